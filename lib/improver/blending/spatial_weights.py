@@ -31,7 +31,6 @@
 """Module to adjust weights spatially based on missing data in input cubes."""
 
 import warnings
-import iris
 import numpy as np
 
 from scipy.ndimage.morphology import distance_transform_edt
@@ -131,6 +130,10 @@ class SpatiallyVaryingWeightsFromMask(object):
         back to a weight of one and any points that are closer than the
         fuzzy_length to a masked point are scaled to be between 0 and 1.
 
+        All of the x-y slices are transformed together, as a stack of
+        slices that are separated by more than the fuzzy_length, so that
+        a masked point only affects the weights within its own slice.
+
         Args:
             weights_from_mask (iris.cube.Cube):
                 A cube containing an initial set of weights based on the mask
@@ -138,35 +141,68 @@ class SpatiallyVaryingWeightsFromMask(object):
         Returns:
             result (iris.cube.Cube):
                 A cube containing the fuzzy weights calculated based on the
-                weights_from_mask. The dimension order may have changed from
-                the input cube as it has been sliced over x and y coordinates.
+                weights_from_mask. The dimensions are in the same order as
+                those of the input cube.
+        """
+        if np.all(weights_from_mask.data == 1.0):
+            # distance_transform_edt doesn't produce what we want if there
+            # are no zeros present.
+            return weights_from_mask.copy()
+
+        # The distance_transform_edt works on N-D arrays, so stack the x-y
+        # slices along a single leading dimension, with a spacing between
+        # the slices that is greater than the fuzzy_length.
+        y_dim, = weights_from_mask.coord_dims(
+            weights_from_mask.coord(axis='y'))
+        x_dim, = weights_from_mask.coord_dims(
+            weights_from_mask.coord(axis='x'))
+        data = np.moveaxis(weights_from_mask.data, [y_dim, x_dim], [-2, -1])
+        stacked_shape = data.shape
+        data = data.reshape((-1,) + stacked_shape[-2:])
+        fuzzy_data = distance_transform_edt(
+            data == 1., sampling=[self.fuzzy_length + 1., 1., 1.])
+        fuzzy_data = fuzzy_data.astype(np.float32)
+        rescaled_fuzzy_data = rescale(
+            fuzzy_data, data_range=[0., self.fuzzy_length], clip=True)
+        rescaled_fuzzy_data = np.moveaxis(
+            rescaled_fuzzy_data.reshape(stacked_shape), [-2, -1],
+            [y_dim, x_dim])
+        return weights_from_mask.copy(data=rescaled_fuzzy_data)
+
+    @staticmethod
+    def _blend_dim_first(cube, blend_coord):
         """
-        result = iris.cube.CubeList()
-        x_coord = weights_from_mask.coord(axis='x').name()
-        y_coord = weights_from_mask.coord(axis='y').name()
-        # The distance_transform_edt works on N-D cubes, so we want to make
-        # sure we only apply it to x-y slices.
-        for weights in weights_from_mask.slices([y_coord, x_coord]):
-            if np.all(weights.data == 1.0):
-                # distance_transform_edt doesn't produce what we want if there
-                # are no zeros present.
-                result.append(weights.copy())
-            else:
-                fuzzy_data = distance_transform_edt(weights.data == 1., 1)
-                fuzzy_data = fuzzy_data.astype(np.float32)
-                rescaled_fuzzy_data = rescale(
-                    fuzzy_data, data_range=[0., self.fuzzy_length],
-                    clip=True)
-                result.append(weights.copy(data=rescaled_fuzzy_data))
-        result = result.merge_cube()
+        Copy a cube, transposing the copy so that the dimension associated
+        with the blend_coord is the leading dimension, with the other
+        dimensions following in their original order. A cube on which the
+        blend_coord is a scalar coordinate is copied without transposing.
+
+        Args:
+            cube (iris.cube.Cube):
+                A cube with a coordinate matching the name given by
+                blend_coord.
+            blend_coord (string):
+                The name of the coordinate whose dimension should lead.
+
+        Returns:
+            result (iris.cube.Cube):
+                A copy of the cube, with the blend_coord dimension leading.
+        """
+        result = cube.copy()
+        blend_dims = result.coord_dims(blend_coord)
+        if blend_dims:
+            blend_dim, = blend_dims
+            result.transpose(
+                [blend_dim] + [dim for dim in range(result.ndim)
+                               if dim != blend_dim])
         return result
 
     @staticmethod
     def multiply_weights(weights_from_mask, one_dimensional_weights_cube,
                          blend_coord):
         """
-        Multiply two cubes together by taking slices along the coordinate
-        matching the blend_coord string.
+        Multiply two cubes together by broadcasting the one dimensional
+        weights along the coordinate matching the blend_coord string.
 
         Args:
             weights_from_mask (iris.cube.Cube):
@@ -194,20 +230,20 @@ class SpatiallyVaryingWeightsFromMask(object):
                 one_dimensional_weights_cube. The blend_coord will be the
                 leading dimension on the output cube.
         """
-        result = iris.cube.CubeList()
         if (weights_from_mask.coord(blend_coord) !=
                 one_dimensional_weights_cube.coord(blend_coord)):
             message = ("The blend_coord {} does not match on "
                        "weights_from_mask and "
                        "one_dimensional_weights_cube".format(blend_coord))
             raise ValueError(message)
-        for masked_weight_slice, one_dimensional_weight in zip(
-                weights_from_mask.slices_over(blend_coord),
-                one_dimensional_weights_cube.slices_over(blend_coord)):
-            masked_weight_slice.data = (
-                masked_weight_slice.data * one_dimensional_weight.data)
-            result.append(masked_weight_slice)
-        result = result.merge_cube()
+        result = SpatiallyVaryingWeightsFromMask._blend_dim_first(
+            weights_from_mask, blend_coord)
+        # Broadcast the one dimensional weights along the leading blend
+        # dimension.
+        one_dimensional_weights = one_dimensional_weights_cube.data.reshape(
+            one_dimensional_weights_cube.shape +
+            (1,) * (result.ndim - one_dimensional_weights_cube.ndim))
+        result.data = result.data * one_dimensional_weights
         return result
 
     @staticmethod
@@ -238,21 +274,19 @@ class SpatiallyVaryingWeightsFromMask(object):
                 The blend_coord will be the leading dimension on the
                 output cube.
         """
-        summed_weights = weights_cube.collapsed(
-            blend_coord, iris.analysis.SUM)
-        result = iris.cube.CubeList()
-        # Slice over blend_coord so the dimensions match.
-        for weight_slice in (
-                weights_cube.slices_over(blend_coord)):
-            # Only divide where the sum of weights are positive. Setting
-            # the out keyword args sets the default value for where
-            # the sum of the weights are zero.
-            normalised_data = np.divide(
-                weight_slice.data, summed_weights.data,
-                out=np.zeros_like(weight_slice.data),
-                where=(summed_weights.data > 0))
-            result.append(weight_slice.copy(data=normalised_data))
-        return result.merge_cube()
+        result = SpatiallyVaryingWeightsFromMask._blend_dim_first(
+            weights_cube, blend_coord)
+        if result.coord_dims(blend_coord):
+            summed_weights = np.sum(result.data, axis=0, keepdims=True)
+        else:
+            summed_weights = result.data
+        # Only divide where the sum of weights are positive. Setting
+        # the out keyword args sets the default value for where
+        # the sum of the weights are zero.
+        result.data = np.divide(
+            result.data, summed_weights, out=np.zeros_like(result.data),
+            where=(summed_weights > 0))
+        return result
 
     @staticmethod
     def create_template_slice(cube_to_collapse, blend_coord):
@@ -309,18 +343,23 @@ class SpatiallyVaryingWeightsFromMask(object):
         x_coord = cube_to_collapse.coord(axis='x').name()
         y_coord = cube_to_collapse.coord(axis='y').name()
         coords_to_slice_over = [blend_coord, y_coord, x_coord]
-        slices = cube_to_collapse.slices(coords_to_slice_over)
-        # Check they all have the same mask
-        first_slice = slices.next()
+        first_slice = next(cube_to_collapse.slices(coords_to_slice_over))
+        # Check they all have the same mask, by comparing the masks of all
+        # of the slices, stacked along a leading dimension, with the first.
         if np.ma.is_masked(first_slice.data):
-            first_mask = first_slice.data.mask
-            for cube_slice in slices:
-                if not np.all(cube_slice.data.mask == first_mask):
-                    message = (
-                        "The mask on the input cube can only vary along the "
-                        "blend_coord, differences in the mask were found "
-                        "along another dimension")
-                    raise ValueError(message)
+            slice_dims = [cube_to_collapse.coord_dims(coord)[0]
+                          for coord in coords_to_slice_over]
+            other_dims = [dim for dim in range(cube_to_collapse.ndim)
+                          if dim not in slice_dims]
+            masks = np.transpose(
+                np.ma.getmaskarray(cube_to_collapse.data),
+                other_dims + slice_dims).reshape((-1,) + first_slice.shape)
+            if not np.all(masks == masks[0]):
+                message = (
+                    "The mask on the input cube can only vary along the "
+                    "blend_coord, differences in the mask were found "
+                    "along another dimension")
+                raise ValueError(message)
         # Remove old dim coords
         for coord in original_dim_coords:
             if coord not in coords_to_slice_over:
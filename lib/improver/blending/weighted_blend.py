@@ -39,10 +39,16 @@ from iris.exceptions import CoordinateNotFoundError
 from improver.utilities.cube_manipulation import sort_coord_in_cube
 from improver.utilities.cube_checker import find_percentile_coordinate
 from improver.utilities.cube_manipulation import enforce_coordinate_ordering
+from improver.utilities.mathematical_operations import (
+    interpolate_multiple_rows)
 from improver.utilities.temporal import (
     cycletime_to_datetime, cycletime_to_number, forecast_period_coord,
     unify_forecast_reference_time, find_latest_cycletime)
 
+# Default limit on the memory used to blend the percentiles for a chunk of
+# points.
+DEFAULT_MAX_MEMORY_IN_BYTES = 2**26
+
 
 def rationalise_blend_time_coords(
         cubelist, blend_coord, cycletime=None, weighting_coord=None):
@@ -266,13 +272,17 @@ class PercentileBlendingAggregator:
         # Create the resulting data array, which is the shape of the original
         # data without dimension we are collapsing over
         result = np.zeros(input_shape[1:], dtype=np.float32)
-        # Loop over the flattened data, i.e. across all the data points in
-        # each slice of the coordinate we are collapsing over, finding the
-        # blended percentile values at each point.
-        for i in range(data.shape[-1]):
-            result[:, i] = (
-                PercentileBlendingAggregator.blend_percentiles(
-                    data[:, :, i], arr_percent, arr_weights[:, :, i]))
+        # Blend the percentiles at chunks of the flattened data points, i.e.
+        # across all the data points in each slice of the coordinate we are
+        # collapsing over, with the size of the chunks limited by the
+        # temporary arrays used for each point.
+        bytes_per_point = 64 * input_shape[0] * input_shape[1]
+        chunk_size = max(1, DEFAULT_MAX_MEMORY_IN_BYTES // bytes_per_point)
+        for start in range(0, data.shape[-1], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            result[:, chunk] = (
+                PercentileBlendingAggregator.blend_percentiles_for_points(
+                    data[:, :, chunk], arr_percent, arr_weights[:, :, chunk]))
         # Reshape the data and put the percentile dimension
         # back in the right place
         shape = arr_percent.shape + shape
@@ -352,6 +362,67 @@ class PercentileBlendingAggregator:
                                           np.float32)
         return new_combined_perc
 
+    @staticmethod
+    def blend_percentiles_for_points(perc_values, percentiles, weights):
+        """ Blend percentiles function, to calculate the weighted blend across
+            a given axis of percentile data for many grid points at once.
+
+            This gives the same result at each point as blend_percentiles,
+            but each step is performed for all the points together.
+
+        Args:
+            perc_values (np.array):
+                Array containing the percentile values to blend, with
+                shape: (length of coord to blend, num of percentiles,
+                num of points)
+            percentiles (np.array):
+                Array of percentile values e.g [0, 20.0, 50.0, 70.0, 100.0],
+                same size as the percentile dimension of data.
+            weights (np.array):
+                Array of weights, with the same shape as perc_values,
+                that we will blend over.
+
+        Returns:
+            new_combined_perc (np.array):
+                Array containing the weighted percentile blend data
+                across the chosen coord, with shape: (num of percentiles,
+                num of points)
+        """
+        # Arrange the data with the percentiles along the last dimension.
+        perc_values = np.moveaxis(perc_values, -1, 1)
+        weights = np.moveaxis(weights, -1, 1)
+        num, num_points, _ = perc_values.shape
+        # Create an array to store the weighted blending pdf
+        combined_pdf = np.zeros(perc_values.shape, dtype=np.float32)
+        # Loop over the axis we are blending over finding the values for the
+        # probability at each threshold in the pdf, for each of the other
+        # points in the axis we are blending over, at all the grid points
+        # at once.
+        for i in range(0, num):
+            for j in range(0, num):
+                if i == j:
+                    recalc_values_in_pdf = percentiles
+                else:
+                    recalc_values_in_pdf = interpolate_multiple_rows(
+                        perc_values[i], perc_values[j], percentiles)
+                # Add the resulting probabilities multiplied by the right
+                # weight to the running total for the combined pdf.
+                combined_pdf[i] += recalc_values_in_pdf*weights[j]
+
+        # Combine and sort the threshold values, and the blended probability
+        # values, for all the points we are blending at each grid point.
+        combined_perc_thres_data = np.sort(
+            np.moveaxis(perc_values, 0, 1).reshape(num_points, -1), axis=-1)
+        combined_perc_values = np.sort(
+            np.moveaxis(combined_pdf, 0, 1).reshape(num_points, -1), axis=-1)
+
+        # Find the percentile values from this combined data by interpolating
+        # back from probability values to the original percentiles.
+        new_combined_perc = interpolate_multiple_rows(
+            percentiles, combined_perc_values,
+            combined_perc_thres_data).astype(np.float32)
+        return new_combined_perc.T
+
 
 class MaxProbabilityAggregator:
     """Class for the Aggregator used to calculate the maximum weighted
@@ -417,7 +488,7 @@ class WeightedBlendAcrossWholeDimension:
        the maximum of the weighted probabilities."""
 
     def __init__(self, coord, weighting_mode, cycletime=None,
-                 timeblending=False):
+                 timeblending=False, streaming=False):
         """Set up for a Weighted Blending plugin
 
         Args:
@@ -440,6 +511,11 @@ class WeightedBlendAcrossWholeDimension:
                 all have the same validity time. Setting this to True will
                 bypass this test, as is necessary for triangular time
                 blending.
+            streaming (bool):
+                If True, non-percentile data is blended one slice over the
+                blending coordinate at a time, so that only a single slice
+                of a cube with lazy data is held in memory. Percentile data
+                is always blended with the PercentileBlendingAggregator.
 
         Raises:
             ValueError : If an invalid weighting_mode is given.
@@ -452,14 +528,16 @@ class WeightedBlendAcrossWholeDimension:
         self.mode = weighting_mode
         self.cycletime = cycletime
         self.timeblending = timeblending
+        self.streaming = streaming
 
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
         description = ('<WeightedBlendAcrossWholeDimension:'
                        ' coord = {0:}, weighting_mode = {1:},'
-                       ' cycletime = {2:}, timeblending: {3:}>')
+                       ' cycletime = {2:}, timeblending: {3:},'
+                       ' streaming: {4:}>')
         return description.format(self.coord, self.mode, self.cycletime,
-                                  self.timeblending)
+                                  self.timeblending, self.streaming)
 
     def check_percentile_coord(self, cube):
         """
@@ -821,6 +899,72 @@ class WeightedBlendAcrossWholeDimension:
         cube_new.data = cube_new.data.astype(np.float32)
         return cube_new
 
+    def streaming_blend(self, cube, weights):
+        """
+        Blend data one slice over self.coord at a time, using either a
+        weighted mean or a weighted maximum. The weighted sum, or the
+        running weighted maximum, and the sum of the weights are accumulated
+        in float32 arrays with the shape of a single slice, so only one
+        slice of a cube with lazy data is realised at any time.
+
+        Args:
+            cube (iris.cube.Cube):
+                The cube which is being blended over self.coord.
+            weights (iris.cube.Cube or None):
+                Cube of blending weights or None.
+        Returns:
+            cube_new (iris.cube.Cube):
+                The cube with values blended over self.coord, with suitable
+                weightings applied.
+        """
+        # Collapse the lazy data to obtain the metadata of the blended cube
+        # without realising any of the data.
+        aggregator = (iris.analysis.MEAN if self.mode == "weighted_mean"
+                      else iris.analysis.MAX)
+        cube_new = cube.copy(data=cube.lazy_data()).collapsed(
+            self.coord, aggregator)
+
+        number_of_fields, = cube.coord(self.coord).shape
+        if weights is None:
+            weights_slices = [None] * number_of_fields
+        else:
+            weights_slices = weights.slices_over(self.coord)
+
+        blended = np.full(cube_new.shape, (
+            0 if self.mode == "weighted_mean" else -np.inf), dtype=np.float32)
+        sum_of_weights = np.zeros(cube_new.shape, dtype=np.float32)
+        sum_of_valid_weights = np.zeros(cube_new.shape, dtype=np.float32)
+        any_valid = np.zeros(cube_new.shape, dtype=bool)
+        is_masked = False
+        for cube_slice, weights_slice in zip(
+                cube.slices_over(self.coord), weights_slices):
+            if weights_slice is None:
+                weights_array = np.full(
+                    cube_slice.shape, 1./number_of_fields, dtype=np.float32)
+            else:
+                weights_array = self.shape_weights(cube_slice, weights_slice)
+            data = cube_slice.data
+            is_masked = is_masked or np.ma.isMaskedArray(data)
+            valid = ~np.ma.getmaskarray(data)
+            weighted_data = np.ma.getdata(data) * weights_array
+            sum_of_weights += weights_array
+            any_valid |= valid
+            if self.mode == "weighted_mean":
+                blended += np.where(valid, weighted_data, 0)
+                sum_of_valid_weights += np.where(valid, weights_array, 0)
+            else:
+                np.maximum(blended, np.where(valid, weighted_data, -np.inf),
+                           out=blended)
+
+        self.check_weights(sum_of_weights[np.newaxis], 0)
+        if self.mode == "weighted_mean":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                blended /= sum_of_valid_weights
+        if is_masked:
+            blended = np.ma.masked_where(~any_valid, blended)
+        cube_new.data = blended
+        return cube_new
+
     def process(self, cube, weights=None):
         """Calculate weighted blend across the chosen coord, for either
            probabilistic or percentile data. If there is a percentile
@@ -879,6 +1023,9 @@ class WeightedBlendAcrossWholeDimension:
         # Percentile aggregator
         if perc_coord and self.mode == "weighted_mean":
             cube_new = self.percentile_weighted_mean(cube, weights, perc_coord)
+        # Weighted mean or maximum, realising one slice at a time.
+        elif self.streaming:
+            cube_new = self.streaming_blend(cube, weights)
         # Weighted mean
         elif self.mode == "weighted_mean":
             cube_new = self.weighted_mean(cube, weights)
@@ -897,7 +1044,267 @@ class WeightedBlendAcrossWholeDimension:
             result.attributes['source_realizations'] = (
                 cube.coord(self.coord).points)
 
-        if isinstance(cube.data, np.ma.core.MaskedArray):
+        # The streaming blend returns masked data for masked inputs without
+        # realising the whole of the input cube.
+        if (not self.streaming or perc_coord) and isinstance(
+                cube.data, np.ma.core.MaskedArray):
             result.data = np.ma.array(result.data)
 
         return result
+
+
+class WeightedBlendAcrossMultipleDimensions:
+    """Apply a sequence of weighted blends to a cube, collapsing each of an
+       ordered list of coordinates in turn, in memory. Consecutive weighted
+       means of unmasked, non-percentile data are fused into a single
+       contraction of the data with the weights of each blend, which is
+       equivalent to blending over each coordinate in turn."""
+
+    def __init__(self, blend_coords, cycletime=None):
+        """Set up for a multiple coordinate Weighted Blending plugin
+
+        Args:
+            blend_coords (list of tuples):
+                Ordered list of (coord, weighting_mode) pairs, giving the
+                name of each coordinate over which the cube will be blended
+                and the weighting_mode, one of 'weighted_maximum' or
+                'weighted_mean', used to blend over it. See
+                WeightedBlendAcrossWholeDimension.
+
+        Keyword Args:
+            cycletime (str):
+                The cycletime in a YYYYMMDDTHHMMZ format e.g. 20171122T0100Z.
+
+        Raises:
+            ValueError : If no blend coordinates are given.
+            ValueError : If a blend coordinate is repeated.
+        """
+        if not blend_coords:
+            msg = "At least one blend coordinate must be given."
+            raise ValueError(msg)
+        coords = [coord for coord, _ in blend_coords]
+        if len(set(coords)) != len(coords):
+            msg = ("Each blend coordinate may only be given once. The blend "
+                   "coordinates given are {}".format(coords))
+            raise ValueError(msg)
+        self.plugins = [
+            WeightedBlendAcrossWholeDimension(
+                coord, weighting_mode, cycletime=cycletime)
+            for coord, weighting_mode in blend_coords]
+        self.cycletime = cycletime
+
+    def __repr__(self):
+        """Represent the configured plugin instance as a string."""
+        description = ('<WeightedBlendAcrossMultipleDimensions:'
+                       ' blend_coords = {0:}, cycletime = {1:}>')
+        blend_coords = [(plugin.coord, plugin.mode)
+                        for plugin in self.plugins]
+        return description.format(blend_coords, self.cycletime)
+
+    @staticmethod
+    def can_fuse(plugin, cube):
+        """
+        Determines whether the blend of a plugin can be fused with those of
+        its neighbours, which requires a weighted mean of data that is
+        neither masked nor percentile data.
+
+        Args:
+            plugin (WeightedBlendAcrossWholeDimension):
+                The plugin for a single blend coordinate.
+            cube (iris.cube.Cube):
+                The cube to be blended.
+        Returns:
+            (bool):
+                True if the blend may be fused.
+        """
+        if plugin.mode != "weighted_mean":
+            return False
+        if isinstance(cube.data, np.ma.core.MaskedArray):
+            return False
+        return plugin.check_percentile_coord(cube) is None
+
+    @staticmethod
+    def compact_weights(plugin, cube, weights):
+        """
+        Get the weights used to blend a cube over the plugin coordinate as
+        an array with only the dimensions of the weights cube, in the order
+        in which they appear on the data cube, normalised over the blending
+        coordinate in the same way as a weighted mean.
+
+        Args:
+            plugin (WeightedBlendAcrossWholeDimension):
+                The plugin for a single blend coordinate.
+            cube (iris.cube.Cube):
+                The cube to be blended, sorted into ascending order along the
+                blending coordinate.
+            weights (iris.cube.Cube or None):
+                Cube of blending weights or None, for equal weights.
+        Returns:
+            (tuple) : tuple containing:
+                **weights_array** (np.array):
+                    Array of the normalised weights.
+                **weights_dims** (list of int):
+                    The dimension of the cube that corresponds to each
+                    dimension of weights_array.
+        Raises:
+            CoordinateNotFoundError : If coordinate to be collapsed not found
+                                      in provided weights cube.
+            ValueError: If weights cube coordinates do not match the data
+                        cube.
+            ValueError: If the weights do not sum to 1 over the blending
+                        coordinate.
+        """
+        blend_dim, = cube.coord_dims(plugin.coord)
+        if weights is None:
+            number_of_fields, = cube.coord(plugin.coord).shape
+            return (np.full(number_of_fields, 1. / number_of_fields,
+                            dtype=np.float32), [blend_dim])
+
+        if not weights.coords(plugin.coord):
+            msg = ('Coordinate to be collapsed not found in weights cube.')
+            raise CoordinateNotFoundError(msg)
+        weights = sort_coord_in_cube(weights, plugin.coord, order="ascending")
+
+        weights_dims = []
+        for dim_coord in weights.dim_coords:
+            try:
+                weights_dims.append(cube.coord_dims(dim_coord.name())[0])
+            except CoordinateNotFoundError:
+                message = (
+                    "{} is a coordinate on the weights cube but it is not "
+                    "found on the cube we are trying to collapse.")
+                raise ValueError(message.format(dim_coord.name()))
+        order = np.argsort(weights_dims)
+        weights_array = np.transpose(
+            np.array(weights.data, dtype=np.float32), order)
+        weights_dims = sorted(weights_dims)
+        if [cube.shape[dim] for dim in weights_dims] != list(
+                weights_array.shape):
+            msg = ("Weights cube is not a compatible shape with the"
+                   " data cube. Weights: {}, Diagnostic: {}".format(
+                       weights.shape, cube.shape))
+            raise ValueError(msg)
+
+        blend_axis = weights_dims.index(blend_dim)
+        plugin.check_weights(weights_array, blend_axis)
+        sum_of_weights = np.sum(weights_array, axis=blend_axis, keepdims=True)
+        weights_array = np.divide(
+            weights_array, sum_of_weights, out=np.zeros_like(weights_array),
+            where=sum_of_weights > 0)
+        return weights_array, weights_dims
+
+    def fused_weighted_mean(self, cube, plugins, weights):
+        """
+        Blend a cube over the coordinates of several plugins at once, using
+        a weighted mean over each coordinate. The weighted mean over each
+        coordinate in turn is the sum over all of the coordinates of the
+        data multiplied by the product of the normalised weights, so the
+        data is contracted with the weights of every blend in a single pass.
+        The metadata is that of blending a cube with lazy data over each
+        coordinate in turn.
+
+        Args:
+            cube (iris.cube.Cube):
+                The cube which is being blended.
+            plugins (list of WeightedBlendAcrossWholeDimension):
+                The plugins for each blend coordinate, in order.
+            weights (list of iris.cube.Cube or None):
+                Cube of blending weights or None for each plugin.
+        Returns:
+            cube_new (iris.cube.Cube):
+                The cube with values blended over the coordinate of each
+                plugin, with suitable weightings applied.
+        Raises:
+            CoordinateNotFoundError : If coordinate to be collapsed not found
+                                      in cube.
+            ValueError : If coordinate to be collapsed is not a dimension.
+        """
+        for plugin in plugins:
+            if not cube.coords(plugin.coord):
+                msg = ('Coordinate to be collapsed not found in cube.')
+                raise CoordinateNotFoundError(msg)
+            if not cube.coord_dims(plugin.coord):
+                raise ValueError('Blending coordinate {} has no associated '
+                                 'dimension'.format(plugin.coord))
+            cube = sort_coord_in_cube(cube, plugin.coord, order="ascending")
+
+        # The dimension of the input cube of each dimension of the cube at
+        # each step of the blending.
+        remaining_dims = list(range(cube.ndim))
+        operands = []
+        cube_new = cube.copy(data=cube.lazy_data())
+        for plugin, plugin_weights in zip(plugins, weights):
+            plugin.check_compatible_time_points(cube_new)
+            weights_array, weights_dims = self.compact_weights(
+                plugin, cube_new, plugin_weights)
+            operands.extend(
+                [weights_array, [remaining_dims[dim] for dim in weights_dims]])
+
+            cube_orig = cube_new
+            cube_new = conform_metadata(
+                cube_orig.collapsed(plugin.coord, iris.analysis.MEAN),
+                cube_orig, coord=plugin.coord, cycletime=plugin.cycletime)
+            if plugin.coord == "realization":
+                cube_new.attributes['source_realizations'] = (
+                    cube_orig.coord(plugin.coord).points)
+            remaining_dims.pop(cube_orig.coord_dims(plugin.coord)[0])
+
+        data = np.einsum(cube.data, list(range(cube.ndim)), *operands,
+                         remaining_dims, optimize=True)
+        cube_new.data = data.astype(np.float32)
+        return cube_new
+
+    def process(self, cube, weights=None):
+        """Calculate the weighted blend across each of the blend coordinates
+           in turn. Runs of consecutive blends that can be fused are
+           calculated with fused_weighted_mean, and all other blends with
+           WeightedBlendAcrossWholeDimension.
+
+        Args:
+            cube (iris.cube.Cube):
+                Cube to blend across the blend coordinates.
+        Keyword Args:
+            weights (list of iris.cube.Cube or None):
+                Cube of blending weights for each blend coordinate, in the
+                same order as the blend coordinates. Each weights cube must
+                be compatible with the cube remaining after blending over
+                the preceding blend coordinates. A weights cube of None
+                blends with equal weights across that coordinate. If None,
+                every blend uses equal weights.
+        Returns:
+            result (iris.cube.Cube):
+                containing the weighted blend across the blend coordinates.
+        Raises:
+            TypeError : If the first argument not a cube.
+            ValueError : If the number of weights cubes does not match the
+                         number of blend coordinates.
+        """
+        if not isinstance(cube, iris.cube.Cube):
+            msg = ('The first argument must be an instance of iris.cube.Cube '
+                   'but is {}.'.format(type(cube)))
+            raise TypeError(msg)
+
+        if weights is None:
+            weights = [None] * len(self.plugins)
+        if len(weights) != len(self.plugins):
+            msg = ("The number of weights cubes ({}) does not match the "
+                   "number of blend coordinates ({})".format(
+                       len(weights), len(self.plugins)))
+            raise ValueError(msg)
+
+        result = cube
+        index = 0
+        while index < len(self.plugins):
+            end = index
+            while (end < len(self.plugins) and
+                   self.can_fuse(self.plugins[end], result)):
+                end += 1
+            if end - index > 1:
+                result = self.fused_weighted_mean(
+                    result, self.plugins[index:end], weights[index:end])
+                index = end
+            else:
+                result = self.plugins[index].process(
+                    result, weights=weights[index])
+                index += 1
+        return result
@@ -31,6 +31,8 @@
 """Module to create the weights used to blend data."""
 
 import copy
+import json
+import hashlib
 import cf_units
 
 import numpy as np
@@ -38,8 +40,12 @@ from scipy.interpolate import interp1d
 
 import iris
 
+from improver.utilities.cache import LeastRecentlyUsedCache
 from improver.utilities.cube_manipulation import check_cube_coordinates
 
+# Default maximum number of weights cubes held within a WeightsCache.
+DEFAULT_MAX_ENTRIES = 128
+
 
 class WeightsUtilities:
     """ Utilities for Weight processing. """
@@ -300,12 +306,114 @@ class WeightsUtilities:
         return weights_cube
 
 
+class WeightsCache(LeastRecentlyUsedCache):
+    """
+    Least recently used cache of weights cubes calculated by the weights
+    plugins. The weights depend only upon the configuration of the plugin
+    and the coordinates of the cubes to be blended, so a key built from
+    these identifies the weights. This allows the weights to be reused
+    when the same blend is set up many times, for example for each
+    diagnostic within a cycle, without interpolating the weights or
+    constructing the weights cube again. The cache may be shared between
+    threads.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Initialise class.
+
+        Keyword Args:
+            max_entries (int):
+                Maximum number of weights cubes to hold. When this is
+                exceeded, the least recently used weights cube is discarded.
+        """
+        super().__init__(max_entries)
+
+    def get_weights(self, key, function, *args, **kwargs):
+        """
+        Return a copy of the weights cube held for the key, or calculate and
+        hold the weights cube if it is not present.
+
+        Args:
+            key (tuple):
+                Hashable key identifying the weights cube.
+            function (callable):
+                Function to calculate the weights cube, if it is not present.
+            *args:
+                Positional arguments passed to the function.
+            **kwargs:
+                Keyword arguments passed to the function.
+
+        Returns:
+            weights_cube (iris.cube.Cube):
+                A copy of the weights cube held for the key, which may be
+                modified.
+        """
+        return self.get(key, function, *args, **kwargs).copy()
+
+    @staticmethod
+    def config_key(config_dict):
+        """
+        Create a key identifying the contents of a configuration dictionary.
+
+        Args:
+            config_dict (dict):
+                Dictionary containing the configuration information.
+
+        Returns:
+            key (str):
+                Hash of the configuration dictionary.
+        """
+        return hashlib.sha1(json.dumps(
+            config_dict, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def cube_key(cube, dims=None):
+        """
+        Create a key identifying the metadata of a cube, that is the units,
+        attributes and cell methods and the coordinates, but not the data.
+
+        Args:
+            cube (iris.cube.Cube):
+                Cube to be identified.
+
+        Keyword Args:
+            dims (list or None):
+                Dimensions of the cube to be identified. Coordinates that
+                span any other dimension are excluded from the key. If None,
+                all the coordinates are included.
+
+        Returns:
+            key (tuple):
+                Hashable description of the metadata of the cube.
+        """
+        coord_keys = []
+        for coord in cube.coords():
+            coord_dims = cube.coord_dims(coord)
+            if dims is not None and not set(coord_dims).issubset(dims):
+                continue
+            coord_keys.append((
+                coord.name(), coord.var_name, str(coord.units),
+                str(coord.coord_system), coord_dims,
+                WeightsCache.array_key(coord.points),
+                WeightsCache.array_key(coord.bounds)
+                if coord.has_bounds() else None,
+                str(sorted(coord.attributes.items()))))
+        return (str(cube.units), str(sorted(cube.attributes.items())),
+                str(cube.cell_methods), tuple(coord_keys))
+
+
+# Weights cache shared by the weights plugins, so that weights are reused
+# between instances of the plugins.
+WEIGHTS_CACHE = WeightsCache()
+
+
 class ChooseWeightsLinear:
     """Plugin to interpolate weights linearly to the required points, where
     original weights are provided as a configuration dictionary"""
 
     def __init__(self, weighting_coord_name, config_dict,
-                 config_coord_name="model_configuration"):
+                 config_coord_name="model_configuration", cache=None):
         """
         Set up for calculating linear weights from a dictionary or input cube
 
@@ -328,6 +436,9 @@ class ChooseWeightsLinear:
                 For example, if the intention is to create weights that scale
                 differently with the weighting_coord for different models, then
                 "model_configuration" would be the config_coord.
+            cache (WeightsCache or None):
+                Cache of weights cubes. If None, the WEIGHTS_CACHE shared
+                between instances of the weights plugins is used.
 
         Dictionary of format::
 
@@ -350,6 +461,7 @@ class ChooseWeightsLinear:
         self.config_dict = config_dict
         self.weights_key_name = "weights"
         self._check_config_dict()
+        self.cache = WEIGHTS_CACHE if cache is None else cache
 
     def __repr__(self):
         """Represent the plugin instance as a string"""
@@ -588,9 +700,39 @@ class ChooseWeightsLinear:
 
         return iris.cube.CubeList(cubelist)
 
+    def _cubes_key(self, cubes):
+        """
+        Create a key identifying the metadata of the input cubes that the
+        weights cube is calculated from. This includes the coordinates that
+        span only the config coordinate and weighting coordinate dimensions,
+        as only these are retained on the weights cube.
+
+        Args:
+            cubes (iris.cube.Cube or iris.cube.CubeList):
+                Cubes passed into the plugin.
+
+        Returns:
+            key (tuple):
+                Hashable description of the input cubes.
+        """
+        if isinstance(cubes, iris.cube.Cube):
+            cubes = [cubes]
+        key = [type(cubes).__name__]
+        for cube in cubes:
+            dims = []
+            for coord_name in [self.weighting_coord_name,
+                               self.config_coord_name]:
+                if cube.coords(coord_name):
+                    dims.extend(cube.coord_dims(coord_name))
+            key.append(self.cache.cube_key(cube, dims=dims))
+        return tuple(key)
+
     def process(self, cubes):
         """Calculation of linear weights based on an input dictionary.
 
+        The weights cube is held within the cache, so that it can be reused
+        for input cubes with the same coordinates.
+
         Args:
             cubes (iris.cube.Cube or iris.cube.CubeList):
                 Cubes containing the coordinate (source point) information
@@ -604,6 +746,25 @@ class ChooseWeightsLinear:
                 Cube containing the output from the interpolation.
                 DimCoords (such as model_id) will be in sorted-ascending order.
         """
+        key = ("ChooseWeightsLinear", self.cache.config_key(self.config_dict),
+               self.weighting_coord_name, self.config_coord_name,
+               self._cubes_key(cubes))
+        return self.cache.get_weights(
+            key, self._create_normalised_weights_cube, cubes)
+
+    def _create_normalised_weights_cube(self, cubes):
+        """Calculate the linear weights for the input cubes and normalise
+        them across the config coordinate.
+
+        Args:
+            cubes (iris.cube.Cube or iris.cube.CubeList):
+                Cubes containing the coordinate (source point) information
+                that will be used for setting up the interpolation.
+
+        Returns:
+            new_weights_cube (iris.cube.Cube):
+                Cube containing the output from the interpolation.
+        """
         # create 2D cube lists with relevant dimensions only for dict
         # processing
         cubes = self._slice_input_cubes(cubes)
@@ -627,7 +788,7 @@ class ChooseWeightsLinear:
 class ChooseDefaultWeightsLinear:
     """ Calculate Default Weights using Linear Function. """
 
-    def __init__(self, y0val=None, slope=0.0, ynval=None):
+    def __init__(self, y0val=None, slope=0.0, ynval=None, cache=None):
         """Set up for calculating default weights using linear function
 
             Keyword Args:
@@ -639,6 +800,10 @@ class ChooseDefaultWeightsLinear:
                     Relative weights of last point.
                     Default value is None
 
+                cache (WeightsCache or None):
+                    Cache of weights cubes. If None, the WEIGHTS_CACHE shared
+                    between instances of the weights plugins is used.
+
             slope OR ynval should be set but NOT BOTH.
 
             If y0val value is not set or set to None then the code
@@ -648,6 +813,7 @@ class ChooseDefaultWeightsLinear:
         """
         self.slope = slope
         self.ynval = ynval
+        self.cache = WEIGHTS_CACHE if cache is None else cache
 
         if y0val is None:
             self.y0val = 20.0
@@ -705,7 +871,9 @@ class ChooseDefaultWeightsLinear:
 
     def process(self, cube, coord_name, coord_vals=None, coord_unit='no_unit',
                 weights_distrib_method='evenly'):
-        """Calculated weights for a given cube and coord.
+        """Calculated weights for a given cube and coord. The weights cube is
+        held within the cache, so that it can be reused for cubes with the
+        same coordinates along the blending dimension.
 
             Args:
                 cube (iris.cube.Cube):
@@ -736,6 +904,25 @@ class ChooseDefaultWeightsLinear:
                    ' {0:s}'.format(str(type(cube))))
             raise TypeError(msg)
 
+        blend_dims = (
+            cube.coord_dims(coord_name) if cube.coords(coord_name) else ())
+        key = (type(self).__name__, (self.y0val, self.slope, self.ynval),
+               coord_name, coord_vals, str(coord_unit), weights_distrib_method,
+               self.cache.cube_key(cube, dims=blend_dims))
+        return self.cache.get_weights(
+            key, self._create_weights_cube, cube, coord_name, coord_vals,
+            coord_unit, weights_distrib_method)
+
+    def _create_weights_cube(self, cube, coord_name, coord_vals, coord_unit,
+                             weights_distrib_method):
+        """Calculate the weights for a given cube and coord, and build the
+        weights cube. The arguments are as for the process method.
+
+            Returns:
+                weights_cube (iris.cube.Cube):
+                    Cube containing the 1D array of normalised weights
+                    matching the length of the cube dimension to be blended
+        """
         (num_of_weights,
          exp_coord_found) = WeightsUtilities.process_coord(
              cube, coord_name, coord_vals, coord_unit)
@@ -761,7 +948,7 @@ class ChooseDefaultWeightsLinear:
 
 class ChooseDefaultWeightsNonLinear:
     """ Calculate Default Weights using NonLinear Function. """
-    def __init__(self, cval=0.85):
+    def __init__(self, cval=0.85, cache=None):
         """Set up for calculating default weights using non-linear function.
 
             Args:
@@ -769,8 +956,13 @@ class ChooseDefaultWeightsNonLinear:
                        Value greater than 0, less than equal 1.0
                        default = 0.85
                        equal weights when cval = 1.0
+                cache (WeightsCache or None):
+                       Cache of weights cubes. If None, the WEIGHTS_CACHE
+                       shared between instances of the weights plugins is
+                       used.
         """
         self.cval = cval
+        self.cache = WEIGHTS_CACHE if cache is None else cache
 
     def nonlinear_weights(self, num_of_weights):
         """Create nonlinear weights.
@@ -803,7 +995,9 @@ class ChooseDefaultWeightsNonLinear:
 
     def process(self, cube, coord_name, coord_vals=None, coord_unit='no_unit',
                 weights_distrib_method='evenly'):
-        """Calculated weights for a given cube and coord.
+        """Calculated weights for a given cube and coord. The weights cube is
+        held within the cache, so that it can be reused for cubes with the
+        same coordinates along the blending dimension.
 
             Args:
                 cube (iris.cube.Cube):
@@ -834,6 +1028,25 @@ class ChooseDefaultWeightsNonLinear:
                    ' {0:s}'.format(str(type(cube))))
             raise TypeError(msg)
 
+        blend_dims = (
+            cube.coord_dims(coord_name) if cube.coords(coord_name) else ())
+        key = (type(self).__name__, (self.cval,), coord_name, coord_vals,
+               str(coord_unit), weights_distrib_method,
+               self.cache.cube_key(cube, dims=blend_dims))
+        return self.cache.get_weights(
+            key, self._create_weights_cube, cube, coord_name, coord_vals,
+            coord_unit, weights_distrib_method)
+
+    def _create_weights_cube(self, cube, coord_name, coord_vals, coord_unit,
+                             weights_distrib_method):
+        """Calculate the weights for a given cube and coord, and build the
+        weights cube. The arguments are as for the process method.
+
+            Returns:
+                weights_cube (iris.cube.Cube):
+                    Cube containing the 1D array of normalised weights
+                    matching the length of the cube dimension to be blended
+        """
         (num_of_weights,
          exp_coord_found) = WeightsUtilities.process_coord(
              cube, coord_name, coord_vals, coord_unit)
@@ -35,7 +35,8 @@ This module defines all the "plugins" specific for ensemble calibration.
 import numpy as np
 from scipy import stats
 from scipy.optimize import minimize
-from scipy.stats import norm
+from scipy.special import ndtr
+import time
 import warnings
 
 import cf_units as unit
@@ -59,16 +60,22 @@ class ContinuousRankedProbabilityScoreMinimisers(object):
     The number of coefficients that will be optimised depend upon the initial
     guess.
 
-    Minimisation is performed using the Nelder-Mead algorithm for 200
-    iterations to limit the computational expense.
+    By default, minimisation is performed using the Nelder-Mead algorithm
+    for 200 iterations to limit the computational expense.
     Note that the BFGS algorithm was initially trialled but had a bug
-    in comparison to comparative results generated in R.
+    in comparison to comparative results generated in R. The gradient-based
+    L-BFGS-B and BFGS algorithms can instead be requested, in which case the
+    closed-form gradient of the CRPS with respect to the coefficients is
+    supplied to the minimiser.
 
     """
 
-    # Maximum iterations for minimisation using Nelder-Mead.
+    # Maximum iterations for minimisation.
     MAX_ITERATIONS = 200
 
+    # Minimisation methods that use the gradient of the CRPS.
+    GRADIENT_METHODS = ["L-BFGS-B", "BFGS"]
+
     # The tolerated percentage change for the final iteration when
     # performing the minimisation.
     TOLERATED_PERCENTAGE_CHANGE = 5
@@ -77,12 +84,257 @@ class ContinuousRankedProbabilityScoreMinimisers(object):
     # as part of the minimisation.
     BAD_VALUE = np.float64(999999)
 
-    def __init__(self):
+    def __init__(self, minimisation_method="Nelder-Mead"):
+        """
+        Initialise class.
+
+        Args:
+            minimisation_method (String):
+                The method used by scipy.optimize.minimize. Either
+                "Nelder-Mead", or one of the gradient-based methods
+                "L-BFGS-B" and "BFGS".
+
+        Raises:
+            ValueError: The minimisation method is not supported.
+
+        """
+        if minimisation_method not in ["Nelder-Mead"] + self.GRADIENT_METHODS:
+            msg = ("Minimisation method requested {} is not supported. "
+                   "Supported methods are: {}".format(
+                       minimisation_method,
+                       ["Nelder-Mead"] + self.GRADIENT_METHODS))
+            raise ValueError(msg)
+        self.minimisation_method = minimisation_method
         # Dictionary containing the minimisation functions, which will
         # be used, depending upon the distribution, which is requested.
         self.minimisation_dict = {
             "gaussian": self.normal_crps_minimiser,
             "truncated gaussian": self.truncated_normal_crps_minimiser}
+        # Dictionary containing the functions returning both the CRPS and
+        # its gradient, which are used by the gradient-based methods.
+        self.gradient_dict = {
+            "gaussian": self.normal_crps_and_gradient,
+            "truncated gaussian": self.truncated_normal_crps_and_gradient}
+        # Diagnostics describing the convergence of the last minimisation.
+        self.diagnostics = {}
+        # Arrays that are reused by each evaluation of the CRPS within a
+        # minimisation.
+        self._buffers = {}
+
+    def __repr__(self):
+        """Represent the configured plugin instance as a string."""
+        result = ('<ContinuousRankedProbabilityScoreMinimisers: '
+                  'minimisation_method: {}>')
+        return result.format(self.minimisation_method)
+
+    def _workspace(self, name, shape, dtype):
+        """
+        Return an array that is allocated on first use, and reused by later
+        evaluations of the CRPS with data of the same shape and type.
+
+        Args:
+            name (String):
+                Name of the array.
+            shape (tuple):
+                Shape of the array.
+            dtype (numpy.dtype):
+                Type of the array.
+
+        Returns:
+            array (Numpy array):
+                Uninitialised array.
+
+        """
+        array = self._buffers.get(name)
+        if array is None or array.shape != shape or array.dtype != dtype:
+            array = np.empty(shape, dtype=dtype)
+            self._buffers[name] = array
+        return array
+
+    def _calculate_mu_and_sigma(
+            self, coeffs, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag):
+        """
+        Calculate the location parameter mu = a + b*X and the scale
+        parameter sigma = sqrt(c**2 + d**2 * S**2) of the distribution at
+        each point, without forming a matrix of the predictor alongside a
+        column of ones. The location parameter is held in double precision,
+        whilst the scale parameter has the precision of the variance and
+        the coefficients.
+
+        Args:
+            coeffs (Numpy array):
+                Coefficients in the order [c, d, a, b].
+            forecast_predictor (Numpy array):
+                Data to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            truth (Numpy array):
+                Data to be used as truth.
+            forecast_var (Numpy array):
+                Ensemble variance data.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple): tuple containing:
+                **mu** (Numpy array):
+                    Location parameter at each point, held in the workspace.
+                **sigma** (Numpy array):
+                    Scale parameter at each point, held in the workspace.
+
+        """
+        coeffs = np.asarray(coeffs)
+        dtype = np.result_type(
+            forecast_predictor.dtype, truth.dtype, np.float64)
+        mu = self._workspace("mu", truth.shape, dtype)
+        sigma = self._workspace(
+            "sigma", truth.shape,
+            np.result_type(forecast_var.dtype, coeffs.dtype))
+        if predictor_of_mean_flag.lower() in ["mean"]:
+            mu[...] = forecast_predictor
+            mu *= coeffs[3]
+        elif predictor_of_mean_flag.lower() in ["realizations"]:
+            # The weights of the realizations are b = beta**2.
+            np.matmul(forecast_predictor,
+                      np.square(coeffs[3:]).astype(dtype), out=mu)
+        mu += coeffs[2]
+        np.multiply(forecast_var, coeffs[1]**2, out=sigma)
+        sigma += coeffs[0]**2
+        np.sqrt(sigma, out=sigma)
+        return mu, sigma
+
+    @staticmethod
+    def _normal_pdf(x, out=None, scale=1.):
+        """
+        Calculate the probability density function of the standard normal
+        distribution, multiplied by a scale factor.
+
+        Args:
+            x (Numpy array):
+                Values at which to calculate the probability density.
+            out (Numpy array or None):
+                Array in which to store the result, which may be x.
+            scale (Float):
+                Factor by which the probability density is multiplied.
+
+        Returns:
+            pdf (Numpy array):
+                The scaled probability density.
+
+        """
+        pdf = np.multiply(x, x, out=out)
+        pdf *= -0.5
+        np.exp(pdf, out=pdf)
+        pdf /= np.sqrt(2 * np.pi)
+        if scale != 1:
+            pdf *= scale
+        return pdf
+
+    @staticmethod
+    def _flatten_training_data(
+            forecast_predictor, truth, forecast_var, predictor_of_mean_flag):
+        """
+        Flatten the training data into the arrays used by the minimisation
+        functions.
+
+        Args:
+            forecast_predictor (iris.cube.Cube):
+                Cube containing the fields to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            truth (iris.cube.Cube):
+                Cube containing the field, which will be used as truth.
+            forecast_var (iris.cube.Cube):
+                Cube containg the field containing the ensemble variance.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple): tuple containing:
+                **forecast_predictor_data** (Numpy array):
+                    The flattened predictor, with an additional trailing
+                    realization dimension if the realizations are the
+                    predictor.
+                **truth_data** (Numpy array):
+                    The flattened truth.
+                **forecast_var_data** (Numpy array):
+                    The flattened ensemble variance.
+
+            Points at which any of the fields are masked or not finite are
+            excluded from each of the arrays.
+
+        """
+        # Ensure predictor_of_mean_flag is valid.
+        check_predictor_of_mean_flag(predictor_of_mean_flag)
+
+        if predictor_of_mean_flag.lower() in ["mean"]:
+            forecast_predictor_data = forecast_predictor.data.flatten()
+        elif predictor_of_mean_flag.lower() in ["realizations"]:
+            forecast_predictor = (
+                enforce_coordinate_ordering(
+                    forecast_predictor, "realization"))
+            forecast_predictor_data = convert_cube_data_to_2d(
+                forecast_predictor)
+        forecast_predictor_data, truth_data, forecast_var_data = [
+            np.ma.filled(data, np.nan) for data in
+            [forecast_predictor_data, truth.data.flatten(),
+             forecast_var.data.flatten()]]
+        # Points that are masked or not finite in any of the fields are
+        # excluded from the training data, so that the CRPS is calculated
+        # over the valid points only.
+        valid = (
+            np.isfinite(truth_data) & np.isfinite(forecast_var_data) &
+            np.isfinite(forecast_predictor_data.reshape(
+                len(truth_data), -1)).all(axis=1))
+        return (forecast_predictor_data[valid], truth_data[valid],
+                forecast_var_data[valid])
+
+    def calculate_crps(
+            self, coeffs, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag, distribution):
+        """
+        Calculate the mean CRPS of the training data for a set of
+        coefficients, without minimising it.
+
+        Args:
+            coeffs (List):
+                List of coefficients.
+                Order of coefficients is [c, d, a, b].
+            forecast_predictor (iris.cube.Cube):
+                Cube containing the fields to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            truth (iris.cube.Cube):
+                Cube containing the field, which will be used as truth.
+            forecast_var (iris.cube.Cube):
+                Cube containg the field containing the ensemble variance.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+            distribution (String):
+                String used to access the appropriate minimisation function
+                within self.minimisation_dict.
+
+        Returns:
+            crps (Float):
+                The CRPS averaged over the valid points of the training
+                data.
+
+        """
+        (forecast_predictor_data, truth_data, forecast_var_data) = (
+            self._flatten_training_data(
+                forecast_predictor, truth, forecast_var,
+                predictor_of_mean_flag))
+        total_crps = self.minimisation_dict[distribution](
+            np.array(coeffs, dtype=np.float64),
+            forecast_predictor_data.astype(np.float64),
+            truth_data.astype(np.float64),
+            forecast_var_data.astype(np.float64), np.sqrt(np.pi),
+            predictor_of_mean_flag)
+        return float(total_crps / max(1, len(truth_data)))
 
     def crps_minimiser_wrapper(
             self, initial_guess, forecast_predictor, truth, forecast_var,
@@ -152,40 +404,58 @@ class ContinuousRankedProbabilityScoreMinimisers(object):
                        distribution, self.minimisation_dict, err))
             raise KeyError(msg)
 
-        # Ensure predictor_of_mean_flag is valid.
-        check_predictor_of_mean_flag(predictor_of_mean_flag)
-
-        if predictor_of_mean_flag.lower() in ["mean"]:
-            forecast_predictor_data = forecast_predictor.data.flatten()
-            truth_data = truth.data.flatten()
-            forecast_var_data = forecast_var.data.flatten()
-        elif predictor_of_mean_flag.lower() in ["realizations"]:
-            truth_data = truth.data.flatten()
-            forecast_predictor = (
-                enforce_coordinate_ordering(
-                    forecast_predictor, "realization"))
-            forecast_predictor_data = convert_cube_data_to_2d(
-                forecast_predictor)
-            forecast_var_data = forecast_var.data.flatten()
-
-        initial_guess = np.array(initial_guess, dtype=np.float32)
-        forecast_predictor_data = forecast_predictor_data.astype(np.float32)
-        forecast_var_data = forecast_var_data.astype(np.float32)
-        truth_data = truth_data.astype(np.float32)
-        sqrt_pi = np.sqrt(np.pi).astype(np.float32)
-
-        optimised_coeffs = minimize(
-            minimisation_function, initial_guess,
-            args=(forecast_predictor_data, truth_data,
-                  forecast_var_data, sqrt_pi, predictor_of_mean_flag),
-            method="Nelder-Mead",
-            options={"maxiter": self.MAX_ITERATIONS, "return_all": True})
+        (forecast_predictor_data, truth_data, forecast_var_data) = (
+            self._flatten_training_data(
+                forecast_predictor, truth, forecast_var,
+                predictor_of_mean_flag))
+
+        start_time = time.time()
+        if self.minimisation_method in self.GRADIENT_METHODS:
+            # The gradient is accumulated over every point, so double
+            # precision is used to give a smooth objective for the line
+            # search.
+            initial_guess = np.array(initial_guess, dtype=np.float64)
+            allvecs = [initial_guess]
+            optimised_coeffs = minimize(
+                self.gradient_dict[distribution], initial_guess,
+                args=(forecast_predictor_data.astype(np.float64),
+                      truth_data.astype(np.float64),
+                      forecast_var_data.astype(np.float64),
+                      np.sqrt(np.pi), predictor_of_mean_flag),
+                method=self.minimisation_method, jac=True,
+                callback=lambda coeffs: allvecs.append(np.copy(coeffs)),
+                options={"maxiter": self.MAX_ITERATIONS})
+        else:
+            initial_guess = np.array(initial_guess, dtype=np.float32)
+            forecast_predictor_data = forecast_predictor_data.astype(
+                np.float32)
+            forecast_var_data = forecast_var_data.astype(np.float32)
+            truth_data = truth_data.astype(np.float32)
+            sqrt_pi = np.sqrt(np.pi).astype(np.float32)
+
+            optimised_coeffs = minimize(
+                minimisation_function, initial_guess,
+                args=(forecast_predictor_data, truth_data,
+                      forecast_var_data, sqrt_pi, predictor_of_mean_flag),
+                method="Nelder-Mead",
+                options={"maxiter": self.MAX_ITERATIONS, "return_all": True})
+            allvecs = optimised_coeffs.allvecs
+        self._buffers = {}
+        self.diagnostics = {
+            "minimisation_method": self.minimisation_method,
+            "success": bool(optimised_coeffs.success),
+            "message": str(optimised_coeffs.message),
+            "iterations": int(optimised_coeffs.nit),
+            "function_evaluations": int(optimised_coeffs.nfev),
+            "crps": float(optimised_coeffs.fun),
+            "wall_time": time.time() - start_time}
         if not optimised_coeffs.success:
             msg = ("Minimisation did not result in convergence after "
                    "{} iterations. \n{}".format(
                        self.MAX_ITERATIONS, optimised_coeffs.message))
             warnings.warn(msg)
-        calculate_percentage_change_in_last_iteration(optimised_coeffs.allvecs)
+        if len(allvecs) > 1:
+            calculate_percentage_change_in_last_iteration(allvecs)
         return optimised_coeffs.x
 
     def normal_crps_minimiser(
@@ -224,27 +494,26 @@ class ContinuousRankedProbabilityScoreMinimisers(object):
                 Minimum value for the CRPS achieved.
 
         """
-        if predictor_of_mean_flag.lower() in ["mean"]:
-            beta = initial_guess[2:]
-        elif predictor_of_mean_flag.lower() in ["realizations"]:
-            beta = np.array(
-                [initial_guess[2]]+(initial_guess[3:]**2).tolist(),
-                dtype=np.float32
-            )
-
-        new_col = np.ones(truth.shape, dtype=np.float32)
-        all_data = np.column_stack((new_col, forecast_predictor))
-        mu = np.dot(all_data, beta)
-        sigma = np.sqrt(
-            initial_guess[0]**2 + initial_guess[1]**2 * forecast_var)
-        xz = (truth - mu) / sigma
-        normal_cdf = norm.cdf(xz)
-        normal_pdf = norm.pdf(xz)
-        result = np.nansum(
-            sigma * (xz * (2 * normal_cdf - 1) + 2 * normal_pdf - 1 / sqrt_pi))
-        if not np.isfinite(np.min(mu/sigma)):
-            result = self.BAD_VALUE
-        return result
+        mu, sigma = self._calculate_mu_and_sigma(
+            initial_guess, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag)
+        work = self._workspace("work", mu.shape, mu.dtype)
+        np.divide(mu, sigma, out=work)
+        if not np.isfinite(np.min(work)):
+            return self.BAD_VALUE
+
+        # xz = (truth - mu) / sigma, which overwrites mu.
+        xz = np.subtract(truth, mu, out=mu)
+        xz /= sigma
+        # sigma * (xz * (2 * cdf(xz) - 1) + 2 * pdf(xz) - 1 / sqrt_pi)
+        ndtr(xz, out=work)
+        work *= 2
+        work -= 1
+        work *= xz
+        work += self._normal_pdf(xz, out=xz, scale=2.)
+        work -= 1 / sqrt_pi
+        work *= sigma
+        return np.nansum(work)
 
     def truncated_normal_crps_minimiser(
             self, initial_guess, forecast_predictor, truth, forecast_var,
@@ -283,33 +552,267 @@ class ContinuousRankedProbabilityScoreMinimisers(object):
                 Minimum value for the CRPS achieved.
 
         """
-        if predictor_of_mean_flag.lower() in ["mean"]:
-            beta = initial_guess[2:]
-        elif predictor_of_mean_flag.lower() in ["realizations"]:
-            beta = np.array(
-                [initial_guess[2]]+(initial_guess[3:]**2).tolist(),
-                dtype=np.float32
-            )
-
-        new_col = np.ones(truth.shape, dtype=np.float32)
-        all_data = np.column_stack((new_col, forecast_predictor))
-        mu = np.dot(all_data, beta)
-        sigma = np.sqrt(
-            initial_guess[0]**2 + initial_guess[1]**2 * forecast_var)
+        mu, sigma = self._calculate_mu_and_sigma(
+            initial_guess, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag)
+        x0 = self._workspace("x0", mu.shape, mu.dtype)
+        np.divide(mu, sigma, out=x0)
+        if not np.isfinite(np.min(x0)) or (np.min(x0) < -3):
+            return self.BAD_VALUE
+
+        # xz = (truth - mu) / sigma, which overwrites mu.
+        xz = np.subtract(truth, mu, out=mu)
+        xz /= sigma
+        normal_cdf_0 = ndtr(
+            x0, out=self._workspace("cdf_0", mu.shape, mu.dtype))
+        # (sigma / cdf(x0)**2) *
+        # (xz * cdf(x0) * (2 * cdf(xz) + cdf(x0) - 2) +
+        #  2 * pdf(xz) * cdf(x0) - cdf(sqrt(2) * x0) / sqrt_pi)
+        work = ndtr(
+            xz, out=self._workspace("work", mu.shape, mu.dtype))
+        work *= 2
+        work += normal_cdf_0
+        work -= 2
+        work *= xz
+        work += self._normal_pdf(xz, out=xz, scale=2.)
+        work *= normal_cdf_0
+        x0 *= np.sqrt(2.)
+        ndtr(x0, out=x0)
+        x0 /= sqrt_pi
+        work -= x0
+        work *= sigma
+        normal_cdf_0 *= normal_cdf_0
+        work /= normal_cdf_0
+        return np.nansum(work)
+
+    @staticmethod
+    def normal_crps_derivatives(truth, mu, sigma, sqrt_pi):
+        """
+        Calculate the CRPS of a normal distribution at each point, and its
+        derivatives with respect to the location and scale parameters.
+
+        Args:
+            truth (Numpy array):
+                Data to be used as truth.
+            mu (Numpy array):
+                Location parameter of the distribution at each point.
+            sigma (Numpy array):
+                Scale parameter of the distribution at each point.
+            sqrt_pi (Numpy array):
+                Square root of Pi
+
+        Returns:
+            (tuple): tuple containing:
+                **crps** (Numpy array):
+                    The CRPS at each point.
+                **dcrps_dmu** (Numpy array):
+                    Derivative of the CRPS with respect to mu.
+                **dcrps_dsigma** (Numpy array):
+                    Derivative of the CRPS with respect to sigma.
+
+        """
         xz = (truth - mu) / sigma
-        normal_cdf = norm.cdf(xz)
-        normal_pdf = norm.pdf(xz)
+        normal_cdf = ndtr(xz)
+        normal_pdf = ContinuousRankedProbabilityScoreMinimisers._normal_pdf(
+            xz)
+        crps = sigma * (
+            xz * (2 * normal_cdf - 1) + 2 * normal_pdf - 1 / sqrt_pi)
+        return crps, 1 - 2 * normal_cdf, 2 * normal_pdf - 1 / sqrt_pi
+
+    @staticmethod
+    def truncated_normal_crps_derivatives(truth, mu, sigma, sqrt_pi):
+        """
+        Calculate the CRPS of a normal distribution truncated at zero at
+        each point, and its derivatives with respect to the location and
+        scale parameters.
+
+        Args:
+            truth (Numpy array):
+                Data to be used as truth.
+            mu (Numpy array):
+                Location parameter of the distribution at each point.
+            sigma (Numpy array):
+                Scale parameter of the distribution at each point.
+            sqrt_pi (Numpy array):
+                Square root of Pi
+
+        Returns:
+            (tuple): tuple containing:
+                **crps** (Numpy array):
+                    The CRPS at each point.
+                **dcrps_dmu** (Numpy array):
+                    Derivative of the CRPS with respect to mu.
+                **dcrps_dsigma** (Numpy array):
+                    Derivative of the CRPS with respect to sigma.
+
+        """
+        normal_pdf_function = (
+            ContinuousRankedProbabilityScoreMinimisers._normal_pdf)
+        xz = (truth - mu) / sigma
+        normal_cdf = ndtr(xz)
+        normal_pdf = normal_pdf_function(xz)
         x0 = mu / sigma
-        normal_cdf_0 = norm.cdf(x0)
-        normal_cdf_root_two = norm.cdf(np.sqrt(2) * x0)
-        result = np.nansum(
-            (sigma / normal_cdf_0**2) *
+        normal_cdf_0 = ndtr(x0)
+        normal_pdf_0 = normal_pdf_function(x0)
+        normal_cdf_root_two = ndtr(np.sqrt(2) * x0)
+        normal_pdf_root_two = normal_pdf_function(np.sqrt(2) * x0)
+        # The CRPS at each point is sigma * g(xz, x0).
+        crps_per_sigma = (
             (xz * normal_cdf_0 * (2 * normal_cdf + normal_cdf_0 - 2) +
              2 * normal_pdf * normal_cdf_0 -
-             normal_cdf_root_two / sqrt_pi))
+             normal_cdf_root_two / sqrt_pi) / normal_cdf_0**2)
+        dg_dxz = (2 * normal_cdf + normal_cdf_0 - 2) / normal_cdf_0
+        dg_dx0 = (
+            -2 * (xz * (normal_cdf - 1) + normal_pdf) * normal_pdf_0 /
+            normal_cdf_0**2 -
+            np.sqrt(2) * normal_pdf_root_two / (sqrt_pi * normal_cdf_0**2) +
+            2 * normal_cdf_root_two * normal_pdf_0 /
+            (sqrt_pi * normal_cdf_0**3))
+        return (sigma * crps_per_sigma, dg_dx0 - dg_dxz,
+                crps_per_sigma - xz * dg_dxz - x0 * dg_dx0)
+
+    @staticmethod
+    def _gradient_from_mean_and_sigma(
+            coeffs, forecast_predictor, forecast_var, sigma,
+            predictor_of_mean_flag, dcrps_dmu, dcrps_dsigma):
+        """
+        Calculate the gradient of the CRPS summed over all points with
+        respect to the coefficients, from the derivatives of the CRPS at each
+        point with respect to the location and scale parameters of the
+        distribution, which are given by mu = a + b*X and
+        sigma**2 = gamma**2 + delta**2 * S**2.
+
+        Args:
+            coeffs (Numpy array):
+                Coefficients in the order [c, d, a, b].
+            forecast_predictor (Numpy array):
+                Data to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            forecast_var (Numpy array):
+                Ensemble variance data.
+            sigma (Numpy array):
+                Scale parameter of the distribution at each point.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+            dcrps_dmu (Numpy array):
+                Derivative of the CRPS with respect to mu at each point.
+            dcrps_dsigma (Numpy array):
+                Derivative of the CRPS with respect to sigma at each point.
+
+        Returns:
+            gradient (Numpy array):
+                Gradient of the CRPS with respect to the coefficients.
+
+        """
+        # Points that are excluded from the CRPS by nansum are also excluded
+        # from the gradient.
+        valid = np.isfinite(dcrps_dmu) & np.isfinite(dcrps_dsigma)
+        dcrps_dmu = np.where(valid, dcrps_dmu, 0.)
+        dcrps_dsigma = np.where(valid, dcrps_dsigma, 0.)
+        gradient_mean = np.concatenate(
+            [[np.sum(dcrps_dmu)], np.atleast_1d(
+                np.dot(dcrps_dmu, forecast_predictor))])
+        if predictor_of_mean_flag.lower() in ["realizations"]:
+            # The weights of the realizations are b = beta**2.
+            gradient_mean[1:] *= 2 * coeffs[3:]
+        dcrps_dvariance = dcrps_dsigma / (2 * sigma)
+        return np.concatenate(
+            [[2 * coeffs[0] * np.sum(dcrps_dvariance),
+              2 * coeffs[1] * np.sum(dcrps_dvariance * forecast_var)],
+             gradient_mean])
+
+    def normal_crps_and_gradient(
+            self, initial_guess, forecast_predictor, truth, forecast_var,
+            sqrt_pi, predictor_of_mean_flag):
+        """
+        Calculate the CRPS for a normal distribution, as in
+        normal_crps_minimiser, together with its closed-form gradient with
+        respect to the coefficients, for use by gradient-based minimisation.
+
+        Args:
+            initial_guess (Numpy array):
+                Coefficients in the order [c, d, a, b].
+            forecast_predictor (Numpy array):
+                Data to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            truth (Numpy array):
+                Data to be used as truth.
+            forecast_var (Numpy array):
+                Ensemble variance data.
+            sqrt_pi (Numpy array):
+                Square root of Pi
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple): tuple containing:
+                **result** (Float):
+                    Value of the CRPS.
+                **gradient** (Numpy array):
+                    Gradient of the CRPS with respect to the coefficients.
+
+        """
+        mu, sigma = self._calculate_mu_and_sigma(
+            initial_guess, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag)
+        if not np.isfinite(np.min(mu/sigma)):
+            return self.BAD_VALUE, np.zeros(len(initial_guess))
+        crps, dcrps_dmu, dcrps_dsigma = self.normal_crps_derivatives(
+            truth, mu, sigma, sqrt_pi)
+        gradient = self._gradient_from_mean_and_sigma(
+            initial_guess, forecast_predictor, forecast_var, sigma,
+            predictor_of_mean_flag, dcrps_dmu, dcrps_dsigma)
+        return np.nansum(crps), gradient
+
+    def truncated_normal_crps_and_gradient(
+            self, initial_guess, forecast_predictor, truth, forecast_var,
+            sqrt_pi, predictor_of_mean_flag):
+        """
+        Calculate the CRPS for a truncated normal distribution, as in
+        truncated_normal_crps_minimiser, together with its closed-form
+        gradient with respect to the coefficients, for use by gradient-based
+        minimisation.
+
+        Args:
+            initial_guess (Numpy array):
+                Coefficients in the order [c, d, a, b].
+            forecast_predictor (Numpy array):
+                Data to be used as the predictor,
+                either the ensemble mean or the ensemble realizations.
+            truth (Numpy array):
+                Data to be used as truth.
+            forecast_var (Numpy array):
+                Ensemble variance data.
+            sqrt_pi (Numpy array):
+                Square root of Pi
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple): tuple containing:
+                **result** (Float):
+                    Value of the CRPS.
+                **gradient** (Numpy array):
+                    Gradient of the CRPS with respect to the coefficients.
+
+        """
+        mu, sigma = self._calculate_mu_and_sigma(
+            initial_guess, forecast_predictor, truth, forecast_var,
+            predictor_of_mean_flag)
         if not np.isfinite(np.min(mu/sigma)) or (np.min(mu/sigma) < -3):
-            result = self.BAD_VALUE
-        return result
+            return self.BAD_VALUE, np.zeros(len(initial_guess))
+        crps, dcrps_dmu, dcrps_dsigma = (
+            self.truncated_normal_crps_derivatives(truth, mu, sigma, sqrt_pi))
+        gradient = self._gradient_from_mean_and_sigma(
+            initial_guess, forecast_predictor, forecast_var, sigma,
+            predictor_of_mean_flag, dcrps_dmu, dcrps_dsigma)
+        return np.nansum(crps), gradient
 
 
 class EstimateCoefficientsForEnsembleCalibration(object):
@@ -324,8 +827,19 @@ class EstimateCoefficientsForEnsembleCalibration(object):
     # ESTIMATE_COEFFICIENTS_FROM_LINEAR_MODEL_FLAG = False.
     ESTIMATE_COEFFICIENTS_FROM_LINEAR_MODEL_FLAG = True
 
+    # The name of each coefficient.
+    COEFF_NAMES = ["gamma", "delta", "a", "beta"]
+
+    # Number of strata, ordered by the mean of the forecast predictor at
+    # each grid point, from which grid points are sampled when training on
+    # a subsample of the grid points.
+    SUBSAMPLE_STRATA = 10
+
     def __init__(self, distribution, desired_units,
-                 predictor_of_mean_flag="mean"):
+                 predictor_of_mean_flag="mean",
+                 minimisation_method="Nelder-Mead",
+                 subsample_fraction=None, random_seed=None,
+                 compare_with_full_sample=False, training_store=None):
         """
         Create an ensemble calibration plugin that, for Nonhomogeneous Gaussian
         Regression, calculates coefficients based on historical forecasts and
@@ -343,12 +857,57 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                 String to specify the input to calculate the calibrated mean.
                 Currently the ensemble mean ("mean") and the ensemble
                 realizations ("realizations") are supported as the predictors.
+            minimisation_method (String):
+                The method used to minimise the CRPS. Either "Nelder-Mead",
+                or one of the gradient-based methods "L-BFGS-B" and "BFGS".
+            subsample_fraction (Float or None):
+                If set, the coefficients are estimated from this fraction of
+                the grid points, which are sampled at random from strata of
+                the mean of the forecast predictor at each grid point.
+                If None, all grid points are used.
+            random_seed (Int or None):
+                Seed for the random sampling of the grid points, so that the
+                subsample can be reproduced.
+            compare_with_full_sample (Logical):
+                If True, the coefficients are also estimated from all grid
+                points when training on a subsample, so that the CRPS of the
+                two sets of coefficients can be compared.
+            training_store (RollingTrainingStore or None):
+                If set, the historic forecasts and truth are added to this
+                store, and the training data for each forecast period is
+                read from the store. Only the newest day of historic
+                forecasts and truth then needs to be supplied.
+                The ensemble mean must be the predictor.
+
+        Raises:
+            ValueError: The subsample fraction is not greater than 0 and no
+                greater than 1.
+            ValueError: A training store is used with the ensemble
+                realizations as the predictor.
 
         """
         self.distribution = distribution
         self.desired_units = desired_units
         self.predictor_of_mean_flag = predictor_of_mean_flag
-        self.minimiser = ContinuousRankedProbabilityScoreMinimisers()
+        self.minimiser = ContinuousRankedProbabilityScoreMinimisers(
+            minimisation_method=minimisation_method)
+        if subsample_fraction is not None and not 0 < subsample_fraction <= 1:
+            msg = ("The subsample fraction must be greater than 0 and no "
+                   "greater than 1: {}".format(subsample_fraction))
+            raise ValueError(msg)
+        self.subsample_fraction = subsample_fraction
+        self.random_seed = random_seed
+        self.compare_with_full_sample = compare_with_full_sample
+        if (training_store is not None and
+                predictor_of_mean_flag.lower() not in ["mean"]):
+            msg = ("A training store holds the ensemble mean and variance, "
+                   "so can only be used with the ensemble mean as the "
+                   "predictor. The predictor requested was {}".format(
+                       predictor_of_mean_flag))
+            raise ValueError(msg)
+        self.training_store = training_store
+        # Diagnostics describing the training at each date.
+        self.training_diagnostics = {}
 
         import imp
         try:
@@ -373,10 +932,12 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                   'distribution: {};' +
                   'desired_units: {}>' +
                   'predictor_of_mean_flag: {}>' +
-                  'minimiser: {}')
+                  'minimiser: {}' +
+                  'subsample_fraction: {}>')
         return result.format(
             self.distribution, self.desired_units,
-            self.predictor_of_mean_flag, self.minimiser)
+            self.predictor_of_mean_flag, self.minimiser,
+            self.subsample_fraction)
 
     def compute_initial_guess(
             self, truth, forecast_predictor, predictor_of_mean_flag,
@@ -470,12 +1031,10 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                         [1, 1, 0] + np.repeat(1, no_of_realizations).tolist())
         return np.array(initial_guess, dtype=np.float32)
 
-    def estimate_coefficients_for_ngr(
+    def _prepare_training_data(
             self, current_forecast, historic_forecast, truth):
         """
-        Using Nonhomogeneous Gaussian Regression/Ensemble Model Output
-        Statistics, estimate the required coefficients from historical
-        forecasts.
+        Prepare the training data for each time within the current forecast.
 
         The main contents of this method is:
 
@@ -490,10 +1049,9 @@ class EstimateCoefficientsForEnsembleCalibration(object):
               the historic forecasts. Apply unit conversion to ensure
               that the truth has the desired units for calibration.
            3. Calculate mean and variance.
-           4. Calculate initial guess at coefficient values by performing a
-              linear regression, if requested, otherwise default values are
-              used.
-           5. Perform minimisation.
+
+        If the inputs can not be processed, a warning is raised and no
+        training data is generated.
 
         Args:
             current_forecast (Iris Cube or CubeList):
@@ -504,13 +1062,22 @@ class EstimateCoefficientsForEnsembleCalibration(object):
             truth (Iris Cube or CubeList):
                 The cube or cubelist containing the truth used for calibration.
 
-        Returns:
+        Yields:
             (tuple): tuple containing:
-                **optimised_coeffs** (Dictionary):
-                    Dictionary containing a list of the optimised coefficients
-                    for each date.
-                **coeff_names** (List):
-                    The name of each coefficient.
+                **date** (datetime.datetime):
+                    The time within the current forecast.
+                **current_forecast_cube** (Iris cube):
+                    Cube containing the current forecast at this time.
+                **forecast_predictor** (Iris cube):
+                    Cube containing the historic forecast predictor, either
+                    the ensemble mean or the ensemble realizations.
+                **forecast_var** (Iris cube):
+                    Cube containing the historic ensemble variance.
+                **truth_cube** (Iris cube):
+                    Cube containing the truth.
+                **no_of_realizations** (Int or None):
+                    Number of realizations, if the ensemble realizations are
+                    the predictor.
 
         """
         def convert_to_cubelist(cubes, cube_type="forecast"):
@@ -538,17 +1105,6 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                     raise TypeError(msg)
             return cubes
 
-        # Ensure predictor_of_mean_flag is valid.
-        check_predictor_of_mean_flag(self.predictor_of_mean_flag)
-
-        # Setting default values for optimised_coeffs and coeff_names.
-        optimised_coeffs = {}
-        coeff_names = ["gamma", "delta", "a", "beta"]
-
-        # Set default values for whether there are NaN values within the
-        # initial guess.
-        nan_in_initial_guess = False
-
         for var in [current_forecast, historic_forecast,
                     truth]:
             if (isinstance(var, iris.cube.Cube) or
@@ -560,9 +1116,9 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                 msg = ("{} is not a Cube or CubeList."
                        "Returning default values for optimised_coeffs {} "
                        "and coeff_names {}.").format(
-                           var, optimised_coeffs, coeff_names)
+                           var, {}, self.COEFF_NAMES)
                 warnings.warn(msg)
-                return optimised_coeffs, coeff_names
+                return
 
         current_forecast_cubes = (
             convert_to_cubelist(
@@ -582,7 +1138,7 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                        len(current_forecast_cubes),
                        len(historic_forecast_cubes), len(truth_cubes)))
             warnings.warn(msg)
-            return optimised_coeffs, coeff_names
+            return
 
         current_forecast_cubes = concatenate_cubes(
             current_forecast_cubes)
@@ -635,10 +1191,289 @@ class EstimateCoefficientsForEnsembleCalibration(object):
             forecast_var = historic_forecast_cube.collapsed(
                 "realization", iris.analysis.VARIANCE)
 
+            yield (date, current_forecast_cube, forecast_predictor,
+                   forecast_var, truth_cube, no_of_realizations)
+
+    def _prepare_training_data_from_store(
+            self, current_forecast, historic_forecast, truth):
+        """
+        Add the historic forecasts and truth to the training store, then
+        read the training data for each time within the current forecast
+        from the store.
+
+        Args:
+            current_forecast (Iris Cube or CubeList):
+                The cube containing the current forecast.
+            historical_forecast (Iris Cube or CubeList):
+                The cube or cubelist containing the historic forecasts to add
+                to the training store, which is usually only the newest day.
+            truth (Iris Cube or CubeList):
+                The cube or cubelist containing the truth to add to the
+                training store.
+
+        Yields:
+            (tuple): tuple containing:
+                **date** (datetime.datetime):
+                    The time within the current forecast.
+                **current_forecast_cube** (Iris cube):
+                    Cube containing the current forecast at this time.
+                **forecast_predictor** (Iris cube):
+                    Cube containing the historic ensemble mean.
+                **forecast_var** (Iris cube):
+                    Cube containing the historic ensemble variance.
+                **truth_cube** (Iris cube):
+                    Cube containing the truth.
+                **no_of_realizations** (None):
+                    The ensemble realizations are not the predictor.
+
+        """
+        cubes = []
+        for cube in [current_forecast, historic_forecast, truth]:
+            if isinstance(cube, iris.cube.CubeList):
+                cube = concatenate_cubes(cube)
+            cubes.append(cube)
+        current_forecast, historic_forecast, truth = cubes
+
+        historic_forecast = historic_forecast.copy()
+        historic_forecast.convert_units(self.desired_units)
+        truth = truth.copy()
+        truth.convert_units(self.desired_units)
+        self.training_store.add(historic_forecast, truth)
+
+        for current_forecast_cube in current_forecast.slices_over("time"):
+            date = unit.num2date(
+                current_forecast_cube.coord("time").points,
+                current_forecast_cube.coord("time").units.name,
+                current_forecast_cube.coord("time").units.calendar)[0]
+            forecast_period = current_forecast_cube.coord(
+                "forecast_period").copy()
+            forecast_period.convert_units("seconds")
+            training_data = self.training_store.load(
+                forecast_period.points[0], current_forecast_cube)
+            if training_data is None:
+                msg = ("Unable to calibrate for the time points {} "
+                       "as the training store holds no data for the "
+                       "forecast period. Moving on to try to calibrate "
+                       "next time point.".format(
+                           current_forecast_cube.coord("time").points))
+                warnings.warn(msg)
+                continue
+            forecast_predictor, forecast_var, truth_cube = training_data
+            yield (date, current_forecast_cube, forecast_predictor,
+                   forecast_var, truth_cube, None)
+
+    def _subsample_training_data(
+            self, forecast_predictor, forecast_var, truth):
+        """
+        Sample grid points from the training data, at random from each of
+        SUBSAMPLE_STRATA equally sized strata of the mean of the forecast
+        predictor at each grid point, so that the subsample spans the range
+        of forecast values.
+
+        Args:
+            forecast_predictor (Iris cube):
+                Cube containing the historic forecast predictor, either
+                the ensemble mean or the ensemble realizations.
+            forecast_var (Iris cube):
+                Cube containing the historic ensemble variance.
+            truth (Iris cube):
+                Cube containing the truth.
+
+        Returns:
+            (tuple): tuple containing:
+                **forecast_predictor** (Iris cube):
+                    Cube containing the forecast predictor at the sampled
+                    grid points, which form the last dimension.
+                **forecast_var** (Iris cube):
+                    Cube containing the ensemble variance at the sampled
+                    grid points.
+                **truth** (Iris cube):
+                    Cube containing the truth at the sampled grid points.
+
+        """
+        spatial_coords = [truth.coord(axis=axis).name() for axis in "yx"]
+
+        def flatten_grid(cube):
+            """Flatten the grid of a cube into its last dimension."""
+            cube = cube.copy()
+            if cube.coords("realization", dim_coords=True):
+                enforce_coordinate_ordering(cube, "realization")
+            enforce_coordinate_ordering(cube, spatial_coords, anchor="end")
+            return cube, cube.data.reshape(cube.shape[:-2] + (-1,))
+
+        forecast_predictor, predictor_data = flatten_grid(forecast_predictor)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            climatology = np.nanmean(
+                np.ma.filled(predictor_data.reshape(
+                    -1, predictor_data.shape[-1]), np.nan), axis=0)
+        random_state = np.random.RandomState(self.random_seed)
+        strata = np.array_split(
+            np.argsort(climatology, kind="mergesort"),
+            min(self.SUBSAMPLE_STRATA, len(climatology)))
+        indices = np.sort(np.concatenate([
+            random_state.choice(
+                stratum, int(np.ceil(self.subsample_fraction * len(stratum))),
+                replace=False)
+            for stratum in strata]))
+
+        sampled_cubes = []
+        for cube, data in [
+                (forecast_predictor, predictor_data),
+                flatten_grid(forecast_var), flatten_grid(truth)]:
+            sampled_cube = iris.cube.Cube(
+                data[..., indices], long_name=cube.name(), units=cube.units)
+            if cube.coords("realization", dim_coords=True):
+                sampled_cube.add_dim_coord(cube.coord("realization"), 0)
+            sampled_cubes.append(sampled_cube)
+        return tuple(sampled_cubes)
+
+    def _compare_subsample_with_full_sample(
+            self, initial_guess, optimised_coeffs, sampled_training_data,
+            all_training_data):
+        """
+        Calculate the CRPS over all grid points of the coefficients
+        estimated from a subsample of the grid points. If
+        compare_with_full_sample is set, the coefficients are also estimated
+        from all grid points, starting from the same initial guess, and the
+        CRPS of the two sets of coefficients is compared.
+
+        Args:
+            initial_guess (List):
+                The initial guess used for the subsample.
+            optimised_coeffs (List):
+                The coefficients estimated from the subsample.
+            sampled_training_data (tuple):
+                The forecast predictor, truth and forecast variance cubes at
+                the sampled grid points.
+            all_training_data (tuple):
+                The forecast predictor, truth and forecast variance cubes at
+                all grid points.
+
+        Returns:
+            diagnostics (Dictionary):
+                Dictionary containing the CRPS averaged over the subsample
+                ("subsample_crps") and over all grid points ("crps"). If
+                compared with the full sample, the CRPS of the coefficients
+                estimated from all grid points ("full_sample_crps"), and the
+                percentage by which the CRPS of the subsample coefficients
+                exceeds it ("crps_change_percent"), are also included.
+
+        """
+        flag = self.predictor_of_mean_flag
+        distribution = self.distribution.lower()
+        diagnostics = {
+            "subsample_crps": self.minimiser.calculate_crps(
+                optimised_coeffs, *sampled_training_data,
+                predictor_of_mean_flag=flag, distribution=distribution),
+            "crps": self.minimiser.calculate_crps(
+                optimised_coeffs, *all_training_data,
+                predictor_of_mean_flag=flag, distribution=distribution)}
+        subsample_minimiser_diagnostics = self.minimiser.diagnostics
+        if self.compare_with_full_sample:
+            full_sample_coeffs = self.minimiser.crps_minimiser_wrapper(
+                initial_guess, *all_training_data,
+                predictor_of_mean_flag=flag, distribution=distribution)
+            diagnostics["full_sample_crps"] = self.minimiser.calculate_crps(
+                full_sample_coeffs, *all_training_data,
+                predictor_of_mean_flag=flag, distribution=distribution)
+            diagnostics["crps_change_percent"] = 100 * (
+                (diagnostics["crps"] - diagnostics["full_sample_crps"]) /
+                diagnostics["full_sample_crps"])
+        self.minimiser.diagnostics = subsample_minimiser_diagnostics
+        return diagnostics
+
+    def estimate_coefficients_for_ngr(
+            self, current_forecast, historic_forecast, truth,
+            previous_coeffs=None):
+        """
+        Using Nonhomogeneous Gaussian Regression/Ensemble Model Output
+        Statistics, estimate the required coefficients from historical
+        forecasts.
+
+        The main contents of this method is:
+
+        1. Prepare the training data for each time within the current
+           forecast, using _prepare_training_data, or read it from the
+           training store, if one is used.
+        2. Calculate initial guess at coefficient values by performing a
+           linear regression, if requested, otherwise default values are
+           used. If coefficients from a previous training are supplied,
+           these are used as the initial guess instead.
+        3. Sample the grid points, if a subsample fraction is set.
+        4. Perform minimisation.
+
+        Args:
+            current_forecast (Iris Cube or CubeList):
+                The cube containing the current forecast.
+            historical_forecast (Iris Cube or CubeList):
+                The cube or cubelist containing the historical forecasts used
+                for calibration.
+            truth (Iris Cube or CubeList):
+                The cube or cubelist containing the truth used for calibration.
+            previous_coeffs (List or None):
+                Coefficients estimated by a previous training, such as the
+                training for the previous cycle, from which to start the
+                minimisation. Order of coefficients is [c, d, a, b].
+                If None, or if any coefficients are NaN, an initial guess is
+                calculated.
+
+        Returns:
+            (tuple): tuple containing:
+                **optimised_coeffs** (Dictionary):
+                    Dictionary containing a list of the optimised coefficients
+                    for each date.
+                **coeff_names** (List):
+                    The name of each coefficient.
+
+        """
+        # Ensure predictor_of_mean_flag is valid.
+        check_predictor_of_mean_flag(self.predictor_of_mean_flag)
+
+        # Setting default values for optimised_coeffs and coeff_names.
+        optimised_coeffs = {}
+        coeff_names = list(self.COEFF_NAMES)
+
+        # Set default values for whether there are NaN values within the
+        # initial guess.
+        nan_in_initial_guess = False
+        initial_guess = None
+        if previous_coeffs is not None and not np.any(
+                np.isnan(previous_coeffs)):
+            initial_guess = np.array(previous_coeffs, dtype=np.float32)
+        self.training_diagnostics = {}
+
+        if self.training_store is None:
+            training_data = self._prepare_training_data(
+                current_forecast, historic_forecast, truth)
+        else:
+            training_data = self._prepare_training_data_from_store(
+                current_forecast, historic_forecast, truth)
+
+        for (date, _, forecast_predictor, forecast_var, truth_cube,
+             no_of_realizations) in training_data:
+
+            no_of_coeffs = (
+                len(coeff_names) if no_of_realizations is None
+                else len(coeff_names) - 1 + no_of_realizations)
+            if (initial_guess is not None and
+                    len(initial_guess) != no_of_coeffs):
+                msg = ("The number of coefficients supplied {} does not "
+                       "match the number of coefficients required {}".format(
+                           len(initial_guess), no_of_coeffs))
+                raise ValueError(msg)
+
+            if self.subsample_fraction is not None:
+                all_training_data = (forecast_predictor, truth_cube,
+                                     forecast_var)
+                (forecast_predictor, forecast_var, truth_cube) = (
+                    self._subsample_training_data(
+                        forecast_predictor, forecast_var, truth_cube))
+
             # Computing initial guess for EMOS coefficients
             # If no initial guess from a previous iteration, or if there
             # are NaNs in the initial guess, calculate an initial guess.
-            if "initial_guess" not in locals() or nan_in_initial_guess:
+            if initial_guess is None or nan_in_initial_guess:
                 initial_guess = self.compute_initial_guess(
                     truth_cube, forecast_predictor,
                     self.predictor_of_mean_flag,
@@ -657,6 +1492,12 @@ class EstimateCoefficientsForEnsembleCalibration(object):
                         truth_cube, forecast_var,
                         self.predictor_of_mean_flag,
                         self.distribution.lower()))
+                if self.subsample_fraction is not None:
+                    self.training_diagnostics[date] = (
+                        self._compare_subsample_with_full_sample(
+                            initial_guess, optimised_coeffs[date],
+                            (forecast_predictor, truth_cube, forecast_var),
+                            all_training_data))
                 initial_guess = optimised_coeffs[date]
             else:
                 optimised_coeffs[date] = initial_guess
@@ -830,19 +1671,320 @@ class ApplyCoefficientsFromEnsembleCalibration(object):
                 calibrated_forecast_var,
                 calibrated_forecast_coefficients)
 
+    @staticmethod
+    def _apply_local_params(
+            forecast_predictor, forecast_var, coefficient_cube, coeff_names,
+            predictor_of_mean_flag):
+        """
+        Function to apply EMOS coefficients that vary between grid points to
+        the forecast at a single date.
+
+        Args:
+            forecast_predictor (Iris cube):
+                Cube containing the forecast predictor at the date e.g.
+                ensemble mean or ensemble realizations.
+            forecast_var (Iris cube):
+                Cube containing the forecast variance at the date.
+            coefficient_cube (Iris cube):
+                Cube containing the coefficients at each grid point, with a
+                leading coefficient_index dimension followed by the y and x
+                dimensions, as created by
+                EstimateLocalCoefficientsForEnsembleCalibration.
+            coeff_names (List):
+                Coefficient names.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple) : tuple containing:
+                **calibrated_forecast_predictor** (Iris cube):
+                    Cube containing the calibrated forecast predictor.
+                **calibrated_forecast_var** (Iris cube):
+                    Cube containing the calibrated forecast variance.
+                **coeff_cubes** (CubeList):
+                    CubeList containing a cube of each coefficient at each
+                    grid point.
+
+        Raises:
+            ValueError: The grid of the coefficients does not match the grid
+                of the forecast.
+
+        """
+        spatial_coords = [
+            forecast_var.coord(axis=axis).name() for axis in "yx"]
+        for coord in spatial_coords:
+            if (not coefficient_cube.coords(coord) or
+                    coefficient_cube.coord(coord) !=
+                    forecast_var.coord(coord)):
+                msg = ("The {} coordinate of the coefficients does not match "
+                       "the {} coordinate of the forecast".format(
+                           coord, coord))
+                raise ValueError(msg)
+        coefficient_cube = coefficient_cube.copy()
+        enforce_coordinate_ordering(
+            coefficient_cube, spatial_coords, anchor="end")
+        forecast_var = forecast_var.copy()
+        enforce_coordinate_ordering(
+            forecast_var, spatial_coords, anchor="end")
+        coeffs = coefficient_cube.data
+        gamma, delta, alpha, beta = coeffs[0], coeffs[1], coeffs[2], coeffs[3:]
+
+        if predictor_of_mean_flag.lower() in ["mean"]:
+            # Calculate predicted mean = a + b*X, where X is the
+            # raw ensemble mean. In this case, b = beta.
+            calibrated_forecast_predictor = forecast_predictor.copy()
+            enforce_coordinate_ordering(
+                calibrated_forecast_predictor, spatial_coords, anchor="end")
+            predicted_mean = (
+                alpha + beta[0] * calibrated_forecast_predictor.data)
+        elif predictor_of_mean_flag.lower() in ["realizations"]:
+            # Calculate predicted mean = a + b*X, where X is the
+            # raw ensemble realizations. In this case, b = beta^2.
+            forecast_predictor = forecast_predictor.copy()
+            enforce_coordinate_ordering(forecast_predictor, "realization")
+            enforce_coordinate_ordering(
+                forecast_predictor, spatial_coords, anchor="end")
+            predicted_mean = alpha + np.sum(
+                beta**2 * forecast_predictor.data.reshape(
+                    beta.shape), axis=0)
+            # Calculate mean of ensemble realizations, as only the
+            # calibrated ensemble mean will be returned.
+            calibrated_forecast_predictor = forecast_predictor.collapsed(
+                "realization", iris.analysis.MEAN)
+        calibrated_forecast_predictor.data = predicted_mean.astype(
+            calibrated_forecast_predictor.dtype)
+
+        # Calculating the predicted variance, based on the
+        # raw variance S^2, where predicted variance = c + dS^2,
+        # where c = (gamma)^2 and d = (delta)^2
+        forecast_var.data = (
+            gamma**2 + delta**2 * forecast_var.data).astype(forecast_var.dtype)
+
+        coeff_cubes = iris.cube.CubeList()
+        for index, coeff_cube in enumerate(
+                coefficient_cube.slices_over("coefficient_index")):
+            coeff_cube.rename(coeff_names[min(index, len(coeff_names) - 1)])
+            coeff_cubes.append(coeff_cube)
+        return calibrated_forecast_predictor, forecast_var, coeff_cubes
+
+    @staticmethod
+    def _coefficients_for_dates(optimised_coeffs, dates, coeff_names):
+        """
+        Function to arrange the coefficients for a list of dates into an
+        array with one row for each date.
+
+        Args:
+            optimised_coeffs (Dictionary):
+                Dictionary containing a list of the optimised coefficients
+                for each date.
+            dates (List):
+                List of the datetime.datetime of each date.
+            coeff_names (List):
+                Coefficient names.
+
+        Returns:
+            (tuple) : tuple containing:
+                **coefficients** (Numpy array):
+                    Array of the coefficients with one row for each date.
+                    Any coefficients beyond the number of coefficient names
+                    are additional values of beta. The row of a date without
+                    coefficients is NaN.
+                **available** (Numpy array):
+                    Boolean array that is True for the dates that have
+                    coefficients.
+
+        Raises:
+            ValueError: There are fewer coefficients than coefficient names.
+
+        """
+        available = np.array([date in optimised_coeffs for date in dates])
+        n_coeffs = len(coeff_names)
+        for date in dates:
+            if date in optimised_coeffs:
+                n_coeffs = len(optimised_coeffs[date])
+                break
+        if n_coeffs < len(coeff_names):
+            msg = ("Number of coefficient names {} with names {} "
+                   "is not equal to the number of "
+                   "optimised_coeffs_at_date values {} "
+                   "with values {} or the number of "
+                   "coefficients is not greater than the "
+                   "number of coefficient names. Can not continue "
+                   "if the number of coefficient names out number "
+                   "the number of coefficients".format(
+                       len(coeff_names), coeff_names, n_coeffs,
+                       optimised_coeffs[dates[available.argmax()]]))
+            raise ValueError(msg)
+
+        coefficients = np.full((len(dates), n_coeffs), np.nan)
+        for index, date in enumerate(dates):
+            if date in optimised_coeffs:
+                coefficients[index] = optimised_coeffs[date]
+            else:
+                msg = ("Ensemble calibration not available "
+                       "for forecasts with start time of {}. "
+                       "Coefficients not available".format(
+                           date.strftime("%Y%m%d%H%M")))
+                warnings.warn(msg)
+        return coefficients, available
+
+    def _apply_global_params(
+            self, forecast_predictors, forecast_vars, optimised_coeffs,
+            coeff_names, predictor_of_mean_flag):
+        """
+        Function to apply EMOS coefficients that are the same at every grid
+        point to the forecast at all times at once.
+
+        The coefficients of each time are gathered into arrays with one
+        value per time, which are broadcast against the time dimension of
+        the forecast, so that the calibrated forecast for every time is
+        calculated together and the output cubes are only created once.
+        The raw forecast is used as the calibrated forecast at any time
+        without coefficients.
+
+        Args:
+            forecast_predictors (Iris cube):
+                Cube containing the forecast predictor e.g. ensemble mean
+                or ensemble realizations.
+            forecast_vars (Iris cube.):
+                Cube containing the forecast variance e.g. ensemble variance.
+            optimised_coeffs (Dictionary):
+                Coefficients for all dates.
+            coeff_names (List):
+                Coefficient names.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+
+        Returns:
+            (tuple) : tuple containing:
+                **calibrated_forecast_predictor** (Iris cube):
+                    Cube containing the calibrated forecast predictor at all
+                    times.
+                **calibrated_forecast_var** (Iris cube):
+                    Cube containing the calibrated forecast variance at all
+                    times.
+                **coeff_cubes** (CubeList):
+                    CubeList containing a cube of each coefficient, with a
+                    time dimension.
+
+        """
+        time_coord = forecast_predictors.coord("time")
+        dates = iris_time_to_datetime(time_coord.copy())
+        coefficients, available = self._coefficients_for_dates(
+            optimised_coeffs, dates, coeff_names)
+
+        # The coefficients applied at times without coefficients leave the
+        # raw forecast unchanged.
+        gamma = np.where(
+            available, coefficients[:, coeff_names.index("gamma")], 0.)
+        delta = np.where(
+            available, coefficients[:, coeff_names.index("delta")], 1.)
+        alpha = np.where(
+            available, coefficients[:, coeff_names.index("a")], 0.)
+        beta_indices = [coeff_names.index("beta")] + list(
+            range(len(coeff_names), coefficients.shape[1]))
+        beta = coefficients[:, beta_indices]
+
+        def along_time(values, cube, skip_dim=None):
+            """Reshape values with a leading time dimension to broadcast
+            against the data of a cube, optionally with one dimension of
+            the cube removed. Any further dimensions of the values are
+            placed after the dimensions of the cube."""
+            shape = [1] * cube.ndim
+            time_dims = cube.coord_dims("time")
+            if time_dims:
+                shape[time_dims[0]] = len(values)
+            if skip_dim is not None:
+                del shape[skip_dim]
+            return values.reshape(shape + list(values.shape[1:]))
+
+        if predictor_of_mean_flag.lower() in ["mean"]:
+            # Calculate predicted mean = a + b*X, where X is the
+            # raw ensemble mean. In this case, b = beta.
+            beta = np.where(available, beta[:, 0], 1.)
+            predicted_mean = (
+                along_time(alpha, forecast_predictors) +
+                along_time(beta, forecast_predictors) *
+                forecast_predictors.data)
+            calibrated_forecast_predictor = forecast_predictors.copy(
+                data=predicted_mean.astype(forecast_predictors.dtype))
+        elif predictor_of_mean_flag.lower() in ["realizations"]:
+            # Calculate predicted mean = a + b*X, where X is the
+            # raw ensemble realizations. In this case, b = beta^2.
+            realization_dim, = forecast_predictors.coord_dims("realization")
+            n_realizations = forecast_predictors.shape[realization_dim]
+            beta = np.where(
+                available[:, np.newaxis], beta**2, 1. / n_realizations)
+            # The realizations are moved to the last dimension, so that
+            # the coefficients of each time can be broadcast against them.
+            realizations = np.moveaxis(
+                forecast_predictors.data, realization_dim, -1)
+            predicted_mean = (
+                along_time(alpha, forecast_predictors, realization_dim) +
+                np.sum(along_time(beta, forecast_predictors, realization_dim) *
+                       realizations, axis=-1))
+            # Calculate mean of ensemble realizations, as only the
+            # calibrated ensemble mean will be returned.
+            calibrated_forecast_predictor = forecast_predictors.collapsed(
+                "realization", iris.analysis.MEAN)
+            calibrated_forecast_predictor.data = predicted_mean.astype(
+                forecast_predictors.dtype)
+
+        # Calculating the predicted variance, based on the
+        # raw variance S^2, where predicted variance = c + dS^2,
+        # where c = (gamma)^2 and d = (delta)^2
+        predicted_var = (
+            along_time(gamma**2, forecast_vars) +
+            along_time(delta**2, forecast_vars) * forecast_vars.data)
+        calibrated_forecast_var = forecast_vars.copy(
+            data=predicted_var.astype(forecast_vars.dtype))
+
+        # Create a cube of each coefficient with a time dimension, and the
+        # coordinates of the forecast that are scalar or vary with time.
+        time_dims = forecast_predictors.coord_dims("time")
+        coords_and_dims = []
+        for coord in forecast_predictors.coords():
+            dims = forecast_predictors.coord_dims(coord)
+            if coord.name() == "time":
+                continue
+            elif not dims:
+                coords_and_dims.append((coord, ()))
+            elif dims == time_dims:
+                coords_and_dims.append((coord, 0))
+        coeff_cubes = iris.cube.CubeList([])
+        for index, coeff_name in enumerate(coeff_names):
+            coeff_cubes.append(iris.cube.Cube(
+                coefficients[:, index], long_name=coeff_name,
+                attributes=forecast_predictors.attributes,
+                dim_coords_and_dims=[
+                    (iris.coords.DimCoord.from_coord(time_coord), 0)],
+                aux_coords_and_dims=[(coord.copy(), dims)
+                                     for coord, dims in coords_and_dims]))
+        return calibrated_forecast_predictor, calibrated_forecast_var, (
+            coeff_cubes)
+
     def _apply_params(
             self, forecast_predictors, forecast_vars, optimised_coeffs,
             coeff_names, predictor_of_mean_flag):
         """
         Function to apply EMOS coefficients to all required dates.
 
+        If the coefficients are the same at every grid point, the forecast
+        at every date is calibrated together, and a single cube spanning all
+        the dates is returned within each CubeList. Coefficients that vary
+        between grid points are applied to each date in turn.
+
         Args:
             forecast_predictors (Iris cube):
                 Cube containing the forecast predictor e.g. ensemble mean
                 or ensemble realizations.
             forecast_vars (Iris cube.):
                 Cube containing the forecast variance e.g. ensemble variance.
-            optimised_coeffs (List):
+            optimised_coeffs (Dictionary):
                 Coefficients for all dates.
             coeff_names (List):
                 Coefficient names.
@@ -866,122 +2008,39 @@ class ApplyCoefficientsFromEnsembleCalibration(object):
         calibrated_forecast_var_all_dates = iris.cube.CubeList()
         calibrated_forecast_coefficients_all_dates = iris.cube.CubeList()
 
-        for forecast_predictor, forecast_var in zip(
-                forecast_predictors.slices_over("time"),
-                forecast_vars.slices_over("time")):
+        dates = iris_time_to_datetime(
+            forecast_predictors.coord("time").copy())
+        if not any(isinstance(optimised_coeffs.get(date), iris.cube.Cube)
+                   for date in dates):
+            forecast_predictors = [forecast_predictors]
+            forecast_vars = [forecast_vars]
+        else:
+            forecast_predictors = forecast_predictors.slices_over("time")
+            forecast_vars = forecast_vars.slices_over("time")
 
+        for forecast_predictor, forecast_var in zip(
+                forecast_predictors, forecast_vars):
             date = iris_time_to_datetime(
                 forecast_predictor.coord("time").copy())[0]
-            constr = iris.Constraint(time=date)
-            forecast_predictor_at_date = forecast_predictor.extract(constr)
-            forecast_var_at_date = forecast_var.extract(constr)
-
-            # If the coefficients are not available for the date, use the
-            # raw ensemble forecast as the calibrated ensemble forecast.
-            if date not in optimised_coeffs.keys():
-                msg = ("Ensemble calibration not available "
-                       "for forecasts with start time of {}. "
-                       "Coefficients not available".format(
-                           date.strftime("%Y%m%d%H%M")))
-                warnings.warn(msg)
-                calibrated_forecast_predictor_at_date = (
-                    forecast_predictor_at_date.copy())
-                calibrated_forecast_var_at_date = forecast_var_at_date.copy()
-                optimised_coeffs[date] = np.full(len(coeff_names), np.nan)
-                coeff_cubes = self._create_coefficient_cube(
-                    forecast_predictor_at_date, optimised_coeffs, coeff_names)
+            if isinstance(optimised_coeffs.get(date), iris.cube.Cube):
+                (calibrated_forecast_predictor,
+                 calibrated_forecast_var, coeff_cubes) = (
+                     self._apply_local_params(
+                         forecast_predictor, forecast_var,
+                         optimised_coeffs[date], coeff_names,
+                         predictor_of_mean_flag))
             else:
-                optimised_coeffs_at_date = (
-                    optimised_coeffs[date])
-
-                # Assigning coefficients to coefficient names.
-                if len(optimised_coeffs_at_date) == len(coeff_names):
-                    optimised_coeffs_at_date = dict(
-                        zip(coeff_names, optimised_coeffs_at_date))
-                elif len(optimised_coeffs_at_date) > len(coeff_names):
-                    excess_beta = (
-                        optimised_coeffs_at_date[len(coeff_names):].tolist())
-                    optimised_coeffs_at_date = (
-                        dict(list(zip(coeff_names, optimised_coeffs_at_date))))
-                    optimised_coeffs_at_date["beta"] = np.array(
-                        [optimised_coeffs_at_date["beta"]]+excess_beta,
-                        dtype=np.float32)
-                else:
-                    msg = ("Number of coefficient names {} with names {} "
-                           "is not equal to the number of "
-                           "optimised_coeffs_at_date values {} "
-                           "with values {} or the number of "
-                           "coefficients is not greater than the "
-                           "number of coefficient names. Can not continue "
-                           "if the number of coefficient names out number "
-                           "the number of coefficients".format(
-                               len(coeff_names), coeff_names,
-                               len(optimised_coeffs_at_date),
-                               optimised_coeffs_at_date))
-                    raise ValueError(msg)
-
-                if predictor_of_mean_flag.lower() in ["mean"]:
-                    # Calculate predicted mean = a + b*X, where X is the
-                    # raw ensemble mean. In this case, b = beta.
-                    beta = [optimised_coeffs_at_date["a"],
-                            optimised_coeffs_at_date["beta"]]
-                    forecast_predictor_flat = (
-                        forecast_predictor_at_date.data.flatten())
-                    new_col = np.ones(forecast_predictor_flat.shape,
-                                      dtype=np.float32)
-                    all_data = np.column_stack(
-                        (new_col, forecast_predictor_flat))
-                    predicted_mean = np.dot(all_data, beta)
-                    calibrated_forecast_predictor_at_date = (
-                        forecast_predictor_at_date)
-                elif predictor_of_mean_flag.lower() in ["realizations"]:
-                    # Calculate predicted mean = a + b*X, where X is the
-                    # raw ensemble mean. In this case, b = beta^2.
-                    beta = np.concatenate(
-                        [[optimised_coeffs_at_date["a"]],
-                         optimised_coeffs_at_date["beta"]**2])
-                    forecast_predictor = (
-                        enforce_coordinate_ordering(
-                            forecast_predictor, "realization"))
-                    forecast_predictor_flat = (
-                        convert_cube_data_to_2d(
-                            forecast_predictor_at_date))
-                    forecast_var_flat = forecast_var_at_date.data.flatten()
-
-                    new_col = np.ones(forecast_var_flat.shape,
-                                      dtype=np.float32)
-                    all_data = (
-                        np.column_stack((new_col, forecast_predictor_flat)))
-                    predicted_mean = np.dot(all_data, beta)
-                    # Calculate mean of ensemble realizations, as only the
-                    # calibrated ensemble mean will be returned.
-                    calibrated_forecast_predictor_at_date = (
-                        forecast_predictor_at_date.collapsed(
-                            "realization", iris.analysis.MEAN))
-
-                xlen = len(forecast_predictor_at_date.coord(axis="x").points)
-                ylen = len(forecast_predictor_at_date.coord(axis="y").points)
-                predicted_mean = np.reshape(predicted_mean, (ylen, xlen))
-                calibrated_forecast_predictor_at_date.data = predicted_mean
-
-                # Calculating the predicted variance, based on the
-                # raw variance S^2, where predicted variance = c + dS^2,
-                # where c = (gamma)^2 and d = (delta)^2
-                predicted_var = (optimised_coeffs_at_date["gamma"]**2 +
-                                 optimised_coeffs_at_date["delta"]**2 *
-                                 forecast_var_at_date.data)
-
-                calibrated_forecast_var_at_date = forecast_var_at_date
-                calibrated_forecast_var_at_date.data = predicted_var
-
-                coeff_cubes = self._create_coefficient_cube(
-                    calibrated_forecast_predictor_at_date,
-                    optimised_coeffs[date], coeff_names)
+                (calibrated_forecast_predictor,
+                 calibrated_forecast_var, coeff_cubes) = (
+                     self._apply_global_params(
+                         forecast_predictor, forecast_var,
+                         optimised_coeffs, coeff_names,
+                         predictor_of_mean_flag))
 
             calibrated_forecast_predictor_all_dates.append(
-                calibrated_forecast_predictor_at_date)
+                calibrated_forecast_predictor)
             calibrated_forecast_var_all_dates.append(
-                calibrated_forecast_var_at_date)
+                calibrated_forecast_var)
             calibrated_forecast_coefficients_all_dates.extend(coeff_cubes)
 
         return (calibrated_forecast_predictor_all_dates,
@@ -997,7 +2056,10 @@ class EnsembleCalibration(object):
 
     """
     def __init__(self, calibration_method, distribution, desired_units,
-                 predictor_of_mean_flag="mean"):
+                 predictor_of_mean_flag="mean",
+                 minimisation_method="Nelder-Mead",
+                 subsample_fraction=None, random_seed=None,
+                 compare_with_full_sample=False, training_store=None):
         """
         Create an ensemble calibration plugin that, for Nonhomogeneous Gaussian
         Regression, calculates coefficients based on historical forecasts and
@@ -1029,11 +2091,37 @@ class EnsembleCalibration(object):
                 String to specify the input to calculate the calibrated mean.
                 Currently the ensemble mean ("mean") and the ensemble
                 realizations ("realizations") are supported as the predictors.
+            minimisation_method (String):
+                The method used to minimise the CRPS. Either "Nelder-Mead",
+                or one of the gradient-based methods "L-BFGS-B" and "BFGS".
+            subsample_fraction (Float or None):
+                If set, the coefficients are estimated from this fraction of
+                the grid points. If None, all grid points are used.
+            random_seed (Int or None):
+                Seed for the random sampling of the grid points.
+            compare_with_full_sample (Logical):
+                If True, the coefficients are also estimated from all grid
+                points when training on a subsample, so that the change in
+                the CRPS is included in the training diagnostics.
+            training_store (RollingTrainingStore or None):
+                If set, the historic forecasts and truth are added to this
+                store, and the training data is read from the store.
         """
         self.calibration_method = calibration_method
         self.distribution = distribution
         self.desired_units = desired_units
         self.predictor_of_mean_flag = predictor_of_mean_flag
+        self.minimisation_method = minimisation_method
+        self.subsample_fraction = subsample_fraction
+        self.random_seed = random_seed
+        self.compare_with_full_sample = compare_with_full_sample
+        self.training_store = training_store
+        # The optimised coefficients for each date, and their names, and
+        # the diagnostics of training on a subsample, from the last
+        # calibration.
+        self.optimised_coeffs = {}
+        self.coeff_names = []
+        self.training_diagnostics = {}
 
     def __str__(self):
         result = ('<EnsembleCalibration: ' +
@@ -1045,12 +2133,19 @@ class EnsembleCalibration(object):
             self.calibration_method, self.distribution, self.desired_units,
             self.predictor_of_mean_flag)
 
-    def process(self, current_forecast, historic_forecast, truth):
+    def process(self, current_forecast, historic_forecast, truth,
+                previous_coeffs=None):
         """
         Performs ensemble calibration through the following steps:
         1. Estimate optimised coefficients from training period.
         2. Apply optimised coefficients to current forecast.
 
+        The optimised coefficients are retained in the optimised_coeffs
+        attribute, so that they can be saved for a later training. When
+        training on a subsample, the diagnostics of the training at each
+        date, including the change in the CRPS compared with the full sample
+        if requested, are retained in the training_diagnostics attribute.
+
         Args:
             current_forecast (Iris Cube or CubeList):
                 The Cube or CubeList that provides the input forecast for
@@ -1061,6 +2156,10 @@ class EnsembleCalibration(object):
             truth (Iris Cube or CubeList):
                 The Cube or CubeList that provides the input truth for
                 calibration with dates matching the historic forecasts.
+            previous_coeffs (List or None):
+                Coefficients estimated by a previous training, such as the
+                training for the previous cycle, from which to start the
+                minimisation.
 
         Returns:
             calibrated_forecast_predictor_and_variance (CubeList):
@@ -1082,10 +2181,19 @@ class EnsembleCalibration(object):
                     ["gaussian", "truncated gaussian"]):
                 ec = EstimateCoefficientsForEnsembleCalibration(
                     self.distribution, self.desired_units,
-                    predictor_of_mean_flag=self.predictor_of_mean_flag)
+                    predictor_of_mean_flag=self.predictor_of_mean_flag,
+                    minimisation_method=self.minimisation_method,
+                    subsample_fraction=self.subsample_fraction,
+                    random_seed=self.random_seed,
+                    compare_with_full_sample=self.compare_with_full_sample,
+                    training_store=self.training_store)
                 optimised_coeffs, coeff_names = (
                     ec.estimate_coefficients_for_ngr(
-                        current_forecast, historic_forecast, truth))
+                        current_forecast, historic_forecast, truth,
+                        previous_coeffs=previous_coeffs))
+                self.optimised_coeffs = dict(optimised_coeffs)
+                self.coeff_names = coeff_names
+                self.training_diagnostics = dict(ec.training_diagnostics)
         else:
             msg = ("Other calibration methods are not available. "
                    "{} is not available".format(
@@ -36,6 +36,8 @@ specific for ensemble calibration.
 import numpy as np
 
 import iris
+from iris.coords import AuxCoord, DimCoord
+from iris.cube import Cube
 
 
 def convert_cube_data_to_2d(
@@ -91,3 +93,34 @@ def check_predictor_of_mean_flag(predictor_of_mean_flag):
                "Accepted values are 'mean' or 'realizations'").format(
                    predictor_of_mean_flag.lower())
         raise ValueError(msg)
+
+
+def create_coefficients_cube(optimised_coeffs, coeff_names):
+    """
+    Create a cube containing a set of optimised coefficients, so that they
+    can be saved and used as the initial guess for a later training.
+
+    Args:
+        optimised_coeffs (List):
+            The optimised coefficients. Order of coefficients is [c, d, a, b].
+        coeff_names (List):
+            The name of each coefficient. Any further coefficients are named
+            after the last coefficient name.
+
+    Returns:
+        coefficients_cube (iris.cube.Cube):
+            Cube of the coefficients, with a coefficient_index dimension and
+            a coefficient_name coordinate.
+
+    """
+    optimised_coeffs = np.array(optimised_coeffs, dtype=np.float32)
+    names = [coeff_names[min(index, len(coeff_names) - 1)]
+             for index in range(len(optimised_coeffs))]
+    coefficients_cube = Cube(
+        optimised_coeffs, long_name="emos_coefficients", units="1")
+    coefficients_cube.add_dim_coord(
+        DimCoord(np.arange(len(optimised_coeffs), dtype=np.int32),
+                 long_name="coefficient_index", units="1"), 0)
+    coefficients_cube.add_aux_coord(
+        AuxCoord(names, long_name="coefficient_name", units="no_unit"), 0)
+    return coefficients_cube
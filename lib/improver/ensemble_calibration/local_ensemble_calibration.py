@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+This module defines the plugins used to estimate ensemble calibration
+coefficients independently at each grid point.
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+import numpy as np
+
+import iris
+from iris.coords import AuxCoord, DimCoord
+
+from improver.ensemble_calibration.ensemble_calibration import (
+    ContinuousRankedProbabilityScoreMinimisers,
+    EstimateCoefficientsForEnsembleCalibration)
+from improver.ensemble_calibration.ensemble_calibration_utilities import (
+    check_predictor_of_mean_flag)
+from improver.utilities.cube_manipulation import enforce_coordinate_ordering
+
+# Default limit on the memory used to minimise the CRPS for a chunk of
+# points.
+DEFAULT_MAX_MEMORY_IN_BYTES = 2**28
+
+
+class BatchedContinuousRankedProbabilityScoreMinimiser(object):
+    """
+    Minimise the Continuous Ranked Probability Score (CRPS) independently at
+    each of many points at once.
+
+    The coefficients [c, d, a, b] of every point are held in a (point,
+    coefficient) array, and are all updated together using damped Newton
+    (Levenberg-Marquardt) steps. The gradient of the CRPS is calculated
+    analytically, and the Hessian from differences of the gradient, with
+    the magnitudes of its eigenvalues used so that every step is downhill.
+    A step is only accepted at a point if it reduces the CRPS at that point,
+    otherwise the damping at that point is increased.
+
+    The points are minimised in chunks that fit within a memory limit,
+    which can be processed in parallel by a pool of processes.
+
+    """
+
+    # Maximum number of Newton steps.
+    MAX_ITERATIONS = 100
+
+    # A point has converged when an accepted step reduces its CRPS by less
+    # than this fraction.
+    TOLERANCE = 1.e-7
+
+    # Initial damping, and the damping at which a point is abandoned.
+    INITIAL_DAMPING = 1.e-3
+    MAX_DAMPING = 1.e8
+
+    def __init__(self, distribution, predictor_of_mean_flag="mean",
+                 max_memory_in_bytes=DEFAULT_MAX_MEMORY_IN_BYTES,
+                 n_workers=1):
+        """
+        Initialise class.
+
+        Args:
+            distribution (String):
+                Name of the distribution, either "gaussian" or
+                "truncated gaussian".
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+            max_memory_in_bytes (int):
+                Approximate limit on the memory used to minimise the CRPS
+                for each chunk of points.
+            n_workers (int):
+                Number of processes used to minimise the chunks of points
+                concurrently. If 1, the chunks are processed in turn.
+
+        Raises:
+            KeyError: The distribution is not supported.
+            ValueError: The number of workers is less than 1.
+
+        """
+        derivatives = {
+            "gaussian": "normal_crps_derivatives",
+            "truncated gaussian": "truncated_normal_crps_derivatives"}
+        try:
+            self.derivatives_name = derivatives[distribution]
+        except KeyError:
+            msg = ("Distribution requested {} is not supported. "
+                   "Supported distributions are: {}".format(
+                       distribution, sorted(derivatives)))
+            raise KeyError(msg)
+        check_predictor_of_mean_flag(predictor_of_mean_flag)
+        if n_workers < 1:
+            msg = "Invalid number of workers: must be >= 1: {}".format(
+                n_workers)
+            raise ValueError(msg)
+        self.distribution = distribution
+        self.predictor_of_mean_flag = predictor_of_mean_flag.lower()
+        self.max_memory_in_bytes = max_memory_in_bytes
+        self.n_workers = n_workers
+        # Diagnostics describing the convergence of the last minimisation.
+        self.diagnostics = {}
+
+    def __repr__(self):
+        """Represent the configured plugin instance as a string."""
+        result = ('<BatchedContinuousRankedProbabilityScoreMinimiser: '
+                  'distribution: {}; predictor_of_mean_flag: {}; '
+                  'max_memory_in_bytes: {}; n_workers: {}>')
+        return result.format(
+            self.distribution, self.predictor_of_mean_flag,
+            self.max_memory_in_bytes, self.n_workers)
+
+    def crps_and_gradient(self, coeffs, forecast_predictor, truth,
+                          forecast_var):
+        """
+        Calculate the CRPS summed over the training samples of each point,
+        and its gradient with respect to the coefficients of each point.
+
+        Args:
+            coeffs (numpy.ndarray):
+                Coefficients of each point, with shape (point, coefficient).
+                Order of coefficients is [c, d, a, b].
+            forecast_predictor (numpy.ndarray):
+                The ensemble mean, with shape (point, sample), or the
+                ensemble realizations, with shape (point, sample,
+                realization).
+            truth (numpy.ndarray):
+                The truth, with shape (point, sample).
+            forecast_var (numpy.ndarray):
+                The ensemble variance, with shape (point, sample).
+
+        Returns:
+            (tuple): tuple containing:
+                **crps** (numpy.ndarray):
+                    The CRPS of each point. This is infinite at points where
+                    the coefficients are not valid.
+                **gradient** (numpy.ndarray):
+                    The gradient of the CRPS of each point, with shape
+                    (point, coefficient).
+
+        """
+        if self.predictor_of_mean_flag == "mean":
+            mu = coeffs[:, 2:3] + coeffs[:, 3:4] * forecast_predictor
+        else:
+            mu = coeffs[:, 2:3] + np.einsum(
+                "ijk,ik->ij", forecast_predictor, coeffs[:, 3:]**2)
+        sigma = np.sqrt(
+            coeffs[:, 0:1]**2 + coeffs[:, 1:2]**2 * forecast_var)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x0 = mu / sigma
+            crps, dcrps_dmu, dcrps_dsigma = getattr(
+                ContinuousRankedProbabilityScoreMinimisers,
+                self.derivatives_name)(truth, mu, sigma, np.sqrt(np.pi))
+            dcrps_dvariance = dcrps_dsigma / (2 * sigma)
+
+        # Samples are excluded if their CRPS is not finite, as in
+        # ContinuousRankedProbabilityScoreMinimisers, whilst points are
+        # invalid if the distribution is not defined at any sample.
+        valid = np.isfinite(crps)
+        invalid_point = np.any(~np.isfinite(x0) & ~np.isnan(truth), axis=1)
+        if self.distribution == "truncated gaussian":
+            invalid_point |= np.any(valid & (x0 < -3), axis=1)
+        dcrps_dmu = np.where(valid, dcrps_dmu, 0.)
+        dcrps_dvariance = np.where(valid, dcrps_dvariance, 0.)
+
+        gradient = np.empty(coeffs.shape)
+        gradient[:, 0] = 2 * coeffs[:, 0] * np.sum(dcrps_dvariance, axis=1)
+        gradient[:, 1] = 2 * coeffs[:, 1] * np.sum(
+            dcrps_dvariance * np.where(valid, forecast_var, 0.), axis=1)
+        gradient[:, 2] = np.sum(dcrps_dmu, axis=1)
+        if self.predictor_of_mean_flag == "mean":
+            gradient[:, 3] = np.sum(
+                dcrps_dmu * np.where(valid, forecast_predictor, 0.), axis=1)
+        else:
+            gradient[:, 3:] = 2 * coeffs[:, 3:] * np.einsum(
+                "ij,ijk->ik", dcrps_dmu,
+                np.where(valid[..., np.newaxis], forecast_predictor, 0.))
+        crps = np.where(invalid_point, np.inf, np.sum(
+            np.where(valid, crps, 0.), axis=1))
+        return crps, gradient
+
+    def _hessian(self, coeffs, gradient, *training_data):
+        """
+        Calculate the Hessian of the CRPS of each point from forward
+        differences of the gradient.
+
+        Args:
+            coeffs (numpy.ndarray):
+                Coefficients of each point, with shape (point, coefficient).
+            gradient (numpy.ndarray):
+                The gradient of the CRPS at the coefficients.
+            training_data (numpy.ndarray):
+                The forecast predictor, truth and forecast variance.
+
+        Returns:
+            hessian (numpy.ndarray):
+                The symmetric Hessian of each point, with shape (point,
+                coefficient, coefficient).
+
+        """
+        n_points, n_coeffs = coeffs.shape
+        steps = 1.e-6 * np.maximum(1., np.abs(coeffs))
+        hessian = np.empty((n_points, n_coeffs, n_coeffs))
+        for index in range(n_coeffs):
+            shifted = coeffs.copy()
+            shifted[:, index] += steps[:, index]
+            _, shifted_gradient = self.crps_and_gradient(
+                shifted, *training_data)
+            hessian[:, :, index] = (
+                (shifted_gradient - gradient) / steps[:, index:index + 1])
+        return 0.5 * (hessian + np.swapaxes(hessian, 1, 2))
+
+    def minimise_chunk(self, initial_guess, forecast_predictor, truth,
+                       forecast_var):
+        """
+        Minimise the CRPS independently at each point of a chunk.
+
+        Args:
+            initial_guess (numpy.ndarray):
+                Initial coefficients of each point, with shape (point,
+                coefficient).
+            forecast_predictor (numpy.ndarray):
+                The ensemble mean, with shape (point, sample), or the
+                ensemble realizations, with shape (point, sample,
+                realization).
+            truth (numpy.ndarray):
+                The truth, with shape (point, sample).
+            forecast_var (numpy.ndarray):
+                The ensemble variance, with shape (point, sample).
+
+        Returns:
+            (tuple): tuple containing:
+                **coeffs** (numpy.ndarray):
+                    The optimised coefficients of each point. Points at which
+                    the initial guess is not valid keep the initial guess.
+                **converged** (numpy.ndarray):
+                    Boolean array that is True at points that converged.
+                **iterations** (int):
+                    The number of Newton steps taken.
+
+        """
+        coeffs = np.array(initial_guess, dtype=np.float64)
+        n_points, n_coeffs = coeffs.shape
+        crps, gradient = self.crps_and_gradient(
+            coeffs, forecast_predictor, truth, forecast_var)
+        damping = np.full(n_points, self.INITIAL_DAMPING)
+        converged = np.zeros(n_points, dtype=bool)
+        active = np.isfinite(crps)
+        iterations = 0
+        while np.any(active) and iterations < self.MAX_ITERATIONS:
+            iterations += 1
+            index = np.nonzero(active)[0]
+            training_data = (
+                forecast_predictor[index], truth[index], forecast_var[index])
+            hessian = self._hessian(
+                coeffs[index], gradient[index], *training_data)
+            # Replacing the eigenvalues of the Hessian by their magnitudes
+            # gives a descent direction even where the CRPS is not convex,
+            # such as around gamma = 0.
+            eigenvalues, eigenvectors = np.linalg.eigh(hessian)
+            eigenvalues = np.abs(eigenvalues)
+            scale = np.max(eigenvalues, axis=1, keepdims=True) + 1.e-12
+            eigenvalues = (np.maximum(eigenvalues, 1.e-8 * scale) +
+                           damping[index, np.newaxis] * scale)
+            step = -np.einsum(
+                "ijk,ik,ilk,il->ij", eigenvectors, 1. / eigenvalues,
+                eigenvectors, gradient[index])
+            new_crps, new_gradient = self.crps_and_gradient(
+                coeffs[index] + step, *training_data)
+
+            accept = new_crps < crps[index]
+            finished = accept & (
+                crps[index] - new_crps <= self.TOLERANCE * np.abs(new_crps))
+            converged[index[finished]] = True
+            accepted = index[accept]
+            coeffs[accepted] += step[accept]
+            crps[accepted] = new_crps[accept]
+            gradient[accepted] = new_gradient[accept]
+            damping[index] = np.where(
+                accept, damping[index] / 3., damping[index] * 4.)
+            active[index[finished]] = False
+            active &= damping < self.MAX_DAMPING
+        return coeffs, converged, iterations
+
+    def process(self, initial_guess, forecast_predictor, truth, forecast_var):
+        """
+        Minimise the CRPS independently at each point, in chunks of points.
+
+        Args:
+            initial_guess (numpy.ndarray):
+                Initial coefficients of each point, with shape (point,
+                coefficient). Order of coefficients is [c, d, a, b].
+            forecast_predictor (numpy.ndarray):
+                The ensemble mean, with shape (point, sample), or the
+                ensemble realizations, with shape (point, sample,
+                realization).
+            truth (numpy.ndarray):
+                The truth, with shape (point, sample).
+            forecast_var (numpy.ndarray):
+                The ensemble variance, with shape (point, sample).
+
+        Returns:
+            optimised_coeffs (numpy.ndarray):
+                The optimised coefficients of each point, with shape (point,
+                coefficient).
+
+        """
+        start_time = time.time()
+        n_points, n_samples = truth.shape
+        n_coeffs = initial_guess.shape[1]
+        # Each evaluation of the CRPS holds around 20 temporary arrays per
+        # predictor of each sample, alongside the Hessian.
+        bytes_per_point = 8 * (
+            20 * n_samples * (n_coeffs - 2) + 4 * n_coeffs**2)
+        chunk = int(max(1, self.max_memory_in_bytes // bytes_per_point))
+        tasks = [
+            (initial_guess[start:start + chunk],
+             forecast_predictor[start:start + chunk],
+             truth[start:start + chunk], forecast_var[start:start + chunk])
+            for start in range(0, n_points, chunk)]
+        if self.n_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                results = list(executor.map(self.minimise_chunk, *zip(*tasks)))
+        else:
+            results = [self.minimise_chunk(*task) for task in tasks]
+
+        self.diagnostics = {
+            "points": n_points,
+            "chunks": len(tasks),
+            "converged_points": int(sum(
+                np.sum(converged) for _, converged, _ in results)),
+            "iterations": max(
+                [iterations for _, _, iterations in results] + [0]),
+            "wall_time": time.time() - start_time}
+        return np.concatenate(
+            [coeffs for coeffs, _, _ in results]
+            or [np.empty((0, n_coeffs))])
+
+
+class EstimateLocalCoefficientsForEnsembleCalibration(
+        EstimateCoefficientsForEnsembleCalibration):
+    """
+    Class focussing on estimating optimised coefficients for ensemble
+    calibration independently at each grid point, using the training samples
+    of that grid point only.
+    """
+
+    def __init__(self, distribution, desired_units,
+                 predictor_of_mean_flag="mean",
+                 max_memory_in_bytes=DEFAULT_MAX_MEMORY_IN_BYTES,
+                 n_workers=1):
+        """
+        Create a plugin that, for Nonhomogeneous Gaussian Regression,
+        calculates coefficients at each grid point based on historical
+        forecasts.
+
+        Args:
+            distribution (String):
+                Name of distribution. Assume that the current forecast can be
+                represented using this distribution.
+            desired_units (String or cf_units.Unit):
+                The unit that you would like the calibration to be undertaken
+                in. The current forecast, historical forecast and truth will be
+                converted as required.
+            predictor_of_mean_flag (String):
+                String to specify the input to calculate the calibrated mean.
+                Currently the ensemble mean ("mean") and the ensemble
+                realizations ("realizations") are supported as the predictors.
+            max_memory_in_bytes (int):
+                Approximate limit on the memory used to minimise the CRPS
+                for each chunk of grid points.
+            n_workers (int):
+                Number of processes used to minimise the chunks of grid
+                points concurrently.
+
+        """
+        super(EstimateLocalCoefficientsForEnsembleCalibration, self).__init__(
+            distribution, desired_units,
+            predictor_of_mean_flag=predictor_of_mean_flag)
+        self.batched_minimiser = (
+            BatchedContinuousRankedProbabilityScoreMinimiser(
+                distribution.lower(),
+                predictor_of_mean_flag=predictor_of_mean_flag,
+                max_memory_in_bytes=max_memory_in_bytes,
+                n_workers=n_workers))
+
+    def __str__(self):
+        result = ('<EstimateLocalCoefficientsForEnsembleCalibration: '
+                  'distribution: {}; desired_units: {}; '
+                  'predictor_of_mean_flag: {}; minimiser: {}>')
+        return result.format(
+            self.distribution, self.desired_units,
+            self.predictor_of_mean_flag, self.batched_minimiser)
+
+    @staticmethod
+    def _data_by_point(cube):
+        """
+        Reshape the data of a cube to have the grid points as the first
+        dimension, followed by the remaining dimensions in their existing
+        order.
+
+        Args:
+            cube (iris.cube.Cube):
+                Cube with x and y dimensions.
+
+        Returns:
+            data (numpy.ndarray):
+                Array of the data, with masked points filled with NaN.
+
+        """
+        spatial_coords = [cube.coord(axis=axis).name() for axis in "yx"]
+        cube = cube.copy()
+        enforce_coordinate_ordering(cube, spatial_coords, anchor="end")
+        n_points = np.prod(cube.shape[-2:])
+        data = np.ma.filled(cube.data.astype(np.float64), np.nan)
+        data = data.reshape(cube.shape[:-2] + (n_points,))
+        return np.moveaxis(data, -1, 0)
+
+    def create_coefficient_cube(self, optimised_coeffs, template_cube,
+                                coeff_names):
+        """
+        Create a cube containing the coefficients of each grid point.
+
+        Args:
+            optimised_coeffs (numpy.ndarray):
+                The coefficients of each grid point, with shape (point,
+                coefficient).
+            template_cube (iris.cube.Cube):
+                Cube containing the current forecast at the date of the
+                coefficients.
+            coeff_names (List):
+                The name of each coefficient. Any further coefficients are
+                named after the last coefficient name.
+
+        Returns:
+            coefficient_cube (iris.cube.Cube):
+                Cube containing the coefficients, with a leading
+                coefficient_index dimension followed by the y and x
+                dimensions.
+
+        """
+        spatial_coords = [
+            template_cube.coord(axis=axis).name() for axis in "yx"]
+        template_cube = next(template_cube.slices(spatial_coords))
+        for coord in template_cube.coords(dim_coords=False):
+            if not coord.shape == (1,):
+                template_cube.remove_coord(coord)
+        if template_cube.coords("realization"):
+            template_cube.remove_coord("realization")
+        coefficient_cubes = iris.cube.CubeList()
+        for index, coeffs in enumerate(optimised_coeffs.T):
+            coefficient_cube = template_cube.copy(
+                data=coeffs.reshape(template_cube.shape).astype(np.float32))
+            coefficient_cube.rename("emos_coefficients")
+            coefficient_cube.units = "1"
+            coefficient_cube.cell_methods = ()
+            coefficient_cube.add_aux_coord(DimCoord(
+                [index], long_name="coefficient_index", units="1"))
+            coefficient_cube.add_aux_coord(AuxCoord(
+                [coeff_names[min(index, len(coeff_names) - 1)]],
+                long_name="coefficient_name", units="no_unit"))
+            coefficient_cubes.append(coefficient_cube)
+        return coefficient_cubes.merge_cube()
+
+    def estimate_coefficients_for_ngr(
+            self, current_forecast, historic_forecast, truth,
+            previous_coeffs=None):
+        """
+        Using Nonhomogeneous Gaussian Regression/Ensemble Model Output
+        Statistics, estimate the required coefficients at each grid point
+        from historical forecasts.
+
+        The initial guess at each grid point is the coefficients at that
+        grid point from a previous training or for the previous date, if
+        available, otherwise the initial guess calculated from all grid
+        points.
+
+        Args:
+            current_forecast (Iris Cube or CubeList):
+                The cube containing the current forecast.
+            historical_forecast (Iris Cube or CubeList):
+                The cube or cubelist containing the historical forecasts used
+                for calibration.
+            truth (Iris Cube or CubeList):
+                The cube or cubelist containing the truth used for calibration.
+            previous_coeffs (Iris Cube or None):
+                Cube of coefficients at each grid point estimated by a
+                previous training, such as the training for the previous
+                cycle, from which to start the minimisation.
+
+        Returns:
+            (tuple): tuple containing:
+                **optimised_coeffs** (Dictionary):
+                    Dictionary containing a cube of the optimised
+                    coefficients at each grid point for each date.
+                **coeff_names** (List):
+                    The name of each coefficient.
+
+        """
+        check_predictor_of_mean_flag(self.predictor_of_mean_flag)
+
+        optimised_coeffs = {}
+        coeff_names = list(self.COEFF_NAMES)
+        initial_guess = None
+        if previous_coeffs is not None:
+            initial_guess = self._data_by_point(previous_coeffs)
+
+        for (date, current_forecast_cube, forecast_predictor, forecast_var,
+             truth_cube, no_of_realizations) in self._prepare_training_data(
+                 current_forecast, historic_forecast, truth):
+
+            if self.predictor_of_mean_flag.lower() in ["mean"]:
+                predictor_data = self._data_by_point(forecast_predictor)
+                predictor_data = predictor_data.reshape(
+                    predictor_data.shape[0], -1)
+            else:
+                forecast_predictor = forecast_predictor.copy()
+                enforce_coordinate_ordering(forecast_predictor, "realization")
+                predictor_data = self._data_by_point(forecast_predictor)
+                predictor_data = np.moveaxis(
+                    predictor_data.reshape(
+                        predictor_data.shape[:2] + (-1,)), 1, 2)
+            n_points = predictor_data.shape[0]
+            truth_data = self._data_by_point(truth_cube).reshape(n_points, -1)
+            forecast_var_data = self._data_by_point(forecast_var).reshape(
+                n_points, -1)
+
+            if initial_guess is None:
+                global_guess = self.compute_initial_guess(
+                    truth_cube, forecast_predictor,
+                    self.predictor_of_mean_flag,
+                    self.ESTIMATE_COEFFICIENTS_FROM_LINEAR_MODEL_FLAG,
+                    no_of_realizations=no_of_realizations)
+                if np.any(np.isnan(global_guess)):
+                    global_guess = self.compute_initial_guess(
+                        truth_cube, forecast_predictor,
+                        self.predictor_of_mean_flag, False,
+                        no_of_realizations=no_of_realizations)
+                initial_guess = np.tile(global_guess, (n_points, 1))
+            elif initial_guess.shape[0] != n_points:
+                msg = ("The number of grid points of the coefficients "
+                       "supplied {} does not match the number of grid points "
+                       "of the forecast {}".format(
+                           initial_guess.shape[0], n_points))
+                raise ValueError(msg)
+
+            initial_guess = self.batched_minimiser.process(
+                initial_guess, predictor_data, truth_data, forecast_var_data)
+            optimised_coeffs[date] = self.create_coefficient_cube(
+                initial_guess, current_forecast_cube, coeff_names)
+
+        return optimised_coeffs, coeff_names
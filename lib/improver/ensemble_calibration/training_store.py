@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+This module defines a store of the training data used to estimate the
+ensemble calibration coefficients, which holds a rolling period of days.
+
+"""
+import datetime
+import glob
+import json
+import os
+import warnings
+
+import dask.array as da
+import numpy as np
+
+import cf_units as unit
+import iris
+from iris.coords import AuxCoord, DimCoord
+from iris.cube import Cube
+
+from improver.utilities.temporal import iris_time_to_datetime
+
+
+class RollingTrainingStore(object):
+    """
+    Store of the historic forecast mean, the historic forecast variance and
+    the truth for each day of a rolling training period, on the calibration
+    grid.
+
+    Each field of each day is held in its own file in the numpy binary
+    format, so that it can be memory-mapped for reading. Days are added to
+    the store, but never rewritten, and days that fall outside the training
+    period ending at the newest day in the store are removed. Each run
+    therefore only needs to add the newest day of historic forecasts and
+    truth, rather than recalculate the whole training period.
+
+    """
+    FIELDS = ["mean", "variance", "truth"]
+    METADATA_FILENAME = "training_store.json"
+    TIME_FORMAT = "%Y%m%dT%H%MZ"
+    TIME_UNITS = "seconds since 1970-01-01 00:00:00"
+
+    def __init__(self, directory, training_length):
+        """
+        Initialise the store.
+
+        Args:
+            directory (String):
+                Directory that holds the store. This is created if it does
+                not exist.
+            training_length (Int):
+                Number of days in the training period.
+
+        Raises:
+            ValueError: The training length is less than one day.
+
+        """
+        if training_length < 1:
+            msg = ("The training length must be at least one day. "
+                   "The training length requested was {}".format(
+                       training_length))
+            raise ValueError(msg)
+        self.directory = directory
+        self.training_length = int(training_length)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def __repr__(self):
+        """Represent the configured plugin instance as a string."""
+        result = ('<RollingTrainingStore: directory: {}; '
+                  'training_length: {}>')
+        return result.format(self.directory, self.training_length)
+
+    def _filename(self, time, forecast_period, field):
+        """
+        Return the path of the file holding one field for one day.
+
+        Args:
+            time (datetime.datetime):
+                Validity time of the historic forecast.
+            forecast_period (Int):
+                Forecast period of the historic forecast in seconds.
+            field (String):
+                Name of the field, one of FIELDS.
+
+        Returns:
+            filename (String):
+                Path of the file.
+
+        """
+        return os.path.join(
+            self.directory, "{}_{}_{}.npy".format(
+                time.strftime(self.TIME_FORMAT), forecast_period, field))
+
+    def _check_units(self, forecast_units, truth_units):
+        """
+        Record the units of the historic forecast and the truth when the
+        first day is added to the store, and check that later days match.
+
+        Args:
+            forecast_units (cf_units.Unit):
+                Units of the historic forecast.
+            truth_units (cf_units.Unit):
+                Units of the truth.
+
+        Raises:
+            ValueError: The units do not match those of the store.
+
+        """
+        units = {"forecast": str(forecast_units), "truth": str(truth_units)}
+        stored_units = self.units()
+        if stored_units is None:
+            with open(os.path.join(
+                    self.directory, self.METADATA_FILENAME), "w") as handle:
+                json.dump({"units": units}, handle)
+        elif stored_units != units:
+            msg = ("The units of the historic forecast and truth {} do not "
+                   "match the units of the training store {}".format(
+                       units, stored_units))
+            raise ValueError(msg)
+
+    def units(self):
+        """
+        Return the units of the historic forecast and truth in the store.
+
+        Returns:
+            units (Dictionary or None):
+                The units of the "forecast" and the "truth", or None if no
+                days have been added to the store.
+
+        """
+        filename = os.path.join(self.directory, self.METADATA_FILENAME)
+        if not os.path.exists(filename):
+            return None
+        with open(filename) as handle:
+            return json.load(handle)["units"]
+
+    def available_times(self, forecast_period=None):
+        """
+        Return the validity times of the days held in the store.
+
+        Args:
+            forecast_period (Int or None):
+                Forecast period in seconds. If None, the days for every
+                forecast period are included.
+
+        Returns:
+            times (List):
+                Sorted list of datetime.datetime objects.
+
+        """
+        pattern = "*_{}_{}.npy".format(
+            "*" if forecast_period is None else int(forecast_period),
+            self.FIELDS[-1])
+        times = set()
+        # The truth is written last, so only complete days are found.
+        for filename in glob.glob(os.path.join(self.directory, pattern)):
+            time_string = os.path.basename(filename).split("_")[0]
+            times.add(datetime.datetime.strptime(
+                time_string, self.TIME_FORMAT))
+        return sorted(times)
+
+    def add(self, historic_forecast, truth):
+        """
+        Add the days within the historic forecast that are not already held
+        in the store, then remove any days that are outside the training
+        period.
+
+        Args:
+            historic_forecast (Iris Cube):
+                Historic forecast with a realization coordinate, and with
+                one or more times.
+            truth (Iris Cube):
+                Truth with one or more times. The truth for a historic
+                forecast has a forecast_reference_time equal to the
+                validity time of the historic forecast.
+
+        Returns:
+            added (List):
+                List of the (time, forecast_period) of each day added, where
+                the forecast period is in seconds.
+
+        """
+        self._check_units(historic_forecast.units, truth.units)
+        added = []
+        for forecast_slice in historic_forecast.slices_over("time"):
+            time, = iris_time_to_datetime(forecast_slice.coord("time"))
+            forecast_period_coord = (
+                forecast_slice.coord("forecast_period").copy())
+            forecast_period_coord.convert_units("seconds")
+            forecast_period = int(forecast_period_coord.points[0])
+            if os.path.exists(
+                    self._filename(time, forecast_period, self.FIELDS[-1])):
+                continue
+
+            truth_slice = truth.extract(
+                iris.Constraint(forecast_reference_time=time))
+            if truth_slice is None:
+                msg = ("Unable to add the historic forecast for {} to the "
+                       "training store as no truth data is available.".format(
+                           time))
+                warnings.warn(msg)
+                continue
+
+            fields = [
+                forecast_slice.collapsed(
+                    "realization", iris.analysis.MEAN).data,
+                forecast_slice.collapsed(
+                    "realization", iris.analysis.VARIANCE).data,
+                truth_slice.data]
+            for field, data in zip(self.FIELDS, fields):
+                np.save(self._filename(time, forecast_period, field),
+                        np.ma.filled(data.astype(np.float32), np.nan))
+            added.append((time, forecast_period))
+        self.remove_expired_days()
+        return added
+
+    def remove_expired_days(self):
+        """
+        Remove the days that are outside the training period ending at the
+        newest day within the store.
+
+        Returns:
+            removed (List):
+                List of the paths of the files removed.
+
+        """
+        times = self.available_times()
+        if not times:
+            return []
+        earliest_time = times[-1] - datetime.timedelta(
+            days=self.training_length)
+        removed = []
+        for filename in glob.glob(os.path.join(self.directory, "*.npy")):
+            time = datetime.datetime.strptime(
+                os.path.basename(filename).split("_")[0], self.TIME_FORMAT)
+            if time <= earliest_time:
+                os.remove(filename)
+                removed.append(filename)
+        return removed
+
+    def load(self, forecast_period, template):
+        """
+        Load the days held in the store for a forecast period, as cubes with
+        the grid of the template. The cubes have lazy data, which is read
+        from the memory-mapped files of each day when it is used.
+
+        Args:
+            forecast_period (Int):
+                Forecast period in seconds.
+            template (Iris Cube):
+                Cube on the calibration grid, such as the current forecast.
+                The y and x coordinates, and the name, of this cube are used
+                for the cubes returned.
+
+        Returns:
+            (tuple or None): tuple containing:
+                **forecast_mean** (Iris Cube):
+                    Historic forecast mean with a leading time dimension.
+                **forecast_var** (Iris Cube):
+                    Historic forecast variance with a leading time dimension.
+                **truth** (Iris Cube):
+                    Truth with a leading time dimension.
+                None is returned if the store holds no days for the forecast
+                period.
+
+        """
+        forecast_period = int(forecast_period)
+        times = self.available_times(forecast_period)
+        if not times:
+            return None
+        units = self.units()
+        time_units = unit.Unit(self.TIME_UNITS, calendar="gregorian")
+        time_coord = DimCoord(
+            np.array([time_units.date2num(time) for time in times],
+                     dtype=np.int64),
+            "time", units=time_units)
+        forecast_period_coord = AuxCoord(
+            np.array(forecast_period, dtype=np.int32), "forecast_period",
+            units="seconds")
+        y_coord = template.coord(axis="y")
+        x_coord = template.coord(axis="x")
+
+        cubes = []
+        for field in self.FIELDS:
+            # Each day is a chunk of the stacked lazy array, read from its
+            # memory-mapped file only when the data is computed.
+            days = [np.load(self._filename(time, forecast_period, field),
+                            mmap_mode="r") for time in times]
+            data = da.stack(
+                [da.from_array(day, chunks=day.shape) for day in days])
+            if da.isnan(data).any().compute():
+                data = da.ma.masked_invalid(data)
+            cube = Cube(
+                data,
+                units=units["truth" if field == "truth" else "forecast"],
+                dim_coords_and_dims=[
+                    (time_coord.copy(), 0), (y_coord.copy(), 1),
+                    (x_coord.copy(), 2)])
+            cube.rename(template.name())
+            if field != "truth":
+                cube.add_aux_coord(forecast_period_coord.copy())
+            cubes.append(cube)
+        return tuple(cubes)
@@ -33,7 +33,10 @@ This module defines the plugins required for Ensemble Copula Coupling.
 
 """
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
 
 
@@ -51,8 +54,13 @@ from improver.ensemble_copula_coupling.ensemble_copula_coupling_utilities \
 from improver.utilities.cube_manipulation import (
     concatenate_cubes, enforce_coordinate_ordering)
 from improver.utilities.cube_checker import (
-    find_percentile_coordinate, check_for_x_and_y_axes,
-    check_cube_coordinates)
+    find_percentile_coordinate, check_for_x_and_y_axes)
+from improver.utilities.mathematical_operations import (
+    interpolate_multiple_rows)
+
+# Default limit on the memory used for the temporary arrays when calculating
+# the probabilities for a chunk of points.
+DEFAULT_MAX_MEMORY_IN_BYTES = 2**26
 
 
 class RebadgePercentilesAsRealizations(object):
@@ -235,17 +243,9 @@ class ResamplePercentiles(object):
                 original_percentiles, forecast_at_reshaped_percentiles,
                 bounds_pairing))
 
-        forecast_at_interpolated_percentiles = (
-            np.empty(
-                (len(desired_percentiles),
-                 forecast_at_reshaped_percentiles.shape[0]),
-                dtype=np.float32
-            )
-        )
-        for index in range(forecast_at_reshaped_percentiles.shape[0]):
-            forecast_at_interpolated_percentiles[:, index] = np.interp(
-                desired_percentiles, original_percentiles,
-                forecast_at_reshaped_percentiles[index, :])
+        forecast_at_interpolated_percentiles = interpolate_multiple_rows(
+            desired_percentiles, original_percentiles,
+            forecast_at_reshaped_percentiles).T.astype(np.float32)
 
         # Reshape forecast_at_percentiles, so the percentiles dimension is
         # first, and any other dimension coordinates follow.
@@ -475,14 +475,9 @@ class GeneratePercentilesFromProbabilities(object):
         percentiles = np.array([x/100.0 for x in percentiles],
                                dtype=np.float32)
 
-        forecast_at_percentiles = (
-            np.empty((len(percentiles), probabilities_for_cdf.shape[0]),
-                     dtype=np.float32)
-        )
-        for index in range(probabilities_for_cdf.shape[0]):
-            forecast_at_percentiles[:, index] = np.interp(
-                percentiles, probabilities_for_cdf[index, :],
-                threshold_points)
+        forecast_at_percentiles = interpolate_multiple_rows(
+            percentiles, probabilities_for_cdf,
+            threshold_points).T.astype(np.float32)
 
         # Convert percentiles back into percentages.
         percentiles = np.array([x*100.0 for x in percentiles],
@@ -739,17 +734,43 @@ class GenerateProbabilitiesFromMeanAndVariance(object):
     """
     Plugin to generate probabilities relative to given thresholds from the mean
     and variance of a distribution.
+
+    The probabilities for all the thresholds are calculated together for
+    chunks of points that fit within a memory limit, which can be processed
+    in parallel by a pool of threads.
     """
 
-    def __init__(self):
+    def __init__(self, max_memory_in_bytes=DEFAULT_MAX_MEMORY_IN_BYTES,
+                 n_workers=1):
         """
         Initialise the class.
+
+        Args:
+            max_memory_in_bytes (int):
+                Approximate limit on the memory used for the temporary arrays
+                when calculating the probabilities, which is shared between
+                the chunks of points being processed at the same time.
+            n_workers (int):
+                Number of threads used to calculate the probabilities for
+                the chunks of points concurrently. If 1, the chunks are
+                processed in turn.
+
+        Raises:
+            ValueError: The number of workers is less than 1.
+
         """
-        pass
+        if n_workers < 1:
+            msg = "Invalid number of workers: must be >= 1: {}".format(
+                n_workers)
+            raise ValueError(msg)
+        self.max_memory_in_bytes = max_memory_in_bytes
+        self.n_workers = n_workers
 
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
-        desc = '<GenerateProbabilitiesFromMeanAndVariance>'
+        desc = ('<GenerateProbabilitiesFromMeanAndVariance: '
+                'max_memory_in_bytes: {}; n_workers: {}>'.format(
+                    self.max_memory_in_bytes, self.n_workers))
         return desc
 
     @staticmethod
@@ -810,13 +831,19 @@ class GenerateProbabilitiesFromMeanAndVariance(object):
                    'not equivalent/compatible.'.format(err))
             raise ValueError(msg)
 
-    @staticmethod
-    def _mean_and_variance_to_probabilities(mean_values, variance_values,
+    def _mean_and_variance_to_probabilities(self, mean_values, variance_values,
                                             probability_cube_template):
         """
         Function returning probabilities relative to provided thresholds based
         on the supplied mean and variance. A Gaussian distribution is assumed.
 
+        The points are split into chunks, and the probabilities for all the
+        thresholds are calculated for each chunk with a single call to the
+        normal cumulative distribution function, which writes the float32
+        probabilities directly into the output array. Points with a variance
+        that is not positive have a probability of NaN, as for
+        scipy.stats.norm.
+
         Args:
             mean_values (iris.cube.Cube):
                 Predictor for the calibrated forecast i.e. the mean.
@@ -837,20 +864,43 @@ class GenerateProbabilitiesFromMeanAndVariance(object):
         relative_to_threshold = (
             probability_cube_template.attributes['relative_to_threshold'])
 
-        # Loop over thresholds, and use a normal distribution with the mean
-        # and variance to calculate the probabilties relative to each
-        # threshold.
-        probabilities = np.empty_like(probability_cube_template.data)
-        distribution = norm(loc=mean_values.data,
-                            scale=np.sqrt(variance_values.data))
-        probability_method = distribution.cdf
-        if relative_to_threshold == 'above':
-            probability_method = distribution.sf
-
-        for index, threshold in enumerate(thresholds):
-            probabilities[index, ...] = probability_method(threshold)
+        spatial_shape = probability_cube_template.shape[1:]
+        means = np.broadcast_to(
+            np.asarray(mean_values.data), spatial_shape).reshape(-1)
+        standard_deviations = np.sqrt(np.broadcast_to(
+            np.asarray(variance_values.data), spatial_shape).reshape(-1))
+        # The probabilities above a threshold are calculated from the
+        # cumulative distribution of the negated standardised values.
+        sign = -1 if relative_to_threshold == 'above' else 1
+        thresholds = thresholds.reshape(-1, 1)
+        probabilities = np.empty(
+            (len(thresholds), means.size), dtype=np.float32)
+
+        def calculate_chunk(chunk):
+            """Calculate the probabilities for all thresholds at a chunk of
+            points."""
+            standardised = thresholds - means[chunk]
+            standardised /= standard_deviations[chunk]
+            standardised *= sign
+            ndtr(standardised, out=probabilities[:, chunk])
+            np.copyto(probabilities[:, chunk], np.nan,
+                      where=~(standard_deviations[chunk] > 0))
+
+        bytes_per_point = len(thresholds) * np.result_type(
+            thresholds, means, standard_deviations).itemsize
+        chunk_size = int(max(1, self.max_memory_in_bytes // (
+            bytes_per_point * self.n_workers)))
+        chunks = [slice(start, start + chunk_size)
+                  for start in range(0, means.size, chunk_size)]
+        if self.n_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                list(executor.map(calculate_chunk, chunks))
+        else:
+            for chunk in chunks:
+                calculate_chunk(chunk)
 
-        probability_cube = probability_cube_template.copy(data=probabilities)
+        probability_cube = probability_cube_template.copy(
+            data=probabilities.reshape(probability_cube_template.shape))
         return probability_cube
 
     def process(self, mean_values, variance_values, probability_cube_template):
@@ -913,7 +963,8 @@ class EnsembleReordering(object):
         ensemble realizations within the raw ensemble forecast is random, such
         that the raw ensemble realizations are exchangeable. If fewer
         percentiles are requested than ensemble realizations, then only the
-        first n ensemble realizations are used.
+        first n ensemble realizations are used. The realization dimension
+        remains in the same position within the cube.
 
         Args:
             post_processed_forecast_percentiles  (iris.cube.Cube):
@@ -939,32 +990,49 @@ class EnsembleReordering(object):
         if plen == mlen:
             pass
         else:
-            raw_forecast_realizations_extended = iris.cube.CubeList()
-            realization_list = []
+            realization_dim, = raw_forecast_realizations.coord_dims(
+                "realization")
             mpoints = raw_forecast_realizations.coord("realization").points
-            # Loop over the number of percentiles and finding the
-            # corresponding ensemble realization number. The ensemble
-            # realization numbers are recycled e.g. 1, 2, 3, 1, 2, 3, etc.
-            for index in range(plen):
-                realization_list.append(mpoints[index % len(mpoints)])
+            # Find the index of the raw ensemble realization for each
+            # percentile. The ensemble realizations are recycled
+            # e.g. 1, 2, 3, 1, 2, 3, etc.
+            realization_indices = np.arange(plen) % mlen
+            keys = [slice(None)] * raw_forecast_realizations.ndim
+            if plen < mlen:
+                # Only the first realizations are required, so a view of the
+                # raw forecast data is used.
+                keys[realization_dim] = slice(0, plen)
+                data = raw_forecast_realizations.data[tuple(keys)]
+            else:
+                data = np.take(raw_forecast_realizations.data,
+                               realization_indices, axis=realization_dim)
 
             # Assume that the ensemble realizations are ascending linearly.
-            new_realization_numbers = realization_list[0] + list(range(plen))
-
-            # Extract the realizations required in the realization_list from
-            # the raw_forecast_realizations. Edit the realization number as
-            # appropriate and append to a cubelist containing rebadged
-            # raw ensemble realizations.
-            for realization, index in zip(
-                    realization_list, new_realization_numbers):
-                constr = iris.Constraint(realization=realization)
-                raw_forecast_realization = raw_forecast_realizations.extract(
-                    constr)
-                raw_forecast_realization.coord("realization").points = index
-                raw_forecast_realizations_extended.append(
-                    raw_forecast_realization)
-            raw_forecast_realizations = (
-                concatenate_cubes(raw_forecast_realizations_extended))
+            new_realization_numbers = mpoints[0] + np.arange(plen)
+
+            raw_forecast_realizations_extended = iris.cube.Cube(data)
+            raw_forecast_realizations_extended.metadata = (
+                raw_forecast_realizations.metadata)
+            for coord in raw_forecast_realizations.coords():
+                dims = raw_forecast_realizations.coord_dims(coord)
+                is_dim_coord = (
+                    coord in raw_forecast_realizations.coords(
+                        dim_coords=True))
+                if coord.name() == "realization":
+                    coord = coord.copy(points=new_realization_numbers)
+                elif realization_dim in dims:
+                    keys = [slice(None)] * len(dims)
+                    keys[dims.index(realization_dim)] = realization_indices
+                    coord = coord[tuple(keys)]
+                else:
+                    coord = coord.copy()
+                if is_dim_coord:
+                    raw_forecast_realizations_extended.add_dim_coord(
+                        coord, dims)
+                else:
+                    raw_forecast_realizations_extended.add_aux_coord(
+                        coord, dims)
+            raw_forecast_realizations = raw_forecast_realizations_extended
         return raw_forecast_realizations
 
     @staticmethod
@@ -974,16 +1042,20 @@ class EnsembleReordering(object):
         """
         Function to apply Ensemble Copula Coupling. This ranks the
         post-processed forecast realizations based on a ranking determined from
-        the raw forecast realizations.
+        the raw forecast realizations. All times and grid points are
+        reordered together, and there is no limit on the number of
+        realizations.
 
         Args:
             post_processed_forecast_percentiles (cube):
                 Cube for post-processed percentiles. The percentiles are
                 assumed to be in ascending order.
             raw_forecast_realizations (cube):
-                Cube containing the raw (not post-processed) forecasts.
-                The probabilistic dimension is assumed to be the zeroth
-                dimension.
+                Cube containing the raw (not post-processed) forecasts, with
+                the same number of realizations as there are percentiles.
+                The dimensions are rearranged to match the post-processed
+                forecast, so the realization dimension need not be the
+                zeroth dimension.
             random_ordering (Logical):
                 If random_ordering is True, the post-processed forecasts are
                 reordered randomly, rather than using the ordering of the
@@ -1001,36 +1073,49 @@ class EnsembleReordering(object):
                 the ranking from the raw ensemble.
 
         """
-        results = iris.cube.CubeList([])
-        for rawfc, calfc in zip(
-                raw_forecast_realizations.slices_over("time"),
-                post_processed_forecast_percentiles.slices_over("time")):
-            if random_seed is not None:
-                random_seed = int(random_seed)
-            random_seed = np.random.RandomState(random_seed)
-            random_data = random_seed.rand(*rawfc.data.shape)
-            if random_ordering:
-                # Returns the indices that would sort the array.
-                # As these indices are from a random dataset, only an argsort
-                # is used.
-                ranking = np.argsort(random_data, axis=0)
-            else:
-                # Lexsort returns the indices sorted firstly by the
-                # primary key, the raw forecast data (unless random_ordering
-                # is enabled), and secondly by the secondary key, an array of
-                # random data, in order to split tied values randomly.
-                sorting_index = np.lexsort((random_data, rawfc.data), axis=0)
-                # Returns the indices that would sort the array.
-                ranking = np.argsort(sorting_index, axis=0)
-            # Index the post-processed forecast data using the ranking array.
-            # np.choose allows indexing of a 3d array using a 3d array,
-            calfc.data = np.choose(ranking, calfc.data)
-            results.append(calfc)
-        # Ensure we haven't lost any dimensional coordinates with only one
-        # value in.
-        results = results.merge_cube()
-        results = check_cube_coordinates(
-            post_processed_forecast_percentiles, results)
+        # Arrange the raw forecast to match the dimensions of the
+        # post-processed forecast, as the realizations may have been moved by
+        # recycling, and length-one dimensions, such as the time, may be
+        # scalar coordinates within only one of the cubes.
+        order = list(raw_forecast_realizations.coord_dims("realization"))
+        for coord in post_processed_forecast_percentiles.dim_coords[1:]:
+            if raw_forecast_realizations.coords(
+                    coord.name(), dim_coords=True):
+                order.extend(raw_forecast_realizations.coord_dims(coord))
+        order.extend(dim for dim in range(raw_forecast_realizations.ndim)
+                     if dim not in order)
+        raw_data = np.transpose(raw_forecast_realizations.data, order).reshape(
+            post_processed_forecast_percentiles.shape)
+
+        if random_seed is not None:
+            random_seed = int(random_seed)
+        # A single generator is used for every time and grid point, so that
+        # the ordering is reproducible for a given random seed.
+        random_data = np.random.RandomState(random_seed).rand(
+            *raw_data.shape)
+        calibrated_data = post_processed_forecast_percentiles.data
+        if random_ordering:
+            # Returns the indices that would sort the array.
+            # As these indices are from a random dataset, the post-processed
+            # forecast is indexed directly with these indices.
+            ranking = np.argsort(random_data, axis=0)
+            reordered_data = np.take_along_axis(
+                calibrated_data, ranking, axis=0)
+        else:
+            # Lexsort returns the indices sorted firstly by the
+            # primary key, the raw forecast data, and secondly by the
+            # secondary key, an array of random data, in order to split tied
+            # values randomly.
+            sorting_index = np.lexsort(
+                (random_data, raw_data), axis=0)
+            # The ascending post-processed values are placed at the position
+            # of the raw forecast realization with the same rank, which
+            # avoids calculating the rank of each raw forecast realization.
+            reordered_data = np.empty_like(calibrated_data)
+            np.put_along_axis(
+                reordered_data, sorting_index, calibrated_data, axis=0)
+        results = post_processed_forecast_percentiles.copy(
+            data=reordered_data)
         return results
 
     def process(
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Module containing a cache for arrays used in neighbourhood processing."""
+
+import hashlib
+
+import numpy as np
+
+from improver.utilities.cache import LeastRecentlyUsedCache
+from improver.utilities.spatial import (
+    convert_distance_into_number_of_grid_cells)
+
+# Default maximum number of entries held within a NeighbourhoodCache.
+DEFAULT_MAX_ENTRIES = 16
+
+
+class NeighbourhoodCache(LeastRecentlyUsedCache):
+    """
+    Least recently used cache of values that depend only upon the grid, the
+    size of the neighbourhood in grid cells and the configuration of the
+    neighbourhood method, such as kernels, Fourier transforms of kernels and
+    neighbourhood areas. This allows these values to be reused when a
+    neighbourhood method is applied to many cubes on the same grid, for
+    example at each lead time. The cache may be shared between threads.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Initialise class.
+
+        Keyword Args:
+            max_entries (int):
+                Maximum number of values to hold. When this is exceeded, the
+                least recently used value is discarded.
+        """
+        super().__init__(max_entries)
+
+    @staticmethod
+    def grid_key(cube):
+        """
+        Create a key identifying the horizontal grid of a cube.
+
+        Args:
+            cube (iris.cube.Cube):
+                Cube with x and y coordinates.
+
+        Returns:
+            key (tuple):
+                Hashable description of the x and y coordinates.
+        """
+        key = []
+        for axis in ["x", "y"]:
+            coord = cube.coord(axis=axis)
+            key.append((coord.name(), str(coord.units),
+                        str(coord.coord_system),
+                        hashlib.sha1(
+                            np.ascontiguousarray(coord.points)).hexdigest()))
+        return tuple(key)
+
+    def grid_cells(self, cube, distance, max_distance_in_grid_cells=None):
+        """
+        Return the number of grid cells in the x and y directions that
+        correspond to a distance on the grid of the cube, using
+        convert_distance_into_number_of_grid_cells.
+
+        Args:
+            cube (iris.cube.Cube):
+                Cube with x and y coordinates.
+            distance (float):
+                Distance in metres.
+
+        Keyword Args:
+            max_distance_in_grid_cells (int or None):
+                Maximum distance in grid cells.
+
+        Returns:
+            (tuple): tuple containing:
+                **grid_cells_x** (int):
+                    Number of grid cells in the x direction.
+                **grid_cells_y** (int):
+                    Number of grid cells in the y direction.
+        """
+        key = ("grid_cells", self.grid_key(cube), float(distance),
+               max_distance_in_grid_cells)
+        return self.get(
+            key, convert_distance_into_number_of_grid_cells, cube, distance,
+            max_distance_in_grid_cells=max_distance_in_grid_cells)
@@ -31,20 +31,37 @@
 """This module contains methods for circular neighbourhood processing."""
 
 import numpy as np
+import scipy.fft
 import scipy.ndimage.filters
 
 import iris
 
 from improver.constants import DEFAULT_PERCENTILES
+from improver.nbhood.cache import NeighbourhoodCache
+from improver.nbhood.tiling import NeighbourhoodTiler
 from improver.utilities.cube_checker import (
     check_cube_coordinates, find_dimension_coordinate_mismatch)
-from improver.utilities.spatial import (
-    check_if_grid_is_equal_area, convert_distance_into_number_of_grid_cells)
+from improver.utilities.spatial import check_if_grid_is_equal_area
 
 
 # Maximum radius of the neighbourhood width in grid cells.
 MAX_RADIUS_IN_GRID_CELLS = 500
 
+# Relative costs per operation, used to choose between applying a circular
+# kernel by direct correlation, by summing spans of rows using cumulative
+# sums, or by FFT convolution.
+DIRECT_CORRELATION_COST = 1.0
+ROW_SPAN_COST = 4.0
+FFT_COST = 2.5
+
+# Default limit on the memory used to hold the neighbourhood of each point
+# when calculating percentiles over a circular neighbourhood.
+DEFAULT_MAX_MEMORY_IN_BYTES = 2**30
+
+# Tolerance used when identifying the ranked values within a neighbourhood
+# that are interpolated between to give each percentile.
+RANK_TOLERANCE = 1.0e-4
+
 
 def circular_kernel(fullranges, ranges, weighted_mode):
     """
@@ -99,7 +116,7 @@ class CircularNeighbourhood(object):
     """
 
     def __init__(self, weighted_mode=True, sum_or_fraction="fraction",
-                 re_mask=False):
+                 re_mask=False, tile_size=None):
         """
         Initialise class.
 
@@ -121,6 +138,12 @@ class CircularNeighbourhood(object):
                 mask is not applied. Therefore, the neighbourhood processing
                 may result in values being present in areas that were
                 originally masked.
+            tile_size (int or None):
+                If set, the grid is processed in tiles of this number of grid
+                cells along each side, and the kernel is only applied to
+                tiles where the data within the tile and the surrounding
+                kernel radius are not constant. The statistics of the tiles
+                are available from the tiler attribute.
         """
         self.weighted_mode = weighted_mode
         if sum_or_fraction not in ["sum", "fraction"]:
@@ -132,6 +155,10 @@ class CircularNeighbourhood(object):
             raise ValueError(msg)
         self.sum_or_fraction = sum_or_fraction
         self.re_mask = re_mask
+        self.cache = NeighbourhoodCache()
+        self.tiler = None
+        if tile_size is not None:
+            self.tiler = NeighbourhoodTiler(tile_size)
 
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
@@ -139,11 +166,208 @@ class CircularNeighbourhood(object):
                   'sum_or_fraction: {}>')
         return result.format(self.weighted_mode, self.sum_or_fraction)
 
-    def apply_circular_kernel(self, cube, ranges):
+    @staticmethod
+    def has_constant_weighting(kernel_2d):
+        """
+        Check whether all of the non-zero weights within a kernel are equal,
+        which is required to apply the kernel by summing spans of rows.
+
+        Args:
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions.
+
+        Returns:
+            (bool):
+                True if all of the non-zero weights are equal.
+        """
+        nonzero_weights = kernel_2d[kernel_2d > 0]
+        return bool(np.all(nonzero_weights == nonzero_weights.max()))
+
+    @staticmethod
+    def select_engine(data, kernel_2d):
+        """
+        Choose how to apply a circular kernel to the data, using a simple
+        cost model. Direct correlation scales with the number of non-zero
+        points in the kernel, summing spans of rows scales with the number
+        of rows in the kernel, and FFT convolution scales with the padded
+        size of each 2D slice. Summing spans of rows is only possible for a
+        kernel with constant weighting.
+
+        Args:
+            data (Numpy.array):
+                Array to which the kernel will be applied.
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions.
+
+        Returns:
+            engine (str):
+                One of "direct", "row_span" or "fft".
+        """
+        if not np.issubdtype(data.dtype, np.floating):
+            return "direct"
+        n_points = np.size(data)
+        padded_size = np.prod(
+            [scipy.fft.next_fast_len(size, True)
+             for size in np.array(data.shape[-2:]) + kernel_2d.shape])
+        n_slices = n_points / np.prod(data.shape[-2:])
+        costs = {
+            "direct": DIRECT_CORRELATION_COST * n_points *
+            np.count_nonzero(kernel_2d),
+            "fft": FFT_COST * n_slices * padded_size *
+            np.log2(padded_size)}
+        if CircularNeighbourhood.has_constant_weighting(kernel_2d):
+            costs["row_span"] = ROW_SPAN_COST * n_points * kernel_2d.shape[0]
+        return min(costs, key=costs.get)
+
+    @staticmethod
+    def _pad_nearest(data, kernel_2d):
+        """
+        Pad the last two dimensions of an array by the kernel radius, by
+        repeating the values at the edge, equivalent to mode='nearest' in
+        scipy.ndimage.
+
+        Args:
+            data (Numpy.array):
+                Array with y and x as the last two dimensions.
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions.
+
+        Returns:
+            padded (Numpy.array):
+                Padded array of float64.
+        """
+        ranges_yx = [size // 2 for size in kernel_2d.shape]
+        pad_width = ([(0, 0)] * (data.ndim - 2) +
+                     [(ranges_yx[0], ranges_yx[0]),
+                      (ranges_yx[1], ranges_yx[1])])
+        return np.pad(np.asarray(data, dtype=np.float64), pad_width,
+                      mode='edge')
+
+    @staticmethod
+    def correlate_by_row_spans(data, kernel_2d):
+        """
+        Apply a kernel with constant weighting, by summing a span of each
+        row of the kernel using the cumulative sum along the x dimension.
+        The cost therefore scales with the number of rows within the kernel,
+        rather than the number of points.
+
+        Args:
+            data (Numpy.array):
+                Array with y and x as the last two dimensions.
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions. The non-zero
+                points within each row must be contiguous.
+
+        Returns:
+            result (Numpy.array):
+                Array of float64 containing the weighted sum over the kernel
+                at each point.
+        """
+        n_rows, n_columns = data.shape[-2:]
+        padded = CircularNeighbourhood._pad_nearest(data, kernel_2d)
+        summed = np.zeros(padded.shape[:-1] + (padded.shape[-1] + 1,))
+        np.cumsum(padded, axis=-1, out=summed[..., 1:])
+        centre = kernel_2d.shape[1] // 2
+        result = np.zeros(data.shape)
+        for row_index, row in enumerate(kernel_2d):
+            columns = np.flatnonzero(row)
+            if columns.size == 0:
+                continue
+            rows = summed[..., row_index:row_index + n_rows, :]
+            start = columns[0]
+            stop = columns[-1] + 1
+            result += row[centre] * (rows[..., stop:stop + n_columns] -
+                                     rows[..., start:start + n_columns])
+        return result
+
+    def correlate_by_fft(self, data, kernel_2d):
+        """
+        Apply a kernel by FFT convolution of each 2D slice in turn. The
+        Fourier transform of the kernel is held within the cache, so that it
+        is reused for each slice and for subsequent calls with the same grid
+        and kernel.
+        Values that are within the rounding error of the FFT are set to
+        zero, so that areas of zeros remain zero.
+
+        Args:
+            data (Numpy.array):
+                Array with y and x as the last two dimensions.
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions.
+
+        Returns:
+            result (Numpy.array):
+                Array of float64 containing the weighted sum over the kernel
+                at each point.
+        """
+        n_rows, n_columns = data.shape[-2:]
+        kernel_rows, kernel_columns = kernel_2d.shape
+        fft_shape = tuple(
+            scipy.fft.next_fast_len(size, True)
+            for size in (n_rows + kernel_rows - 1,
+                         n_columns + kernel_columns - 1))
+        # Correlation is convolution with the reversed kernel.
+        key = ("kernel_fft", fft_shape, self.cache.array_key(kernel_2d))
+        kernel_fft = self.cache.get(
+            key, scipy.fft.rfft2, kernel_2d[::-1, ::-1], s=fft_shape)
+
+        result = np.empty(data.shape)
+        for data_slice, result_slice in zip(
+                data.reshape((-1, n_rows, n_columns)),
+                result.reshape((-1, n_rows, n_columns))):
+            padded = self._pad_nearest(data_slice, kernel_2d)
+            convolved = scipy.fft.irfft2(
+                scipy.fft.rfft2(padded, s=fft_shape) * kernel_fft,
+                s=fft_shape)
+            result_slice[:] = convolved[
+                kernel_rows - 1:kernel_rows - 1 + n_rows,
+                kernel_columns - 1:kernel_columns - 1 + n_columns]
+            tolerance = (np.finfo(np.float64).eps *
+                         np.log2(np.prod(fft_shape)) *
+                         np.abs(kernel_2d).sum() * np.abs(padded).max())
+            result_slice[np.abs(result_slice) <= tolerance] = 0.
+        return result
+
+    def _correlate(self, data, kernel_2d, engine):
+        """
+        Apply a kernel to the last two dimensions of an array using the
+        requested engine.
+
+        Args:
+            data (Numpy.array):
+                Array with y and x as the last two dimensions.
+            kernel_2d (Numpy.array):
+                The kernel, with only the y and x dimensions.
+            engine (str):
+                One of "direct", "row_span" or "fft".
+
+        Returns:
+            result (Numpy.array):
+                Array containing the weighted sum over the kernel at each
+                point.
+        """
+        if engine == "direct":
+            return scipy.ndimage.filters.correlate(
+                data, kernel_2d.reshape((1,)*(data.ndim - 2) +
+                                        kernel_2d.shape),
+                mode='nearest')
+        if engine == "row_span":
+            return self.correlate_by_row_spans(data, kernel_2d)
+        return self.correlate_by_fft(data, kernel_2d)
+
+    def apply_circular_kernel(self, cube, ranges, engine=None):
         """
         Method to apply a circular kernel to the data within the input cube in
         order to smooth the resulting field.
 
+        The kernel is applied by direct correlation for small kernels. For
+        large kernels, the kernel is applied either by summing spans of rows
+        or by FFT convolution, depending upon the estimated cost. Values
+        beyond the edge of the domain are taken from the nearest edge point
+        in all cases.
+        If the plugin was created with a tile size, the kernel is only
+        applied to the tiles of the grid in which the data are not constant.
+
         Args:
             cube (Iris.cube.Cube):
                 Cube containing to array to apply CircularNeighbourhood
@@ -152,11 +376,21 @@ class CircularNeighbourhood(object):
                 Number of grid cells in the x and y direction used to create
                 the kernel.
 
+        Keyword Args:
+            engine (str or None):
+                Method used to apply the kernel: "direct", "row_span" or
+                "fft". If None, the method is chosen using select_engine.
+
         Returns:
             cube (Iris.cube.Cube):
                 Cube containing the smoothed field after the kernel has been
                 applied.
 
+        Raises:
+            ValueError: If the engine requested is not supported.
+            ValueError: If the "row_span" engine is requested for a kernel
+                        that does not have constant weighting.
+
         """
         data = cube.data
         fullranges = np.zeros([np.ndim(data)])
@@ -167,16 +401,63 @@ class CircularNeighbourhood(object):
 
         for axis_index, axis in enumerate(axes):
             fullranges[axis] = ranges[axis_index]
-        self.kernel = circular_kernel(fullranges, ranges,
-                                      self.weighted_mode)
+        key = ("kernel", tuple(fullranges), tuple(ranges),
+               self.weighted_mode)
+        # The kernel is held in a local variable, as well as an attribute,
+        # so that concurrent calls from other threads cannot replace it.
+        kernel = self.cache.get(
+            key, circular_kernel, fullranges, ranges, self.weighted_mode)
+        self.kernel = kernel
         # Smooth the data by applying the kernel.
-        if self.sum_or_fraction is "fraction":
-            total_area = np.sum(self.kernel)
-        elif self.sum_or_fraction is "sum":
+        if self.sum_or_fraction == "fraction":
+            total_area = np.sum(kernel)
+        elif self.sum_or_fraction == "sum":
             total_area = 1.0
 
-        cube.data = scipy.ndimage.filters.correlate(
-            data, self.kernel, mode='nearest') / total_area
+        y_axis, x_axis = axes[::-1]
+        kernel_2d = np.moveaxis(
+            kernel, [y_axis, x_axis], [-2, -1]).reshape(
+                kernel.shape[y_axis], kernel.shape[x_axis])
+        if engine not in [None, "direct", "row_span", "fft"]:
+            msg = ("The engine requested: {} is not a supported "
+                   "engine. Please choose from: 'direct', 'row_span', "
+                   "'fft'.".format(engine))
+            raise ValueError(msg)
+        if engine == "row_span" and not self.has_constant_weighting(
+                kernel_2d):
+            msg = ("The 'row_span' engine can only be used with a kernel "
+                   "with constant weighting. Please choose from: 'direct', "
+                   "'fft'.")
+            raise ValueError(msg)
+
+        if (self.tiler is None or np.ma.isMaskedArray(data) or
+                not np.issubdtype(data.dtype, np.floating)):
+            if engine is None:
+                engine = self.select_engine(data, kernel_2d)
+            if engine == "direct":
+                smoothed = scipy.ndimage.filters.correlate(
+                    data, kernel, mode='nearest')
+            else:
+                smoothed = np.moveaxis(
+                    self._correlate(
+                        np.moveaxis(data, [y_axis, x_axis], [-2, -1]),
+                        kernel_2d, engine),
+                    [-2, -1], [y_axis, x_axis]).astype(data.dtype)
+        else:
+            # Unless an engine is requested, the engine is chosen for each
+            # tile, as the cheapest engine for a tile may not be the
+            # cheapest for the whole grid.
+            kernel_sum = np.sum(kernel_2d)
+            smoothed = self.tiler.process(
+                np.moveaxis(data, [y_axis, x_axis], [-2, -1]),
+                kernel_2d.shape[1] // 2, kernel_2d.shape[0] // 2,
+                lambda data, _: self._correlate(
+                    data, kernel_2d,
+                    engine or self.select_engine(data, kernel_2d)),
+                lambda values, rows, columns: values * kernel_sum,
+                data.dtype)
+            smoothed = np.moveaxis(smoothed, [-2, -1], [y_axis, x_axis])
+        cube.data = smoothed / total_area
         return cube
 
     def run(self, cube, radius, mask_cube=None):
@@ -210,7 +491,7 @@ class CircularNeighbourhood(object):
 
         # Check that the cube has an equal area grid.
         check_if_grid_is_equal_area(cube)
-        ranges = convert_distance_into_number_of_grid_cells(
+        ranges = self.cache.grid_cells(
             cube, radius, max_distance_in_grid_cells=MAX_RADIUS_IN_GRID_CELLS)
         cube = self.apply_circular_kernel(cube, ranges)
         return cube
@@ -223,7 +504,8 @@ class GeneratePercentilesFromACircularNeighbourhood(object):
     A maximum kernel radius of 500 grid cells is imposed in order to
     avoid computational ineffiency and possible memory errors.
     """
-    def __init__(self, percentiles=DEFAULT_PERCENTILES):
+    def __init__(self, percentiles=DEFAULT_PERCENTILES,
+                 max_memory_in_bytes=DEFAULT_MAX_MEMORY_IN_BYTES):
         """
         Initialise class.
 
@@ -231,12 +513,19 @@ class GeneratePercentilesFromACircularNeighbourhood(object):
             percentiles (list or float):
                 Percentile values at which to calculate; if not provided uses
                 DEFAULT_PERCENTILES.
+            max_memory_in_bytes (int):
+                Approximate limit on the memory used to hold the values
+                within the neighbourhood of each point, whilst the
+                percentiles are calculated. The grid is processed in bands
+                of rows that fit within this limit.
 
         """
         try:
             self.percentiles = tuple(percentiles)
         except TypeError:
             self.percentiles = tuple([percentiles])
+        self.max_memory_in_bytes = max_memory_in_bytes
+        self.cache = NeighbourhoodCache()
 
     def __repr__(self):
         """Represent the configured class instance as a string."""
@@ -249,7 +538,10 @@ class GeneratePercentilesFromACircularNeighbourhood(object):
         Method to pad and unpad a two dimensional cube. The input array is
         padded and percentiles are calculated using a neighbourhood around
         each point. The resulting percentile data are unpadded and put into a
-        cube.
+        cube. The neighbourhoods are only gathered for a band of rows at a
+        time, unless the data contain few enough distinct values that the
+        percentiles can be found by counting the points within each
+        neighbourhood that do not exceed each value.
 
         Args:
             slice_2d (Iris.cube.Cube):
@@ -360,38 +652,208 @@ class GeneratePercentilesFromACircularNeighbourhood(object):
         ranges_xy[1] = int(np.floor(kernel.shape[1] / 2.0))
         padded = np.pad(slice_2d.data, ranges_xy, mode='mean',
                         stat_length=np.max(ranges_xy))
-        padshape = np.shape(padded)  # Store size to make unflatten easier
-        padded = padded.flatten()
-        # Add 2nd dimension with each point's neighbourhood points along it.
-        # nbhood_slices is a list of numpy arrays where each array contains the
-        # total number of points within the padded array. The number of arrays
-        # is equal to the number of points within the kernel.
-        nbhood_slices = [
-            np.roll(padded, (padshape[1]*j)+i)
+        # Offsets in y and x of each point within the neighbourhood.
+        offsets = [
+            (-j, -i)
             for i in range(-ranges_xy[1], ranges_xy[1]+1)
             for j in range(-ranges_xy[0], ranges_xy[0]+1)
             if kernel[..., i+ranges_xy[1], j+ranges_xy[0]] > 0.]
+        percentiles = np.array(self.percentiles, dtype=np.float32)
 
-        # Collapse this dimension into percentiles (a new 2nd dimension)
-        perc_data = np.percentile(
-            nbhood_slices,
-            np.array(self.percentiles, dtype=np.float32),
-            axis=0
-        )
-
-        # Convert back to float32 (np.percentile always gives float64 here...)
-        perc_data = perc_data.astype(np.float32)
+        if self.use_order_statistics(padded, offsets, ranges_xy,
+                                     len(percentiles)):
+            perc_data = self.percentiles_from_ranked_counts(
+                padded, offsets, ranges_xy, slice_2d.shape, percentiles)
+        else:
+            perc_data = self.percentiles_over_row_bands(
+                padded, offsets, ranges_xy, slice_2d.shape, percentiles)
 
-        # Return to 3D
-        perc_data = perc_data.reshape(
-            len(self.percentiles), padshape[0], padshape[1])
         # Create a cube for these data:
         pctcube = self.make_percentile_cube(slice_2d)
-        # And put in data, removing the padding
-        pctcube.data = perc_data[:, ranges_xy[0]:-ranges_xy[0],
-                                 ranges_xy[1]:-ranges_xy[1]]
+        pctcube.data = perc_data
         return pctcube
 
+    @staticmethod
+    def _neighbourhood_mask(offsets, ranges_xy):
+        """
+        Create an array that is one at each point within the neighbourhood
+        and zero elsewhere.
+
+        Args:
+            offsets (list):
+                Offsets in y and x of each point within the neighbourhood.
+            ranges_xy (Numpy.array):
+                Number of grid cells in the y and x directions that the
+                neighbourhood extends from its centre.
+
+        Returns:
+            nbhood_mask (Numpy.array):
+                Array of shape (2 * ranges_xy[0] + 1, 2 * ranges_xy[1] + 1).
+        """
+        nbhood_mask = np.zeros(2 * ranges_xy + 1)
+        for y_offset, x_offset in offsets:
+            nbhood_mask[y_offset + ranges_xy[0], x_offset + ranges_xy[1]] = 1.
+        return nbhood_mask
+
+    def use_order_statistics(self, padded, offsets, ranges_xy,
+                             n_percentiles):
+        """
+        Decide whether the percentiles should be calculated from counts of
+        the number of points within each neighbourhood that do not exceed
+        each of the distinct values within the padded data. This is only
+        possible if each row of the neighbourhood is a contiguous span that
+        includes the centre of the neighbourhood, and is cheaper than
+        sorting the neighbourhood of each point if the data only contain a
+        few distinct values, such as binary fields.
+
+        Args:
+            padded (Numpy.array):
+                Padded 2d array of data.
+            offsets (list):
+                Offsets in y and x of each point within the neighbourhood.
+            ranges_xy (Numpy.array):
+                Number of grid cells in the y and x directions that the
+                neighbourhood extends from its centre.
+            n_percentiles (int):
+                Number of percentiles to be calculated.
+
+        Returns:
+            boolean:
+                True if the percentiles should be calculated from counts.
+        """
+        nbhood_mask = self._neighbourhood_mask(offsets, ranges_xy)
+        for row in nbhood_mask:
+            columns = np.flatnonzero(row)
+            if columns.size == 0:
+                continue
+            if (row[ranges_xy[1]] == 0. or
+                    columns[-1] - columns[0] + 1 != columns.size):
+                return False
+        if np.isnan(padded).any():
+            return False
+        n_values = np.unique(padded).size
+        cost_per_value = nbhood_mask.shape[0] + 2 * n_percentiles
+        return (n_values - 1) * cost_per_value < len(offsets)
+
+    def percentiles_over_row_bands(self, padded, offsets, ranges_xy, shape,
+                                   percentiles):
+        """
+        Calculate percentiles over the neighbourhood of each point by
+        gathering the values within the neighbourhoods of a band of rows at
+        a time, so that the memory used is limited by max_memory_in_bytes.
+
+        Args:
+            padded (Numpy.array):
+                Padded 2d array of data.
+            offsets (list):
+                Offsets in y and x of each point within the neighbourhood.
+            ranges_xy (Numpy.array):
+                Number of grid cells in the y and x directions used to pad
+                the data.
+            shape (tuple):
+                Shape of the unpadded data.
+            percentiles (Numpy.array):
+                Percentile values at which to calculate.
+
+        Returns:
+            perc_data (Numpy.array):
+                Array of float32 with the percentiles as the leading
+                dimension, followed by the unpadded y and x dimensions.
+        """
+        n_rows, n_columns = shape
+        bytes_per_row = n_columns * (
+            2 * len(offsets) * padded.itemsize + 2 * len(percentiles) * 8)
+        band = int(max(1, min(n_rows,
+                              self.max_memory_in_bytes // bytes_per_row)))
+        nbhood_values = np.empty((len(offsets), band, n_columns),
+                                 dtype=padded.dtype)
+        perc_data = np.empty((len(percentiles),) + tuple(shape),
+                             dtype=np.float32)
+        for start in range(0, n_rows, band):
+            stop = min(start + band, n_rows)
+            for index, (y_offset, x_offset) in enumerate(offsets):
+                y_start = ranges_xy[0] + start + y_offset
+                x_start = ranges_xy[1] + x_offset
+                nbhood_values[index, :stop - start] = padded[
+                    y_start:y_start + stop - start,
+                    x_start:x_start + n_columns]
+            perc_data[:, start:stop] = np.percentile(
+                nbhood_values[:, :stop - start], percentiles, axis=0)
+        return perc_data
+
+    def percentiles_from_ranked_counts(self, padded, offsets, ranges_xy,
+                                       shape, percentiles):
+        """
+        Calculate percentiles over the neighbourhood of each point from the
+        number of points within each neighbourhood that do not exceed each
+        of the distinct values within the padded data. This identifies the
+        ranked values either side of each percentile. Where these values
+        are equal, this is the percentile. Otherwise the percentiles are
+        calculated from the values within the neighbourhood of the point.
+
+        Args:
+            padded (Numpy.array):
+                Padded 2d array of data.
+            offsets (list):
+                Offsets in y and x of each point within the neighbourhood.
+            ranges_xy (Numpy.array):
+                Number of grid cells in the y and x directions used to pad
+                the data.
+            shape (tuple):
+                Shape of the unpadded data.
+            percentiles (Numpy.array):
+                Percentile values at which to calculate.
+
+        Returns:
+            perc_data (Numpy.array):
+                Array of float32 with the percentiles as the leading
+                dimension, followed by the unpadded y and x dimensions.
+        """
+        n_rows, n_columns = shape
+        n_points = len(offsets)
+        nbhood_mask = self._neighbourhood_mask(offsets, ranges_xy)
+        values = np.unique(padded)
+
+        # Ranks either side of each percentile, widened slightly so that
+        # the ranks interpolated between by np.percentile are included.
+        ranks = percentiles.astype(np.float64) / 100. * (n_points - 1)
+        lower_ranks = np.clip(
+            np.floor(ranks - RANK_TOLERANCE), 0, n_points - 1)
+        upper_ranks = np.clip(
+            np.ceil(ranks + RANK_TOLERANCE), 0, n_points - 1)
+        lower_ranks = lower_ranks.reshape(-1, 1, 1)
+        upper_ranks = upper_ranks.reshape(-1, 1, 1)
+
+        # The value with a given rank is the first value for which the
+        # number of points not exceeding it is greater than the rank.
+        lower_index = np.zeros((len(percentiles),) + tuple(shape),
+                               dtype=np.int32)
+        upper_index = np.zeros_like(lower_index)
+        for value in values[:-1]:
+            counts = CircularNeighbourhood.correlate_by_row_spans(
+                padded <= value, nbhood_mask)[
+                    ranges_xy[0]:ranges_xy[0] + n_rows,
+                    ranges_xy[1]:ranges_xy[1] + n_columns]
+            lower_index += counts <= lower_ranks
+            upper_index += counts <= upper_ranks
+        perc_data = values[lower_index].astype(np.float32)
+
+        # Calculate the percentiles directly at the remaining points.
+        y_points, x_points = np.nonzero(
+            np.any(lower_index != upper_index, axis=0))
+        bytes_per_point = (
+            2 * n_points * padded.itemsize + 2 * len(percentiles) * 8)
+        chunk = int(max(1, self.max_memory_in_bytes // bytes_per_point))
+        for start in range(0, y_points.size, chunk):
+            y_chunk = y_points[start:start + chunk] + ranges_xy[0]
+            x_chunk = x_points[start:start + chunk] + ranges_xy[1]
+            nbhood_values = np.array([
+                padded[y_chunk + y_offset, x_chunk + x_offset]
+                for y_offset, x_offset in offsets])
+            perc_data[:, y_chunk - ranges_xy[0], x_chunk - ranges_xy[1]] = (
+                np.percentile(nbhood_values, percentiles, axis=0))
+        return perc_data
+
     def run(self, cube, radius, mask_cube=None):
         """
         Method to apply a circular kernel to the data within the input cube in
@@ -422,10 +884,12 @@ class GeneratePercentilesFromACircularNeighbourhood(object):
         # Check that the cube has an equal area grid.
         check_if_grid_is_equal_area(cube)
         # Take data array and identify X and Y axes indices
-        ranges_tuple = convert_distance_into_number_of_grid_cells(
+        ranges_tuple = self.cache.grid_cells(
             cube, radius, max_distance_in_grid_cells=MAX_RADIUS_IN_GRID_CELLS)
         ranges_xy = np.array(ranges_tuple)
-        kernel = circular_kernel(ranges_xy, ranges_tuple, weighted_mode=False)
+        kernel = self.cache.get(
+            ("kernel", ranges_tuple, False), circular_kernel, ranges_xy,
+            ranges_tuple, weighted_mode=False)
         # Loop over each 2D slice to reduce memory demand and derive
         # percentiles on the kernel. Will return an extra dimension.
         pctcubelist = iris.cube.CubeList()
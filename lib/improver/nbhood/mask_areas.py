@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Module containing neighbourhood areas of a static mask, which are
+precomputed and saved alongside the ancillaries, so that they can be reused
+by square neighbourhood processing with the mask."""
+
+import json
+import os
+
+import iris
+import numpy as np
+
+from improver.nbhood.square_kernel import (
+    MAX_RADIUS_IN_GRID_CELLS, SquareNeighbourhood)
+from improver.utilities.spatial import (
+    convert_distance_into_number_of_grid_cells)
+
+# Names of the files within a mask areas directory.
+MASK_FILENAME = "mask.npy"
+AREAS_FILENAME = "areas.npy"
+METADATA_FILENAME = "metadata.json"
+
+
+class NeighbourhoodMaskAreas(object):
+    """
+    Neighbourhood areas of a 2D mask for a set of neighbourhood sizes. The
+    neighbourhood area at each point is the sum of the mask over the square
+    neighbourhood of the point, which is the denominator of the
+    neighbourhood fraction calculated by SquareNeighbourhood. The areas of
+    the complement of the mask (1 - mask), such as a sea mask for a land
+    mask, are found from the areas of the mask, so a single set of areas
+    serves both.
+    """
+
+    def __init__(self, mask, areas):
+        """
+        Initialise class.
+
+        Args:
+            mask (np.ndarray):
+                The 2D mask, with y as the first dimension and x as the
+                second dimension.
+            areas (dict):
+                Dictionary mapping tuples of the number of grid cells in the
+                x and y directions to arrays of the neighbourhood areas,
+                with the same shape as the mask.
+        """
+        self.mask = mask
+        self.areas = areas
+
+    def __repr__(self):
+        """Represent the configured class instance as a string."""
+        result = '<NeighbourhoodMaskAreas: shape: {}, grid_cells: {}>'
+        return result.format(self.mask.shape, sorted(self.areas))
+
+    def neighbourhood_area(self, mask, cells_x, cells_y):
+        """
+        Return the neighbourhood area for a mask, if the mask matches the
+        mask for which the areas were precomputed, or its complement.
+
+        Args:
+            mask (np.ndarray):
+                The 2D mask, with y as the first dimension and x as the
+                second dimension.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Returns:
+            neighbourhood_area (np.ndarray or None):
+                Array containing the sum of the mask over the neighbourhood
+                of each point, or None if the areas are not available for
+                this mask and neighbourhood size.
+        """
+        key = (cells_x, cells_y)
+        if key not in self.areas or mask.shape != self.mask.shape:
+            return None
+        if np.array_equal(mask, self.mask):
+            return self.areas[key]
+        if np.array_equal(mask, 1 - self.mask):
+            return (SquareNeighbourhood.count_points_within_domain(
+                mask.shape, cells_x, cells_y) - self.areas[key])
+        return None
+
+
+class GenerateNeighbourhoodMaskAreas(object):
+    """
+    Calculate the neighbourhood areas of a static mask, such as a land-sea
+    mask, for a list of radii.
+    """
+
+    def __init__(self, radii):
+        """
+        Initialise class.
+
+        Args:
+            radii (list of float):
+                The radii in metres of the neighbourhoods for which the areas
+                are calculated.
+        """
+        self.radii = [float(radius) for radius in radii]
+
+    def __repr__(self):
+        """Represent the configured plugin instance as a string."""
+        result = '<GenerateNeighbourhoodMaskAreas: radii: {}>'
+        return result.format(self.radii)
+
+    def process(self, mask_cube):
+        """
+        Calculate the neighbourhood areas of the mask for each radius, in
+        the same way as SquareNeighbourhood.
+
+        Args:
+            mask_cube (iris.cube.Cube):
+                Cube containing the mask, with x and y dimensions only.
+
+        Returns:
+            mask_areas (NeighbourhoodMaskAreas):
+                The neighbourhood areas of the mask.
+        """
+        mask_cube = iris.util.squeeze(mask_cube)
+        mask_dims = [mask_cube.coord_dims(mask_cube.coord(axis=axis))[0]
+                     for axis in ["y", "x"]]
+        mask = np.moveaxis(mask_cube.data, mask_dims, [0, 1])
+        plugin = SquareNeighbourhood()
+        areas = {}
+        for radius in self.radii:
+            grid_cells = tuple(
+                int(cells) for cells in
+                convert_distance_into_number_of_grid_cells(
+                    mask_cube, radius,
+                    max_distance_in_grid_cells=MAX_RADIUS_IN_GRID_CELLS))
+            areas[grid_cells] = np.array(plugin.calculate_neighbourhood_area(
+                mask[np.newaxis], *grid_cells)[0])
+        return NeighbourhoodMaskAreas(np.array(mask), areas)
+
+
+def save_mask_areas(mask_areas, dirpath):
+    """
+    Save neighbourhood mask areas to a directory, as numpy arrays that can
+    be memory-mapped when they are loaded.
+
+    Args:
+        mask_areas (NeighbourhoodMaskAreas):
+            The neighbourhood areas of a mask.
+        dirpath (str):
+            Path to the directory, which is created if it does not exist.
+    """
+    if not os.path.exists(dirpath):
+        os.makedirs(dirpath)
+    grid_cells = sorted(mask_areas.areas)
+    np.save(os.path.join(dirpath, MASK_FILENAME), mask_areas.mask)
+    np.save(os.path.join(dirpath, AREAS_FILENAME),
+            np.array([mask_areas.areas[key] for key in grid_cells]))
+    with open(os.path.join(dirpath, METADATA_FILENAME), "w") as metadata:
+        json.dump({"grid_cells": [list(key) for key in grid_cells]},
+                  metadata)
+
+
+def load_mask_areas(dirpath):
+    """
+    Load neighbourhood mask areas saved by save_mask_areas. The areas are
+    memory-mapped, so only the areas that are used are read.
+
+    Args:
+        dirpath (str):
+            Path to the directory.
+
+    Returns:
+        mask_areas (NeighbourhoodMaskAreas):
+            The neighbourhood areas of a mask.
+    """
+    with open(os.path.join(dirpath, METADATA_FILENAME)) as metadata:
+        grid_cells = json.load(metadata)["grid_cells"]
+    mask = np.load(os.path.join(dirpath, MASK_FILENAME), mmap_mode="r")
+    areas = np.load(os.path.join(dirpath, AREAS_FILENAME), mmap_mode="r")
+    return NeighbourhoodMaskAreas(
+        mask, {tuple(key): area for key, area in zip(grid_cells, areas)})
@@ -30,6 +30,10 @@
 # POSSIBILITY OF SUCH DAMAGE.
 """Module containing neighbourhood processing utilities."""
 
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+
+import dask.array as da
 import iris
 import numpy as np
 
@@ -59,7 +63,8 @@ class BaseNeighbourhoodProcessing(object):
 
     """
 
-    def __init__(self, neighbourhood_method, radii, lead_times=None):
+    def __init__(self, neighbourhood_method, radii, lead_times=None,
+                 n_workers=1):
         """
         Create a neighbourhood processing plugin that applies a smoothing
         to points in a cube.
@@ -79,6 +84,10 @@ class BaseNeighbourhoodProcessing(object):
                 List of lead times or forecast periods, at which the radii
                 within 'radii' are defined. The lead times are expected
                 in hours.
+            n_workers (int):
+                Number of threads used to apply the neighbourhood method to
+                the realizations and times of the cube concurrently. If 1,
+                these are processed in turn.
         """
         self.neighbourhood_method = neighbourhood_method
 
@@ -93,6 +102,11 @@ class BaseNeighbourhoodProcessing(object):
                        "and the number of lead times. "
                        "Unable to continue due to mismatch.")
                 raise ValueError(msg)
+        if n_workers < 1:
+            msg = "Invalid number of workers: must be >= 1: {}".format(
+                n_workers)
+            raise ValueError(msg)
+        self.n_workers = n_workers
 
     def _find_radii(self, cube_lead_times=None):
         """Revise radius or radii for found lead times.
@@ -114,6 +128,153 @@ class BaseNeighbourhoodProcessing(object):
         radii = np.interp(cube_lead_times, self.lead_times, self.radii)
         return radii
 
+    def _group_time_slices(self, cube, radii):
+        """
+        Group consecutive time slices of the cube, for which the radii
+        correspond to the same number of grid cells, so that each group can
+        be processed by the neighbourhood method at once. The number of grid
+        cells is found using the cache of the neighbourhood method. If the
+        neighbourhood method does not have a cache, each time slice is
+        processed separately.
+
+        Args:
+            cube (Iris.cube.Cube):
+                Cube containing a time coordinate.
+            radii (np.array of float):
+                Radius in metres required at each time.
+
+        Returns:
+            groups (list of tuples):
+                List of tuples of a cube containing one or more times and the
+                radius in metres to use for those times.
+        """
+        time_slices = list(cube.slices_over("time"))
+        cache = getattr(self.neighbourhood_method, "cache", None)
+        time_dims = cube.coord_dims("time")
+        if cache is None or not time_dims:
+            return list(zip(time_slices, radii))
+
+        grid_cells = [cache.grid_cells(time_slice, radius)
+                      for time_slice, radius in zip(time_slices, radii)]
+        groups = []
+        start = 0
+        for stop in range(1, len(grid_cells) + 1):
+            if (stop < len(grid_cells) and
+                    grid_cells[stop] == grid_cells[start]):
+                continue
+            if stop - start == 1:
+                groups.append((time_slices[start], radii[start]))
+            else:
+                index = [slice(None)] * cube.ndim
+                index[time_dims[0]] = slice(start, stop)
+                groups.append((cube[tuple(index)], radii[start]))
+            start = stop
+        return groups
+
+    def _concatenate_results(self, tasks, results):
+        """
+        Concatenate the cubes resulting from applying the neighbourhood
+        method, first over time and then over realization.
+
+        Args:
+            tasks (list of tuples):
+                List of tuples of the realization position, the time
+                position, the cube processed and the radius used.
+            results (list of Iris.cube.Cube):
+                List of the cubes resulting from each task.
+
+        Returns:
+            combined_cube (Iris.cube.Cube):
+                Cube containing all of the results.
+        """
+        cubes_real = []
+        for (realization_index, _, _, _), result in zip(tasks, results):
+            if realization_index == len(cubes_real):
+                cubes_real.append(iris.cube.CubeList([]))
+            cubes_real[realization_index].append(result)
+        for index, cubes_time in enumerate(cubes_real):
+            if len(cubes_time) > 1:
+                cubes_real[index] = concatenate_cubes(
+                    cubes_time, coords_to_slice_over=["time"])
+            else:
+                cubes_real[index] = cubes_time[0]
+        if len(cubes_real) > 1:
+            combined_cube = concatenate_cubes(
+                cubes_real, coords_to_slice_over=["realization"])
+        else:
+            combined_cube = cubes_real[0]
+        return combined_cube
+
+    def _fill_output_cube(self, cube, tasks, results):
+        """
+        Write the cubes resulting from applying the neighbourhood method into
+        an output array with the shape of the input cube, in the order in
+        which the results are returned. If the neighbourhood method changes
+        the dimensions of the cube, for example by adding a percentile
+        coordinate, the results are concatenated instead.
+
+        Args:
+            cube (Iris.cube.Cube):
+                Cube to which the neighbourhood processing is being applied.
+            tasks (list of tuples):
+                List of tuples of the realization position, the time
+                position, the cube processed and the radius used.
+            results (iterator of Iris.cube.Cube):
+                The cubes resulting from each task, in the order of the
+                tasks.
+
+        Returns:
+            combined_cube (Iris.cube.Cube):
+                Cube containing all of the results.
+        """
+        results = iter(results)
+        first_result = next(results)
+        first_cube = tasks[0][2]
+        if (first_result.shape != first_cube.shape or
+                [coord.name() for coord in first_result.dim_coords] !=
+                [coord.name() for coord in first_cube.dim_coords]):
+            return self._concatenate_results(
+                tasks, [first_result] + list(results))
+
+        try:
+            realization_dims = cube.coord_dims(
+                cube.coord("realization", dim_coords=True))
+        except iris.exceptions.CoordinateNotFoundError:
+            realization_dims = ()
+        time_dims = cube.coord_dims("time") if cube.coords("time") else ()
+
+        # The metadata of the output is found by concatenating placeholder
+        # cubes with lazy data in the same way as the results would be, so
+        # that the output matches that from processing the tasks in turn.
+        data = np.empty(cube.shape, dtype=first_result.dtype)
+        mask = None
+        placeholders = []
+        for (realization_index, time_position, _, _), result in zip(
+                tasks, itertools.chain([first_result], results)):
+            index = [slice(None)] * cube.ndim
+            if realization_dims:
+                index[realization_dims[0]] = realization_index
+            if time_position is not None and time_dims:
+                index[time_dims[0]] = time_position
+            index = tuple(index)
+            data[index] = result.data
+            if isinstance(result.data, np.ma.MaskedArray):
+                if mask is None:
+                    mask = np.zeros(cube.shape, dtype=bool)
+                mask[index] = np.ma.getmaskarray(result.data)
+            placeholders.append(result.copy(data=da.zeros(
+                result.shape, dtype=result.dtype, chunks=result.shape)))
+        if mask is not None:
+            data = np.ma.MaskedArray(data, mask=mask)
+
+        combined_cube = self._concatenate_results(tasks, placeholders)
+        exception_coordinates = find_dimension_coordinate_mismatch(
+            cube, combined_cube, two_way_mismatch=False)
+        combined_cube = check_cube_coordinates(
+            cube, combined_cube, exception_coordinates=exception_coordinates)
+        combined_cube.data = data
+        return combined_cube
+
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
         if callable(self.neighbourhood_method):
@@ -169,39 +330,49 @@ class BaseNeighbourhoodProcessing(object):
         if np.isnan(cube.data).any():
             raise ValueError("Error: NaN detected in input cube data")
 
-        cubes_real = []
-        for cube_realization in slices_over_realization:
+        # Each task is described by the position of the realization within
+        # the realizations of the cube, the position of the time or times
+        # within the time coordinate of the cube (None if the radius does
+        # not vary with lead time), the cube to be processed and the radius.
+        tasks = []
+        for realization_index, cube_realization in enumerate(
+                slices_over_realization):
             if self.lead_times is None:
-                cube_new = self.neighbourhood_method.run(
-                    cube_realization, self.radii, mask_cube=mask_cube)
-            else:
-                # Interpolate to find the radius at each required lead time.
-                fp_coord = forecast_period_coord(cube_realization)
-                fp_coord.convert_units("hours")
-                required_radii = self._find_radii(
-                    cube_lead_times=fp_coord.points)
-
-                cubes_time = iris.cube.CubeList([])
-                # Find the number of grid cells required for creating the
-                # neighbourhood, and then apply the neighbourhood
-                # processing method to smooth the field.
-                for cube_slice, radius in (
-                        zip(cube_realization.slices_over("time"),
-                            required_radii)):
-                    cube_slice = self.neighbourhood_method.run(
-                        cube_slice, radius, mask_cube=mask_cube)
-                    cubes_time.append(cube_slice)
-                if len(cubes_time) > 1:
-                    cube_new = concatenate_cubes(
-                        cubes_time, coords_to_slice_over=["time"])
-                else:
-                    cube_new = cubes_time[0]
-            cubes_real.append(cube_new)
-        if len(cubes_real) > 1:
-            combined_cube = concatenate_cubes(
-                cubes_real, coords_to_slice_over=["realization"])
+                tasks.append(
+                    (realization_index, None, cube_realization, self.radii))
+                continue
+            # Interpolate to find the radius at each required lead time.
+            fp_coord = forecast_period_coord(cube_realization)
+            fp_coord.convert_units("hours")
+            required_radii = self._find_radii(
+                cube_lead_times=fp_coord.points)
+
+            # Find the number of grid cells required for creating the
+            # neighbourhood, so that times that require the same number of
+            # grid cells can be processed together.
+            time_index = 0
+            for cube_slice, radius in self._group_time_slices(
+                    cube_realization, required_radii):
+                n_times = len(cube_slice.coord("time").points)
+                tasks.append(
+                    (realization_index,
+                     slice(time_index, time_index + n_times),
+                     cube_slice, radius))
+                time_index += n_times
+
+        def run(task):
+            """Apply the neighbourhood method to the cube of a task."""
+            _, _, cube_slice, radius = task
+            return self.neighbourhood_method.run(
+                cube_slice, radius, mask_cube=mask_cube)
+
+        if self.n_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                combined_cube = self._fill_output_cube(
+                    cube, tasks, executor.map(run, tasks))
         else:
-            combined_cube = cubes_real[0]
+            combined_cube = self._concatenate_results(
+                tasks, [run(task) for task in tasks])
 
         # Promote dimensional coordinates that used to be present.
         exception_coordinates = (
@@ -218,7 +389,7 @@ class GeneratePercentilesFromANeighbourhood(BaseNeighbourhoodProcessing):
 
     def __init__(
             self, neighbourhood_method, radii, lead_times=None,
-            percentiles=DEFAULT_PERCENTILES):
+            percentiles=DEFAULT_PERCENTILES, n_workers=1):
         """
         Create a neighbourhood processing subclass that generates percentiles
         from a neighbourhood of points.
@@ -240,9 +411,13 @@ class GeneratePercentilesFromANeighbourhood(BaseNeighbourhoodProcessing):
             percentiles (list):
                 Percentile values at which to calculate; if not provided uses
                 DEFAULT_PERCENTILES.
+            n_workers (int):
+                Number of threads used to process the realizations and times
+                of the cube concurrently.
         """
         super(GeneratePercentilesFromANeighbourhood, self).__init__(
-            neighbourhood_method, radii, lead_times=lead_times)
+            neighbourhood_method, radii, lead_times=lead_times,
+            n_workers=n_workers)
 
         methods = {
             "circular": GeneratePercentilesFromACircularNeighbourhood}
@@ -264,7 +439,7 @@ class NeighbourhoodProcessing(BaseNeighbourhoodProcessing):
     def __init__(
             self, neighbourhood_method, radii, lead_times=None,
             weighted_mode=True, sum_or_fraction="fraction",
-            re_mask=False):
+            re_mask=False, n_workers=1, tile_size=None, mask_areas=None):
         """
         Create a neighbourhood processing subclass that applies a smoothing
         to points in a cube.
@@ -302,17 +477,40 @@ class NeighbourhoodProcessing(BaseNeighbourhoodProcessing):
                 mask is not applied. Therefore, the neighbourhood processing
                 may result in values being present in areas that were
                 originally masked.
+            n_workers (int):
+                Number of threads used to process the realizations and times
+                of the cube concurrently.
+            tile_size (int or None):
+                If set, the grid is processed in tiles of this number of grid
+                cells along each side, and the neighbourhood is only
+                calculated for tiles that are not constant over the tile and
+                the surrounding neighbourhood radius. The statistics of the
+                tiles are available from the tiler attribute of the
+                neighbourhood_method.
+            mask_areas (improver.nbhood.mask_areas.NeighbourhoodMaskAreas or
+                    None):
+                Precomputed neighbourhood areas of the mask cube that will be
+                supplied to process, or of its complement. Only supported for
+                the square neighbourhood method.
         """
         super(NeighbourhoodProcessing, self).__init__(
-            neighbourhood_method, radii, lead_times=lead_times)
+            neighbourhood_method, radii, lead_times=lead_times,
+            n_workers=n_workers)
 
         methods = {
             "circular": CircularNeighbourhood,
             "square": SquareNeighbourhood}
+        method_kwargs = {"tile_size": tile_size}
+        if mask_areas is not None:
+            if neighbourhood_method != "square":
+                msg = ("Precomputed mask areas are only supported for the "
+                       "square neighbourhood method.")
+                raise ValueError(msg)
+            method_kwargs["mask_areas"] = mask_areas
         try:
             method = methods[neighbourhood_method]
             self.neighbourhood_method = method(
-                weighted_mode, sum_or_fraction, re_mask)
+                weighted_mode, sum_or_fraction, re_mask, **method_kwargs)
         except KeyError:
             msg = ("The neighbourhood_method requested: {} is not a "
                    "supported method. Please choose from: {}".format(
@@ -30,13 +30,15 @@
 # POSSIBILITY OF SUCH DAMAGE.
 """Module to apply a recursive filter to neighbourhooded data."""
 
+from concurrent.futures import ThreadPoolExecutor
+
 import iris
 import numpy as np
 
 from improver.nbhood.square_kernel import SquareNeighbourhood
 from improver.utilities.cube_checker import check_cube_coordinates
 from improver.utilities.pad_spatial import (
-    pad_cube_with_halo, remove_halo_from_cube)
+    pad_coord, pad_cube_with_halo, remove_halo_from_cube)
 
 
 class RecursiveFilter(object):
@@ -46,7 +48,7 @@ class RecursiveFilter(object):
     """
 
     def __init__(self, alpha_x=None, alpha_y=None, iterations=None,
-                 edge_width=1, re_mask=False):
+                 edge_width=1, re_mask=False, engine="batched", n_workers=1):
         """
         Initialise the class.
 
@@ -71,12 +73,21 @@ class RecursiveFilter(object):
                 mask is not applied. Therefore, the recursive filtering
                 may result in values being present in areas that were
                 originally masked.
+            engine (string):
+                The engine used to run the recursive filter. Options:
+                "batched", which filters all the 2D slices within the cube
+                at once, or "slices", which filters each 2D slice in turn.
+            n_workers (integer):
+                The number of threads used by the "batched" engine to filter
+                independent lines of the data in parallel.
 
         Raises:
             ValueError: If alpha_x is not set such that 0 < alpha_x < 1
             ValueError: If alpha_y is not set such that 0 < alpha_y < 1
             ValueError: If number of iterations is not None and is set such
                         that iterations is not >= 1
+            ValueError: If the engine is not supported.
+            ValueError: If n_workers is not >= 1
 
         """
         if alpha_x is not None:
@@ -97,11 +108,24 @@ class RecursiveFilter(object):
                     "Invalid number of iterations: must be >= 1: {}".format(
                         iterations))
 
+        engines = ["batched", "slices"]
+        if engine not in engines:
+            raise ValueError(
+                "The engine requested: {} is not a supported engine. "
+                "Please choose from: {}".format(engine, engines))
+
+        if not n_workers >= 1:
+            raise ValueError(
+                "Invalid number of workers: must be >= 1: {}".format(
+                    n_workers))
+
         self.alpha_x = alpha_x
         self.alpha_y = alpha_y
         self.iterations = iterations
         self.edge_width = edge_width
         self.re_mask = re_mask
+        self.engine = engine
+        self.n_workers = n_workers
 
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
@@ -227,6 +251,123 @@ class RecursiveFilter(object):
             cube.data = output
         return cube
 
+    @staticmethod
+    def _recurse_batched(data, alphas, axis, backward=False):
+        """
+        Method to run the recursive filter along one axis of a stack of 2D
+        slices in place. Each step along the axis updates every line of
+        every slice at once, using the same calculation as
+        _recurse_forward and _recurse_backward.
+
+        Args:
+            data (numpy array):
+                Array with y and x as the last two dimensions, containing the
+                input data to which the recursive filter will be applied.
+            alphas (numpy array):
+                2D array of alpha values, with y and x dimensions, that will
+                be used when applying the recursive filter along the
+                specified axis.
+            axis (integer):
+                Index of the spatial axis (-2 or -1) over which to recurse.
+
+        Keyword Args:
+            backward (boolean):
+                If True, recurse in the backwards direction.
+
+        Returns:
+            data (numpy array):
+                The input array, containing the smoothed field.
+        """
+        lines = np.moveaxis(data, axis, 0)
+        line_alphas = np.moveaxis(alphas, axis, 0)
+        weights = 1. - line_alphas
+        if backward:
+            steps = range(lines.shape[0]-2, -1, -1)
+            previous = 1
+        else:
+            steps = range(1, lines.shape[0])
+            previous = -1
+        for i in steps:
+            lines[i] = (weights[i] * lines[i] +
+                        line_alphas[i] * lines[i+previous])
+        return data
+
+    def _recurse_lines(self, executor, data, alphas, axis, backward):
+        """
+        Method to run the recursive filter along one axis of a stack of 2D
+        slices in place, dividing the independent lines between the workers.
+
+        Args:
+            executor (concurrent.futures.ThreadPoolExecutor or None):
+                Executor used to run blocks of lines in parallel. If None,
+                all lines are filtered together.
+            data (numpy array):
+                Array with y and x as the last two dimensions, containing the
+                input data to which the recursive filter will be applied.
+            alphas (numpy array):
+                2D array of alpha values, with y and x dimensions.
+            axis (integer):
+                Index of the spatial axis (-2 or -1) over which to recurse.
+            backward (boolean):
+                If True, recurse in the backwards direction.
+        """
+        if executor is None:
+            self._recurse_batched(data, alphas, axis, backward=backward)
+            return
+
+        # Lines along the axis are independent, so the data are divided
+        # into blocks along the other spatial axis.
+        other_axis = -1 if axis == -2 else -2
+        bounds = np.linspace(
+            0, data.shape[other_axis], self.n_workers+1).astype(int)
+        results = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if other_axis == -1:
+                index = (Ellipsis, slice(start, stop))
+            else:
+                index = (Ellipsis, slice(start, stop), slice(None))
+            results.append(executor.submit(
+                self._recurse_batched, data[index], alphas[index], axis,
+                backward=backward))
+        for result in results:
+            result.result()
+
+    def _run_batched_recursion(self, data, alphas_x, alphas_y, iterations):
+        """
+        Method to run the recursive filter on a stack of 2D slices at once.
+
+        Args:
+            data (numpy array):
+                Array with y and x as the last two dimensions, containing the
+                input data to which the recursive filter will be applied.
+            alphas_x (numpy array):
+                2D array of alpha values that will be used when applying the
+                recursive filter along the x-axis.
+            alphas_y (numpy array):
+                2D array of alpha values that will be used when applying the
+                recursive filter along the y-axis.
+            iterations (integer):
+                The number of iterations of the recursive filter.
+
+        Returns:
+            data (numpy array):
+                The input array, containing the smoothed field after the
+                recursive filter has been applied.
+        """
+        passes = [(alphas_x, -1, False), (alphas_x, -1, True),
+                  (alphas_y, -2, False), (alphas_y, -2, True)]
+        if self.n_workers == 1:
+            for _ in range(iterations):
+                for alphas, axis, backward in passes:
+                    self._recurse_lines(None, data, alphas, axis, backward)
+            return data
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            for _ in range(iterations):
+                for alphas, axis, backward in passes:
+                    self._recurse_lines(
+                        executor, data, alphas, axis, backward)
+        return data
+
     def _set_alphas(self, cube, alpha, alphas_cube):
         """
         Set up the alpha parameter.
@@ -287,7 +428,8 @@ class RecursiveFilter(object):
         The steps undertaken are:
 
         1. Split the input cube into slices determined by the co-ordinates in
-           the x and y directions.
+           the x and y directions. The "batched" engine instead processes
+           all of the slices together, as described in _process_batched.
         2. Construct an array of filter parameters (alphas_x and alphas_y) for
            each cube slice that are used to weight the recursive filter in
            the x- and y-directions.
@@ -327,6 +469,9 @@ class RecursiveFilter(object):
         alphas_x = self._set_alphas(cube_format, self.alpha_x, alphas_x)
         alphas_y = self._set_alphas(cube_format, self.alpha_y, alphas_y)
 
+        if self.engine == "batched":
+            return self._process_batched(cube, alphas_x, alphas_y, mask_cube)
+
         recursed_cube = iris.cube.CubeList()
         for output in cube.slices([cube.coord(axis='y'),
                                    cube.coord(axis='x')]):
@@ -357,3 +502,67 @@ class RecursiveFilter(object):
         new_cube = check_cube_coordinates(cube, new_cube)
 
         return new_cube
+
+    def _process_batched(self, cube, alphas_x, alphas_y, mask_cube):
+        """
+        Run the recursive filter on all the 2D slices within the cube at
+        once. The data are arranged with the y and x dimensions last, then
+        masked, padded with a halo and filtered in the same way as each slice
+        is by the "slices" engine.
+
+        Args:
+            cube (Iris.cube.Cube):
+                Cube containing the input data to which the recursive filter
+                will be applied.
+            alphas_x (Iris.cube.Cube):
+                2D cube containing a padded array of alpha values that will
+                be used when applying the recursive filter along the x-axis.
+            alphas_y (Iris.cube.Cube):
+                2D cube containing a padded array of alpha values that will
+                be used when applying the recursive filter along the y-axis.
+            mask_cube (Iris.cube.Cube or None):
+                Cube containing an external mask to apply to the cube before
+                applying the recursive filter.
+
+        Returns:
+            new_cube (Iris.cube.Cube):
+                Cube containing the smoothed field after the recursive filter
+                method has been applied.
+        """
+        spatial_dims = [cube.coord_dims(cube.coord(axis=axis))[0]
+                        for axis in ["y", "x"]]
+        data = np.moveaxis(cube.data, spatial_dims, [-2, -1])
+        mask_data = None
+        if mask_cube is not None:
+            mask_cube = iris.util.squeeze(mask_cube)
+            mask_dims = [mask_cube.coord_dims(mask_cube.coord(axis=axis))[0]
+                         for axis in ["y", "x"]]
+            mask_data = np.moveaxis(mask_cube.data, mask_dims, [-2, -1])
+        data, mask, nan_array = (
+            SquareNeighbourhood.set_up_arrays_to_be_neighbourhooded(
+                data, mask_data=mask_data))
+
+        # Pad a halo around each slice, as pad_cube_with_halo does.
+        width = 2*self.edge_width
+        n_other_dims = data.ndim - 2
+        padded = np.pad(
+            data, [(0, 0)] * n_other_dims + [(width, width)] * 2, "mean",
+            stat_length=([(1, 1)] * n_other_dims +
+                         [(0.5*width, 0.5*width)] * 2))
+        padded = self._run_batched_recursion(
+            padded, alphas_x.data, alphas_y.data, self.iterations)
+        end = -width if width != 0 else None
+        result = padded[..., width:end, width:end]
+
+        if self.re_mask:
+            result[nan_array] = np.nan
+            result = np.ma.masked_array(result, mask=np.logical_not(mask))
+        result = np.moveaxis(result, [-2, -1], spatial_dims)
+
+        new_cube = cube.copy(data=result)
+        # Pass the spatial coordinates through the same padding and halo
+        # removal as the slice-by-slice methods, so the output grid matches.
+        for axis in ["x", "y"]:
+            coord = pad_coord(cube.coord(axis=axis), width, 'add')
+            new_cube.replace_coord(pad_coord(coord, width, 'remove'))
+        return new_cube
@@ -33,13 +33,13 @@
 import iris
 import numpy as np
 
+from improver.nbhood.cache import NeighbourhoodCache
+from improver.nbhood.tiling import NeighbourhoodTiler
 from improver.utilities.cube_checker import (
     check_for_x_and_y_axes, check_cube_coordinates)
 from improver.utilities.cube_manipulation import clip_cube_data
 from improver.utilities.pad_spatial import (
-    pad_cube_with_halo, remove_halo_from_cube)
-from improver.utilities.spatial import (
-    convert_distance_into_number_of_grid_cells)
+    pad_coord, pad_cube_with_halo, remove_halo_from_cube)
 
 # Maximum radius of the neighbourhood width in grid cells.
 MAX_RADIUS_IN_GRID_CELLS = 500
@@ -52,7 +52,7 @@ class SquareNeighbourhood(object):
     """
 
     def __init__(self, weighted_mode=True, sum_or_fraction="fraction",
-                 re_mask=True):
+                 re_mask=True, tile_size=None, mask_areas=None):
         """
         Initialise class.
 
@@ -73,6 +73,18 @@ class SquareNeighbourhood(object):
                 mask is not applied. Therefore, the neighbourhood processing
                 may result in values being present in areas that were
                 originally masked.
+            tile_size (int or None):
+                If set, the grid is processed in tiles of this number of grid
+                cells along each side, and the neighbourhood is only
+                calculated for tiles where the data within the tile and the
+                surrounding neighbourhood radius are not constant. The
+                statistics of the tiles are available from the tiler
+                attribute.
+            mask_areas (improver.nbhood.mask_areas.NeighbourhoodMaskAreas or
+                    None):
+                Precomputed neighbourhood areas of a mask. These are used
+                instead of calculating the neighbourhood area, when the mask
+                applied matches the precomputed mask or its complement.
         """
         self.weighted_mode = weighted_mode
         if sum_or_fraction not in ["sum", "fraction"]:
@@ -84,6 +96,11 @@ class SquareNeighbourhood(object):
             raise ValueError(msg)
         self.sum_or_fraction = sum_or_fraction
         self.re_mask = re_mask
+        self.cache = NeighbourhoodCache()
+        self.tiler = None
+        if tile_size is not None:
+            self.tiler = NeighbourhoodTiler(tile_size)
+        self.mask_areas = mask_areas
 
     def __repr__(self):
         """Represent the configured plugin instance as a string."""
@@ -92,6 +109,72 @@ class SquareNeighbourhood(object):
         return result.format(self.weighted_mode, self.sum_or_fraction,
                              self.re_mask)
 
+    @staticmethod
+    def select_precision(data, iscomplex=False, is_probability=False):
+        """
+        Select the precision to be used for the cumulative sum of an array.
+
+        Probabilities lie between 0 and 1, so single precision is sufficient.
+        Integer-valued data, such as a mask, can be summed exactly at double
+        precision, provided the sum of the absolute values is within the
+        range of integers that can be represented exactly. Otherwise, a
+        Kahan-compensated double precision sum is used.
+
+        Args:
+            data (np.ndarray):
+                Array that will be cumulated.
+
+        Keyword Args:
+            iscomplex (bool):
+                Flag indicating whether data contains complex values.
+            is_probability (bool):
+                Flag indicating whether data contains probabilities.
+
+        Returns:
+            precision (str):
+                One of "complex", "float32", "float64" or "kahan".
+        """
+        if iscomplex:
+            return "complex"
+        if is_probability:
+            return "float32"
+        data = np.real(data)
+        if (np.array_equal(data, np.round(data)) and
+                np.sum(np.abs(data), dtype=np.float64) < 2**53):
+            return "float64"
+        return "kahan"
+
+    @staticmethod
+    def _compensated_cumsum(data, axis):
+        """
+        Calculate a cumulative sum along an axis at double precision, using
+        Kahan-Babuska (Neumaier) compensated summation to limit the growth of
+        rounding errors. The summation is vectorised over all other axes.
+
+        Args:
+            data (np.ndarray):
+                Array to be cumulated.
+            axis (int):
+                Axis along which to cumulate.
+
+        Returns:
+            summed_data (np.ndarray):
+                Array of float64 containing the cumulative sum.
+        """
+        data = np.moveaxis(np.asarray(data, dtype=np.float64), axis, 0)
+        summed_data = np.empty_like(data)
+        total = np.zeros(data.shape[1:])
+        compensation = np.zeros(data.shape[1:])
+        for index, values in enumerate(data):
+            new_total = total + values
+            compensation += np.where(
+                np.abs(total) >= np.abs(values),
+                (total - new_total) + values,
+                (values - new_total) + total)
+            total = new_total
+            summed_data[index] = total + compensation
+        return np.moveaxis(summed_data, 0, axis)
+
     @staticmethod
     def cumulate_array(cube, iscomplex=False):
         """
@@ -100,6 +183,7 @@ class SquareNeighbourhood(object):
         are in the nth row, and then cumulating along the x direction,
         so that the largest values are in the mth column. Each grid point
         will contain the cumulative sum from the origin to that grid point.
+        The precision of the cumulative sum is chosen using select_precision.
 
         Args:
             cube (Iris.cube.Cube):
@@ -118,25 +202,18 @@ class SquareNeighbourhood(object):
                 along the y and x direction has been applied.
         """
         summed_cube = cube.copy()
-        if iscomplex:
-            data = cube.data.astype(complex)
-        elif cube.name().startswith("probability_of"):
-            # No need for high precision calculation, just between 0 and 1.
-            data = cube.data.astype(np.float32)
-        else:
-            # Go to high precision for safety.
-            data = cube.data.astype(np.longdouble)
-        data_summed_along_y = np.cumsum(data, axis=0)
-        data_summed_along_x = (
-            np.cumsum(data_summed_along_y, axis=1))
-        summed_cube.data = data_summed_along_x
+        precision = SquareNeighbourhood.select_precision(
+            cube.data, iscomplex=iscomplex,
+            is_probability=cube.name().startswith("probability_of"))
+        summed_cube.data = SquareNeighbourhood.cumulate_batched_array(
+            cube.data, precision=precision)
         return summed_cube
 
     @staticmethod
     def calculate_neighbourhood(summed_cube,
                                 ymax_xmax_disp, ymin_xmax_disp,
                                 ymin_xmin_disp, ymax_xmin_disp,
-                                n_rows, n_columns):
+                                n_rows, n_columns, out=None):
         """
         Fast vectorised approach to calculating neighbourhood totals.
 
@@ -190,19 +267,47 @@ class SquareNeighbourhood(object):
             n_columns (int):
                 Number of columns
 
+        Keyword Args:
+            out (np.array or None):
+                Preallocated array of shape (n_rows, n_columns) into which the
+                neighbourhood total is written. If None, a new array is
+                created.
+
         Returns:
             neighbourhood_total (np.array):
                 Array containing the calculated neighbourhood total.
         """
-        flattened = summed_cube.data.flatten()
-        ymax_xmax_array = np.roll(flattened, -ymax_xmax_disp)
-        ymin_xmax_array = np.roll(flattened, -ymin_xmax_disp)
-        ymin_xmin_array = np.roll(flattened, -ymin_xmin_disp)
-        ymax_xmin_array = np.roll(flattened, -ymax_xmin_disp)
-        neighbourhood_total = (ymax_xmax_array - ymin_xmax_array +
-                               ymin_xmin_array - ymax_xmin_array)
-        neighbourhood_total.resize(n_rows, n_columns)
-        return neighbourhood_total
+        flattened = np.ravel(summed_cube.data)
+        if out is None:
+            out = np.empty((n_rows, n_columns), dtype=flattened.dtype)
+        # The total is accumulated in a flattened view, so an array that is
+        # not C-contiguous is filled from a contiguous copy at the end.
+        if out.flags.c_contiguous:
+            total = out
+        else:
+            total = np.empty(out.shape, dtype=out.dtype)
+        neighbourhood_total = total.reshape(-1)
+        size = flattened.size
+        # Each corner is read as two offset views of the flattened array,
+        # equivalent to rolling the array by the displacement, and
+        # accumulated in place in the same order as B - D + C - A.
+        for displacement, ufunc in [(ymax_xmax_disp, None),
+                                    (ymin_xmax_disp, np.subtract),
+                                    (ymin_xmin_disp, np.add),
+                                    (ymax_xmin_disp, np.subtract)]:
+            start = displacement % size
+            for out_slice, corner in [(slice(0, size - start),
+                                       flattened[start:]),
+                                      (slice(size - start, size),
+                                       flattened[:start])]:
+                if ufunc is None:
+                    neighbourhood_total[out_slice] = corner
+                else:
+                    ufunc(neighbourhood_total[out_slice], corner,
+                          out=neighbourhood_total[out_slice])
+        if total is not out:
+            np.copyto(out, total)
+        return out
 
     def mean_over_neighbourhood(self, summed_cube, summed_mask,
                                 cells_x, cells_y, iscomplex=False):
@@ -220,8 +325,8 @@ class SquareNeighbourhood(object):
         1. The displacements between the four points used to calculate the
            neighbourhood total sum and the central grid point are calculated.
         2. Within the function calculate_neighbourhood...
-           Four copies of the cumulate array output are flattened and rolled
-           by these displacements to align the four terms used in the
+           The cumulate array output is flattened and four views, offset by
+           these displacements, are used to align the four terms used in the
            neighbourhood total sum calculation.
         3. The neighbourhood total at all points can then be calculated
            simultaneously in a single vector sum.
@@ -274,9 +379,8 @@ class SquareNeighbourhood(object):
         # Equivalent to point C in the docstring example.
         ymin_xmin_disp = (-1*(cells_y+1)*n_columns) - cells_x - 1
 
-        # Flatten the cube data and create 4 copies of the flattened
-        # array which are rolled to align the 4-points which are needed
-        # for the calculation.
+        # Flatten the cube data and use views of the flattened array, offset
+        # to align the 4-points which are needed for the calculation.
         neighbourhood_total = self.calculate_neighbourhood(
             summed_cube, ymax_xmax_disp, ymin_xmax_disp,
             ymin_xmin_disp, ymax_xmin_disp,
@@ -453,16 +557,305 @@ class SquareNeighbourhood(object):
                                minimum_value, maximum_value))
         return neighbourhood_averaged_cube
 
+    @staticmethod
+    def set_up_arrays_to_be_neighbourhooded(data, mask_data=None):
+        """
+        Set up an array ready for neighbourhooding all of its 2D slices at
+        once. This is the array equivalent of
+        set_up_cubes_to_be_neighbourhooded, with the mask and NaN handling
+        applied independently to each slice.
+
+        Args:
+            data (np.ndarray or np.ma.MaskedArray):
+                Array that will be checked for whether the data is masked
+                or NaN. The last two dimensions must be y and x, any leading
+                dimensions are processed together.
+
+        Keyword Args:
+            mask_data (np.ndarray or None):
+                Array to be used as a mask. This must be broadcastable to the
+                shape of data, so will generally be a 2D (y, x) array.
+
+        Returns:
+            (tuple) : tuple containing:
+                **data** (np.ndarray):
+                    Array with masked or NaN values set to 0.0
+                **mask** (np.ndarray):
+                    Array with masked or NaN values set to 0.0
+                **nan_array** (np.ndarray):
+                    Boolean array to be used to set the values within
+                    the output data to be NaN.
+        """
+        input_mask = np.ma.getmaskarray(data)
+        data = np.array(np.ma.getdata(data))
+        if mask_data is None:
+            mask = np.real(np.ones_like(data))
+        else:
+            mask = np.broadcast_to(mask_data, data.shape).copy()
+        mask[input_mask] = 0.0
+        # Set NaN values to 0 in both the data and mask.
+        nan_array = np.isnan(data)
+        mask[nan_array] = 0.0
+        data[nan_array] = 0.0
+        #  Set data to 0.0 where mask is 0.0
+        data = (data * mask).astype(data.dtype)
+        return data, mask, nan_array
+
+    @staticmethod
+    def cumulate_batched_array(data, precision=None):
+        """
+        Method to calculate the cumulative sum over the last two dimensions
+        (y and x) of an N-D array, so that every 2D slice along the leading
+        dimensions is converted into its summed area table in a single
+        vectorised pass. This matches cumulate_array applied to each slice
+        in turn, but without the need to create a cube for each slice.
+
+        Args:
+            data (np.ndarray):
+                Array to be cumulated, with y and x as the last two
+                dimensions.
+
+        Keyword Args:
+            precision (str or None):
+                Precision of the cumulative sum, as returned by
+                select_precision. If None, the precision is selected from
+                the data.
+
+        Returns:
+            summed_data (np.ndarray):
+                Array with cumulative summing applied along the y and x
+                dimensions.
+        """
+        if precision is None:
+            precision = SquareNeighbourhood.select_precision(
+                data, iscomplex=np.any(np.iscomplex(data)))
+        if precision == "complex":
+            data = np.asarray(data, dtype=complex)
+        else:
+            data = np.real(data)
+        if precision == "kahan":
+            return SquareNeighbourhood._compensated_cumsum(
+                SquareNeighbourhood._compensated_cumsum(data, -2), -1)
+        if precision in ["float32", "float64"]:
+            data = data.astype(precision)
+        return np.cumsum(np.cumsum(data, axis=-2), axis=-1)
+
+    @staticmethod
+    def calculate_batched_neighbourhood(summed_data, cells_x, cells_y,
+                                        out=None):
+        """
+        Calculate the neighbourhood totals for all 2D slices of a padded
+        summed area table at once, using the same four points as
+        calculate_neighbourhood. The summed data must have been padded by
+        cells_x + 1 and cells_y + 1 points before cumulating, and the
+        neighbourhood totals are returned for the unpadded domain only,
+        so that no wrapping around the edges of the domain occurs.
+
+        Args:
+            summed_data (np.ndarray):
+                Padded array to which cumulate_batched_array has been
+                applied, with y and x as the last two dimensions.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Keyword Args:
+            out (np.ndarray or None):
+                Preallocated array into which the neighbourhood totals are
+                written. If None, a new array is created.
+
+        Returns:
+            neighbourhood_total (np.ndarray):
+                Array containing the neighbourhood total for each point
+                within the unpadded domain.
+        """
+        n_rows = summed_data.shape[-2] - 2*(cells_y + 1)
+        n_columns = summed_data.shape[-1] - 2*(cells_x + 1)
+        ymin = slice(0, n_rows)
+        ymax = slice(2*cells_y + 1, 2*cells_y + 1 + n_rows)
+        xmin = slice(0, n_columns)
+        xmax = slice(2*cells_x + 1, 2*cells_x + 1 + n_columns)
+        # Equivalent to B - D + C - A in the calculate_neighbourhood
+        # docstring example, with each corner read as a view.
+        neighbourhood_total = np.subtract(
+            summed_data[..., ymax, xmax], summed_data[..., ymin, xmax],
+            out=out)
+        neighbourhood_total += summed_data[..., ymin, xmin]
+        neighbourhood_total -= summed_data[..., ymax, xmin]
+        return neighbourhood_total
+
+    def calculate_neighbourhood_area(self, mask, cells_x, cells_y):
+        """
+        Method to calculate the sum of the mask over the neighbourhood of
+        each point, for all 2D slices of an array at once. If the mask is
+        the same for every slice, the area is calculated for a single slice
+        and held within the cache, so that it can be reused for other cubes
+        with the same mask and neighbourhood size. The area for a single
+        slice is taken from the precomputed mask areas, if available.
+
+        Args:
+            mask (np.ndarray):
+                Array with masked or NaN values set to 0.0, with y and x as
+                the last two dimensions.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Returns:
+            neighbourhood_area (np.ndarray):
+                Array with the same shape as the mask, containing the sum of
+                the mask over the neighbourhood of each point. This may be a
+                read-only view.
+        """
+        def calculate_area(mask):
+            """Calculate the neighbourhood area for an array of masks."""
+            if self.mask_areas is not None and mask.ndim == 2:
+                neighbourhood_area = self.mask_areas.neighbourhood_area(
+                    mask, cells_x, cells_y)
+                if neighbourhood_area is not None:
+                    return neighbourhood_area
+            pad_width = ([(0, 0)]*(mask.ndim - 2) +
+                         [(cells_y + 1, cells_y + 1),
+                          (cells_x + 1, cells_x + 1)])
+            summed_mask = self.cumulate_batched_array(
+                np.pad(mask, pad_width, "constant"))
+            return self.calculate_batched_neighbourhood(
+                summed_mask, cells_x, cells_y)
+
+        mask_slices = mask.reshape((-1,) + mask.shape[-2:])
+        if not (mask_slices == mask_slices[0]).all():
+            return calculate_area(mask)
+        key = ("neighbourhood_area", cells_x, cells_y,
+               self.cache.array_key(mask_slices[0]))
+        neighbourhood_area = self.cache.get(
+            key, calculate_area, mask_slices[0])
+        return np.broadcast_to(neighbourhood_area, mask.shape)
+
+    def mean_over_batched_neighbourhood(
+            self, data, mask, cells_x, cells_y, is_probability=False):
+        """
+        Method to calculate the neighbourhood sum or fraction for all 2D
+        slices of an array at once. The data and mask are padded with a
+        halo of zeros, cumulated at the precision given by select_precision
+        and the four-point algorithm is applied along the last two
+        dimensions, giving the same values as _pad_and_calculate_neighbourhood
+        applied to each slice in turn.
+
+        Args:
+            data (np.ndarray):
+                Array with masked or NaN values set to 0.0, with y and x as
+                the last two dimensions.
+            mask (np.ndarray):
+                Array with masked or NaN values set to 0.0, with the same
+                shape as data.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Keyword Args:
+            is_probability (bool):
+                Flag indicating whether the data are probabilities, in which
+                case the cumulative sum can be calculated at single
+                precision.
+
+        Returns:
+            result (np.ndarray):
+                Array containing the neighbourhood processed data for the
+                unpadded domain.
+        """
+        pad_width = ([(0, 0)]*(data.ndim - 2) +
+                     [(cells_y + 1, cells_y + 1), (cells_x + 1, cells_x + 1)])
+        is_complex = np.any(np.iscomplex(data))
+        precision = self.select_precision(
+            data, iscomplex=is_complex, is_probability=is_probability)
+        summed_data = self.cumulate_batched_array(
+            np.pad(data, pad_width, "constant"), precision=precision)
+        neighbourhood_total = self.calculate_batched_neighbourhood(
+            summed_data, cells_x, cells_y)
+        result_dtype = complex if is_complex else float
+
+        if self.sum_or_fraction == "fraction":
+            neighbourhood_area = self.calculate_neighbourhood_area(
+                mask, cells_x, cells_y)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = (neighbourhood_total.astype(result_dtype) /
+                          neighbourhood_area.astype(result_dtype))
+            result[~np.isfinite(result)] = np.nan
+        else:
+            result = neighbourhood_total.astype(result_dtype)
+
+        if not is_complex:
+            result = result.astype(np.float32)
+        return result
+
+    @staticmethod
+    def count_points_within_domain(shape, cells_x, cells_y):
+        """
+        Count the points of the neighbourhood of each grid point that lie
+        within the domain, which is the neighbourhood area if the mask is 1
+        everywhere.
+
+        Args:
+            shape (tuple):
+                Number of rows and columns of the domain.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Returns:
+            n_points (np.ndarray):
+                Array of the given shape containing the number of points.
+        """
+        def points_within_domain(size, cells):
+            """Count the points of each neighbourhood within the domain."""
+            index = np.arange(size)
+            return (np.minimum(index + cells, size - 1) -
+                    np.maximum(index - cells, 0) + 1)
+
+        return np.outer(points_within_domain(shape[0], cells_y),
+                        points_within_domain(shape[1], cells_x))
+
+    def _constant_tile_function(self, shape, cells_x, cells_y):
+        """
+        Create the function used by the tiler to fill a tile in which the
+        data are constant and the mask is 1 throughout the neighbourhood.
+        The neighbourhood fraction is then the constant value, and the
+        neighbourhood sum is the constant value multiplied by the number of
+        points of the neighbourhood that lie within the domain.
+
+        Args:
+            shape (tuple):
+                Number of rows and columns of the domain.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Returns:
+            fill_function (callable):
+                Function returning the result within a constant tile.
+        """
+        n_points = self.count_points_within_domain(shape, cells_x, cells_y)
+
+        def fill_function(values, rows, columns):
+            """Return the result within a constant tile."""
+            if self.sum_or_fraction == "fraction":
+                return values
+            return values * n_points[rows, columns]
+        return fill_function
+
     def run(self, cube, radius, mask_cube=None):
         """
         Call the methods required to apply a square neighbourhood
         method to a cube.
 
-        The steps undertaken are:
+        All 2D slices of the cube are processed together in a single
+        vectorised pass over the leading dimensions. The steps undertaken
+        are:
 
-        1. Set up cubes by determining, if the arrays are masked.
-        2. Pad the input array with a halo and then calculate the neighbourhood
-           of the haloed array.
+        1. Set up the data and mask arrays by determining, if the arrays are
+           masked or contain NaNs.
+        2. Pad the arrays with a halo and then calculate the neighbourhood
+           of the haloed arrays.
         3. Remove the halo from the neighbourhooded array and deal with a mask,
            if required.
 
@@ -483,37 +876,56 @@ class SquareNeighbourhood(object):
                 Cube containing the smoothed field after the square
                 neighbourhood method has been applied.
         """
-        # If the data is masked, the mask will be processed as well as the
-        # original_data * mask array.
-        original_attributes = cube.attributes
-        original_methods = cube.cell_methods
-        grid_cells_x, grid_cells_y = (
-            convert_distance_into_number_of_grid_cells(
-                cube, radius,
-                max_distance_in_grid_cells=MAX_RADIUS_IN_GRID_CELLS))
-        result_slices = iris.cube.CubeList()
-        for cube_slice in cube.slices([cube.coord(axis='y'),
-                                       cube.coord(axis='x')]):
-            (cube_slice, mask, nan_array) = (
-                self.set_up_cubes_to_be_neighbourhooded(cube_slice,
-                                                        mask_cube))
-            neighbourhood_averaged_cube = (
-                self._pad_and_calculate_neighbourhood(
-                    cube_slice, mask,
-                    grid_cells_x, grid_cells_y))
-            neighbourhood_averaged_cube = (
-                self._remove_padding_and_mask(
-                    neighbourhood_averaged_cube,
-                    cube_slice, mask,
-                    grid_cells_x, grid_cells_y))
-            neighbourhood_averaged_cube.data[nan_array.astype(bool)] = np.nan
-            result_slices.append(neighbourhood_averaged_cube)
-
-        neighbourhood_averaged_cube = result_slices.merge_cube()
-
-        neighbourhood_averaged_cube.cell_methods = original_methods
-        neighbourhood_averaged_cube.attributes = original_attributes
-
-        neighbourhood_averaged_cube = check_cube_coordinates(
-            cube, neighbourhood_averaged_cube)
+        check_for_x_and_y_axes(cube)
+        grid_cells_x, grid_cells_y = self.cache.grid_cells(
+            cube, radius, max_distance_in_grid_cells=MAX_RADIUS_IN_GRID_CELLS)
+
+        # Move the y and x dimensions to the end, so that all other
+        # dimensions are processed together.
+        spatial_dims = [cube.coord_dims(cube.coord(axis=axis))[0]
+                        for axis in ["y", "x"]]
+        data = np.moveaxis(cube.data, spatial_dims, [-2, -1])
+        mask_data = None
+        if mask_cube is not None:
+            mask_cube = iris.util.squeeze(mask_cube)
+            mask_dims = [mask_cube.coord_dims(mask_cube.coord(axis=axis))[0]
+                         for axis in ["y", "x"]]
+            mask_data = np.moveaxis(mask_cube.data, mask_dims, [-2, -1])
+
+        data, mask, nan_array = self.set_up_arrays_to_be_neighbourhooded(
+            data, mask_data=mask_data)
+        is_probability = cube.name().startswith("probability_of")
+        if self.tiler is None or np.iscomplexobj(data):
+            result = self.mean_over_batched_neighbourhood(
+                data, mask, grid_cells_x, grid_cells_y,
+                is_probability=is_probability)
+        else:
+            result = self.tiler.process(
+                data, grid_cells_x, grid_cells_y,
+                lambda data, mask: self.mean_over_batched_neighbourhood(
+                    data, mask, grid_cells_x, grid_cells_y,
+                    is_probability=is_probability),
+                self._constant_tile_function(
+                    data.shape[-2:], grid_cells_x, grid_cells_y),
+                np.float32, mask=mask)
+
+        if self.re_mask and mask.min() < 1.0:
+            result = np.ma.masked_array(result, mask=np.logical_not(mask))
+        # Clip each slice so values lie within the range of the original
+        # slice.
+        if self.sum_or_fraction == "fraction":
+            minimum_value = np.nanmin(data, axis=(-2, -1), keepdims=True)
+            maximum_value = np.nanmax(data, axis=(-2, -1), keepdims=True)
+            result = np.clip(result, minimum_value, maximum_value)
+        result[nan_array] = np.nan
+        result = np.moveaxis(result, [-2, -1], spatial_dims)
+
+        neighbourhood_averaged_cube = cube.copy(data=result)
+        # Pass the spatial coordinates through the same padding and halo
+        # removal as the slice-by-slice methods, so the output grid matches.
+        for axis, grid_cells in zip(["x", "y"], [grid_cells_x, grid_cells_y]):
+            coord = pad_coord(
+                cube.coord(axis=axis), grid_cells+1, 'add')
+            neighbourhood_averaged_cube.replace_coord(
+                pad_coord(coord, grid_cells+1, 'remove'))
         return neighbourhood_averaged_cube
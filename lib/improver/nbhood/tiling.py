@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Module containing tiled execution of neighbourhood processing, which
+skips regions of the grid in which the data are constant."""
+
+import itertools
+import threading
+import time
+
+import numpy as np
+
+# Default number of grid cells along each side of a tile.
+DEFAULT_TILE_SIZE = 128
+
+# Number of grid cells along each side of the blocks within which the range
+# of the data is found, when finding the tiles in which the data are
+# constant.
+BLOCK_SIZE = 8
+
+
+class NeighbourhoodTiler(object):
+    """
+    Apply a neighbourhood kernel to the 2D slices of an array tile by tile,
+    so that the kernel is only applied where it is needed. A tile is
+    constant if the data within the tile, and within a halo of the kernel
+    radius around the tile, are all equal. The result for a constant tile
+    does not depend on the kernel, so it is filled directly, and the kernel
+    is only applied to the active tiles. This is much quicker for fields,
+    such as thresholded precipitation probabilities, that are zero over most
+    of the domain.
+
+    Statistics describing the tiles are accumulated over all calls, so that
+    they can be reported once a cube has been processed. The tiler may be
+    shared between threads.
+    """
+
+    def __init__(self, tile_size=DEFAULT_TILE_SIZE):
+        """
+        Initialise class.
+
+        Keyword Args:
+            tile_size (int):
+                Number of grid cells along each side of a tile.
+        """
+        if tile_size < 1:
+            msg = "Invalid tile size: must be >= 1: {}".format(tile_size)
+            raise ValueError(msg)
+        self.tile_size = int(tile_size)
+        self._lock = threading.Lock()
+        self.reset_statistics()
+
+    def __repr__(self):
+        """Represent the configured class instance as a string."""
+        result = ('<NeighbourhoodTiler: tile_size: {}, tiles: {}, '
+                  'active_tiles: {}>')
+        return result.format(self.tile_size, self.n_tiles,
+                             self.n_active_tiles)
+
+    def reset_statistics(self):
+        """Discard the statistics accumulated so far."""
+        with self._lock:
+            self.n_tiles = 0
+            self.n_active_tiles = 0
+            self.kernel_points = 0
+            self.constant_points = 0
+            self.kernel_time = 0.
+            self.total_time = 0.
+
+    def statistics(self):
+        """
+        Return the statistics accumulated over all calls to process. Each
+        tile of each 2D slice is counted separately.
+
+        Returns:
+            statistics (dict):
+                Dictionary containing:
+
+                **n_tiles** (int):
+                    Number of tiles processed.
+                **n_active_tiles** (int):
+                    Number of tiles to which the kernel was applied.
+                **active_fraction** (float or None):
+                    Fraction of the tiles to which the kernel was applied,
+                    or None if no tiles have been processed.
+                **kernel_time** (float):
+                    Time in seconds spent applying the kernel.
+                **total_time** (float):
+                    Time in seconds spent within process.
+                **estimated_time_saved** (float or None):
+                    Time in seconds that applying the kernel to the points
+                    within the constant tiles would have taken, estimated
+                    from the mean time per point to which the kernel was
+                    applied, including the halos, less the time spent
+                    finding and filling the constant tiles. None if the
+                    kernel has not been applied to any points.
+        """
+        with self._lock:
+            n_tiles = self.n_tiles
+            n_active_tiles = self.n_active_tiles
+            kernel_points = self.kernel_points
+            constant_points = self.constant_points
+            kernel_time = self.kernel_time
+            total_time = self.total_time
+        active_fraction = None
+        if n_tiles:
+            active_fraction = n_active_tiles / n_tiles
+        estimated_time_saved = None
+        if kernel_points:
+            estimated_time_saved = (
+                kernel_time / kernel_points * constant_points -
+                (total_time - kernel_time))
+        return {"n_tiles": n_tiles,
+                "n_active_tiles": n_active_tiles,
+                "active_fraction": active_fraction,
+                "kernel_time": kernel_time,
+                "total_time": total_time,
+                "estimated_time_saved": estimated_time_saved}
+
+    def _tile_limits(self, size):
+        """
+        Return the start and stop indices of the tiles along a dimension.
+
+        Args:
+            size (int):
+                Length of the dimension.
+
+        Returns:
+            starts (np.ndarray):
+                Index of the first point within each tile.
+            stops (np.ndarray):
+                Index after the last point within each tile.
+        """
+        starts = np.arange(0, size, self.tile_size)
+        stops = np.minimum(starts + self.tile_size, size)
+        return starts, stops
+
+    @staticmethod
+    def _reduce_rows(ufunc, array, block_size):
+        """
+        Reduce each block of consecutive rows of an array.
+
+        Args:
+            ufunc (np.ufunc):
+                Function used to reduce the rows, such as np.minimum.
+            array (np.ndarray):
+                Array of shape (n_slices, n_rows, n_columns).
+            block_size (int):
+                Number of rows within each block. The last block may be
+                smaller.
+
+        Returns:
+            blocks (np.ndarray):
+                Array of shape (n_slices, n_blocks, n_columns).
+        """
+        n_slices, n_rows, n_columns = array.shape
+        n_whole = n_rows // block_size
+        blocks = [ufunc.reduce(
+            array[:, :n_whole*block_size].reshape(
+                (n_slices, n_whole, block_size, n_columns)), axis=2)]
+        if n_rows % block_size:
+            blocks.append(ufunc.reduce(
+                array[:, n_whole*block_size:], axis=1, keepdims=True))
+        return np.concatenate(blocks, axis=1)
+
+    def find_constant_tiles(self, data, cells_x, cells_y, mask=None):
+        """
+        Find the tiles of each 2D slice in which the data are constant over
+        the tile and the halo around it. The range of the data is first
+        found within small blocks, and the range over each tile and its halo
+        is then found from the blocks that overlap it. A tile may therefore
+        be found to be active when it is actually constant, but never the
+        reverse. Tiles containing values that are not finite are always
+        active.
+
+        Args:
+            data (np.ndarray):
+                Array of shape (n_slices, n_rows, n_columns).
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+
+        Keyword Args:
+            mask (np.ndarray or None):
+                Array with the same shape as data. If provided, a tile is
+                only constant if the mask is also 1 throughout the tile and
+                its halo.
+
+        Returns:
+            (tuple): tuple containing:
+                **constant** (np.ndarray):
+                    Boolean array of shape (n_slices, n_tile_rows,
+                    n_tile_columns), which is True for constant tiles.
+                **values** (np.ndarray):
+                    Array with the same shape as constant, containing the
+                    value of the data within each constant tile.
+        """
+        block_size = min(BLOCK_SIZE, self.tile_size)
+        windows = []
+        for size, cells in zip(data.shape[-2:], [cells_y, cells_x]):
+            starts, stops = self._tile_limits(size)
+            windows.append(list(zip(
+                np.maximum(starts - cells, 0) // block_size,
+                -(-np.minimum(stops + cells, size) // block_size))))
+
+        def window_range(array):
+            """Find the minimum and maximum over each tile and its halo."""
+            ranges = []
+            for ufunc in [np.minimum, np.maximum]:
+                # Reducing along the rows of a contiguous array vectorises
+                # well, so the array is transposed to reduce each axis.
+                blocks = self._reduce_rows(ufunc, array, block_size)
+                blocks = np.swapaxes(self._reduce_rows(
+                    ufunc, np.ascontiguousarray(np.swapaxes(blocks, -2, -1)),
+                    block_size), -2, -1)
+                tiles = np.empty(
+                    (array.shape[0], len(windows[0]), len(windows[1])),
+                    dtype=blocks.dtype)
+                for (tile_y, rows), (tile_x, columns) in itertools.product(
+                        enumerate(windows[0]), enumerate(windows[1])):
+                    tiles[:, tile_y, tile_x] = ufunc.reduce(
+                        blocks[:, slice(*rows), slice(*columns)].reshape(
+                            (array.shape[0], -1)), axis=-1)
+                ranges.append(tiles)
+            return ranges
+
+        values, maximum = window_range(data)
+        constant = (values == maximum) & np.isfinite(values)
+        if mask is not None and not (mask == 1).all():
+            mask_min, mask_max = window_range(mask)
+            constant &= (mask_min == 1) & (mask_max == 1)
+        return constant, values
+
+    def process(self, data, cells_x, cells_y, kernel_function,
+                fill_function, dtype, mask=None):
+        """
+        Apply a neighbourhood kernel to the active tiles of every 2D slice
+        of an array, and fill the constant tiles directly. The kernel is
+        applied to each active tile together with its halo, clipped to the
+        edges of the domain, so the kernel treats the edges of the domain in
+        the same way as when it is applied to the whole array. If there are
+        no constant tiles, the kernel is applied to the whole array at once.
+
+        Args:
+            data (np.ndarray):
+                Array with y and x as the last two dimensions.
+            cells_x, cells_y (int):
+                The radius of the neighbourhood in grid points, in the x and y
+                directions (excluding the central grid point).
+            kernel_function (callable):
+                Function taking an array of shape (n_slices, n_rows,
+                n_columns) and the matching mask array, or None, and
+                returning the result of applying the kernel to it, with the
+                same shape.
+            fill_function (callable):
+                Function taking an array of shape (n_slices, 1, 1) of the
+                constant values, and the slices of the rows and columns of
+                a tile, and returning the result within the tile.
+            dtype (np.dtype):
+                Data type of the result.
+
+        Keyword Args:
+            mask (np.ndarray or None):
+                Array with the same shape as data, passed to the kernel
+                function.
+
+        Returns:
+            result (np.ndarray):
+                Array with the same shape as data, containing the result of
+                applying the kernel.
+        """
+        start_time = time.perf_counter()
+        kernel_time = 0.
+        kernel_points = 0
+        constant_points = 0
+        n_rows, n_columns = data.shape[-2:]
+        slices = data.reshape((-1, n_rows, n_columns))
+        mask_slices = None
+        if mask is not None:
+            mask_slices = np.reshape(mask, slices.shape)
+
+        constant, values = self.find_constant_tiles(
+            slices, cells_x, cells_y, mask=mask_slices)
+        if not constant.any():
+            kernel_start = time.perf_counter()
+            result = kernel_function(slices, mask_slices).astype(dtype)
+            kernel_time = time.perf_counter() - kernel_start
+            kernel_points = slices.size
+        else:
+            result = np.empty(slices.shape, dtype=dtype)
+            starts_y, stops_y = self._tile_limits(n_rows)
+            starts_x, stops_x = self._tile_limits(n_columns)
+            for (tile_y, (y_0, y_1)), (tile_x, (x_0, x_1)) in (
+                    itertools.product(enumerate(zip(starts_y, stops_y)),
+                                      enumerate(zip(starts_x, stops_x)))):
+                tile = (slice(y_0, y_1), slice(x_0, x_1))
+                tile_constant = constant[:, tile_y, tile_x]
+                if tile_constant.any():
+                    result[(tile_constant,) + tile] = fill_function(
+                        values[tile_constant, tile_y, tile_x][:, None, None],
+                        *tile)
+                    constant_points += (np.count_nonzero(tile_constant) *
+                                        (y_1 - y_0) * (x_1 - x_0))
+                active = ~tile_constant
+                if not active.any():
+                    continue
+                halo_y = slice(max(y_0 - cells_y, 0),
+                               min(y_1 + cells_y, n_rows))
+                halo_x = slice(max(x_0 - cells_x, 0),
+                               min(x_1 + cells_x, n_columns))
+                kernel_start = time.perf_counter()
+                tile_result = kernel_function(
+                    slices[active, halo_y, halo_x],
+                    None if mask_slices is None else
+                    mask_slices[active, halo_y, halo_x])
+                kernel_time += time.perf_counter() - kernel_start
+                kernel_points += tile_result.size
+                result[(active,) + tile] = tile_result[
+                    :, y_0 - halo_y.start:y_1 - halo_y.start,
+                    x_0 - halo_x.start:x_1 - halo_x.start]
+
+        with self._lock:
+            self.n_tiles += constant.size
+            self.n_active_tiles += np.count_nonzero(~constant)
+            self.kernel_points += kernel_points
+            self.constant_points += constant_points
+            self.kernel_time += kernel_time
+            self.total_time += time.perf_counter() - start_time
+        return result.reshape(data.shape)
@@ -145,13 +145,47 @@ class ApplyNeighbourhoodProcessingWithAMask(object):
             self.lead_times, self.weighted_mode,
             self.sum_or_fraction, self.re_mask)
 
+    def _add_coord_for_masking(self, cube, mask_cube):
+        """
+        Create a cube with a leading dimension for the coordinate used for
+        masking, containing a copy of the data of the input cube for each
+        point along this coordinate, so that all of the masks can be applied
+        at once.
+
+        Args:
+            cube (Iris.cube.Cube):
+                Cube containing a 2D x-y slice of the data to be neighbourhood
+                processed.
+            mask_cube (Iris.cube.Cube):
+                Cube containing the array to be used as a mask.
+
+        Returns:
+            band_cube (Iris.cube.Cube):
+                Cube with the coordinate used for masking as a leading
+                dimension coordinate.
+        """
+        coord = iris.coords.DimCoord.from_coord(
+            mask_cube.coord(self.coord_for_masking))
+        data = cube.data[np.newaxis].repeat(len(coord.points), axis=0)
+        band_cube = iris.cube.Cube(data)
+        band_cube.metadata = cube.metadata
+        band_cube.add_dim_coord(coord, 0)
+        for cube_coord in cube.dim_coords:
+            band_cube.add_dim_coord(
+                cube_coord.copy(), cube.coord_dims(cube_coord)[0] + 1)
+        for cube_coord in cube.aux_coords:
+            band_cube.add_aux_coord(
+                cube_coord.copy(),
+                [dim + 1 for dim in cube.coord_dims(cube_coord)])
+        return band_cube
+
     def process(self, cube, mask_cube):
         """
-        1. Iterate over the chosen coordinate within the mask_cube and apply
-           the mask at each iteration to the cube that is to be neighbourhood
-           processed.
-        2. Concatenate the cubes from each iteration together to create a
-           single cube.
+        1. Apply all of the masks along the chosen coordinate within the
+           mask_cube at once to each 2D x-y slice of the cube that is to be
+           neighbourhood processed, so that each slice gains a dimension
+           along the chosen coordinate.
+        2. Merge the cubes from each slice together to create a single cube.
 
         Args:
             cube (Iris.cube.Cube):
@@ -171,6 +205,10 @@ class ApplyNeighbourhoodProcessingWithAMask(object):
         """
         yname = cube.coord(axis='y').name()
         xname = cube.coord(axis='x').name()
+        plugin = NeighbourhoodProcessing(
+            self.neighbourhood_method, self.radii,
+            lead_times=self.lead_times, weighted_mode=self.weighted_mode,
+            sum_or_fraction=self.sum_or_fraction, re_mask=self.re_mask)
         result_slices = iris.cube.CubeList([])
         # Take 2D slices of the input cube for memory issues.
         prev_x_y_slice = None
@@ -185,21 +223,10 @@ class ApplyNeighbourhoodProcessingWithAMask(object):
                 continue
             prev_x_y_slice = x_y_slice
 
-            cube_slices = iris.cube.CubeList([])
-            # Apply each mask in in mask_cube to the 2D input slice.
-            for cube_slice in mask_cube.slices_over(self.coord_for_masking):
-                output_cube = NeighbourhoodProcessing(
-                    self.neighbourhood_method, self.radii,
-                    lead_times=self.lead_times,
-                    weighted_mode=self.weighted_mode,
-                    sum_or_fraction=self.sum_or_fraction, re_mask=self.re_mask
-                    ).process(x_y_slice, mask_cube=cube_slice)
-                coord_object = cube_slice.coord(self.coord_for_masking).copy()
-                output_cube.add_aux_coord(coord_object)
-                output_cube = iris.util.new_axis(
-                    output_cube, self.coord_for_masking)
-                cube_slices.append(output_cube)
-            concatenated_cube = cube_slices.concatenate_cube()
+            # Apply every mask in mask_cube to the 2D input slice in a
+            # single pass over a cube with a dimension for the masks.
+            band_cube = self._add_coord_for_masking(x_y_slice, mask_cube)
+            concatenated_cube = plugin.process(band_cube, mask_cube=mask_cube)
             exception_coordinates = (
                 find_dimension_coordinate_mismatch(
                     x_y_slice, concatenated_cube, two_way_mismatch=False))
@@ -401,13 +428,24 @@ class CollapseMaskedNeighbourhoodCoordinate(object):
             self.renormalize_weights(cube)
         weights = self.weights.data
 
-        # Loop over any extra dimensions
-        cubelist = iris.cube.CubeList([])
-        for slice_3d in cube.slices([self.coord_masked, yname, xname]):
-            collapsed_slice = slice_3d.collapsed(
-                self.coord_masked, iris.analysis.MEAN, weights=weights)
-            cubelist.append(collapsed_slice)
-        result = cubelist.merge_cube()
+        # Broadcast the weights, which are ordered as the coord_masked, y and
+        # x coordinates, over any extra dimensions, so that the coordinate
+        # can be collapsed for all of the slices of the cube at once.
+        weights_dims = [cube.coord_dims(name)[0]
+                        for name in [self.coord_masked, yname, xname]]
+        extra_dims = [dim for dim in range(cube.ndim)
+                      if dim not in weights_dims]
+        order = np.argsort(extra_dims + weights_dims)
+        shape = [cube.shape[dim] for dim in extra_dims] + list(weights.shape)
+        broadcast_weights = np.broadcast_to(
+            np.ma.getdata(weights), shape).transpose(order)
+        if np.ma.is_masked(weights):
+            broadcast_weights = np.ma.masked_array(
+                broadcast_weights,
+                mask=np.broadcast_to(
+                    np.ma.getmaskarray(weights), shape).transpose(order))
+        result = cube.collapsed(
+            self.coord_masked, iris.analysis.MEAN, weights=broadcast_weights)
         # Promote any scalar coordinates with one point back to dimension
         # coordinates if they were dimensions in the input cube.
         # Take a slice over the coordinate we are collapsing as we do not
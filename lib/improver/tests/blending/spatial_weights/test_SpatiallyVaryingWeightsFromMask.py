@@ -303,6 +303,25 @@ class Test_smooth_initial_weights(IrisTest):
         result = plugin.smooth_initial_weights(cube)
         self.assertArrayAlmostEqual(result.data, expected)
 
+    def test_fuzziness_does_not_cross_slices(self):
+        """Test that zero weight points in one x-y slice do not reduce the
+        weights in the other slices of a 3D input cube, including a slice
+        with no zero weight points."""
+        thresholds = [10, 20, 30]
+        data = np.ones((3, 7, 7), dtype=np.float32)
+        cube = set_up_probability_cube(
+            data, thresholds, spatial_grid="equalarea",
+            time=datetime(2017, 11, 10, 4, 0),
+            frt=datetime(2017, 11, 10, 0, 0),)
+        cube.data[0, :, :] = 0.0
+        cube.data[2, 3, 3] = 0.0
+        plugin = SpatiallyVaryingWeightsFromMask(fuzzy_length=10)
+        result = plugin.smooth_initial_weights(cube)
+        self.assertArrayEqual(result.data[0], np.zeros((7, 7)))
+        self.assertArrayEqual(result.data[1], np.ones((7, 7)))
+        self.assertAlmostEqual(result.data[2, 3, 0], 0.3)
+        self.assertEqual(result.dtype, np.float32)
+
 
 class Test_multiply_weights(IrisTest):
     """Test multiply_weights method"""
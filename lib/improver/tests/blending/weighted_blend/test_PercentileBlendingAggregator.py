@@ -301,5 +301,27 @@ class Test_blend_percentiles(IrisTest):
         self.assertArrayAlmostEqual(result, expected_result)
 
 
+class Test_blend_percentiles_for_points(IrisTest):
+    """Test the blend_percentiles_for_points method"""
+    def test_matches_blend_percentiles(self):
+        """Test that the result at each point is identical to that of
+           blend_percentiles at that point"""
+        percentile_values = np.sort(
+            PERCENTILE_DATA.reshape(3, 4, 6), axis=1)
+        percentile_values[1, :, 2] = percentile_values[0, :, 2]
+        percentiles = np.array([0., 25., 75., 100.], dtype=np.float32)
+        weights = np.broadcast_to(
+            np.array([0.5, 0.3, 0.2], dtype=np.float32).reshape(3, 1, 1),
+            percentile_values.shape)
+        result = PercentileBlendingAggregator.blend_percentiles_for_points(
+            percentile_values, percentiles, weights)
+        self.assertEqual(result.shape, (4, 6))
+        for point in range(6):
+            expected = PercentileBlendingAggregator.blend_percentiles(
+                percentile_values[:, :, point], percentiles,
+                weights[:, :, point])
+            self.assertArrayEqual(result[:, point], expected)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the
+   weighted_blend.WeightedBlendAcrossMultipleDimensions plugin."""
+
+
+import unittest
+
+from iris.coords import DimCoord
+from iris.cube import Cube
+from iris.tests import IrisTest
+from iris.exceptions import CoordinateNotFoundError
+import numpy as np
+
+from improver.blending.weighted_blend import (
+    WeightedBlendAcrossMultipleDimensions, WeightedBlendAcrossWholeDimension)
+from improver.tests.blending.weighted_blend.\
+    test_WeightedBlendAcrossWholeDimension import time_coords_for_test_cubes
+from improver.utilities.warnings_handler import ManageWarnings
+
+MEAN_OVER_REALIZATIONS_AND_FRTS = [
+    ("realization", "weighted_mean"),
+    ("forecast_reference_time", "weighted_mean")]
+
+
+def sequential_blend(cube, blend_coords, weights):
+    """Blend a cube over each blend coordinate in turn with
+    WeightedBlendAcrossWholeDimension."""
+    for (coord, mode), coord_weights in zip(blend_coords, weights):
+        cube = WeightedBlendAcrossWholeDimension(coord, mode).process(
+            cube, weights=coord_weights)
+    return cube
+
+
+class Test__init__(IrisTest):
+
+    """Test the __init__ method."""
+
+    def test_basic(self):
+        """Test that the __init__ sets up a plugin for each coordinate."""
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS, cycletime='20171101T0300Z')
+        self.assertEqual([p.coord for p in plugin.plugins],
+                         ["realization", "forecast_reference_time"])
+        self.assertEqual([p.mode for p in plugin.plugins],
+                         ["weighted_mean", "weighted_mean"])
+        self.assertEqual([p.cycletime for p in plugin.plugins],
+                         ['20171101T0300Z', '20171101T0300Z'])
+
+    def test_no_coords(self):
+        """Test that an error is raised if no coordinates are given."""
+        msg = "At least one blend coordinate must be given."
+        with self.assertRaisesRegex(ValueError, msg):
+            WeightedBlendAcrossMultipleDimensions([])
+
+    def test_repeated_coord(self):
+        """Test that an error is raised if a coordinate is repeated."""
+        msg = "Each blend coordinate may only be given once."
+        with self.assertRaisesRegex(ValueError, msg):
+            WeightedBlendAcrossMultipleDimensions(
+                [("realization", "weighted_mean"),
+                 ("realization", "weighted_maximum")])
+
+    def test_invalid_mode(self):
+        """Test that an error is raised for an invalid weighting mode."""
+        msg = "weighting_mode: not_a_method is not recognised"
+        with self.assertRaisesRegex(ValueError, msg):
+            WeightedBlendAcrossMultipleDimensions(
+                [("realization", "not_a_method")])
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS))
+        msg = ("<WeightedBlendAcrossMultipleDimensions: blend_coords = "
+               "[('realization', 'weighted_mean'), "
+               "('forecast_reference_time', 'weighted_mean')], "
+               "cycletime = None>")
+        self.assertEqual(result, msg)
+
+
+class Test_multiple_blend(IrisTest):
+
+    """A shared setup for tests in the WeightedBlendAcrossMultipleDimensions
+    plugin."""
+
+    def setUp(self):
+        """Create a cube with realization, forecast reference time and
+        spatial dimensions, and weights cubes for each blend."""
+        time_coord, frt_coord, fp_coord = time_coords_for_test_cubes()
+        realization_coord = DimCoord([0, 1], 'realization', units='1')
+        lat_coord = DimCoord(np.linspace(-45.0, 45.0, 2), 'latitude',
+                             units='degrees')
+        lon_coord = DimCoord(np.linspace(120, 180, 2), 'longitude',
+                             units='degrees')
+
+        data = np.arange(24, dtype=np.float32).reshape((2, 3, 2, 2))
+        cube = Cube(
+            data, standard_name="air_temperature", units="K",
+            dim_coords_and_dims=[(realization_coord, 0), (frt_coord, 1),
+                                 (lat_coord, 2), (lon_coord, 3)])
+        cube.add_aux_coord(time_coord)
+        cube.add_aux_coord(fp_coord, data_dims=1)
+        self.cube = cube
+
+        self.realization_weights = Cube(
+            np.array([0.25, 0.75], dtype=np.float32), long_name='weights',
+            dim_coords_and_dims=[(realization_coord, 0)])
+        weights3d = np.array([[[0.1, 0.3],
+                               [0.2, 0.4]],
+                              [[0.1, 0.3],
+                               [0.2, 0.4]],
+                              [[0.8, 0.4],
+                               [0.6, 0.2]]], dtype=np.float32)
+        self.frt_weights = Cube(
+            weights3d, long_name='weights',
+            dim_coords_and_dims=[(frt_coord, 0), (lat_coord, 1),
+                                 (lon_coord, 2)])
+
+
+class Test_compact_weights(Test_multiple_blend):
+
+    """Test the compact_weights method."""
+
+    def test_no_weights(self):
+        """Test that equal weights are returned over the blend dimension."""
+        plugin = WeightedBlendAcrossWholeDimension(
+            "forecast_reference_time", "weighted_mean")
+        weights, dims = WeightedBlendAcrossMultipleDimensions.compact_weights(
+            plugin, self.cube, None)
+        self.assertArrayAlmostEqual(weights, np.full(3, 1. / 3))
+        self.assertEqual(dims, [1])
+
+    def test_multidimensional_weights(self):
+        """Test that weights keep only their own dimensions, ordered as on
+        the data cube."""
+        self.frt_weights.transpose([2, 0, 1])
+        plugin = WeightedBlendAcrossWholeDimension(
+            "forecast_reference_time", "weighted_mean")
+        weights, dims = WeightedBlendAcrossMultipleDimensions.compact_weights(
+            plugin, self.cube, self.frt_weights)
+        self.assertEqual(dims, [1, 2, 3])
+        self.assertArrayAlmostEqual(weights, self.frt_weights.data.transpose(
+            [1, 2, 0]))
+        self.assertEqual(weights.dtype, np.float32)
+
+    def test_weights_not_summing_to_one(self):
+        """Test that an error is raised if the weights do not sum to one."""
+        self.realization_weights.data = np.array([0.5, 0.75],
+                                                 dtype=np.float32)
+        plugin = WeightedBlendAcrossWholeDimension(
+            "realization", "weighted_mean")
+        msg = "Weights do not sum to 1 over the blending coordinate."
+        with self.assertRaisesRegex(ValueError, msg):
+            WeightedBlendAcrossMultipleDimensions.compact_weights(
+                plugin, self.cube, self.realization_weights)
+
+    def test_weights_without_blend_coord(self):
+        """Test that an error is raised if the weights cube does not have the
+        blending coordinate."""
+        plugin = WeightedBlendAcrossWholeDimension(
+            "forecast_reference_time", "weighted_mean")
+        msg = "Coordinate to be collapsed not found in weights cube."
+        with self.assertRaisesRegex(CoordinateNotFoundError, msg):
+            WeightedBlendAcrossMultipleDimensions.compact_weights(
+                plugin, self.cube, self.realization_weights)
+
+
+class Test_fused_weighted_mean(Test_multiple_blend):
+
+    """Test the fused_weighted_mean method."""
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_matches_sequential_blend(self):
+        """Test that the fused blend matches blending over each coordinate
+        in turn, including the metadata."""
+        weights = [self.realization_weights, self.frt_weights]
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        result = plugin.fused_weighted_mean(
+            self.cube, plugin.plugins, weights)
+        expected = sequential_blend(
+            self.cube, MEAN_OVER_REALIZATIONS_AND_FRTS, weights)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertEqual(result.data.dtype, np.float32)
+        self.assertEqual(result.cell_methods, expected.cell_methods)
+        self.assertEqual(result.coord("forecast_reference_time"),
+                         expected.coord("forecast_reference_time"))
+        self.assertEqual(result.coord("forecast_period"),
+                         expected.coord("forecast_period"))
+        self.assertArrayEqual(result.attributes["source_realizations"],
+                              [0, 1])
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_unsorted_coords(self):
+        """Test that the data and weights are matched along each coordinate
+        when the coordinates are in descending order."""
+        weights = [self.realization_weights, self.frt_weights]
+        expected = sequential_blend(
+            self.cube, MEAN_OVER_REALIZATIONS_AND_FRTS, weights)
+        cube = self.cube[::-1, ::-1]
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        result = plugin.fused_weighted_mean(cube, plugin.plugins, weights)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+
+    def test_coord_not_found(self):
+        """Test that an error is raised if a blend coordinate is missing."""
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            [("realization", "weighted_mean"), ("model", "weighted_mean")])
+        msg = "Coordinate to be collapsed not found in cube."
+        with self.assertRaisesRegex(CoordinateNotFoundError, msg):
+            plugin.fused_weighted_mean(self.cube, plugin.plugins, [None, None])
+
+
+class Test_process(Test_multiple_blend):
+
+    """Test the process method."""
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_fused(self):
+        """Test that consecutive weighted means are fused, and match blending
+        over each coordinate in turn."""
+        weights = [self.realization_weights, self.frt_weights]
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        result = plugin.process(self.cube, weights=weights)
+        expected = sequential_blend(
+            self.cube, MEAN_OVER_REALIZATIONS_AND_FRTS, weights)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertEqual(result.shape, (2, 2))
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_no_weights(self):
+        """Test that equal weights are used over every coordinate if no
+        weights are given."""
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        result = plugin.process(self.cube)
+        self.assertArrayAlmostEqual(result.data,
+                                    np.mean(self.cube.data, axis=(0, 1)))
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_weighted_maximum(self):
+        """Test that a weighted maximum is blended separately, matching
+        blending over each coordinate in turn."""
+        blend_coords = [("realization", "weighted_mean"),
+                        ("forecast_reference_time", "weighted_maximum")]
+        weights = [self.realization_weights, self.frt_weights]
+        result = WeightedBlendAcrossMultipleDimensions(blend_coords).process(
+            self.cube, weights=weights)
+        expected = sequential_blend(self.cube, blend_coords, weights)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertEqual(result.cell_methods, expected.cell_methods)
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_masked_data(self):
+        """Test that masked data is blended over each coordinate in turn,
+        so that masked points are excluded from each weighted mean."""
+        mask = np.zeros(self.cube.shape, dtype=bool)
+        mask[0, 0, 0, 0] = True
+        mask[:, 1, 1, 1] = True
+        self.cube.data = np.ma.masked_array(self.cube.data, mask=mask)
+        weights = [self.realization_weights, self.frt_weights]
+        result = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS).process(
+                self.cube, weights=weights)
+        expected = sequential_blend(
+            self.cube, MEAN_OVER_REALIZATIONS_AND_FRTS, weights)
+        self.assertIsInstance(result.data, np.ma.MaskedArray)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+
+    def test_wrong_number_of_weights(self):
+        """Test that an error is raised if the number of weights cubes does
+        not match the number of blend coordinates."""
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        msg = "The number of weights cubes \\(1\\) does not match"
+        with self.assertRaisesRegex(ValueError, msg):
+            plugin.process(self.cube, weights=[self.realization_weights])
+
+    def test_not_a_cube(self):
+        """Test that an error is raised if the input is not a cube."""
+        plugin = WeightedBlendAcrossMultipleDimensions(
+            MEAN_OVER_REALIZATIONS_AND_FRTS)
+        msg = "The first argument must be an instance of iris.cube.Cube"
+        with self.assertRaisesRegex(TypeError, msg):
+            plugin.process(self.cube.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
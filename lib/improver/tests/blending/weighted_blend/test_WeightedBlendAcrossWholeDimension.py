@@ -110,6 +110,7 @@ class Test__init__(IrisTest):
         self.assertEqual(plugin.coord, 'time')
         self.assertEqual(plugin.mode, 'weighted_mean')
         self.assertEqual(plugin.cycletime, '20171101T0300Z')
+        self.assertFalse(plugin.streaming)
 
     def test_raises_expression(self):
         """Test that the __init__ raises an error when appropriate."""
@@ -129,7 +130,7 @@ class Test__repr__(IrisTest):
             'time', 'weighted_mean'))
         msg = ('<WeightedBlendAcrossWholeDimension: coord = time,'
                ' weighting_mode = weighted_mean, cycletime = None, '
-               'timeblending: False>')
+               'timeblending: False, streaming: False>')
         self.assertEqual(result, msg)
 
 
@@ -755,6 +756,99 @@ class Test_weighted_maximum(Test_weighted_blend):
         self.assertArrayAlmostEqual(result.data, expected_array)
 
 
+class Test_streaming_blend(Test_weighted_blend):
+
+    """Test the streaming_blend function."""
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_matches_weighted_mean(self):
+        """Test the streaming blend matches the weighted_mean function for
+        1D, spatially varying and equal weights."""
+        coord = "forecast_reference_time"
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        for weights in [self.weights1d, self.weights3d, None]:
+            expected = plugin.weighted_mean(self.cube, weights)
+            result = plugin.streaming_blend(self.cube, weights)
+            self.assertArrayAlmostEqual(result.data, expected.data)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertEqual(result.cell_methods, expected.cell_methods)
+            self.assertEqual(result.coords(), expected.coords())
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_matches_weighted_maximum(self):
+        """Test the streaming blend matches the weighted_maximum function
+        for 1D, spatially varying and equal weights."""
+        coord = "forecast_reference_time"
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_maximum', streaming=True)
+        for weights in [self.weights1d, self.weights3d, None]:
+            expected = plugin.weighted_maximum(self.cube, weights)
+            result = plugin.streaming_blend(self.cube, weights)
+            self.assertArrayAlmostEqual(result.data, expected.data)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertEqual(result.cell_methods, expected.cell_methods)
+            self.assertEqual(result.coords(), expected.coords())
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_threshold_cube(self):
+        """Test the streaming blend of a cube with a threshold dimension
+        when the blending is over the forecast_reference_time."""
+        coord = "forecast_reference_time"
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        result = plugin.streaming_blend(self.cube_threshold, self.weights1d)
+        expected = plugin.weighted_mean(self.cube_threshold, self.weights1d)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_masked_data(self):
+        """Test masked points are excluded from the weighted mean, and points
+        masked in every slice are masked in the result."""
+        coord = "forecast_reference_time"
+        mask = np.zeros(self.cube.shape, dtype=bool)
+        mask[0, 0, 0] = True
+        mask[:, 1, 1] = True
+        self.cube.data = np.ma.masked_array(self.cube.data, mask=mask)
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        result = plugin.streaming_blend(self.cube, self.weights1d)
+        expected = plugin.weighted_mean(self.cube, self.weights1d)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertArrayEqual(result.data.mask, [[False, False],
+                                                 [False, True]])
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_lazy_data(self):
+        """Test that a cube with lazy data is blended without realising the
+        data of the input cube."""
+        coord = "forecast_reference_time"
+        cube = self.cube.copy(data=self.cube.lazy_data())
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        result = plugin.streaming_blend(cube, self.weights1d)
+        self.assertTrue(cube.has_lazy_data())
+        self.assertFalse(result.has_lazy_data())
+        self.assertArrayAlmostEqual(result.data, np.full((2, 2), 1.5))
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_weights_do_not_sum_to_one(self):
+        """Test that an error is raised if the weights do not sum to one."""
+        coord = "forecast_reference_time"
+        self.weights1d.data = self.weights1d.data * 2
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        msg = 'Weights do not sum to 1 over the blending coordinate.'
+        with self.assertRaisesRegex(ValueError, msg):
+            plugin.streaming_blend(self.cube, self.weights1d)
+
+
 class Test_process(Test_weighted_blend):
 
     """Test the process method."""
@@ -937,6 +1031,22 @@ class Test_process(Test_weighted_blend):
         self.assertArrayEqual(result.attributes['source_realizations'],
                               expected)
 
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_streaming(self):
+        """Test that the streaming blend gives the same result and metadata
+        as the weighted_mean method when called through process."""
+        coord = "forecast_reference_time"
+        expected = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean').process(
+                self.cube_threshold, self.weights1d)
+        plugin = WeightedBlendAcrossWholeDimension(
+            coord, 'weighted_mean', streaming=True)
+        result = plugin.process(self.cube_threshold, self.weights1d)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertEqual(result.attributes, expected.attributes)
+        self.assertEqual(result.coords(), expected.coords())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -41,6 +41,7 @@ from iris.tests import IrisTest
 
 from improver.blending.weights import ChooseDefaultWeightsLinear \
     as LinearWeights
+from improver.blending.weights import WeightsCache
 from improver.tests.set_up_test_cubes import (
     set_up_variable_cube, add_coordinate)
 
@@ -157,6 +158,32 @@ class Test_process(IrisTest):
         result = plugin.process(self.cube, self.coord_name, self.coord_vals)
         self.assertAlmostEqual(result.data.sum(), 1.0)
 
+    def test_weights_cached(self):
+        """Test that the weights cube is reused by another plugin instance
+        with the same configuration, and that modifying the returned cube
+        does not modify the cached weights."""
+        cache = WeightsCache()
+        result = LinearWeights(y0val=1.0, ynval=3.0, cache=cache).process(
+            self.cube, self.coord_name, self.coord_vals)
+        expected = result.data.copy()
+        result.data[:] = 0.
+        result = LinearWeights(y0val=1.0, ynval=3.0, cache=cache).process(
+            self.cube, self.coord_name, self.coord_vals)
+        self.assertArrayAlmostEqual(result.data, expected)
+        self.assertArrayAlmostEqual(expected, [0.25, 0.75])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_weights_not_cached_for_different_config(self):
+        """Test that the cached weights are not used by a plugin with a
+        different configuration."""
+        cache = WeightsCache()
+        LinearWeights(y0val=1.0, ynval=3.0, cache=cache).process(
+            self.cube, self.coord_name, self.coord_vals)
+        result = LinearWeights(y0val=1.0, ynval=1.0, cache=cache).process(
+            self.cube, self.coord_name, self.coord_vals)
+        self.assertArrayAlmostEqual(result.data, [0.5, 0.5])
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
     def test_fails_coord_not_in_cube(self):
         """Test it raises a Value Error if coord not in the cube. """
         coord = AuxCoord([], long_name="notset")
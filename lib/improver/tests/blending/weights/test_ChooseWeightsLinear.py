@@ -39,7 +39,7 @@ import numpy as np
 from copy import deepcopy
 from datetime import datetime as dt
 
-from improver.blending.weights import ChooseWeightsLinear
+from improver.blending.weights import ChooseWeightsLinear, WeightsCache
 from improver.utilities.temporal import forecast_period_coord
 from improver.tests.set_up_test_cubes import (
     set_up_variable_cube, add_coordinate)
@@ -542,6 +542,41 @@ class Test_process(IrisTest):
             result.coord('model_configuration').points,
             ["uk_det", "uk_ens", "gl_ens"])
 
+    def test_weights_cached(self):
+        """Test that the weights cube is reused by another plugin instance
+        with the same configuration dictionary, and is recalculated for
+        cubes with different forecast periods."""
+        time_points = [
+            dt(2017, 1, 10, 9), dt(2017, 1, 10, 10), dt(2017, 1, 10, 11)]
+        cube1 = set_up_basic_model_config_cube(
+            frt=dt(2017, 1, 10, 3), time_points=time_points)
+        cube2 = cube1.copy()
+        cube2.coord("model_id").points = [2000]
+        cube2.coord("model_configuration").points = ["uk_ens"]
+        cubes = iris.cube.CubeList([cube1, cube2])
+        cache = WeightsCache()
+
+        expected = ChooseWeightsLinear(
+            self.weighting_coord_name, self.config_dict_fp,
+            cache=cache).process(cubes)
+        result = ChooseWeightsLinear(
+            self.weighting_coord_name, self.config_dict_fp,
+            cache=cache).process(cubes)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertArrayAlmostEqual(result.data, expected.data)
+        self.assertEqual(result.coords(), expected.coords())
+        self.assertIsNot(result, expected)
+
+        later_cubes = iris.cube.CubeList([
+            update_time_and_forecast_period(cube.copy(), 3600)
+            for cube in cubes])
+        result = ChooseWeightsLinear(
+            self.weighting_coord_name, self.config_dict_fp,
+            cache=cache).process(later_cubes)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertArrayAlmostEqual(
+            result.data, [[1., 0.8, 0.6], [0., 0.2, 0.4]])
+
     def test_height_and_realization_dict(self):
         """Test blending members with a configuration dictionary."""
         cube = set_up_variable_cube(274.*np.ones((2, 2, 2), dtype=np.float32))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the weights.WeightsCache class."""
+
+
+import unittest
+
+import numpy as np
+from iris.tests import IrisTest
+
+from improver.blending.weights import WeightsCache
+from improver.tests.set_up_test_cubes import (
+    set_up_variable_cube, add_coordinate)
+
+
+class Test__repr__(IrisTest):
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(WeightsCache(max_entries=4))
+        msg = ('<WeightsCache: max_entries: 4, entries: 0, '
+               'hits: 0, misses: 0>')
+        self.assertEqual(result, msg)
+
+
+class Test_get_weights(IrisTest):
+    """Test the get_weights method."""
+
+    def test_copy_returned(self):
+        """Test that a copy of the held weights cube is returned, so that
+        modifying the returned cube does not modify the held cube."""
+        cube = set_up_variable_cube(np.ones((2, 2), dtype=np.float32))
+        cache = WeightsCache()
+        result = cache.get_weights(("a",), cube.copy)
+        result.data[:] = 0.
+        result = cache.get_weights(("a",), cube.copy)
+        self.assertArrayEqual(result.data, np.ones((2, 2)))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class Test_config_key(IrisTest):
+    """Test the config_key method."""
+
+    def test_order_independent(self):
+        """Test that the key does not depend upon the order of the
+        dictionary, but does depend upon its values."""
+        config = {"uk_det": {"forecast_period": [7, 12], "weights": [1, 0]},
+                  "uk_ens": {"forecast_period": [7, 12], "weights": [0, 1]}}
+        reordered = {"uk_ens": config["uk_ens"], "uk_det": config["uk_det"]}
+        different = {"uk_det": config["uk_det"],
+                     "uk_ens": {"forecast_period": [7, 12],
+                                "weights": [1, 1]}}
+        self.assertEqual(WeightsCache.config_key(config),
+                         WeightsCache.config_key(reordered))
+        self.assertNotEqual(WeightsCache.config_key(config),
+                            WeightsCache.config_key(different))
+
+
+class Test_cube_key(IrisTest):
+    """Test the cube_key method."""
+
+    def setUp(self):
+        """Set up a cube with a height dimension."""
+        cube = set_up_variable_cube(np.ones((2, 2), dtype=np.float32))
+        self.cube = add_coordinate(cube, [10., 20.], "height",
+                                   coord_units="m")
+
+    def test_data_excluded(self):
+        """Test that the key does not depend upon the data."""
+        other = self.cube.copy(data=np.zeros(self.cube.shape,
+                                             dtype=np.float32))
+        self.assertEqual(WeightsCache.cube_key(self.cube),
+                         WeightsCache.cube_key(other))
+
+    def test_coordinate_points(self):
+        """Test that the key depends upon the coordinate points."""
+        other = self.cube.copy()
+        other.coord("height").points = [10., 30.]
+        self.assertNotEqual(WeightsCache.cube_key(self.cube),
+                            WeightsCache.cube_key(other))
+
+    def test_dims(self):
+        """Test that coordinates spanning dimensions other than those
+        requested are excluded from the key."""
+        other = self.cube.copy()
+        other.coord(axis="x").points = other.coord(axis="x").points + 1.
+        self.assertNotEqual(WeightsCache.cube_key(self.cube),
+                            WeightsCache.cube_key(other))
+        self.assertEqual(WeightsCache.cube_key(self.cube, dims=[0]),
+                         WeightsCache.cube_key(other, dims=[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -46,6 +46,8 @@ import numpy as np
 
 from improver.ensemble_calibration.ensemble_calibration import (
     ApplyCoefficientsFromEnsembleCalibration as Plugin)
+from improver.ensemble_calibration.local_ensemble_calibration import (
+    EstimateLocalCoefficientsForEnsembleCalibration)
 from improver.utilities.cube_manipulation import concatenate_cubes
 from improver.tests.ensemble_calibration.ensemble_calibration.\
     helper_functions import (set_up_temperature_cube,
@@ -55,7 +57,8 @@ from improver.utilities.warnings_handler import ManageWarnings
 
 def datetime_from_timestamp(timestamp):
     """Wrapper for timestamp to return a datetime object"""
-    return datetime.datetime.utcfromtimestamp(timestamp*3600)
+    return datetime.datetime.utcfromtimestamp(
+        np.asarray(timestamp).item()*3600)
 
 
 class Test__find_coords_of_length_one(IrisTest):
@@ -532,8 +535,12 @@ class Test__apply_params(IrisTest):
                 self.coeff_names, predictor_of_mean_flag))
 
         for result in [forecast_predictor, forecast_variance]:
-            self.assertEqual(len(result), 2)
-        self.assertEqual(len(coefficients), 8)
+            self.assertEqual(len(result), 1)
+            self.assertEqual(result[0].shape, (2, 3, 3))
+            self.assertEqual(result[0].dtype, np.float32)
+        self.assertEqual(len(coefficients), 4)
+        for result in coefficients:
+            self.assertEqual(result.shape, (2,))
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate.",
@@ -574,7 +581,8 @@ class Test__apply_params(IrisTest):
         forecast_predictor, _, _ = plugin._apply_params(
             predictor_cube, variance_cube, optimised_coeffs,
             self.coeff_names, predictor_of_mean_flag)
-        self.assertArrayAlmostEqual(forecast_predictor[0].data, data)
+        self.assertArrayAlmostEqual(forecast_predictor[0].data[0], data,
+                                    decimal=4)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate.",
@@ -614,7 +622,7 @@ class Test__apply_params(IrisTest):
         _, forecast_variance, _ = plugin._apply_params(
             predictor_cube, variance_cube, optimised_coeffs,
             self.coeff_names, predictor_of_mean_flag)
-        self.assertArrayAlmostEqual(forecast_variance[0].data, data)
+        self.assertArrayAlmostEqual(forecast_variance[0].data[0], data)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate.",
@@ -625,7 +633,7 @@ class Test__apply_params(IrisTest):
         Test that the plugin returns values for the coefficients,
         which match the expected values.
         """
-        data = np.array([4.55819380e-06])
+        data = np.array([4.55819380e-06, 4.55819380e-06])
 
         cube = self.current_temperature_forecast_cube
         cube1 = cube.copy()
@@ -696,8 +704,9 @@ class Test__apply_params(IrisTest):
         forecast_predictor, _, _ = plugin._apply_params(
             predictor_cube, variance_cube, optimised_coeffs,
             self.coeff_names, predictor_of_mean_flag)
-        self.assertArrayAlmostEqual(forecast_predictor[0].data, data,
+        self.assertArrayAlmostEqual(forecast_predictor[0].data[0], data,
                                     decimal=4)
+        self.assertEqual(forecast_predictor[0].dtype, np.float32)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate.",
@@ -740,7 +749,7 @@ class Test__apply_params(IrisTest):
         _, forecast_variance, _ = plugin._apply_params(
             predictor_cube, variance_cube, optimised_coeffs,
             self.coeff_names, predictor_of_mean_flag)
-        self.assertArrayAlmostEqual(forecast_variance[0].data, data,
+        self.assertArrayAlmostEqual(forecast_variance[0].data[0], data,
                                     decimal=4)
 
     @ManageWarnings(
@@ -753,7 +762,7 @@ class Test__apply_params(IrisTest):
         which match the expected values when the individual ensemble
         realizations are used as the predictor.
         """
-        data = np.array([5.0])
+        data = np.array([5.0, 5.0])
         cube = self.current_temperature_forecast_cube
         cube1 = cube.copy()
         cube2 = cube.copy()
@@ -855,7 +864,7 @@ class Test__apply_params(IrisTest):
             predictor_cube, variance_cube, optimised_coeffs,
             self.coeff_names, predictor_of_mean_flag)
 
-        self.assertArrayAlmostEqual(result[0][0].data, data, decimal=4)
+        self.assertArrayAlmostEqual(result[0][0].data[0], data, decimal=4)
 
     @ManageWarnings(
         record=True,
@@ -893,6 +902,124 @@ class Test__apply_params(IrisTest):
         self.assertTrue(any(warning_msg in str(item)
                             for item in warning_list))
 
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate.",
+                          "Ensemble calibration not available"])
+    def test_one_date_missing(self):
+        """
+        Test that the raw forecast is returned at a date without
+        coefficients, and the calibrated forecast at a date with
+        coefficients, with NaN coefficients for the missing date.
+        """
+        cube = self.current_temperature_forecast_cube
+        cube2 = cube.copy()
+        cube2.coord("time").points = cube2.coord("time").points + 3
+        cube2.data += 3
+        cube = concatenate_cubes(CubeList([cube, cube2]))
+        the_date = datetime_from_timestamp(cube.coord("time").points[1])
+        optimised_coeffs = {the_date: [1., 2., 3., 2.]}
+
+        predictor_cube = cube.collapsed("realization", iris.analysis.MEAN)
+        variance_cube = cube.collapsed("realization", iris.analysis.VARIANCE)
+
+        plugin = Plugin(cube, optimised_coeffs, self.coeff_names)
+        forecast_predictor, forecast_variance, coefficients = (
+            plugin._apply_params(
+                predictor_cube, variance_cube, optimised_coeffs,
+                self.coeff_names, "mean"))
+        self.assertArrayAlmostEqual(
+            forecast_predictor[0].data[0], predictor_cube.data[0])
+        self.assertArrayAlmostEqual(
+            forecast_predictor[0].data[1], 3. + 2. * predictor_cube.data[1],
+            decimal=4)
+        self.assertArrayAlmostEqual(
+            forecast_variance[0].data[0], variance_cube.data[0])
+        self.assertArrayAlmostEqual(
+            forecast_variance[0].data[1], 1. + 4. * variance_cube.data[1],
+            decimal=4)
+        self.assertTrue(np.isnan(coefficients[0].data[0]))
+        self.assertArrayAlmostEqual(
+            [coeff_cube.data[1] for coeff_cube in coefficients],
+            [1., 2., 3., 2.])
+        self.assertEqual(
+            coefficients[0].coord("time"), predictor_cube.coord("time"))
+
+
+class Test__apply_local_params(IrisTest):
+
+    """Test applying coefficients that vary between grid points."""
+
+    def setUp(self):
+        """Set up a temperature cube and a cube of coefficients at each grid
+        point."""
+        self.cube = add_forecast_reference_time_and_forecast_period(
+            set_up_temperature_cube())
+        self.coeff_names = ["gamma", "delta", "a", "beta"]
+        coeffs = np.tile([1., 0.5, 0., 1.], (9, 1))
+        coeffs[:, 2] = np.arange(9)
+        self.coefficient_cube = (
+            EstimateLocalCoefficientsForEnsembleCalibration(
+                "gaussian", "K").create_coefficient_cube(
+                    coeffs, self.cube, self.coeff_names))
+        self.predictor_cube = self.cube.collapsed(
+            "realization", iris.analysis.MEAN)
+        self.variance_cube = self.cube.collapsed(
+            "realization", iris.analysis.VARIANCE)
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_basic(self):
+        """Test that the intercept and the variance coefficients of each grid
+        point are applied at that grid point."""
+        date = datetime.datetime(2015, 11, 23, 7, 0)
+        optimised_coeffs = {date: self.coefficient_cube}
+        plugin = Plugin(self.cube, optimised_coeffs, self.coeff_names)
+        forecast_predictor, forecast_variance, coefficients = (
+            plugin._apply_params(
+                self.predictor_cube, self.variance_cube, optimised_coeffs,
+                self.coeff_names, "mean"))
+        self.assertArrayAlmostEqual(
+            forecast_predictor[0].data,
+            self.predictor_cube.data[0] + np.arange(9).reshape(3, 3),
+            decimal=4)
+        self.assertArrayAlmostEqual(
+            forecast_variance[0].data,
+            1. + 0.25 * self.variance_cube.data[0], decimal=4)
+        self.assertEqual(
+            [cube.name() for cube in coefficients], self.coeff_names)
+        self.assertEqual(coefficients[2].shape, (3, 3))
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def test_realizations(self):
+        """Test that the coefficients of each realization are applied when
+        using the realizations as the predictor."""
+        coeffs = np.tile(
+            [1., 0.5, 0.] + [np.sqrt(1. / 3.)] * 3, (9, 1))
+        coefficient_cube = (
+            EstimateLocalCoefficientsForEnsembleCalibration(
+                "gaussian", "K").create_coefficient_cube(
+                    coeffs, self.cube, self.coeff_names))
+        forecast_predictor, _, coefficients = Plugin._apply_local_params(
+            next(self.cube.slices_over("time")),
+            next(self.variance_cube.slices_over("time")),
+            coefficient_cube, self.coeff_names, "realizations")
+        self.assertArrayAlmostEqual(
+            forecast_predictor.data, self.predictor_cube.data[0], decimal=4)
+        self.assertEqual(len(coefficients), 6)
+
+    def test_mismatched_grid(self):
+        """Test that an error is raised if the grid of the coefficients does
+        not match the grid of the forecast."""
+        self.coefficient_cube.coord("latitude").points = (
+            self.coefficient_cube.coord("latitude").points + 1.)
+        msg = "The latitude coordinate of the coefficients does not match"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin._apply_local_params(
+                next(self.predictor_cube.slices_over("time")),
+                next(self.variance_cube.slices_over("time")),
+                self.coefficient_cube, self.coeff_names, "mean")
+
 
 if __name__ == '__main__':
     unittest.main()
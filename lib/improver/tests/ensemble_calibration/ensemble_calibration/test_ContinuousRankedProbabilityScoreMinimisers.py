@@ -39,6 +39,7 @@ import unittest
 import iris
 from iris.tests import IrisTest
 import numpy as np
+from scipy.stats import norm
 
 from improver.ensemble_calibration.ensemble_calibration import (
     ContinuousRankedProbabilityScoreMinimisers as Plugin)
@@ -49,6 +50,35 @@ from improver.tests.ensemble_calibration.ensemble_calibration.\
 from improver.utilities.warnings_handler import ManageWarnings
 
 
+class Test__init__(IrisTest):
+
+    """Test the __init__ method."""
+
+    def test_default(self):
+        """Test that Nelder-Mead is used by default."""
+        plugin = Plugin()
+        self.assertEqual(plugin.minimisation_method, "Nelder-Mead")
+
+    def test_invalid_method(self):
+        """Test that a ValueError is raised for an unsupported minimisation
+        method."""
+        msg = "Minimisation method requested"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin(minimisation_method="Powell")
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(Plugin(minimisation_method="L-BFGS-B"))
+        msg = ('<ContinuousRankedProbabilityScoreMinimisers: '
+               'minimisation_method: L-BFGS-B>')
+        self.assertEqual(result, msg)
+
+
 class Test_normal_crps_minimiser(IrisTest):
 
     """
@@ -89,7 +119,7 @@ class Test_normal_crps_minimiser(IrisTest):
             forecast_variance_data, sqrt_pi, predictor_of_mean_flag)
 
         self.assertIsInstance(result, np.float64)
-        self.assertAlmostEqual(result, 16.607763767419634)
+        self.assertAlmostEqual(result, 16.607763906362223)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate."])
@@ -124,7 +154,7 @@ class Test_normal_crps_minimiser(IrisTest):
             forecast_variance_data, sqrt_pi, predictor_of_mean_flag)
 
         self.assertIsInstance(result, np.float64)
-        self.assertAlmostEqual(result, 4886.9467779764836)
+        self.assertAlmostEqual(result, 4886.947247539365)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate."])
@@ -163,6 +193,29 @@ class Test_normal_crps_minimiser(IrisTest):
         self.assertIsInstance(result, np.float64)
         self.assertAlmostEqual(result, plugin.BAD_VALUE)
 
+    def test_scipy_stats_reference(self):
+        """
+        Test that the CRPS matches that calculated using scipy.stats,
+        when the buffers are reused by a second evaluation.
+        """
+        initial_guess = np.array([5, 1, 0, 1], dtype=np.float32)
+        forecast_predictor = np.array([270., 280., 290.], dtype=np.float32)
+        forecast_variance = np.array([1., 4., 9.], dtype=np.float32)
+        truth = np.array([271., 279., 295.], dtype=np.float32)
+        sqrt_pi = np.sqrt(np.pi).astype(np.float32)
+        sigma = np.sqrt(25. + forecast_variance)
+        xz = (truth - forecast_predictor) / sigma
+        expected = np.sum(
+            sigma * (xz * (2 * norm.cdf(xz) - 1) + 2 * norm.pdf(xz) -
+                     1 / np.sqrt(np.pi)))
+
+        plugin = Plugin()
+        for _ in range(2):
+            result = plugin.normal_crps_minimiser(
+                initial_guess, forecast_predictor, truth, forecast_variance,
+                sqrt_pi, "mean")
+            self.assertAlmostEqual(result, expected, places=5)
+
 
 class Test_truncated_normal_crps_minimiser(IrisTest):
 
@@ -204,7 +257,7 @@ class Test_truncated_normal_crps_minimiser(IrisTest):
             forecast_variance_data, sqrt_pi, predictor_of_mean_flag)
 
         self.assertIsInstance(result, np.float64)
-        self.assertAlmostEqual(result, 13.182782882390779)
+        self.assertAlmostEqual(result, 13.18278295172707)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate."])
@@ -239,7 +292,7 @@ class Test_truncated_normal_crps_minimiser(IrisTest):
             forecast_variance_data, sqrt_pi, predictor_of_mean_flag)
 
         self.assertIsInstance(result, np.float64)
-        self.assertAlmostEqual(result, 533.48760954557883)
+        self.assertAlmostEqual(result, 533.4876129591545)
 
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate."])
@@ -278,6 +331,124 @@ class Test_truncated_normal_crps_minimiser(IrisTest):
         self.assertIsInstance(result, np.float64)
         self.assertAlmostEqual(result, plugin.BAD_VALUE)
 
+    def test_scipy_stats_reference(self):
+        """
+        Test that the CRPS matches that calculated using scipy.stats,
+        when the buffers are reused by a second evaluation.
+        """
+        initial_guess = np.array([1, 1, 0, 1], dtype=np.float32)
+        forecast_predictor = np.array([0.5, 5., 10.], dtype=np.float32)
+        forecast_variance = np.array([1., 4., 9.], dtype=np.float32)
+        truth = np.array([0., 4., 12.], dtype=np.float32)
+        sqrt_pi = np.sqrt(np.pi).astype(np.float32)
+        sigma = np.sqrt(1. + forecast_variance)
+        xz = (truth - forecast_predictor) / sigma
+        x0 = forecast_predictor / sigma
+        expected = np.sum(
+            (sigma / norm.cdf(x0)**2) *
+            (xz * norm.cdf(x0) * (2 * norm.cdf(xz) + norm.cdf(x0) - 2) +
+             2 * norm.pdf(xz) * norm.cdf(x0) -
+             norm.cdf(np.sqrt(2) * x0) / np.sqrt(np.pi)))
+
+        plugin = Plugin()
+        for _ in range(2):
+            result = plugin.truncated_normal_crps_minimiser(
+                initial_guess, forecast_predictor, truth, forecast_variance,
+                sqrt_pi, "mean")
+            self.assertAlmostEqual(result, expected, places=5)
+
+
+class Test_crps_and_gradient(IrisTest):
+
+    """
+    Test calculating the CRPS together with its gradient with respect to
+    the coefficients, for the normal and truncated normal distributions.
+    """
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate."])
+    def setUp(self):
+        """Set up the predictors, truth and variance data."""
+        cube = set_up_wind_speed_cube()
+        self.forecast_predictor_mean = cube.collapsed(
+            "realization", iris.analysis.MEAN).data.flatten()
+        self.forecast_predictor_realizations = convert_cube_data_to_2d(cube)
+        self.forecast_variance = cube.collapsed(
+            "realization", iris.analysis.VARIANCE).data.flatten()
+        self.truth = cube.collapsed(
+            "realization", iris.analysis.MAX).data.flatten()
+        self.sqrt_pi = np.sqrt(np.pi)
+        self.plugin = Plugin()
+
+    def check_gradient(self, function, initial_guess, forecast_predictor,
+                       predictor_of_mean_flag):
+        """Check the gradient against a finite difference approximation."""
+        args = (forecast_predictor.astype(np.float64),
+                self.truth.astype(np.float64),
+                self.forecast_variance.astype(np.float64),
+                self.sqrt_pi, predictor_of_mean_flag)
+        initial_guess = np.array(initial_guess, dtype=np.float64)
+        _, gradient = function(initial_guess, *args)
+        step = 1.e-6
+        expected = [
+            (function(initial_guess + delta, *args)[0] -
+             function(initial_guess - delta, *args)[0]) / (2 * step)
+            for delta in np.eye(len(initial_guess)) * step]
+        self.assertArrayAlmostEqual(gradient, expected, decimal=4)
+
+    def test_normal_value(self):
+        """Test that the CRPS matches normal_crps_minimiser."""
+        initial_guess = np.array([5, 1, 0, 1], dtype=np.float32)
+        args = (self.forecast_predictor_mean, self.truth,
+                self.forecast_variance, self.sqrt_pi, "mean")
+        result, _ = self.plugin.normal_crps_and_gradient(initial_guess, *args)
+        expected = self.plugin.normal_crps_minimiser(initial_guess, *args)
+        self.assertAlmostEqual(result, expected, places=4)
+
+    def test_truncated_normal_value(self):
+        """Test that the CRPS matches truncated_normal_crps_minimiser."""
+        initial_guess = np.array([5, 1, 0, 1], dtype=np.float32)
+        args = (self.forecast_predictor_mean, self.truth,
+                self.forecast_variance, self.sqrt_pi, "mean")
+        result, _ = self.plugin.truncated_normal_crps_and_gradient(
+            initial_guess, *args)
+        expected = self.plugin.truncated_normal_crps_minimiser(
+            initial_guess, *args)
+        self.assertAlmostEqual(result, expected, places=4)
+
+    def test_normal_gradient(self):
+        """Test the gradient for a normal distribution, with either the
+        ensemble mean or the ensemble realizations as the predictor."""
+        self.check_gradient(
+            self.plugin.normal_crps_and_gradient, [0.5, 0.8, 0.2, 0.9],
+            self.forecast_predictor_mean, "mean")
+        self.check_gradient(
+            self.plugin.normal_crps_and_gradient,
+            [0.5, 0.8, 0.2, 0.5, 0.6, 0.7],
+            self.forecast_predictor_realizations, "realizations")
+
+    def test_truncated_normal_gradient(self):
+        """Test the gradient for a truncated normal distribution, with either
+        the ensemble mean or the ensemble realizations as the predictor."""
+        self.check_gradient(
+            self.plugin.truncated_normal_crps_and_gradient,
+            [0.5, 0.8, 0.2, 0.9], self.forecast_predictor_mean, "mean")
+        self.check_gradient(
+            self.plugin.truncated_normal_crps_and_gradient,
+            [0.5, 0.8, 0.2, 0.5, 0.6, 0.7],
+            self.forecast_predictor_realizations, "realizations")
+
+    @ManageWarnings(ignored_messages=["divide by zero encountered"])
+    def test_bad_value(self):
+        """Test that the BAD_VALUE and a zero gradient are returned, when
+        the appropriate condition is found."""
+        initial_guess = np.array([0, 0, 1, 1])
+        result, gradient = self.plugin.normal_crps_and_gradient(
+            initial_guess, self.forecast_predictor_mean, self.truth,
+            self.forecast_variance, self.sqrt_pi, "mean")
+        self.assertEqual(result, self.plugin.BAD_VALUE)
+        self.assertArrayEqual(gradient, np.zeros(4))
+
 
 class Test_crps_minimiser_wrapper(IrisTest):
 
@@ -343,6 +514,48 @@ class Test_crps_minimiser_wrapper(IrisTest):
             result, [6.24021609e+00, 1.35694934e+00, 1.84642787e-03,
                      5.55444682e-01, 5.04367388e-01, 6.68575194e-01])
 
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate.",
+                          "Minimisation did not result in convergence",
+                          "The final iteration resulted in a percentage"])
+    def test_masked_training_data(self):
+        """
+        Test that masked points in the truth and the forecast are excluded
+        from the minimisation, so that the result matches that of the
+        unmasked valid points only.
+        The ensemble mean is the predictor.
+        """
+        initial_guess = np.array([5, 1, 0, 1], dtype=np.float32)
+        cube = set_up_temperature_cube()
+
+        forecast_predictor = cube.collapsed("realization", iris.analysis.MEAN)
+        forecast_variance = cube.collapsed(
+            "realization", iris.analysis.VARIANCE)
+        truth = cube.collapsed("realization", iris.analysis.MAX)
+        mask = np.zeros(truth.shape, dtype=bool)
+        truth_mask = mask.copy()
+        truth_mask.flat[0] = True
+        forecast_mask = mask.copy()
+        forecast_mask.flat[4] = True
+        truth.data = np.ma.masked_array(truth.data, mask=truth_mask)
+        forecast_predictor.data = np.ma.masked_array(
+            forecast_predictor.data, mask=forecast_mask)
+
+        valid = ~(truth_mask | forecast_mask).flatten()
+        valid_cubes = [
+            iris.cube.Cube(np.ma.getdata(cube.data).flatten()[valid])
+            for cube in [forecast_predictor, truth, forecast_variance]]
+
+        plugin = Plugin()
+        result = plugin.crps_minimiser_wrapper(
+            initial_guess, forecast_predictor, truth, forecast_variance,
+            "mean", "gaussian")
+        expected = plugin.crps_minimiser_wrapper(
+            initial_guess, valid_cubes[0], valid_cubes[1], valid_cubes[2],
+            "mean", "gaussian")
+        self.assertFalse(np.allclose(result, initial_guess))
+        self.assertArrayAlmostEqual(result, expected)
+
     @ManageWarnings(
         ignored_messages=["Collapsing a non-contiguous coordinate."])
     def test_normal_mean_predictor_keyerror(self):
@@ -751,6 +964,70 @@ class Test_crps_minimiser_wrapper(IrisTest):
         self.assertTrue(any(warning_msg_iter in str(item)
                             for item in warning_list))
 
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate.",
+                          "Minimisation did not result in convergence"])
+    def test_gradient_methods(self):
+        """
+        Test that the gradient-based methods reach a CRPS that is no greater
+        than that reached using Nelder-Mead, for both distributions, and
+        that the convergence diagnostics are recorded.
+        The ensemble mean is the predictor.
+        """
+        initial_guess = np.array([5, 1, 0, 1], dtype=np.float32)
+        cube = set_up_wind_speed_cube()
+
+        forecast_predictor = cube.collapsed("realization", iris.analysis.MEAN)
+        forecast_variance = cube.collapsed(
+            "realization", iris.analysis.VARIANCE)
+        truth = cube.collapsed("realization", iris.analysis.MAX)
+
+        for distribution in ["gaussian", "truncated gaussian"]:
+            plugin = Plugin()
+            plugin.crps_minimiser_wrapper(
+                initial_guess, forecast_predictor, truth, forecast_variance,
+                "mean", distribution)
+            nelder_mead_crps = plugin.diagnostics["crps"]
+            for method in ["L-BFGS-B", "BFGS"]:
+                plugin = Plugin(minimisation_method=method)
+                result = plugin.crps_minimiser_wrapper(
+                    initial_guess, forecast_predictor, truth,
+                    forecast_variance, "mean", distribution)
+                self.assertIsInstance(result, np.ndarray)
+                self.assertEqual(len(result), 4)
+                self.assertEqual(
+                    plugin.diagnostics["minimisation_method"], method)
+                self.assertLessEqual(
+                    plugin.diagnostics["iterations"], plugin.MAX_ITERATIONS)
+                self.assertLessEqual(
+                    plugin.diagnostics["crps"], nelder_mead_crps + 1.e-4)
+
+    @ManageWarnings(
+        ignored_messages=["Collapsing a non-contiguous coordinate.",
+                          "Minimisation did not result in convergence",
+                          "The final iteration resulted in a percentage"])
+    def test_gradient_method_realizations_predictor(self):
+        """
+        Test that L-BFGS-B reaches a lower CRPS than Nelder-Mead, when the
+        ensemble realizations are the predictor.
+        """
+        initial_guess = np.array([5, 1, 0, 1, 1, 1], dtype=np.float32)
+        cube = set_up_temperature_cube()
+
+        forecast_variance = cube.collapsed(
+            "realization", iris.analysis.VARIANCE)
+        truth = cube.collapsed("realization", iris.analysis.MAX)
+
+        crps = []
+        for method in ["Nelder-Mead", "L-BFGS-B"]:
+            plugin = Plugin(minimisation_method=method)
+            result = plugin.crps_minimiser_wrapper(
+                initial_guess, cube.copy(), truth, forecast_variance,
+                "realizations", "gaussian")
+            self.assertEqual(len(result), 6)
+            crps.append(plugin.diagnostics["crps"])
+        self.assertLess(crps[1], crps[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -369,6 +369,28 @@ class Test_process(IrisTest):
             self.temperature_truth_cube)
         self.assertIsInstance(result, CubeList)
 
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_training_diagnostics(self):
+        """
+        Test that the diagnostics of training on a subsample, including the
+        change in the CRPS compared with training on all grid points, are
+        retained by the plugin.
+        The ensemble mean is the predictor.
+        """
+        plugin = Plugin(
+            "ensemble model output statistics", "gaussian", "m s-1",
+            minimisation_method="L-BFGS-B", subsample_fraction=0.5,
+            random_seed=0, compare_with_full_sample=True)
+        plugin.process(
+            self.current_wind_speed_forecast_cube,
+            self.historic_wind_speed_forecast_cube,
+            self.wind_speed_truth_cube)
+        self.assertEqual(
+            list(plugin.training_diagnostics), list(plugin.optimised_coeffs))
+        diagnostics, = plugin.training_diagnostics.values()
+        self.assertIn("crps_change_percent", diagnostics)
+
     def test_unknown_calibration_method(self):
         """
         Test that the plugin raises an error if an unknown calibration method
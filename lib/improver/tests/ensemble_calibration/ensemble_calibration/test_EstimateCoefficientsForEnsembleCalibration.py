@@ -34,6 +34,8 @@ Unit tests for the
 class.
 
 """
+import shutil
+from tempfile import mkdtemp
 import unittest
 
 import iris
@@ -43,8 +45,11 @@ import numpy as np
 
 from improver.ensemble_calibration.ensemble_calibration import (
     EstimateCoefficientsForEnsembleCalibration as Plugin)
+from improver.ensemble_calibration.training_store import (
+    RollingTrainingStore)
 from improver.tests.ensemble_calibration.ensemble_calibration.\
-    helper_functions import (set_up_temperature_cube, set_up_wind_speed_cube,
+    helper_functions import (set_up_cube, set_up_temperature_cube,
+                             set_up_wind_speed_cube,
                              add_forecast_reference_time_and_forecast_period,
                              _create_historic_forecasts, _create_truth)
 from improver.utilities.warnings_handler import ManageWarnings
@@ -170,6 +175,93 @@ class Test__init__(IrisTest):
             self.assertTrue(any(warning_msg in str(item)
                                 for item in warning_list))
 
+    def test_invalid_subsample_fraction(self):
+        """Test that a subsample fraction greater than 1 raises an
+        error."""
+        msg = "The subsample fraction must be greater than 0"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin("gaussian", "degreesC", subsample_fraction=1.5)
+
+    def test_training_store_realizations(self):
+        """Test that using a training store with the ensemble realizations
+        as the predictor raises an error."""
+        msg = "A training store holds the ensemble mean and variance"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin("gaussian", "degreesC",
+                   predictor_of_mean_flag="realizations",
+                   training_store=RollingTrainingStore(".", 30))
+
+
+class Test__subsample_training_data(IrisTest):
+
+    """Test the _subsample_training_data method."""
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def setUp(self):
+        """Set up historic forecasts and truth on a 10 x 10 grid."""
+        data = np.tile(np.linspace(250., 300., 100).reshape(10, 10),
+                       (3, 1, 1, 1))
+        data[1] += 1
+        data[2] += 2
+        current_forecast = add_forecast_reference_time_and_forecast_period(
+            set_up_cube(data.astype(np.float32), "air_temperature", "K",
+                        y_dimension_length=10, x_dimension_length=10))
+        self.historic_forecast = _create_historic_forecasts(current_forecast)
+        self.forecast_mean = self.historic_forecast.collapsed(
+            "realization", iris.analysis.MEAN)
+        self.forecast_var = self.historic_forecast.collapsed(
+            "realization", iris.analysis.VARIANCE)
+        self.truth = _create_truth(current_forecast)
+
+    def test_basic(self):
+        """Test that the requested fraction of the grid points is sampled,
+        with the same grid points in each cube."""
+        plugin = Plugin("gaussian", "K", subsample_fraction=0.5,
+                        random_seed=0)
+        forecast_mean, forecast_var, truth = (
+            plugin._subsample_training_data(
+                self.forecast_mean, self.forecast_var, self.truth))
+        for cube in [forecast_mean, forecast_var, truth]:
+            self.assertEqual(cube.shape, (5, 50))
+        self.assertArrayAlmostEqual(
+            forecast_mean.data, truth.data, decimal=4)
+
+    def test_stratified(self):
+        """Test that the same number of grid points is sampled from each
+        tenth of the grid points, ordered by the forecast mean."""
+        plugin = Plugin("gaussian", "K", subsample_fraction=0.2,
+                        random_seed=0)
+        forecast_mean, _, _ = plugin._subsample_training_data(
+            self.forecast_mean, self.forecast_var, self.truth)
+        bins = np.append(
+            np.sort(self.forecast_mean.data[0].flatten())[::10], np.inf)
+        counts, _ = np.histogram(forecast_mean.data[0], bins=bins)
+        self.assertArrayEqual(counts, np.full(10, 2))
+
+    def test_reproducible(self):
+        """Test that the same grid points are sampled with the same random
+        seed, and different grid points with a different random seed."""
+        results = []
+        for random_seed in [0, 0, 1]:
+            plugin = Plugin("gaussian", "K", subsample_fraction=0.2,
+                            random_seed=random_seed)
+            forecast_mean, _, _ = plugin._subsample_training_data(
+                self.forecast_mean, self.forecast_var, self.truth)
+            results.append(forecast_mean.data)
+        self.assertArrayEqual(results[0], results[1])
+        self.assertFalse(np.array_equal(results[0], results[2]))
+
+    def test_realizations(self):
+        """Test that the realization dimension is retained when the
+        realizations are the predictor."""
+        plugin = Plugin("gaussian", "K", subsample_fraction=0.5,
+                        random_seed=0)
+        forecast_predictor, _, _ = plugin._subsample_training_data(
+            self.historic_forecast, self.forecast_var, self.truth)
+        self.assertEqual(forecast_predictor.shape, (3, 5, 50))
+        self.assertEqual(forecast_predictor.coord_dims("realization"), (0,))
+
 
 class Test_compute_initial_guess(IrisTest):
 
@@ -434,6 +526,97 @@ class Test_estimate_coefficients_for_ngr(IrisTest):
             self.assertEqual(
                 len(optimised_coeffs[key]), len(coeff_names))
 
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_previous_coeffs(self):
+        """Ensure that starting from the coefficients of a previous training
+        on the same data reproduces those coefficients in fewer
+        iterations."""
+        plugin = Plugin("gaussian", "m s-1",
+                        minimisation_method="L-BFGS-B")
+        optimised_coeffs, _ = plugin.estimate_coefficients_for_ngr(
+            self.current_wind_speed_forecast_cube,
+            self.historic_wind_speed_forecast_cube,
+            self.wind_speed_truth_cube)
+        previous_coeffs, = optimised_coeffs.values()
+        iterations = plugin.minimiser.diagnostics["iterations"]
+        optimised_coeffs, _ = plugin.estimate_coefficients_for_ngr(
+            self.current_wind_speed_forecast_cube,
+            self.historic_wind_speed_forecast_cube,
+            self.wind_speed_truth_cube, previous_coeffs=previous_coeffs)
+        result, = optimised_coeffs.values()
+        self.assertArrayAlmostEqual(result, previous_coeffs, decimal=4)
+        self.assertLess(
+            plugin.minimiser.diagnostics["iterations"], iterations)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_previous_coeffs_wrong_length(self):
+        """Ensure that an error is raised if the number of previous
+        coefficients does not match the predictor."""
+        plugin = Plugin("gaussian", "degreesC",
+                        predictor_of_mean_flag="realizations")
+        msg = "The number of coefficients supplied 4 does not match"
+        with self.assertRaisesRegex(ValueError, msg):
+            plugin.estimate_coefficients_for_ngr(
+                self.current_temperature_forecast_cube,
+                self.historic_temperature_forecast_cube,
+                self.temperature_truth_cube, previous_coeffs=[1, 1, 0, 1])
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_subsample(self):
+        """Ensure that training on a subsample records the CRPS of the
+        subsample and of all grid points, and its change relative to
+        training on all grid points."""
+        plugin = Plugin("gaussian", "m s-1",
+                        minimisation_method="L-BFGS-B",
+                        subsample_fraction=0.5, random_seed=0,
+                        compare_with_full_sample=True)
+        optimised_coeffs, _ = plugin.estimate_coefficients_for_ngr(
+            self.current_wind_speed_forecast_cube,
+            self.historic_wind_speed_forecast_cube,
+            self.wind_speed_truth_cube)
+        self.assertEqual(
+            list(plugin.training_diagnostics), list(optimised_coeffs))
+        diagnostics, = plugin.training_diagnostics.values()
+        self.assertEqual(
+            sorted(diagnostics), ["crps", "crps_change_percent",
+                                  "full_sample_crps", "subsample_crps"])
+        self.assertGreaterEqual(diagnostics["crps_change_percent"], -1.e-3)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_training_store(self):
+        """Ensure that the coefficients estimated from the training store
+        match those estimated from the historic forecasts and truth, when
+        only the newest day is supplied once the store has been filled."""
+        expected, _ = Plugin(
+            "gaussian", "m s-1",
+            minimisation_method="L-BFGS-B").estimate_coefficients_for_ngr(
+                self.current_wind_speed_forecast_cube,
+                self.historic_wind_speed_forecast_cube,
+                self.wind_speed_truth_cube)
+        directory = mkdtemp()
+        try:
+            training_store = RollingTrainingStore(directory, 30)
+            plugin = Plugin("gaussian", "m s-1",
+                            minimisation_method="L-BFGS-B",
+                            training_store=training_store)
+            plugin.estimate_coefficients_for_ngr(
+                self.current_wind_speed_forecast_cube,
+                self.historic_wind_speed_forecast_cube[:-1],
+                self.wind_speed_truth_cube)
+            result, _ = plugin.estimate_coefficients_for_ngr(
+                self.current_wind_speed_forecast_cube,
+                self.historic_wind_speed_forecast_cube[-1:],
+                self.wind_speed_truth_cube)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(list(result), list(expected))
+        self.assertArrayAlmostEqual(
+            list(result.values())[0], list(expected.values())[0], decimal=4)
+
     @ManageWarnings(
         ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
     def test_coefficient_values_for_gaussian_distribution(self):
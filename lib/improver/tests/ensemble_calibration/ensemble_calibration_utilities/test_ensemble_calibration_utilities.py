@@ -40,7 +40,8 @@ from iris.tests import IrisTest
 import numpy as np
 
 from improver.ensemble_calibration.ensemble_calibration_utilities import (
-    convert_cube_data_to_2d, check_predictor_of_mean_flag)
+    convert_cube_data_to_2d, check_predictor_of_mean_flag,
+    create_coefficients_cube)
 from improver.tests.ensemble_calibration.ensemble_calibration.\
     helper_functions import set_up_temperature_cube
 
@@ -220,5 +221,31 @@ class Test_check_predictor_of_mean_flag(IrisTest):
             check_predictor_of_mean_flag(predictor_of_mean_flag)
 
 
+class Test_create_coefficients_cube(IrisTest):
+
+    """Test the create_coefficients_cube utility."""
+
+    def test_basic(self):
+        """Test that the coefficients and their names are stored in the
+        cube."""
+        result = create_coefficients_cube(
+            [1., 2., 3., 4.], ["gamma", "delta", "a", "beta"])
+        self.assertEqual(result.name(), "emos_coefficients")
+        self.assertArrayAlmostEqual(result.data, [1., 2., 3., 4.])
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayEqual(
+            result.coord("coefficient_name").points,
+            ["gamma", "delta", "a", "beta"])
+
+    def test_realizations(self):
+        """Test that further coefficients are named after the last
+        coefficient name."""
+        result = create_coefficients_cube(
+            [1., 2., 3., 4., 5.], ["gamma", "delta", "a", "beta"])
+        self.assertArrayEqual(
+            result.coord("coefficient_name").points,
+            ["gamma", "delta", "a", "beta", "beta"])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Unit tests for the
+`local_ensemble_calibration.BatchedContinuousRankedProbabilityScoreMinimiser`
+class.
+
+"""
+import unittest
+
+from iris.tests import IrisTest
+import numpy as np
+from scipy.optimize import minimize
+
+from improver.ensemble_calibration.ensemble_calibration import (
+    ContinuousRankedProbabilityScoreMinimisers)
+from improver.ensemble_calibration.local_ensemble_calibration import (
+    BatchedContinuousRankedProbabilityScoreMinimiser as Plugin)
+
+
+def _create_training_data(n_points=20, n_samples=15, n_realizations=3):
+    """Create forecasts and truths that differ between points."""
+    state = np.random.RandomState(0)
+    realizations = (
+        state.normal(10., 2., (n_points, n_samples, n_realizations)) +
+        state.normal(0., 3., (n_points, 1, 1)))
+    truth = (
+        realizations.mean(axis=2) * state.uniform(0.8, 1.2, (n_points, 1)) +
+        state.normal(0., 1.5, (n_points, n_samples)) + 1.)
+    return realizations, truth
+
+
+class Test__init__(IrisTest):
+
+    """Test the __init__ method."""
+
+    def test_basic(self):
+        """Test that the attributes are set."""
+        plugin = Plugin("gaussian", max_memory_in_bytes=1000, n_workers=2)
+        self.assertEqual(plugin.distribution, "gaussian")
+        self.assertEqual(plugin.predictor_of_mean_flag, "mean")
+        self.assertEqual(plugin.max_memory_in_bytes, 1000)
+        self.assertEqual(plugin.n_workers, 2)
+
+    def test_invalid_distribution(self):
+        """Test that an unsupported distribution raises an error."""
+        msg = "Distribution requested"
+        with self.assertRaisesRegex(KeyError, msg):
+            Plugin("foo")
+
+    def test_invalid_n_workers(self):
+        """Test that fewer than one worker raises an error."""
+        msg = "Invalid number of workers"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin("gaussian", n_workers=0)
+
+
+class Test__repr__(IrisTest):
+
+    """Test the __repr__ method."""
+
+    def test_basic(self):
+        """Test the string representation."""
+        result = str(Plugin("truncated gaussian", max_memory_in_bytes=1000))
+        msg = ("<BatchedContinuousRankedProbabilityScoreMinimiser: "
+               "distribution: truncated gaussian; predictor_of_mean_flag: "
+               "mean; max_memory_in_bytes: 1000; n_workers: 1>")
+        self.assertEqual(result, msg)
+
+
+class Test_crps_and_gradient(IrisTest):
+
+    """Test the crps_and_gradient method."""
+
+    def setUp(self):
+        """Set up training data and coefficients for testing."""
+        realizations, self.truth = _create_training_data(n_points=4)
+        self.realizations = np.abs(realizations)
+        self.truth = np.abs(self.truth)
+        self.forecast_mean = self.realizations.mean(axis=2)
+        self.forecast_var = self.realizations.var(axis=2)
+        self.coeffs = np.array(
+            [[1., 1., 0., 1.], [0.5, 0.2, 1., 0.9],
+             [2., 0.5, -1., 1.1], [1., 1., 0.5, 0.8]])
+        self.sqrt_pi = np.sqrt(np.pi)
+
+    def test_matches_single_point(self):
+        """Test that the CRPS and gradient at each point match those
+        calculated for that point alone, for each distribution."""
+        minimisers = ContinuousRankedProbabilityScoreMinimisers()
+        functions = {
+            "gaussian": minimisers.normal_crps_and_gradient,
+            "truncated gaussian":
+                minimisers.truncated_normal_crps_and_gradient}
+        for distribution, function in functions.items():
+            crps, gradient = Plugin(distribution).crps_and_gradient(
+                self.coeffs, self.forecast_mean, self.truth,
+                self.forecast_var)
+            for point in range(len(self.coeffs)):
+                expected_crps, expected_gradient = function(
+                    self.coeffs[point], self.forecast_mean[point],
+                    self.truth[point], self.forecast_var[point],
+                    self.sqrt_pi, "mean")
+                self.assertAlmostEqual(crps[point], expected_crps)
+                self.assertArrayAlmostEqual(
+                    gradient[point], expected_gradient)
+
+    def test_realizations_predictor(self):
+        """Test that the CRPS and gradient at each point match those
+        calculated for that point alone using the realizations as the
+        predictor."""
+        coeffs = np.concatenate(
+            [self.coeffs, np.full((4, 2), 0.5)], axis=1)
+        minimisers = ContinuousRankedProbabilityScoreMinimisers()
+        crps, gradient = Plugin(
+            "gaussian", predictor_of_mean_flag="realizations"
+        ).crps_and_gradient(
+            coeffs, self.realizations, self.truth, self.forecast_var)
+        for point in range(len(coeffs)):
+            expected_crps, expected_gradient = (
+                minimisers.normal_crps_and_gradient(
+                    coeffs[point], self.realizations[point],
+                    self.truth[point], self.forecast_var[point],
+                    self.sqrt_pi, "realizations"))
+            self.assertAlmostEqual(crps[point], expected_crps)
+            self.assertArrayAlmostEqual(gradient[point], expected_gradient)
+
+    def test_nan_excluded(self):
+        """Test that samples with a NaN truth are excluded from the CRPS of
+        that point only."""
+        truth = self.truth.copy()
+        truth[0, 0] = np.nan
+        plugin = Plugin("gaussian")
+        crps, _ = plugin.crps_and_gradient(
+            self.coeffs, self.forecast_mean, truth, self.forecast_var)
+        expected_crps, _ = plugin.crps_and_gradient(
+            self.coeffs[:1], self.forecast_mean[:1, 1:], truth[:1, 1:],
+            self.forecast_var[:1, 1:])
+        self.assertAlmostEqual(crps[0], expected_crps[0])
+        self.assertTrue(np.all(np.isfinite(crps)))
+
+    def test_invalid_point(self):
+        """Test that a point with a zero standard deviation has an infinite
+        CRPS, without affecting the other points."""
+        coeffs = self.coeffs.copy()
+        coeffs[1, :2] = 0.
+        forecast_var = self.forecast_var.copy()
+        crps, _ = Plugin("gaussian").crps_and_gradient(
+            coeffs, self.forecast_mean, self.truth, forecast_var)
+        self.assertEqual(crps[1], np.inf)
+        self.assertTrue(np.all(np.isfinite(crps[[0, 2, 3]])))
+
+
+class Test_process(IrisTest):
+
+    """Test the process method."""
+
+    def setUp(self):
+        """Set up training data and an initial guess for testing."""
+        self.realizations, self.truth = _create_training_data()
+        self.forecast_mean = self.realizations.mean(axis=2)
+        self.forecast_var = self.realizations.var(axis=2)
+        self.initial_guess = np.tile([1., 1., 0., 1.], (20, 1))
+
+    def _scipy_crps(self, predictor_of_mean_flag, initial_guess,
+                    forecast_predictor):
+        """Minimise the CRPS at each point in turn using scipy."""
+        function = (
+            ContinuousRankedProbabilityScoreMinimisers(
+                minimisation_method="L-BFGS-B").normal_crps_and_gradient)
+        crps = []
+        for point in range(len(initial_guess)):
+            result = minimize(
+                function, initial_guess[point], jac=True, method="L-BFGS-B",
+                args=(forecast_predictor[point], self.truth[point],
+                      self.forecast_var[point], np.sqrt(np.pi),
+                      predictor_of_mean_flag))
+            crps.append(result.fun)
+        return np.array(crps)
+
+    def test_basic(self):
+        """Test that the minimised CRPS at every point is no more than that
+        found by minimising each point in turn using scipy."""
+        plugin = Plugin("gaussian")
+        result = plugin.process(
+            self.initial_guess, self.forecast_mean, self.truth,
+            self.forecast_var)
+        self.assertEqual(result.shape, (20, 4))
+        crps, _ = plugin.crps_and_gradient(
+            result, self.forecast_mean, self.truth, self.forecast_var)
+        expected = self._scipy_crps(
+            "mean", self.initial_guess, self.forecast_mean)
+        self.assertTrue(np.all(crps <= expected + 1.e-5))
+        self.assertEqual(plugin.diagnostics["converged_points"], 20)
+
+    def test_realizations_predictor(self):
+        """Test that the minimised CRPS at every point is no more than that
+        found by minimising each point in turn using scipy, when using the
+        realizations as the predictor."""
+        initial_guess = np.tile(
+            [1., 1., 0.] + [np.sqrt(1. / 3.)] * 3, (20, 1))
+        plugin = Plugin("gaussian", predictor_of_mean_flag="realizations")
+        result = plugin.process(
+            initial_guess, self.realizations, self.truth, self.forecast_var)
+        crps, _ = plugin.crps_and_gradient(
+            result, self.realizations, self.truth, self.forecast_var)
+        expected = self._scipy_crps(
+            "realizations", initial_guess, self.realizations)
+        self.assertTrue(np.all(crps <= expected + 1.e-5))
+
+    def test_chunks_and_workers(self):
+        """Test that the result does not depend on the chunking of the points
+        or the number of processes used."""
+        expected = Plugin("gaussian").process(
+            self.initial_guess, self.forecast_mean, self.truth,
+            self.forecast_var)
+        plugin = Plugin("gaussian", max_memory_in_bytes=1, n_workers=2)
+        result = plugin.process(
+            self.initial_guess, self.forecast_mean, self.truth,
+            self.forecast_var)
+        self.assertEqual(plugin.diagnostics["chunks"], 20)
+        self.assertArrayAlmostEqual(result, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
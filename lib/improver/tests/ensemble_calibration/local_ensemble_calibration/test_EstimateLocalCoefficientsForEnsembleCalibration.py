@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Unit tests for the
+`local_ensemble_calibration.EstimateLocalCoefficientsForEnsembleCalibration`
+class.
+
+"""
+import unittest
+
+import iris
+from iris.tests import IrisTest
+import numpy as np
+
+from improver.ensemble_calibration.local_ensemble_calibration import (
+    EstimateLocalCoefficientsForEnsembleCalibration as Plugin)
+from improver.tests.ensemble_calibration.ensemble_calibration.\
+    helper_functions import (set_up_temperature_cube,
+                             add_forecast_reference_time_and_forecast_period,
+                             _create_historic_forecasts, _create_truth)
+from improver.utilities.warnings_handler import ManageWarnings
+
+IGNORED_MESSAGES = ["Collapsing a non-contiguous coordinate.",
+                    "The statsmodels can not be imported"]
+WARNING_TYPES = [UserWarning, ImportWarning]
+
+
+class Test__str__(IrisTest):
+
+    """Test the __str__ method."""
+
+    def test_basic(self):
+        """Test the string representation."""
+        result = str(Plugin("gaussian", "degreesC", n_workers=2))
+        msg = ("<EstimateLocalCoefficientsForEnsembleCalibration: "
+               "distribution: gaussian; desired_units: degreesC; "
+               "predictor_of_mean_flag: mean; minimiser: "
+               "<BatchedContinuousRankedProbabilityScoreMinimiser: "
+               "distribution: gaussian; predictor_of_mean_flag: mean; "
+               "max_memory_in_bytes: 268435456; n_workers: 2>>")
+        self.assertEqual(result, msg)
+
+
+class Test_estimate_coefficients_for_ngr(IrisTest):
+
+    """Test the estimate_coefficients_for_ngr method."""
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def setUp(self):
+        """Set up temperature cubes that vary in skill between grid
+        points."""
+        self.current_forecast = (
+            add_forecast_reference_time_and_forecast_period(
+                set_up_temperature_cube()))
+        self.historic_forecast = _create_historic_forecasts(
+            self.current_forecast)
+        truth = _create_truth(self.current_forecast)
+        state = np.random.RandomState(0)
+        truth.data = truth.data + state.normal(
+            0., 1., truth.shape).astype(np.float32)
+        truth.data[..., 0] += 2.
+        self.truth = truth
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_basic(self):
+        """Test that a cube of coefficients at each grid point is returned
+        for the date of the current forecast."""
+        optimised_coeffs, coeff_names = Plugin(
+            "gaussian", "degreesC").estimate_coefficients_for_ngr(
+                self.current_forecast, self.historic_forecast, self.truth)
+        self.assertEqual(coeff_names, ["gamma", "delta", "a", "beta"])
+        self.assertEqual(len(optimised_coeffs), 1)
+        cube, = optimised_coeffs.values()
+        self.assertEqual(cube.name(), "emos_coefficients")
+        self.assertEqual(cube.shape, (4, 3, 3))
+        self.assertArrayEqual(
+            cube.coord("coefficient_name").points, coeff_names)
+        self.assertEqual(
+            cube.coord("latitude"), self.current_forecast.coord("latitude"))
+        self.assertEqual(
+            cube.coord("time"), self.current_forecast.coord("time"))
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_local_bias(self):
+        """Test that the calibrated mean of the training forecasts at each
+        grid point matches the mean of the truth at that grid point, including
+        at the grid points where the truth is warmer."""
+        optimised_coeffs, _ = Plugin(
+            "gaussian", "degreesC").estimate_coefficients_for_ngr(
+                self.current_forecast, self.historic_forecast, self.truth)
+        cube, = optimised_coeffs.values()
+        forecast_mean = self.historic_forecast.collapsed(
+            "realization", iris.analysis.MEAN).data - 273.15
+        calibrated_mean = cube.data[2] + cube.data[3] * forecast_mean
+        truth = self.truth.data - 273.15
+        self.assertArrayAllClose(
+            calibrated_mean.mean(axis=0), truth.mean(axis=0), atol=0.5)
+        self.assertFalse(np.allclose(cube.data[2, :, 0], cube.data[2, :, 1]))
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_previous_coeffs(self):
+        """Test that starting from the coefficients of a previous training
+        on the same data reproduces those coefficients."""
+        plugin = Plugin("gaussian", "degreesC")
+        optimised_coeffs, _ = plugin.estimate_coefficients_for_ngr(
+            self.current_forecast, self.historic_forecast, self.truth)
+        previous_coeffs, = optimised_coeffs.values()
+        optimised_coeffs, _ = plugin.estimate_coefficients_for_ngr(
+            self.current_forecast, self.historic_forecast, self.truth,
+            previous_coeffs=previous_coeffs)
+        result, = optimised_coeffs.values()
+        self.assertArrayAlmostEqual(
+            result.data, previous_coeffs.data, decimal=4)
+        self.assertLessEqual(
+            plugin.batched_minimiser.diagnostics["iterations"], 2)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_realizations_predictor(self):
+        """Test that a coefficient for each realization is returned when
+        using the realizations as the predictor."""
+        optimised_coeffs, _ = Plugin(
+            "truncated gaussian", "degreesC",
+            predictor_of_mean_flag="realizations"
+        ).estimate_coefficients_for_ngr(
+            self.current_forecast, self.historic_forecast, self.truth)
+        cube, = optimised_coeffs.values()
+        self.assertEqual(cube.shape, (6, 3, 3))
+        self.assertArrayEqual(
+            cube.coord("coefficient_name").points,
+            ["gamma", "delta", "a", "beta", "beta", "beta"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Unit tests for the `training_store.RollingTrainingStore` class.
+
+"""
+import datetime
+import os
+import shutil
+from tempfile import mkdtemp
+import unittest
+
+import iris
+from iris.tests import IrisTest
+import numpy as np
+
+from improver.ensemble_calibration.training_store import (
+    RollingTrainingStore as Plugin)
+from improver.tests.ensemble_calibration.ensemble_calibration.\
+    helper_functions import (set_up_temperature_cube,
+                             add_forecast_reference_time_and_forecast_period,
+                             _create_historic_forecasts, _create_truth)
+from improver.utilities.warnings_handler import ManageWarnings
+
+IGNORED_MESSAGES = ["Collapsing a non-contiguous coordinate."]
+WARNING_TYPES = [UserWarning]
+
+# The validity times of the historic forecasts.
+TIMES = [datetime.datetime(2015, 11, day, 7, 0) for day in range(18, 23)]
+# The forecast period of the historic forecasts in seconds.
+FORECAST_PERIOD = 4 * 3600
+
+
+class Test__init__(IrisTest):
+
+    """Test the __init__ method."""
+
+    def setUp(self):
+        """Set up a temporary directory."""
+        self.directory = mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def test_basic(self):
+        """Test that the directory of the store is created."""
+        directory = os.path.join(self.directory, "store")
+        plugin = Plugin(directory, 30)
+        self.assertEqual(plugin.training_length, 30)
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_invalid_training_length(self):
+        """Test that a training length of less than a day raises an
+        error."""
+        msg = "The training length must be at least one day"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin(self.directory, 0)
+
+
+class Test__repr__(IrisTest):
+
+    """Test the __repr__ method."""
+
+    def test_basic(self):
+        """Test the string representation."""
+        result = str(Plugin(".", 30))
+        msg = "<RollingTrainingStore: directory: .; training_length: 30>"
+        self.assertEqual(result, msg)
+
+
+class StoreTest(IrisTest):
+
+    """Set up a store, historic forecasts and truth for testing."""
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def setUp(self):
+        """Set up a temporary directory and the training data."""
+        self.directory = mkdtemp()
+        self.current_forecast = (
+            add_forecast_reference_time_and_forecast_period(
+                set_up_temperature_cube()))
+        self.historic_forecast = _create_historic_forecasts(
+            self.current_forecast)
+        self.truth = _create_truth(self.current_forecast)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+
+class Test_add(StoreTest):
+
+    """Test the add method."""
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_basic(self):
+        """Test that each day is added to the store, along with the
+        units."""
+        plugin = Plugin(self.directory, 30)
+        result = plugin.add(self.historic_forecast, self.truth)
+        self.assertEqual(result, [(time, FORECAST_PERIOD) for time in TIMES])
+        self.assertEqual(plugin.available_times(FORECAST_PERIOD), TIMES)
+        self.assertEqual(plugin.units(), {"forecast": "K", "truth": "K"})
+        filename = os.path.join(
+            self.directory, "20151122T0700Z_14400_variance.npy")
+        expected = self.historic_forecast[-1].collapsed(
+            "realization", iris.analysis.VARIANCE).data
+        self.assertArrayAlmostEqual(np.load(filename), expected)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_days_not_rewritten(self):
+        """Test that only the days that are not already in the store are
+        added."""
+        plugin = Plugin(self.directory, 30)
+        plugin.add(self.historic_forecast[:3], self.truth)
+        result = plugin.add(self.historic_forecast, self.truth)
+        self.assertEqual(
+            result, [(time, FORECAST_PERIOD) for time in TIMES[3:]])
+        self.assertEqual(plugin.available_times(), TIMES)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_expired_days_removed(self):
+        """Test that days outside the training period are removed."""
+        plugin = Plugin(self.directory, 2)
+        plugin.add(self.historic_forecast, self.truth)
+        self.assertEqual(plugin.available_times(), TIMES[-2:])
+        self.assertEqual(
+            len(os.listdir(self.directory)), 2 * len(plugin.FIELDS) + 1)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES,
+        record=True)
+    def test_missing_truth(self, warning_list=None):
+        """Test that a warning is raised, and the day is not added, if the
+        truth is not available."""
+        plugin = Plugin(self.directory, 30)
+        result = plugin.add(self.historic_forecast, self.truth[1:])
+        self.assertEqual(
+            result, [(time, FORECAST_PERIOD) for time in TIMES[1:]])
+        msg = "as no truth data is available"
+        self.assertTrue(any(msg in str(item) for item in warning_list))
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_units_mismatch(self):
+        """Test that an error is raised if the units do not match those of
+        the store."""
+        plugin = Plugin(self.directory, 30)
+        plugin.add(self.historic_forecast[:3], self.truth)
+        self.historic_forecast.convert_units("degreesC")
+        msg = "do not match the units of the training store"
+        with self.assertRaisesRegex(ValueError, msg):
+            plugin.add(self.historic_forecast, self.truth)
+
+
+class Test_load(StoreTest):
+
+    """Test the load method."""
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_basic(self):
+        """Test that the training data is loaded as cubes on the grid of the
+        template."""
+        plugin = Plugin(self.directory, 30)
+        plugin.add(self.historic_forecast, self.truth)
+        forecast_mean, forecast_var, truth = plugin.load(
+            FORECAST_PERIOD, self.current_forecast)
+        for cube in [forecast_mean, forecast_var, truth]:
+            self.assertEqual(cube.shape, (5, 3, 3))
+            self.assertTrue(cube.has_lazy_data())
+            self.assertEqual(cube.name(), self.current_forecast.name())
+            self.assertEqual(cube.units, "K")
+            self.assertEqual(cube.coord("latitude"),
+                             self.current_forecast.coord("latitude"))
+        self.assertArrayAlmostEqual(
+            forecast_mean.data, self.historic_forecast.collapsed(
+                "realization", iris.analysis.MEAN).data)
+        self.assertArrayAlmostEqual(truth.data, self.truth.data)
+        self.assertEqual(
+            forecast_mean.coord("forecast_period").points, FORECAST_PERIOD)
+
+    @ManageWarnings(
+        ignored_messages=IGNORED_MESSAGES, warning_types=WARNING_TYPES)
+    def test_missing_data_masked(self):
+        """Test that NaNs held in the store are masked in the loaded
+        data."""
+        self.truth.data[0, 1, 1] = np.nan
+        plugin = Plugin(self.directory, 30)
+        plugin.add(self.historic_forecast, self.truth)
+        _, _, truth = plugin.load(FORECAST_PERIOD, self.current_forecast)
+        self.assertTrue(truth.has_lazy_data())
+        self.assertIsInstance(truth.data, np.ma.MaskedArray)
+        self.assertTrue(truth.data.mask[0, 1, 1])
+        self.assertEqual(truth.data.mask.sum(), 1)
+
+    def test_empty(self):
+        """Test that None is returned if the store holds no days for the
+        forecast period."""
+        plugin = Plugin(self.directory, 30)
+        self.assertIsNone(plugin.load(FORECAST_PERIOD, self.current_forecast))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -166,11 +166,11 @@ class Test__recycle_raw_ensemble_realizations(IrisTest):
         """
         data = np.array([[[[4., 4.625, 5.25],
                            [5.875, 6.5, 7.125],
-                           [7.75, 8.375, 9.]],
-                          [[6., 6.625, 7.25],
+                           [7.75, 8.375, 9.]]],
+                         [[[6., 6.625, 7.25],
                            [7.875, 8.5, 9.125],
-                           [9.75, 10.375, 11.]],
-                          [[4., 4.625, 5.25],
+                           [9.75, 10.375, 11.]]],
+                         [[[4., 4.625, 5.25],
                            [5.875, 6.5, 7.125],
                            [7.75, 8.375, 9.]]]])
         post_processed_forecast_percentiles = self.percentile_cube
@@ -193,8 +193,8 @@ class Test__recycle_raw_ensemble_realizations(IrisTest):
         """
         data = np.array([[[[4., 4.625, 5.25],
                            [5.875, 6.5, 7.125],
-                           [7.75, 8.375, 9.]],
-                          [[6., 6.625, 7.25],
+                           [7.75, 8.375, 9.]]],
+                         [[[6., 6.625, 7.25],
                            [7.875, 8.5, 9.125],
                            [9.75, 10.375, 11.]]]])
         post_processed_forecast_percentiles = self.percentile_cube
@@ -230,29 +230,29 @@ class Test__recycle_raw_ensemble_realizations(IrisTest):
 
         expected = np.array([[[[4., 4.625, 5.25],
                                [5.875, 6.5, 7.125],
-                               [7.75, 8.375, 9.]],
-                              [[6., 6.625, 7.25],
+                               [7.75, 8.375, 9.]]],
+                             [[[6., 6.625, 7.25],
                                [7.875, 8.5, 9.125],
-                               [9.75, 10.375, 11.]],
-                              [[4., 4.625, 5.25],
+                               [9.75, 10.375, 11.]]],
+                             [[[4., 4.625, 5.25],
                                [5.875, 6.5, 7.125],
-                               [7.75, 8.375, 9.]],
-                              [[6., 6.625, 7.25],
+                               [7.75, 8.375, 9.]]],
+                             [[[6., 6.625, 7.25],
                                [7.875, 8.5, 9.125],
-                               [9.75, 10.375, 11.]],
-                              [[4., 4.625, 5.25],
+                               [9.75, 10.375, 11.]]],
+                             [[[4., 4.625, 5.25],
                                [5.875, 6.5, 7.125],
-                               [7.75, 8.375, 9.]],
-                              [[6., 6.625, 7.25],
+                               [7.75, 8.375, 9.]]],
+                             [[[6., 6.625, 7.25],
                                [7.875, 8.5, 9.125],
-                               [9.75, 10.375, 11.]],
-                              [[4., 4.625, 5.25],
+                               [9.75, 10.375, 11.]]],
+                             [[[4., 4.625, 5.25],
                                [5.875, 6.5, 7.125],
-                               [7.75, 8.375, 9.]],
-                              [[6., 6.625, 7.25],
+                               [7.75, 8.375, 9.]]],
+                             [[[6., 6.625, 7.25],
                                [7.875, 8.5, 9.125],
-                               [9.75, 10.375, 11.]],
-                              [[4., 4.625, 5.25],
+                               [9.75, 10.375, 11.]]],
+                             [[[4., 4.625, 5.25],
                                [5.875, 6.5, 7.125],
                                [7.75, 8.375, 9.]]]])
         post_processed_forecast_percentiles = self.percentile_cube
@@ -264,6 +264,27 @@ class Test__recycle_raw_ensemble_realizations(IrisTest):
             self.perc_coord)
         self.assertArrayAlmostEqual(expected, result.data)
 
+    def test_coordinates_retained(self):
+        """
+        Test that the recycled raw forecast keeps the realization dimension
+        in its original position, and keeps the other coordinates of the
+        raw forecast.
+        """
+        post_processed_forecast_percentiles = self.percentile_cube
+        raw_forecast_realizations = self.realization_cube[:2, :, :, :]
+        plu = Plugin()
+        result = plu._recycle_raw_ensemble_realizations(
+            post_processed_forecast_percentiles, raw_forecast_realizations,
+            self.perc_coord)
+        self.assertEqual(result.coord_dims("realization"), (0,))
+        self.assertEqual(result.shape, (3, 1, 3, 3))
+        for coord in raw_forecast_realizations.coords():
+            if coord.name() != "realization":
+                self.assertEqual(result.coord(coord.name()), coord)
+                self.assertEqual(
+                    result.coord_dims(coord.name()),
+                    raw_forecast_realizations.coord_dims(coord))
+
 
 class Test_rank_ecc(IrisTest):
 
@@ -563,6 +584,52 @@ class Test_rank_ecc(IrisTest):
             np.array_equal(aresult, result.data) for aresult in permutations]
         self.assertIn(True, matches)
 
+    def test_many_realizations(self):
+        """
+        Test that the plugin returns the correct cube data when there are
+        more than 32 realizations, which is the limit of np.choose.
+        """
+        raw_data = np.arange(44, dtype=np.float32)[::-1].reshape(44, 1)
+        calibrated_data = np.arange(44, dtype=np.float32).reshape(44, 1)
+        cube = set_up_cube(
+            np.zeros((44, 1, 1, 1), dtype=np.float32), "air_temperature",
+            "K", realizations=np.arange(44), y_dimension_length=1,
+            x_dimension_length=1)[:, :, 0, 0]
+        raw_cube = cube.copy(data=raw_data)
+        calibrated_cube = cube.copy(data=calibrated_data)
+
+        plugin = Plugin()
+        result = plugin.rank_ecc(calibrated_cube, raw_cube)
+        self.assertArrayAlmostEqual(result.data, raw_data)
+
+    def test_multiple_times_random_seed(self):
+        """
+        Test that the plugin reorders every time in a single call, and that
+        the tied values are split reproducibly when a random seed is given.
+        """
+        raw_data = np.array([[[[1, 1]]], [[[3, 2]]], [[[2, 2]]]])
+        raw_data = np.concatenate([raw_data, raw_data[::-1]], axis=1)
+        calibrated_data = np.array([[[[1, 1]]], [[[2, 2]]], [[[3, 3]]]])
+        calibrated_data = np.concatenate(
+            [calibrated_data, calibrated_data], axis=1)
+        cube = set_up_cube(
+            np.zeros((3, 2, 1, 2), dtype=np.float32), "air_temperature", "K",
+            timesteps=2, y_dimension_length=1, x_dimension_length=2)
+        raw_cube = cube.copy(data=raw_data)
+        calibrated_cube = cube.copy(data=calibrated_data)
+
+        plugin = Plugin()
+        result = plugin.rank_ecc(calibrated_cube, raw_cube, random_seed=0)
+        repeated = plugin.rank_ecc(calibrated_cube, raw_cube, random_seed=0)
+        self.assertArrayEqual(result.data, repeated.data)
+        self.assertArrayEqual(result.data[:, 0, 0, 0], [1, 3, 2])
+        self.assertArrayEqual(result.data[:, 1, 0, 0], [2, 3, 1])
+        # The raw data for each time is tied at the second grid point, so
+        # any ordering of the values is allowed.
+        for time in range(2):
+            self.assertArrayEqual(
+                np.sort(result.data[:, time, 0, 1]), [1, 2, 3])
+
 
 class Test_process(IrisTest):
 
@@ -51,11 +51,23 @@ class Test__repr__(IrisTest):
 
     def test_basic(self):
         """Test string representation"""
-        expected_string = "<GenerateProbabilitiesFromMeanAndVariance>"
+        expected_string = ("<GenerateProbabilitiesFromMeanAndVariance: "
+                           "max_memory_in_bytes: 67108864; n_workers: 1>")
         result = str(Plugin())
         self.assertEqual(result, expected_string)
 
 
+class Test__init__(IrisTest):
+
+    """Test the initialisation of the plugin."""
+
+    def test_invalid_n_workers(self):
+        """Test that an error is raised for fewer than one worker."""
+        msg = "Invalid number of workers"
+        with self.assertRaisesRegex(ValueError, msg):
+            Plugin(n_workers=0)
+
+
 class Test__check_template_cube(IrisTest):
 
     """Test the _check_template_cube function."""
@@ -180,6 +192,30 @@ class Test__mean_and_variance_to_probabilities(IrisTest):
             self.means, self.variances, self.template_cube)
         np.testing.assert_allclose(result.data, expected, rtol=1.e-4)
 
+    def test_chunks_and_workers(self):
+        """Test that the same probabilities are returned when the points are
+        split into chunks that are processed by several threads."""
+
+        self.means.data = np.linspace(5, 15, 9).reshape(3, 3)
+        self.variances.data = np.linspace(1, 9, 9).reshape(3, 3)
+        expected = Plugin()._mean_and_variance_to_probabilities(
+            self.means, self.variances, self.template_cube)
+        plugin = Plugin(max_memory_in_bytes=1, n_workers=2)
+        result = plugin._mean_and_variance_to_probabilities(
+            self.means, self.variances, self.template_cube)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayEqual(result.data, expected.data)
+
+    def test_non_positive_variance(self):
+        """Test that the probabilities are NaN where the variance is not
+        positive, as for scipy.stats.norm."""
+
+        self.variances.data[0, 0] = 0.
+        result = Plugin()._mean_and_variance_to_probabilities(
+            self.means, self.variances, self.template_cube)
+        self.assertTrue(np.isnan(result.data[:, 0, 0]).all())
+        self.assertFalse(np.isnan(result.data[:, 1:, 1:]).any())
+
 
 class Test_process(IrisTest):
 
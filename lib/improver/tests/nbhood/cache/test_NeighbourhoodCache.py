@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the nbhood.cache.NeighbourhoodCache plugin."""
+
+
+import unittest
+
+from iris.tests import IrisTest
+import numpy as np
+
+from improver.nbhood.cache import NeighbourhoodCache
+from improver.tests.nbhood.nbhood.test_BaseNeighbourhoodProcessing import (
+    set_up_cube)
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(NeighbourhoodCache(max_entries=4))
+        msg = ('<NeighbourhoodCache: max_entries: 4, entries: 0, '
+               'hits: 0, misses: 0>')
+        self.assertEqual(result, msg)
+
+
+class Test_get(IrisTest):
+
+    """Test the get method."""
+
+    def test_reuse(self):
+        """Test that a value is only calculated once for each key."""
+        calls = []
+
+        def function(value, offset=0):
+            """Record the call and return the value."""
+            calls.append(value)
+            return value + offset
+
+        cache = NeighbourhoodCache()
+        self.assertEqual(cache.get(("a",), function, 1, offset=1), 2)
+        self.assertEqual(cache.get(("a",), function, 1, offset=1), 2)
+        self.assertEqual(cache.get(("b",), function, 3), 3)
+        self.assertEqual(calls, [1, 3])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_least_recently_used_discarded(self):
+        """Test that the least recently used value is discarded when the
+        maximum number of entries is exceeded."""
+        cache = NeighbourhoodCache(max_entries=2)
+        cache.get(("a",), lambda: 1)
+        cache.get(("b",), lambda: 2)
+        cache.get(("a",), lambda: 1)
+        cache.get(("c",), lambda: 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(("a",), lambda: None), 1)
+        self.assertIsNone(cache.get(("b",), lambda: None))
+
+    def test_clear(self):
+        """Test that clear discards all values."""
+        cache = NeighbourhoodCache()
+        cache.get(("a",), lambda: 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class Test_array_key(IrisTest):
+
+    """Test the array_key method."""
+
+    def test_basic(self):
+        """Test that arrays with the same values give the same key, and
+        arrays with different values, shapes or types do not."""
+        array = np.arange(6.).reshape(2, 3)
+        key = NeighbourhoodCache.array_key(array)
+        self.assertEqual(NeighbourhoodCache.array_key(array.copy()), key)
+        self.assertNotEqual(
+            NeighbourhoodCache.array_key(array + 1.), key)
+        self.assertNotEqual(
+            NeighbourhoodCache.array_key(array.reshape(3, 2)), key)
+        self.assertNotEqual(
+            NeighbourhoodCache.array_key(array.astype(np.float32)), key)
+
+
+class Test_grid_cells(IrisTest):
+
+    """Test the grid_cells method."""
+
+    def test_basic(self):
+        """Test that the number of grid cells is returned, and reused for
+        another cube on the same grid."""
+        cube = set_up_cube()
+        cache = NeighbourhoodCache()
+        self.assertEqual(cache.grid_cells(cube, 4000.), (2, 2))
+        self.assertEqual(cache.grid_cells(cube.copy(), 4000.), (2, 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_different_grid(self):
+        """Test that the number of grid cells is recalculated for a
+        different grid."""
+        cube = set_up_cube()
+        other_cube = cube.copy()
+        other_cube.coord("projection_x_coordinate").points = (
+            2. * cube.coord("projection_x_coordinate").points)
+        cache = NeighbourhoodCache()
+        self.assertEqual(cache.grid_cells(cube, 4000.), (2, 2))
+        self.assertEqual(cache.grid_cells(other_cube, 4000.), (1, 2))
+
+    def test_error_not_held(self):
+        """Test that an invalid distance raises an error each time."""
+        cube = set_up_cube()
+        cache = NeighbourhoodCache()
+        msg = "Distance of 100.0m gives zero cell extent"
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, msg):
+                cache.grid_cells(cube, 100.)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,8 +36,10 @@ import unittest
 from iris.cube import Cube
 from iris.tests import IrisTest
 import numpy as np
+import scipy.ndimage
 
-from improver.nbhood.circular_kernel import CircularNeighbourhood
+from improver.nbhood.circular_kernel import (
+    CircularNeighbourhood, circular_kernel)
 from improver.tests.nbhood.nbhood.test_BaseNeighbourhoodProcessing import (
     SINGLE_POINT_RANGE_2_CENTROID_FLAT, SINGLE_POINT_RANGE_3_CENTROID,
     SINGLE_POINT_RANGE_5_CENTROID, set_up_cube)
@@ -68,6 +70,97 @@ class Test__repr__(IrisTest):
         self.assertEqual(str(result), msg)
 
 
+class Test_select_engine(IrisTest):
+
+    """Test the choice of method used to apply the kernel."""
+
+    def setUp(self):
+        """Set up a data array."""
+        self.data = np.ones((2, 200, 200), dtype=np.float32)
+
+    def test_small_kernel(self):
+        """Test that direct correlation is chosen for a small kernel."""
+        kernel = circular_kernel([1, 1], (1, 1), weighted_mode=True)
+        result = CircularNeighbourhood.select_engine(self.data, kernel)
+        self.assertEqual(result, "direct")
+
+    def test_unweighted_kernel(self):
+        """Test that summing spans of rows is chosen for a moderate kernel
+        with constant weighting."""
+        kernel = circular_kernel([5, 5], (5, 5), weighted_mode=False)
+        result = CircularNeighbourhood.select_engine(self.data, kernel)
+        self.assertEqual(result, "row_span")
+
+    def test_large_kernel(self):
+        """Test that FFT convolution is chosen for large kernels."""
+        for weighted_mode in [True, False]:
+            kernel = circular_kernel(
+                [20, 20], (20, 20), weighted_mode=weighted_mode)
+            result = CircularNeighbourhood.select_engine(self.data, kernel)
+            self.assertEqual(result, "fft")
+
+    def test_integer_data(self):
+        """Test that direct correlation is chosen for integer data."""
+        kernel = circular_kernel([20, 20], (20, 20), weighted_mode=True)
+        result = CircularNeighbourhood.select_engine(
+            self.data.astype(int), kernel)
+        self.assertEqual(result, "direct")
+
+
+class Test_has_constant_weighting(IrisTest):
+
+    """Test the check for a kernel with constant weighting."""
+
+    def test_basic(self):
+        """Test that only an unweighted kernel has constant weighting."""
+        for weighted_mode in [True, False]:
+            kernel = circular_kernel([3, 3], (3, 3),
+                                     weighted_mode=weighted_mode)
+            self.assertEqual(
+                CircularNeighbourhood.has_constant_weighting(kernel),
+                not weighted_mode)
+
+
+class Test_correlate_by_row_spans(IrisTest):
+
+    """Test applying a kernel by summing spans of rows."""
+
+    def test_basic(self):
+        """Test that the result matches direct correlation, including
+        points near the edge of the domain."""
+        data = np.random.RandomState(0).rand(2, 12, 10)
+        kernel = circular_kernel([3, 3], (3, 3), weighted_mode=False)
+        expected = np.array([scipy.ndimage.correlate(
+            data_slice, kernel, mode='nearest') for data_slice in data])
+        result = CircularNeighbourhood.correlate_by_row_spans(data, kernel)
+        self.assertArrayAlmostEqual(result, expected)
+
+
+class Test_correlate_by_fft(IrisTest):
+
+    """Test applying a kernel by FFT convolution."""
+
+    def test_basic(self):
+        """Test that the result matches direct correlation for a kernel
+        larger than the domain."""
+        data = np.random.RandomState(0).rand(2, 12, 10)
+        kernel = circular_kernel([7, 7], (7, 7), weighted_mode=True)
+        expected = np.array([scipy.ndimage.correlate(
+            data_slice, kernel, mode='nearest') for data_slice in data])
+        result = CircularNeighbourhood().correlate_by_fft(data, kernel)
+        self.assertArrayAlmostEqual(result, expected)
+
+    def test_zeros_preserved(self):
+        """Test that points with no non-zero values within the kernel are
+        exactly zero."""
+        data = np.zeros((1, 40, 40))
+        data[0, :5, :5] = 1.
+        kernel = circular_kernel([5, 5], (5, 5), weighted_mode=True)
+        result = CircularNeighbourhood().correlate_by_fft(data, kernel)
+        self.assertTrue(np.all(result[0, 15:, 15:] == 0.))
+        self.assertTrue(np.all(result[0, :5, :5] > 0.))
+
+
 class Test_apply_circular_kernel(IrisTest):
 
     """Test neighbourhood circular probabilities plugin."""
@@ -316,6 +409,66 @@ class Test_apply_circular_kernel(IrisTest):
                 weighted_mode=True).apply_circular_kernel(cube, ranges))
         self.assertArrayAlmostEqual(result.data, expected)
 
+    def test_engines_match(self):
+        """Test that the same result is obtained whichever method is used
+        to apply the kernel, for a cube with multiple times."""
+        cube = set_up_cube(
+            zero_point_indices=[(0, 0, 10, 10), (0, 1, 7, 7)],
+            num_time_points=2)
+        cube.data = np.random.RandomState(0).rand(
+            *cube.shape).astype(np.float32)
+        ranges = (4, 4)
+        for weighted_mode in [True, False]:
+            plugin = CircularNeighbourhood(weighted_mode=weighted_mode)
+            expected = plugin.apply_circular_kernel(
+                cube.copy(), ranges, engine="direct")
+            engines = ["fft"] if weighted_mode else ["fft", "row_span"]
+            for engine in engines:
+                result = plugin.apply_circular_kernel(
+                    cube.copy(), ranges, engine=engine)
+                self.assertEqual(result.dtype, np.float32)
+                self.assertArrayAlmostEqual(result.data, expected.data)
+
+    def test_tiled(self):
+        """Test that applying the kernel in tiles, skipping tiles in which
+        the data are constant, gives the same result as applying the kernel
+        to the whole cube."""
+        cube = set_up_cube(
+            zero_point_indices=[(0, 0, 1, 17), (0, 1, 7, 7)],
+            num_time_points=2, num_grid_points=20)
+        ranges = (3, 3)
+        for sum_or_fraction in ["fraction", "sum"]:
+            expected = CircularNeighbourhood(
+                sum_or_fraction=sum_or_fraction).apply_circular_kernel(
+                    cube.copy(), ranges)
+            plugin = CircularNeighbourhood(
+                sum_or_fraction=sum_or_fraction, tile_size=4)
+            result = plugin.apply_circular_kernel(cube.copy(), ranges)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertArrayAlmostEqual(result.data, expected.data)
+            self.assertLess(plugin.tiler.statistics()["active_fraction"], 1.)
+
+    def test_invalid_engine(self):
+        """Test that an error is raised for an unknown engine."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_time_points=1,
+            num_grid_points=5)
+        msg = "The engine requested: nonsense is not a supported engine"
+        with self.assertRaisesRegex(ValueError, msg):
+            CircularNeighbourhood().apply_circular_kernel(
+                cube, (2, 2), engine="nonsense")
+
+    def test_row_span_weighted_kernel(self):
+        """Test that an error is raised if summing spans of rows is requested
+        for a kernel that does not have constant weighting."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_time_points=1,
+            num_grid_points=5)
+        msg = "The 'row_span' engine can only be used with a kernel"
+        with self.assertRaisesRegex(ValueError, msg):
+            CircularNeighbourhood(weighted_mode=True).apply_circular_kernel(
+                cube, (2, 2), engine="row_span")
+
 
 class Test_run(IrisTest):
 
@@ -42,7 +42,7 @@ import numpy as np
 
 from improver.constants import DEFAULT_PERCENTILES
 from improver.nbhood.circular_kernel import (
-    GeneratePercentilesFromACircularNeighbourhood)
+    GeneratePercentilesFromACircularNeighbourhood, circular_kernel)
 from improver.tests.nbhood.nbhood.test_BaseNeighbourhoodProcessing import (
     set_up_cube, set_up_cube_lat_long)
 
@@ -311,6 +311,91 @@ class Test_pad_and_unpad_cube(IrisTest):
                     slice_2d, kernel))
         self.assertArrayAlmostEqual(result.data, expected)
 
+    def test_memory_limit(self):
+        """Test that the same percentiles are returned when the memory
+        available only allows one row to be processed at a time."""
+        data = np.random.RandomState(0).rand(7, 7).astype(np.float32)
+        slice_2d = set_up_cube(
+            zero_point_indices=((0, 0, 3, 3),),
+            num_grid_points=7)[0, 0].copy(data=data)
+        kernel = circular_kernel(np.array([2, 2]), (2, 2), False)
+        expected = GeneratePercentilesFromACircularNeighbourhood(
+            ).pad_and_unpad_cube(slice_2d, kernel)
+        result = GeneratePercentilesFromACircularNeighbourhood(
+            max_memory_in_bytes=1).pad_and_unpad_cube(slice_2d, kernel)
+        self.assertEqual(result.data.dtype, np.float32)
+        self.assertArrayEqual(result.data, expected.data)
+
+
+class Test_use_order_statistics(IrisTest):
+
+    """Test the choice of whether to calculate percentiles from counts."""
+
+    def setUp(self):
+        """Set up the neighbourhood offsets."""
+        self.ranges_xy = np.array([2, 2])
+        kernel = circular_kernel(self.ranges_xy, (2, 2), False)
+        self.offsets = [
+            (y_offset - 2, x_offset - 2)
+            for y_offset, x_offset in zip(*np.nonzero(kernel))]
+        self.plugin = GeneratePercentilesFromACircularNeighbourhood()
+
+    def test_binary(self):
+        """Test that counts are used for binary data."""
+        padded = np.zeros((7, 7), dtype=np.float32)
+        padded[3, 3] = 1.
+        self.assertTrue(self.plugin.use_order_statistics(
+            padded, self.offsets, self.ranges_xy, 1))
+
+    def test_many_values(self):
+        """Test that counts are not used for data with many distinct
+        values."""
+        padded = np.arange(49, dtype=np.float32).reshape(7, 7)
+        self.assertFalse(self.plugin.use_order_statistics(
+            padded, self.offsets, self.ranges_xy, 1))
+
+    def test_irregular_kernel(self):
+        """Test that counts are not used if a row of the neighbourhood does
+        not include the centre."""
+        padded = np.zeros((7, 7), dtype=np.float32)
+        offsets = [(-1, 0), (0, -1), (0, 1), (1, 1)]
+        self.assertFalse(self.plugin.use_order_statistics(
+            padded, offsets, self.ranges_xy, 1))
+
+    def test_nan(self):
+        """Test that counts are not used for data containing NaNs."""
+        padded = np.zeros((7, 7), dtype=np.float32)
+        padded[3, 3] = np.nan
+        self.assertFalse(self.plugin.use_order_statistics(
+            padded, self.offsets, self.ranges_xy, 1))
+
+
+class Test_percentiles_from_ranked_counts(IrisTest):
+
+    """Test the calculation of percentiles from counts of ranked values."""
+
+    def test_matches_row_bands(self):
+        """Test that the percentiles match those calculated from the values
+        within each neighbourhood, including points where the percentiles
+        lie between differing values."""
+        ranges_xy = np.array([2, 2])
+        kernel = circular_kernel(ranges_xy, (2, 2), False)
+        padded = np.zeros((14, 14), dtype=np.float32)
+        padded[4:8, 5:9] = 1.
+        padded[9, 3] = 0.5
+        offsets = [
+            (y_offset - 2, x_offset - 2)
+            for y_offset, x_offset in zip(*np.nonzero(kernel))]
+        percentiles = np.array([0, 10, 25, 50, 75, 90, 100],
+                               dtype=np.float32)
+        plugin = GeneratePercentilesFromACircularNeighbourhood()
+        expected = plugin.percentiles_over_row_bands(
+            padded, offsets, ranges_xy, (10, 10), percentiles)
+        result = plugin.percentiles_from_ranked_counts(
+            padded, offsets, ranges_xy, (10, 10), percentiles)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayEqual(result, expected)
+
 
 class Test_run(IrisTest):
 
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the nbhood.mask_areas.GenerateNeighbourhoodMaskAreas
+plugin."""
+
+
+import unittest
+
+import iris
+from iris.tests import IrisTest
+import numpy as np
+
+from improver.nbhood.mask_areas import (
+    GenerateNeighbourhoodMaskAreas, NeighbourhoodMaskAreas)
+from improver.nbhood.square_kernel import SquareNeighbourhood
+from improver.tests.nbhood.nbhood.test_BaseNeighbourhoodProcessing import (
+    set_up_cube)
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(GenerateNeighbourhoodMaskAreas([2000, 4000]))
+        msg = '<GenerateNeighbourhoodMaskAreas: radii: [2000.0, 4000.0]>'
+        self.assertEqual(result, msg)
+
+
+class Test_process(IrisTest):
+
+    """Test the calculation of the neighbourhood areas of a mask."""
+
+    def test_basic(self):
+        """Test that the areas are calculated for each radius, in the same
+        way as for square neighbourhood processing."""
+        mask_cube = iris.util.squeeze(set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (0, 0, 3, 3)),
+            num_grid_points=7))
+        result = GenerateNeighbourhoodMaskAreas(
+            [2000, 4000]).process(mask_cube)
+        self.assertIsInstance(result, NeighbourhoodMaskAreas)
+        self.assertArrayEqual(result.mask, mask_cube.data)
+        self.assertEqual(sorted(result.areas), [(1, 1), (2, 2)])
+        for cells in [1, 2]:
+            expected = SquareNeighbourhood().calculate_neighbourhood_area(
+                mask_cube.data[np.newaxis], cells, cells)[0]
+            self.assertArrayEqual(result.areas[(cells, cells)], expected)
+
+    def test_transposed(self):
+        """Test that the mask is stored with y as the first dimension."""
+        mask_cube = iris.util.squeeze(set_up_cube(
+            zero_point_indices=((0, 0, 2, 3),), num_grid_points=7))
+        expected = mask_cube.data.copy()
+        mask_cube.transpose()
+        result = GenerateNeighbourhoodMaskAreas([2000]).process(mask_cube)
+        self.assertArrayEqual(result.mask, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the nbhood.mask_areas.NeighbourhoodMaskAreas class."""
+
+
+import shutil
+import tempfile
+import unittest
+
+from iris.tests import IrisTest
+import numpy as np
+
+from improver.nbhood.mask_areas import (
+    NeighbourhoodMaskAreas, load_mask_areas, save_mask_areas)
+from improver.nbhood.square_kernel import SquareNeighbourhood
+
+
+def set_up_mask_areas():
+    """Set up a land mask and its neighbourhood areas for a neighbourhood
+    of one grid cell in each direction."""
+    mask = np.zeros((5, 6), dtype=np.int64)
+    mask[1:3, 2:5] = 1
+    area = SquareNeighbourhood().calculate_neighbourhood_area(
+        mask[np.newaxis], 1, 1)[0]
+    return NeighbourhoodMaskAreas(mask, {(1, 1): area})
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(set_up_mask_areas())
+        msg = '<NeighbourhoodMaskAreas: shape: (5, 6), grid_cells: [(1, 1)]>'
+        self.assertEqual(result, msg)
+
+
+class Test_neighbourhood_area(IrisTest):
+
+    """Test the lookup of the neighbourhood area of a mask."""
+
+    def setUp(self):
+        """Set up the mask areas."""
+        self.mask_areas = set_up_mask_areas()
+        self.mask = self.mask_areas.mask
+
+    def test_mask(self):
+        """Test that the area of the precomputed mask is returned."""
+        expected = SquareNeighbourhood().calculate_neighbourhood_area(
+            self.mask[np.newaxis], 1, 1)[0]
+        result = self.mask_areas.neighbourhood_area(self.mask, 1, 1)
+        self.assertArrayEqual(result, expected)
+
+    def test_complement(self):
+        """Test that the area of the complement of the precomputed mask,
+        such as a sea mask for a land mask, is found from the precomputed
+        area."""
+        sea_mask = np.logical_not(self.mask).astype(int)
+        expected = SquareNeighbourhood().calculate_neighbourhood_area(
+            sea_mask[np.newaxis], 1, 1)[0]
+        result = self.mask_areas.neighbourhood_area(sea_mask, 1, 1)
+        self.assertArrayEqual(result, expected)
+
+    def test_other_mask(self):
+        """Test that None is returned for a different mask."""
+        mask = self.mask.copy()
+        mask[0, 0] = 1
+        self.assertIsNone(self.mask_areas.neighbourhood_area(mask, 1, 1))
+
+    def test_other_grid_cells(self):
+        """Test that None is returned for a neighbourhood size for which
+        the areas were not precomputed."""
+        self.assertIsNone(self.mask_areas.neighbourhood_area(self.mask, 2, 1))
+
+
+class Test_save_and_load(IrisTest):
+
+    """Test saving and loading the mask areas."""
+
+    def setUp(self):
+        """Create a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        """Test that the loaded mask areas match the saved mask areas, and
+        are memory-mapped."""
+        mask_areas = set_up_mask_areas()
+        save_mask_areas(mask_areas, self.directory)
+        result = load_mask_areas(self.directory)
+        self.assertArrayEqual(result.mask, mask_areas.mask)
+        self.assertEqual(list(result.areas), [(1, 1)])
+        self.assertArrayEqual(result.areas[(1, 1)], mask_areas.areas[(1, 1)])
+        self.assertIsInstance(result.mask, np.memmap)
+        self.assertIsInstance(result.areas[(1, 1)], np.memmap)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -279,6 +279,15 @@ class Test__init__(IrisTest):
             neighbourhood_method = CircularNeighbourhood()
             NBHood(neighbourhood_method, radii, lead_times=lead_times)
 
+    def test_n_workers(self):
+        """Test that the number of workers is stored, and that the desired
+        error message is raised if it is less than 1."""
+        plugin = NBHood(CircularNeighbourhood(), 2000, n_workers=3)
+        self.assertEqual(plugin.n_workers, 3)
+        msg = "Invalid number of workers: must be >= 1: 0"
+        with self.assertRaisesRegex(ValueError, msg):
+            NBHood(CircularNeighbourhood(), 2000, n_workers=0)
+
 
 class Test__repr__(IrisTest):
 
@@ -301,6 +310,41 @@ class Test__repr__(IrisTest):
         self.assertEqual(result, msg)
 
 
+class Test__group_time_slices(IrisTest):
+
+    """Test the grouping of time slices that require the same number of grid
+    cells."""
+
+    def setUp(self):
+        """Set up a cube with four times."""
+        self.cube = set_up_cube(num_time_points=4)[0]
+        iris.util.promote_aux_coord_to_dim_coord(self.cube, "time")
+
+    def test_basic(self):
+        """Test that consecutive times with radii that give the same number
+        of grid cells are grouped together."""
+        radii = np.array([2000., 2500., 4000., 2000.])
+        plugin = NBHood(CircularNeighbourhood(), list(radii), [1, 2, 3, 4])
+        result = plugin._group_time_slices(self.cube, radii)
+        self.assertEqual([group.shape for group, _ in result],
+                         [(2, 16, 16), (16, 16), (16, 16)])
+        self.assertArrayEqual(
+            result[0][0].coord("time").points,
+            self.cube.coord("time").points[:2])
+        self.assertEqual([radius for _, radius in result],
+                         [2000., 4000., 2000.])
+
+    def test_no_cache(self):
+        """Test that each time is processed separately if the neighbourhood
+        method does not have a cache."""
+        radii = np.array([2000., 2000., 2000., 2000.])
+        plugin = NBHood(CircularNeighbourhood(), list(radii), [1, 2, 3, 4])
+        plugin.neighbourhood_method.cache = None
+        result = plugin._group_time_slices(self.cube, radii)
+        self.assertEqual([group.shape for group, _ in result],
+                         [(16, 16)] * 4)
+
+
 class Test__find_radii(IrisTest):
 
     """Test the internal _find_radii function is working correctly."""
@@ -647,6 +691,43 @@ class Test_process(IrisTest):
             cube, mask_cube)
         self.assertArrayAlmostEqual(result.data, expected)
 
+    def test_n_workers_radii_varying_with_lead_time(self):
+        """Test that using several workers gives the same cube as processing
+        each realization and time in turn, when the radius varies with lead
+        time."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (1, 1, 3, 3), (1, 2, 1, 1)),
+            num_time_points=3, num_realization_points=2)
+        iris.util.promote_aux_coord_to_dim_coord(cube, "time")
+        cube = add_forecast_reference_time_and_forecast_period(
+            cube, time_point=cube.coord("time").points, fp_point=[2, 3, 4])
+        radii = [2000, 2000, 6000]
+        lead_times = [2, 3, 4]
+        expected = NBHood(
+            CircularNeighbourhood(), radii, lead_times).process(cube.copy())
+        result = NBHood(
+            CircularNeighbourhood(), radii, lead_times,
+            n_workers=3).process(cube.copy())
+        self.assertEqual(result, expected)
+
+    def test_n_workers_mask_cube(self):
+        """Test that using several workers gives the same masked cube as
+        processing each realization in turn, when a mask cube is used."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (1, 0, 1, 3)),
+            num_grid_points=5, num_realization_points=2)
+        cube = iris.util.squeeze(cube)
+        mask_cube = cube[0].copy()
+        mask_cube.data = np.ones((5, 5))
+        mask_cube.data[1:3, 1] = 0.
+        neighbourhood_method = SquareNeighbourhood(re_mask=True)
+        expected = NBHood(neighbourhood_method, 2000).process(
+            cube.copy(), mask_cube)
+        result = NBHood(neighbourhood_method, 2000, n_workers=2).process(
+            cube.copy(), mask_cube)
+        self.assertEqual(result, expected)
+        self.assertArrayEqual(result.data.mask, expected.data.mask)
+
 
 if __name__ == '__main__':
     unittest.main()
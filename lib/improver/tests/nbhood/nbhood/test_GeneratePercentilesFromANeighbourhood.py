@@ -111,6 +111,20 @@ class Test_process(IrisTest):
                         percentiles=percentiles).process(self.cube)
         self.assertIsInstance(result, Cube)
 
+    def test_n_workers(self):
+        """Test that the percentiles are the same if several workers are
+        used."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (1, 0, 1, 1)),
+            num_grid_points=5, num_realization_points=2)
+        percentiles = (25, 50, 75)
+        expected = NBHood(
+            'circular', 4000, percentiles=percentiles).process(cube.copy())
+        result = NBHood(
+            'circular', 4000, percentiles=percentiles,
+            n_workers=2).process(cube.copy())
+        self.assertEqual(result, expected)
+
 
 if __name__ == '__main__':
     unittest.main()
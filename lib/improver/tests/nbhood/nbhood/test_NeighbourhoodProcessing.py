@@ -33,10 +33,13 @@
 
 import unittest
 
+import iris
 from iris.cube import Cube
 from iris.tests import IrisTest
 import numpy as np
 
+from improver.nbhood.mask_areas import (
+    GenerateNeighbourhoodMaskAreas, NeighbourhoodMaskAreas)
 from improver.nbhood.nbhood import NeighbourhoodProcessing as NBHood
 from improver.tests.nbhood.nbhood.test_BaseNeighbourhoodProcessing import (
     set_up_cube)
@@ -65,6 +68,14 @@ class Test__init__(IrisTest):
         with self.assertRaisesRegex(KeyError, msg):
             NBHood(neighbourhood_method, radii)
 
+    def test_mask_areas_circular(self):
+        """Test that a ValueError is raised if precomputed mask areas are
+        supplied for the circular neighbourhood method."""
+        mask_areas = NeighbourhoodMaskAreas(np.ones((5, 5)), {})
+        msg = 'Precomputed mask areas are only supported'
+        with self.assertRaisesRegex(ValueError, msg):
+            NBHood('circular', 10000, mask_areas=mask_areas)
+
 
 class Test__repr__(IrisTest):
 
@@ -134,6 +145,47 @@ class Test_process(IrisTest):
         self.assertIsInstance(result, Cube)
         self.assertArrayAlmostEqual(result.data, expected)
 
+    def test_n_workers(self):
+        """Test that the neighbourhood processing gives the same result if
+        several workers are used."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (1, 0, 1, 1)),
+            num_grid_points=5, num_realization_points=2)
+        expected = NBHood('circular', 4000).process(cube.copy())
+        result = NBHood('circular', 4000, n_workers=2).process(cube.copy())
+        self.assertEqual(result, expected)
+
+    def test_tile_size(self):
+        """Test that the tile size is passed to the neighbourhood method and
+        that processing in tiles gives the same result."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_grid_points=16)
+        expected = NBHood('square', 4000).process(cube.copy())
+        plugin = NBHood('square', 4000, tile_size=4)
+        result = plugin.process(cube.copy())
+        self.assertEqual(plugin.neighbourhood_method.tiler.tile_size, 4)
+        self.assertArrayAlmostEqual(result.data, expected.data)
+
+    def test_mask_areas(self):
+        """Test that using the precomputed areas of a land mask gives the
+        same result for both the land mask and the sea mask."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_grid_points=7)
+        land_only = iris.util.squeeze(cube.copy())
+        land_only.data = np.zeros((7, 7), dtype=np.int64)
+        land_only.data[1:4, 2:6] = 1
+        sea_only = land_only.copy(data=1 - land_only.data)
+        mask_areas = GenerateNeighbourhoodMaskAreas([2000]).process(
+            land_only)
+        for mask_cube in [land_only, sea_only]:
+            expected = NBHood('square', 2000, re_mask=True).process(
+                cube.copy(), mask_cube)
+            result = NBHood(
+                'square', 2000, re_mask=True, mask_areas=mask_areas).process(
+                    cube.copy(), mask_cube)
+            self.assertArrayEqual(result.data.mask, expected.data.mask)
+            self.assertArrayAlmostEqual(result.data, expected.data)
+
 
 if __name__ == '__main__':
     unittest.main()
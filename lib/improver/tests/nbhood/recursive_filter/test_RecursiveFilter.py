@@ -38,7 +38,8 @@ import numpy as np
 from improver.nbhood.recursive_filter import RecursiveFilter
 from improver.utilities.cube_manipulation import enforce_coordinate_ordering
 from improver.utilities.pad_spatial import pad_cube_with_halo
-from improver.tests.set_up_test_cubes import set_up_variable_cube
+from improver.tests.set_up_test_cubes import (
+    add_coordinate, set_up_variable_cube)
 
 
 class Test__repr__(IrisTest):
@@ -131,6 +132,19 @@ class Test__init__(Test_RecursiveFilter):
             RecursiveFilter(alpha_x=None, alpha_y=None,
                             iterations=iterations, edge_width=1)
 
+    def test_engine(self):
+        """Test when an unsupported engine is given (invalid)."""
+        msg = "The engine requested: fast is not a supported engine"
+        with self.assertRaisesRegex(ValueError, msg):
+            RecursiveFilter(engine="fast")
+
+    def test_n_workers(self):
+        """Test when a number of workers less than unity is given
+        (invalid)."""
+        msg = "Invalid number of workers: must be >= 1: 0"
+        with self.assertRaisesRegex(ValueError, msg):
+            RecursiveFilter(n_workers=0)
+
 
 class Test__set_alphas(Test_RecursiveFilter):
 
@@ -252,6 +266,59 @@ class Test__recurse_backward(Test_RecursiveFilter):
         self.assertArrayAlmostEqual(result, expected_result)
 
 
+class Test__recurse_batched(Test_RecursiveFilter):
+
+    """Test the _recurse_batched method"""
+
+    def test_forward(self):
+        """Test that each slice of a stack is filtered in the same way as
+        by _recurse_forward along each axis."""
+        data = np.stack([self.cube.data[0], self.cube.data[0].T])
+        for axis in [0, 1]:
+            expected = np.stack([
+                RecursiveFilter._recurse_forward(
+                    data_slice.copy(), self.alphas_cube.data, axis)
+                for data_slice in data])
+            result = RecursiveFilter._recurse_batched(
+                data.copy(), self.alphas_cube.data, axis-2)
+            self.assertArrayEqual(result, expected)
+
+    def test_backward(self):
+        """Test that each slice of a stack is filtered in the same way as
+        by _recurse_backward along each axis."""
+        data = np.stack([self.cube.data[0], self.cube.data[0].T])
+        for axis in [0, 1]:
+            expected = np.stack([
+                RecursiveFilter._recurse_backward(
+                    data_slice.copy(), self.alphas_cube.data, axis)
+                for data_slice in data])
+            result = RecursiveFilter._recurse_batched(
+                data.copy(), self.alphas_cube.data, axis-2, backward=True)
+            self.assertArrayEqual(result, expected)
+
+
+class Test__run_batched_recursion(Test_RecursiveFilter):
+
+    """Test the _run_batched_recursion method"""
+
+    def test_matches_run_recursion(self):
+        """Test that the result matches _run_recursion, with and without
+        multiple workers."""
+        cube = iris.util.squeeze(self.cube)
+        alphas_x = RecursiveFilter()._set_alphas(cube, self.alpha_x, None)
+        alphas_y = RecursiveFilter()._set_alphas(cube, 0.25, None)
+        padded_cube = pad_cube_with_halo(cube, 2, 2)
+        padded_data = padded_cube.data.copy()
+        expected = RecursiveFilter()._run_recursion(
+            padded_cube, alphas_x, alphas_y, 2)
+        for n_workers in [1, 3]:
+            result = RecursiveFilter(
+                n_workers=n_workers)._run_batched_recursion(
+                    padded_data[np.newaxis].copy(), alphas_x.data,
+                    alphas_y.data, 2)
+            self.assertArrayEqual(result[0], expected.data)
+
+
 class Test__run_recursion(Test_RecursiveFilter):
 
     """Test the _run_recursion method"""
@@ -403,6 +470,23 @@ class Test_process(Test_RecursiveFilter):
             ["realization", "longitude", "latitude"])
         self.assertArrayAlmostEqual(result.data[0], expected_result)
 
+    def test_engines_match(self):
+        """Test that the "batched" and "slices" engines give the same cube
+        for multiple realizations of masked data."""
+        cube = add_coordinate(self.cube[0], [0, 1, 2], "realization",
+                              dtype=np.int32)
+        cube.data[1] = cube.data[1].T
+        mask = np.zeros(cube.shape)
+        mask[2, 1, 2] = 1
+        cube.data = np.ma.MaskedArray(cube.data, mask=mask)
+        results = [
+            RecursiveFilter(alpha_x=self.alpha_x, alpha_y=0.25,
+                            iterations=2, re_mask=True,
+                            engine=engine).process(cube.copy())
+            for engine in ["batched", "slices"]]
+        self.assertEqual(results[0], results[1])
+        self.assertArrayEqual(results[0].data.mask, results[1].data.mask)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -40,7 +40,9 @@ from iris.tests import IrisTest
 
 import numpy as np
 
+from improver.nbhood.mask_areas import NeighbourhoodMaskAreas
 from improver.nbhood.square_kernel import SquareNeighbourhood
+from improver.utilities.cube_checker import check_cube_coordinates
 from improver.wind_calculations.wind_direction import WindDirection
 from improver.tests.nbhood.nbhood.test_NeighbourhoodProcessing import (
     set_up_cube)
@@ -72,6 +74,57 @@ class Test__repr__(IrisTest):
         self.assertEqual(result, msg)
 
 
+class Test_select_precision(IrisTest):
+
+    """Test the selection of the precision for the cumulative sum."""
+
+    def test_complex(self):
+        """Test that complex data uses a complex sum."""
+        data = np.ones((3, 3), dtype=complex)
+        result = SquareNeighbourhood.select_precision(data, iscomplex=True)
+        self.assertEqual(result, "complex")
+
+    def test_probability(self):
+        """Test that probabilities use a single precision sum."""
+        data = np.full((3, 3), 0.5, dtype=np.float32)
+        result = SquareNeighbourhood.select_precision(
+            data, is_probability=True)
+        self.assertEqual(result, "float32")
+
+    def test_integer_valued(self):
+        """Test that integer-valued data uses a double precision sum."""
+        data = np.array([[0., 1.], [1., 1.]], dtype=np.float32)
+        result = SquareNeighbourhood.select_precision(data)
+        self.assertEqual(result, "float64")
+
+    def test_non_integer_valued(self):
+        """Test that other data uses a compensated sum."""
+        data = np.array([[0., 1.5], [1., 1.]], dtype=np.float32)
+        result = SquareNeighbourhood.select_precision(data)
+        self.assertEqual(result, "kahan")
+
+
+class Test__compensated_cumsum(IrisTest):
+
+    """Test the compensated cumulative sum."""
+
+    def test_basic(self):
+        """Test the cumulative sum along each axis matches np.cumsum for
+        values that can be summed exactly."""
+        data = np.arange(12.).reshape(3, 4)
+        for axis in [0, 1]:
+            result = SquareNeighbourhood._compensated_cumsum(data, axis)
+            self.assertArrayEqual(result, np.cumsum(data, axis=axis))
+
+    def test_compensation(self):
+        """Test that small values are not lost when added to a large
+        running total."""
+        data = np.array([1.e16, 1., 1., 1., 1., -1.e16])
+        result = SquareNeighbourhood._compensated_cumsum(data, 0)
+        self.assertEqual(result[-1], 4.)
+        self.assertNotEqual(np.cumsum(data)[-1], 4.)
+
+
 class Test_cumulate_array(IrisTest):
 
     """Test for cumulating an array in the y and x dimension."""
@@ -148,6 +201,47 @@ class Test_calculate_neighbourhood(IrisTest):
                                                           self.n_columns))
         self.assertArrayEqual(result, expected)
 
+    def test_preallocated_output(self):
+        """Test that the neighbourhood total is written into a preallocated
+        output array, without modifying the summed cube."""
+        out = np.zeros((self.n_rows, self.n_columns))
+        result = (
+            SquareNeighbourhood().calculate_neighbourhood(self.cube,
+                                                          self.ymax_xmax_disp,
+                                                          self.ymin_xmax_disp,
+                                                          self.ymin_xmin_disp,
+                                                          self.ymax_xmin_disp,
+                                                          self.n_rows,
+                                                          self.n_columns,
+                                                          out=out))
+        self.assertIs(result, out)
+        self.assertEqual(result[3, 3], 8.)
+        self.assertArrayEqual(self.cube.data, self.data)
+
+    def test_non_contiguous_preallocated_output(self):
+        """Test that the neighbourhood total is written into a preallocated
+        output array that is not C-contiguous."""
+        expected = (
+            SquareNeighbourhood().calculate_neighbourhood(self.cube,
+                                                          self.ymax_xmax_disp,
+                                                          self.ymin_xmax_disp,
+                                                          self.ymin_xmin_disp,
+                                                          self.ymax_xmin_disp,
+                                                          self.n_rows,
+                                                          self.n_columns))
+        out = np.zeros((self.n_columns, self.n_rows)).T
+        result = (
+            SquareNeighbourhood().calculate_neighbourhood(self.cube,
+                                                          self.ymax_xmax_disp,
+                                                          self.ymin_xmax_disp,
+                                                          self.ymin_xmin_disp,
+                                                          self.ymax_xmin_disp,
+                                                          self.n_rows,
+                                                          self.n_columns,
+                                                          out=out))
+        self.assertIs(result, out)
+        self.assertArrayEqual(out, expected)
+
 
 class Test_mean_over_neighbourhood(IrisTest):
 
@@ -330,6 +424,204 @@ class Test_set_up_cubes_to_be_neighbourhooded(IrisTest):
         self.assertArrayEqual(result_nan_array, expected_nans)
 
 
+class Test_set_up_arrays_to_be_neighbourhooded(IrisTest):
+
+    """Test the set up of arrays prior to batched neighbourhooding."""
+
+    def setUp(self):
+        """Set up a multi-slice data array."""
+        self.data = np.ones((2, 5, 5), dtype=np.float32)
+        self.data[0, 2, 2] = 0.5
+        self.data[1, 1, 3] = 0.5
+
+    def test_without_masked_data(self):
+        """Test setting up arrays when the input data is not masked."""
+        data, mask, nan_array = (
+            SquareNeighbourhood.set_up_arrays_to_be_neighbourhooded(
+                self.data))
+        self.assertArrayEqual(data, self.data)
+        self.assertArrayEqual(mask, np.ones((2, 5, 5)))
+        self.assertFalse(nan_array.any())
+        self.assertEqual(data.dtype, np.float32)
+
+    def test_masked_data_and_nans(self):
+        """Test that masked points and NaNs are set to zero in both the data
+        and mask independently for each slice."""
+        self.data[0, 1, 2] = np.nan
+        input_data = np.ma.masked_equal(self.data, 0.5)
+        expected_mask = np.ones((2, 5, 5))
+        expected_mask[0, 2, 2] = 0.
+        expected_mask[1, 1, 3] = 0.
+        expected_mask[0, 1, 2] = 0.
+        data, mask, nan_array = (
+            SquareNeighbourhood.set_up_arrays_to_be_neighbourhooded(
+                input_data))
+        self.assertNotIsInstance(data, np.ma.MaskedArray)
+        self.assertArrayEqual(mask, expected_mask)
+        self.assertArrayEqual(data, expected_mask)
+        self.assertArrayEqual(np.argwhere(nan_array), [[0, 1, 2]])
+
+    def test_with_separate_mask_data(self):
+        """Test that a 2D mask is broadcast across all slices and that the
+        input mask is not modified."""
+        mask_data = np.ones((5, 5), dtype=int)
+        mask_data[0, 0] = 0
+        self.data[1, 4, 4] = np.nan
+        data, mask, _ = (
+            SquareNeighbourhood.set_up_arrays_to_be_neighbourhooded(
+                self.data, mask_data=mask_data))
+        self.assertEqual(mask.shape, (2, 5, 5))
+        self.assertArrayEqual(mask[:, 0, 0], [0, 0])
+        self.assertArrayEqual(mask[:, 4, 4], [1, 0])
+        self.assertArrayEqual(data[:, 0, 0], [0., 0.])
+        self.assertEqual(mask_data.sum(), 24)
+
+
+class Test_cumulate_batched_array(IrisTest):
+
+    """Test cumulating all slices of an array in the y and x dimension."""
+
+    def test_basic(self):
+        """Test that each slice is cumulated independently and matches the
+        result from cumulate_array."""
+        data = np.ones((2, 5, 5), dtype=np.float32)
+        data[0, 2, 2] = 0.
+        data[1, 0, 0] = 0.
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (0, 1, 0, 0)),
+            num_time_points=2, num_grid_points=5)
+        expected = np.array(
+            [SquareNeighbourhood.cumulate_array(
+                iris.util.squeeze(cube_slice)).data
+             for cube_slice in cube.slices_over("time")]).squeeze()
+        result = SquareNeighbourhood.cumulate_batched_array(data)
+        self.assertArrayEqual(result, expected)
+
+
+class Test_calculate_batched_neighbourhood(IrisTest):
+
+    """Test calculating neighbourhood totals for all slices at once."""
+
+    def test_basic(self):
+        """Test that the neighbourhood totals match the interior of the
+        result from calculate_neighbourhood, for each slice."""
+        # This array is the output from cumulate_array when a 3x3 array of 1's
+        # with a 0 at the centre point (1,1) is passed in.
+        # A Halo has been added to the data.
+        data = np.array(
+            [[0., 0., 0., 0., 0., 0., 0.],
+             [0., 0., 0., 0., 0., 0., 0.],
+             [0., 0., 1., 2., 3., 3., 3.],
+             [0., 0., 2., 3., 5., 5., 5.],
+             [0., 0., 3., 5., 8., 8., 8.],
+             [0., 0., 3., 5., 8., 8., 8.],
+             [0., 0., 3., 5., 8., 8., 8.]])
+        summed_data = np.stack([data, 2*data])
+        expected = np.array(
+            [[3., 5., 3.],
+             [5., 8., 5.],
+             [3., 5., 3.]])
+        result = SquareNeighbourhood.calculate_batched_neighbourhood(
+            summed_data, 1, 1)
+        self.assertArrayEqual(result, np.stack([expected, 2*expected]))
+
+
+class Test_calculate_neighbourhood_area(IrisTest):
+
+    """Test calculating the neighbourhood area of a mask."""
+
+    def setUp(self):
+        """Set up a mask array and the expected area for each slice."""
+        self.mask = np.ones((2, 3, 3), dtype=np.float32)
+        self.mask[:, 1, 1] = 0.
+        self.expected_slice = np.array(
+            [[3., 5., 3.],
+             [5., 8., 5.],
+             [3., 5., 3.]])
+
+    def test_same_mask_cached(self):
+        """Test that the area is calculated once for a mask that is the same
+        for every slice, and reused for a different number of slices."""
+        plugin = SquareNeighbourhood()
+        result = plugin.calculate_neighbourhood_area(self.mask, 1, 1)
+        self.assertEqual(result.shape, (2, 3, 3))
+        self.assertArrayEqual(result[0], self.expected_slice)
+        self.assertArrayEqual(result[1], self.expected_slice)
+        result = plugin.calculate_neighbourhood_area(self.mask[0], 1, 1)
+        self.assertArrayEqual(result, self.expected_slice)
+        self.assertEqual((plugin.cache.hits, plugin.cache.misses), (1, 1))
+
+    def test_different_masks(self):
+        """Test the area for slices with different masks."""
+        self.mask[1] = 1.
+        plugin = SquareNeighbourhood()
+        result = plugin.calculate_neighbourhood_area(self.mask, 1, 1)
+        self.assertArrayEqual(result[0], self.expected_slice)
+        self.assertArrayEqual(result[1], self.expected_slice + 1.)
+        self.assertEqual(len(plugin.cache), 0)
+
+    def test_precomputed_mask_areas(self):
+        """Test that the precomputed area is used for the precomputed mask,
+        and for its complement. The precomputed area differs from the area
+        of the mask, so that its use can be detected."""
+        self.expected_slice[0, 0] = 7.
+        mask_areas = NeighbourhoodMaskAreas(
+            self.mask[0], {(1, 1): self.expected_slice})
+        plugin = SquareNeighbourhood(mask_areas=mask_areas)
+        result = plugin.calculate_neighbourhood_area(self.mask, 1, 1)
+        self.assertArrayEqual(result[1], self.expected_slice)
+        result = plugin.calculate_neighbourhood_area(1. - self.mask, 1, 1)
+        self.assertArrayEqual(
+            result[1], [[4., 6., 4.], [6., 9., 6.], [4., 6., 4.]] -
+            self.expected_slice)
+
+
+class Test_mean_over_batched_neighbourhood(IrisTest):
+
+    """Test calculating the neighbourhood for all slices at once."""
+
+    def setUp(self):
+        """Set up data and mask arrays."""
+        self.data = np.ones((2, 3, 3), dtype=np.float32)
+        self.data[0, 1, 1] = 0.
+        self.mask = np.ones((2, 3, 3), dtype=np.float32)
+
+    def test_basic_fraction(self):
+        """Test the neighbourhood fraction for each slice."""
+        expected_slice = np.array(
+            [[0.75, 0.833333, 0.75],
+             [0.833333, 0.888889, 0.833333],
+             [0.75, 0.833333, 0.75]])
+        result = SquareNeighbourhood().mean_over_batched_neighbourhood(
+            self.data, self.mask, 1, 1)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayAlmostEqual(result[0], expected_slice)
+        self.assertArrayAlmostEqual(result[1], np.ones((3, 3)))
+
+    def test_basic_sum(self):
+        """Test the neighbourhood sum for each slice."""
+        expected_slice = np.array(
+            [[3., 5., 3.],
+             [5., 8., 5.],
+             [3., 5., 3.]])
+        result = SquareNeighbourhood(
+            sum_or_fraction="sum").mean_over_batched_neighbourhood(
+                self.data, self.mask, 1, 1, is_probability=True)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayEqual(result[0], expected_slice)
+        self.assertArrayEqual(result[1], expected_slice + [[1, 1, 1],
+                                                           [1, 1, 1],
+                                                           [1, 1, 1]])
+
+    def test_zero_area(self):
+        """Test that points with no valid neighbours are set to NaN."""
+        self.mask[1] = 0.
+        result = SquareNeighbourhood().mean_over_batched_neighbourhood(
+            self.data, self.mask, 1, 1)
+        self.assertTrue(np.isnan(result[1]).all())
+        self.assertFalse(np.isnan(result[0]).any())
+
+
 class Test__pad_and_calculate_neighbourhood(IrisTest):
 
     """Test the padding and calculation of neighbourhood processing."""
@@ -860,6 +1152,72 @@ class Test_run(IrisTest):
         self.assertTupleEqual(result.cell_methods, cube.cell_methods)
         self.assertDictEqual(result.attributes, cube.attributes)
 
+    def test_matches_slice_by_slice(self):
+        """Test that processing all slices at once gives identical results
+        to applying the slice-by-slice methods to each slice in turn, for
+        masked data containing NaNs."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_time_points=3,
+            num_grid_points=10)
+        state = np.random.RandomState(0)
+        data = state.rand(*cube.shape).astype(np.float32)
+        data[state.rand(*cube.shape) < 0.05] = np.nan
+        cube.data = np.ma.masked_where(state.rand(*cube.shape) < 0.2, data)
+        plugin = SquareNeighbourhood()
+        grid_cells = 2
+        expected = iris.cube.CubeList()
+        for cube_slice in cube.slices([cube.coord(axis='y'),
+                                       cube.coord(axis='x')]):
+            cube_slice, mask, nan_array = (
+                plugin.set_up_cubes_to_be_neighbourhooded(cube_slice))
+            nbhood_slice = plugin._pad_and_calculate_neighbourhood(
+                cube_slice, mask, grid_cells, grid_cells)
+            nbhood_slice = plugin._remove_padding_and_mask(
+                nbhood_slice, cube_slice, mask, grid_cells, grid_cells)
+            nbhood_slice.data[nan_array] = np.nan
+            expected.append(nbhood_slice)
+        expected = check_cube_coordinates(cube, expected.merge_cube())
+        result = plugin.run(cube, grid_cells*2000)
+        self.assertArrayEqual(result.data.mask, expected.data.mask)
+        self.assertArrayEqual(result.data.data, expected.data.data)
+        self.assertEqual(result.coord(axis='x'), expected.coord(axis='x'))
+
+    def test_tiled(self):
+        """Test that processing the cube in tiles, skipping tiles in which
+        the data are constant, gives the same result as processing the whole
+        cube, for both the fraction and the sum."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2), (0, 1, 15, 12)),
+            num_time_points=2, num_grid_points=20)
+        cube.data = 1. - cube.data
+        mask_cube = iris.util.squeeze(next(cube.slices_over("time")))
+        mask_cube.data = np.ones((20, 20), dtype=np.float32)
+        mask_cube.data[18, 1] = 0.
+        for sum_or_fraction in ["fraction", "sum"]:
+            expected = SquareNeighbourhood(
+                sum_or_fraction=sum_or_fraction).run(
+                    cube.copy(), self.RADIUS, mask_cube=mask_cube)
+            plugin = SquareNeighbourhood(
+                sum_or_fraction=sum_or_fraction, tile_size=4)
+            result = plugin.run(cube.copy(), self.RADIUS, mask_cube=mask_cube)
+            self.assertEqual(result.dtype, expected.dtype)
+            self.assertArrayEqual(result.data.mask, expected.data.mask)
+            self.assertArrayAlmostEqual(result.data, expected.data)
+            self.assertLess(plugin.tiler.statistics()["active_fraction"], 1.)
+
+    def test_mask_cube_unchanged(self):
+        """Test that a separate mask cube is not modified when the input
+        cube contains masked data at multiple times."""
+        cube = set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_time_points=2,
+            num_grid_points=5)
+        cube.data = np.ma.masked_equal(cube.data, 0.)
+        mask_cube = iris.util.squeeze(next(cube.slices_over("time")))
+        mask_cube.data = np.ones((5, 5), dtype=np.float32)
+        SquareNeighbourhood().run(cube, self.RADIUS, mask_cube=mask_cube)
+        self.assertArrayEqual(mask_cube.data, np.ones((5, 5)))
+        self.assertEqual(mask_cube.name(), cube.name())
+
 
 if __name__ == '__main__':
     unittest.main()
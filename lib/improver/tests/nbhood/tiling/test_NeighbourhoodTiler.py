@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Unit tests for the nbhood.tiling.NeighbourhoodTiler plugin."""
+
+
+import unittest
+
+from iris.tests import IrisTest
+import numpy as np
+import scipy.ndimage
+
+from improver.nbhood.tiling import NeighbourhoodTiler
+
+
+def box_sum(data, mask):
+    """Sum over a 5x5 neighbourhood, treating points beyond the edge of
+    the domain as zero."""
+    return scipy.ndimage.uniform_filter(
+        data, size=(1, 5, 5), mode="constant") * 25.
+
+
+def box_sum_fill(values, rows, columns):
+    """Return the box sum within a constant tile away from the edges."""
+    return values * 25.
+
+
+class Test__init__(IrisTest):
+
+    """Test the init method."""
+
+    def test_invalid_tile_size(self):
+        """Test that an error is raised for a tile size less than 1."""
+        msg = "Invalid tile size: must be >= 1: 0"
+        with self.assertRaisesRegex(ValueError, msg):
+            NeighbourhoodTiler(tile_size=0)
+
+
+class Test__repr__(IrisTest):
+
+    """Test the repr method."""
+
+    def test_basic(self):
+        """Test that the __repr__ returns the expected string."""
+        result = str(NeighbourhoodTiler(tile_size=4))
+        msg = '<NeighbourhoodTiler: tile_size: 4, tiles: 0, active_tiles: 0>'
+        self.assertEqual(result, msg)
+
+
+class Test_find_constant_tiles(IrisTest):
+
+    """Test the find_constant_tiles method."""
+
+    def setUp(self):
+        """Set up an array of zeros with a single non-zero point."""
+        self.data = np.zeros((2, 12, 12), dtype=np.float32)
+        self.data[0, 1, 1] = 1.
+
+    def test_basic(self):
+        """Test that only the tiles within the radius of the non-zero point
+        are active."""
+        constant, values = NeighbourhoodTiler(
+            tile_size=4).find_constant_tiles(self.data, 2, 2)
+        expected = np.ones((2, 3, 3), dtype=bool)
+        expected[0, :2, :2] = False
+        self.assertArrayEqual(constant, expected)
+        self.assertArrayEqual(values[constant], 0.)
+
+    def test_larger_halo(self):
+        """Test that more tiles are active with a larger radius."""
+        constant, _ = NeighbourhoodTiler(
+            tile_size=4).find_constant_tiles(self.data, 2, 7)
+        expected = np.ones((2, 3, 3), dtype=bool)
+        expected[0, :, :2] = False
+        self.assertArrayEqual(constant, expected)
+
+    def test_mask(self):
+        """Test that tiles near points where the mask is not 1 are
+        active."""
+        mask = np.ones(self.data.shape, dtype=np.float32)
+        mask[1, 10, 10] = 0.
+        constant, _ = NeighbourhoodTiler(
+            tile_size=4).find_constant_tiles(self.data, 2, 2, mask=mask)
+        self.assertFalse(constant[1, 2, 2])
+        self.assertEqual(np.count_nonzero(~constant[1]), 4)
+
+    def test_nan(self):
+        """Test that tiles containing NaNs are active."""
+        self.data[1, 6, 6] = np.nan
+        constant, _ = NeighbourhoodTiler(
+            tile_size=4).find_constant_tiles(self.data, 0, 0)
+        self.assertFalse(constant[1, 1, 1])
+        self.assertEqual(np.count_nonzero(~constant[1]), 1)
+
+
+class Test_process(IrisTest):
+
+    """Test the process method."""
+
+    def setUp(self):
+        """Set up an array that is zero away from a few points."""
+        self.data = np.zeros((3, 20, 23), dtype=np.float32)
+        self.data[0, 3, 4] = 1.
+        self.data[2, 15:18, 19:22] = 0.5
+
+    def test_basic(self):
+        """Test that the result matches applying the kernel to the whole
+        array."""
+        expected = box_sum(self.data, None)
+        result = NeighbourhoodTiler(tile_size=4).process(
+            self.data, 2, 2, box_sum, box_sum_fill, np.float32)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertArrayAlmostEqual(result, expected)
+
+    def test_leading_dimensions(self):
+        """Test that the result has the shape of the input data when there
+        are several leading dimensions."""
+        data = self.data.reshape((3, 1, 20, 23))
+        result = NeighbourhoodTiler(tile_size=4).process(
+            data, 2, 2, box_sum, box_sum_fill, np.float32)
+        self.assertArrayAlmostEqual(
+            result, box_sum(self.data, None).reshape(data.shape))
+
+    def test_statistics(self):
+        """Test that the statistics describe the tiles processed and are
+        accumulated over calls."""
+        plugin = NeighbourhoodTiler(tile_size=4)
+        plugin.process(self.data, 2, 2, box_sum, box_sum_fill, np.float32)
+        statistics = plugin.statistics()
+        self.assertEqual(statistics["n_tiles"], 90)
+        self.assertEqual(statistics["n_active_tiles"], 15)
+        self.assertAlmostEqual(statistics["active_fraction"], 15 / 90)
+        self.assertIsNotNone(statistics["estimated_time_saved"])
+        plugin.process(self.data, 2, 2, box_sum, box_sum_fill, np.float32)
+        self.assertEqual(plugin.statistics()["n_tiles"], 180)
+        plugin.reset_statistics()
+        self.assertIsNone(plugin.statistics()["active_fraction"])
+
+    def test_no_constant_tiles(self):
+        """Test that the kernel is applied to the whole array at once if
+        there are no constant tiles."""
+        data = np.random.RandomState(0).rand(2, 9, 9).astype(np.float32)
+        calls = []
+
+        def kernel(data, mask):
+            """Record the shape of the data and apply the kernel."""
+            calls.append(data.shape)
+            return box_sum(data, mask)
+
+        result = NeighbourhoodTiler(tile_size=3).process(
+            data, 2, 2, kernel, box_sum_fill, np.float32)
+        self.assertEqual(calls, [(2, 9, 9)])
+        self.assertArrayAlmostEqual(result, box_sum(data, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -128,6 +128,51 @@ class Test__repr__(IrisTest):
         self.assertEqual(result, msg)
 
 
+class Test__add_coord_for_masking(IrisTest):
+
+    """Test the _add_coord_for_masking method of
+    ApplyNeighbourhoodProcessingWithAMask."""
+
+    def setUp(self):
+        """Set up a cube and a mask cube with two topographic zones."""
+        self.cube = iris.util.squeeze(set_up_cube(
+            zero_point_indices=((0, 0, 2, 2),), num_grid_points=5))
+        mask_cubes = iris.cube.CubeList([])
+        for point, bounds in zip([50, 150], [[0, 100], [100, 200]]):
+            mask_cubes.append(set_up_topographic_zone_cube(
+                np.ones((5, 5)), point, bounds, num_grid_points=5))
+        self.mask_cube = mask_cubes.merge_cube()
+
+    def test_basic(self):
+        """Test that the data of the input cube is copied for each
+        topographic zone, which is added as the leading dimension."""
+        plugin = ApplyNeighbourhoodProcessingWithAMask(
+            "topographic_zone", 2000)
+        result = plugin._add_coord_for_masking(self.cube, self.mask_cube)
+        self.assertEqual(result.shape, (2, 5, 5))
+        self.assertEqual(result.coord_dims("topographic_zone"), (0,))
+        self.assertArrayEqual(
+            result.coord("topographic_zone").points, [50, 150])
+        self.assertEqual(result.coord_dims("projection_y_coordinate"), (1,))
+        self.assertEqual(result.coord_dims("projection_x_coordinate"), (2,))
+        self.assertEqual(result.name(), self.cube.name())
+        self.assertEqual(result.coord("realization"),
+                         self.cube.coord("realization"))
+        for band_slice in result.data:
+            self.assertArrayEqual(band_slice, self.cube.data)
+
+    def test_masked_data(self):
+        """Test that the mask of masked input data is copied for each
+        topographic zone."""
+        self.cube.data = np.ma.masked_equal(self.cube.data, 0)
+        plugin = ApplyNeighbourhoodProcessingWithAMask(
+            "topographic_zone", 2000)
+        result = plugin._add_coord_for_masking(self.cube, self.mask_cube)
+        self.assertIsInstance(result.data, np.ma.MaskedArray)
+        for band_slice in result.data:
+            self.assertArrayEqual(band_slice.mask, self.cube.data.mask)
+
+
 class Test_process(IrisTest):
 
     """Test the process method of ApplyNeighbourhoodProcessingWithAMask."""
@@ -38,7 +38,8 @@ import numpy as np
 import iris
 from iris.tests import IrisTest
 
-from improver.utilities.mathematical_operations import Integration
+from improver.utilities.mathematical_operations import (
+    Integration, interpolate_multiple_rows)
 from improver.tests.ensemble_calibration.ensemble_calibration.\
     helper_functions import set_up_temperature_cube
 
@@ -545,5 +546,81 @@ class Test_process(IrisTest):
         self.assertArrayAlmostEqual(result.data, expected)
 
 
+class Test_interpolate_multiple_rows(IrisTest):
+
+    """Test the interpolate_multiple_rows function."""
+
+    def setUp(self):
+        """Set up points and knots, including points outside the knots and
+        points on the knots."""
+        self.x = np.array([-1., 0., 0.5, 2., 2.5, 4.])
+        self.xp = np.array([[0., 1., 2., 3.],
+                            [0., 2., 2., 4.],
+                            [1., 1.5, 2.5, 3.]])
+        self.fp = np.array([[10., 20., 30., 40.],
+                            [1., 2., 3., 4.],
+                            [5., 5., 6., 8.]])
+
+    def test_common_knots(self):
+        """Test that the result matches np.interp when the knots are the
+        same for every row, and the function values vary."""
+        result = interpolate_multiple_rows(self.x, self.xp[0], self.fp)
+        expected = np.array(
+            [np.interp(self.x, self.xp[0], row) for row in self.fp])
+        self.assertArrayEqual(result, expected)
+
+    def test_knots_for_each_row(self):
+        """Test that the result matches np.interp when the knots vary by
+        row, including repeated knots."""
+        result = interpolate_multiple_rows(self.x, self.xp, self.fp[0])
+        expected = np.array(
+            [np.interp(self.x, row, self.fp[0]) for row in self.xp])
+        self.assertArrayEqual(result, expected)
+
+    def test_points_for_each_row(self):
+        """Test that the result matches np.interp when the points, the knots
+        and the function values all vary by row."""
+        x = np.array([self.x, self.x[::-1], self.x + 0.25])
+        result = interpolate_multiple_rows(x, self.xp, self.fp)
+        expected = np.array(
+            [np.interp(*args) for args in zip(x, self.xp, self.fp)])
+        self.assertArrayEqual(result, expected)
+
+    def test_one_dimensional(self):
+        """Test that a one-dimensional result is returned for
+        one-dimensional inputs."""
+        result = interpolate_multiple_rows(self.x, self.xp[0], self.fp[0])
+        self.assertArrayEqual(
+            result, np.interp(self.x, self.xp[0], self.fp[0]))
+
+    def test_not_ascending(self):
+        """Test that a row of knots that is not ascending gives the same
+        result as np.interp."""
+        xp = self.xp.copy()
+        xp[1] = xp[1][::-1]
+        x = np.append(self.x, np.nan)
+        result = interpolate_multiple_rows(x, xp, self.fp[0])
+        expected = np.array([np.interp(x, row, self.fp[0]) for row in xp])
+        self.assertArrayEqual(result, expected)
+
+    def test_common_knots_not_ascending(self):
+        """Test that knots shared by every row that are not ascending give
+        the same result as np.interp, for both two-dimensional and
+        one-dimensional inputs."""
+        xp = np.array([0., 2., 1., 3.])
+        result = interpolate_multiple_rows(self.x, xp, self.fp)
+        expected = np.array([np.interp(self.x, xp, row) for row in self.fp])
+        self.assertArrayEqual(result, expected)
+        result = interpolate_multiple_rows(self.x, xp, self.fp[0])
+        self.assertArrayEqual(result, np.interp(self.x, xp, self.fp[0]))
+
+    def test_mismatched_knots(self):
+        """Test that an error is raised if the number of knots and function
+        values differ."""
+        msg = "The number of points at which the function is known 4"
+        with self.assertRaisesRegex(ValueError, msg):
+            interpolate_multiple_rows(self.x, self.xp, self.fp[:, :3])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2017-2019 Met Office.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Module containing a least recently used cache of calculated values."""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+import numpy as np
+
+
+class LeastRecentlyUsedCache(object):
+    """
+    Cache of calculated values, with a maximum number of entries. When the
+    maximum is exceeded, the least recently used value is discarded. The
+    cache may be shared between threads.
+    """
+
+    def __init__(self, max_entries):
+        """
+        Initialise class.
+
+        Args:
+            max_entries (int):
+                Maximum number of values to hold. When this is exceeded, the
+                least recently used value is discarded.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        """Represent the configured class instance as a string."""
+        result = ('<{}: max_entries: {}, entries: {}, hits: {}, misses: {}>')
+        return result.format(type(self).__name__, self.max_entries, len(self),
+                             self.hits, self.misses)
+
+    def __len__(self):
+        """Return the number of values held within the cache."""
+        return len(self._entries)
+
+    def clear(self):
+        """Discard all the values held within the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key, function, *args, **kwargs):
+        """
+        Return the value held for the key, or calculate and hold the value
+        if it is not present.
+
+        Args:
+            key (tuple):
+                Hashable key identifying the value.
+            function (callable):
+                Function to calculate the value, if it is not present.
+            *args:
+                Positional arguments passed to the function.
+            **kwargs:
+                Keyword arguments passed to the function.
+
+        Returns:
+            value:
+                The value held for the key. This should not be modified, as
+                it may be returned again.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # The value is calculated outside the lock, so other threads are not
+        # held up. If two threads calculate the same value, both are equal.
+        value = function(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    @staticmethod
+    def array_key(array):
+        """
+        Create a key identifying the contents of an array.
+
+        Args:
+            array (numpy.ndarray):
+                Array to be identified.
+
+        Returns:
+            key (tuple):
+                Hashable description of the shape, type and values of the
+                array.
+        """
+        return (array.shape, array.dtype.str,
+                hashlib.sha1(np.ascontiguousarray(array)).hexdigest())
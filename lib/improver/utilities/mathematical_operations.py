@@ -313,3 +313,118 @@ class Integration(object):
             self.ensure_monotonic_increase_in_chosen_direction(
                 integrated_cube))
         return integrated_cube
+
+
+def interpolate_multiple_rows(x, xp, fp):
+    """
+    Perform one-dimensional linear interpolation along each row of a set of
+    data, giving the same values as np.interp applied to each row in turn,
+    but in a single vectorised pass over the rows.
+
+    Any of the inputs may either be one-dimensional, in which case the same
+    values are used for every row, or two-dimensional with one row for each
+    row of the output. As for np.interp, values of x below the first value
+    of xp in a row take the first value of fp, and values of x above the
+    last value of xp take the last value of fp.
+
+    Args:
+        x (Numpy array):
+            The points at which to interpolate, of shape (points,) or
+            (rows, points).
+        xp (Numpy array):
+            The points at which the function is known, of shape (knots,) or
+            (rows, knots). These should be ascending along each row. Any row
+            that is not ascending, including a single row of knots shared by
+            every row, is interpolated by np.interp individually, so that the
+            result still matches np.interp.
+        fp (Numpy array):
+            The values of the function at xp, of shape (knots,) or
+            (rows, knots).
+
+    Returns:
+        result (Numpy array):
+            The interpolated values, of shape (rows, points), or (points,) if
+            all the inputs are one-dimensional.
+
+    Raises:
+        ValueError: The number of knots within xp and fp differ.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    xp = np.asarray(xp, dtype=np.float64)
+    fp = np.asarray(fp, dtype=np.float64)
+    if xp.shape[-1] != fp.shape[-1]:
+        msg = ("The number of points at which the function is known {} does "
+               "not match the number of values of the function {}".format(
+                   xp.shape[-1], fp.shape[-1]))
+        raise ValueError(msg)
+    all_1d = x.ndim == 1 and xp.ndim == 1 and fp.ndim == 1
+    # The calculation is performed with the rows along the last dimension,
+    # so that each operation runs along the longest contiguous dimension.
+    x, xp, fp = [np.ascontiguousarray(np.atleast_2d(array).T)
+                 for array in [x, xp, fp]]
+    n_rows = max(x.shape[1], xp.shape[1], fp.shape[1])
+    n_knots = xp.shape[0]
+    shape = (x.shape[0], n_rows)
+
+    # Find the index of the last knot that is not greater than each point,
+    # which is the interval used by np.interp.
+    if xp.shape[1] == 1:
+        index = np.searchsorted(xp[:, 0], x, side="right") - 1
+    else:
+        # Count the knots that are not greater than each point, one knot at
+        # a time.
+        index = np.full(shape, -1, dtype=np.int16)
+        not_greater = np.empty(shape, dtype=bool)
+        for knot in range(n_knots):
+            np.less_equal(xp[knot], x, out=not_greater)
+            index += not_greater
+
+    if n_knots == 1:
+        result = np.broadcast_to(fp, shape).copy()
+    else:
+        # Gather the knots either side of each point using flattened
+        # indices, which are offset to the column of each row for inputs
+        # that vary by row.
+        lower = np.clip(index, 0, n_knots - 2).astype(np.intp)
+        lower_by_row = lower * n_rows + np.arange(n_rows)
+        gathered = []
+        for values in [xp, fp]:
+            if values.shape[1] == 1:
+                indices, step = lower, 1
+            else:
+                indices, step = lower_by_row, n_rows
+            gathered.extend([values.ravel()[indices],
+                             values.ravel()[indices + step]])
+        x_lower, x_upper, f_lower, f_upper = gathered
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (f_upper - f_lower) / (x_upper - x_lower)
+            result = slope * (x - x_lower) + f_lower
+            # As in np.interp, if the value is not finite, try the
+            # calculation from the upper knot, and then fall back to the
+            # lower value if both values of the function are equal.
+            invalid = np.isnan(result)
+            if invalid.any():
+                result[invalid] = np.broadcast_to(
+                    slope * (x - x_upper) + f_upper, shape)[invalid]
+                equal = invalid & (f_lower == f_upper)
+                result[equal] = np.broadcast_to(f_lower, shape)[equal]
+        np.copyto(result, fp[:1], where=index < 0)
+        np.copyto(result, fp[-1:], where=index >= n_knots - 1)
+        np.copyto(result, np.nan, where=np.isnan(x))
+
+    # Rows that are not ascending, or every row if the knots shared by all
+    # rows are not ascending, are interpolated individually.
+    if n_knots > 1:
+        not_ascending = np.broadcast_to(
+            np.any(np.diff(xp, axis=0) < 0, axis=0), (n_rows,))
+        for row in np.flatnonzero(not_ascending):
+            result[:, row] = np.interp(
+                np.broadcast_to(x, shape)[:, row],
+                np.broadcast_to(xp, (n_knots, n_rows))[:, row],
+                np.broadcast_to(fp, (n_knots, n_rows))[:, row])
+
+    result = result.T
+    if all_1d:
+        return result[0]
+    return result
@@ -35,6 +35,11 @@
   expected="usage: improver-ensemble-calibration [-h] [--profile]
                                      [--profile_file PROFILE_FILE]
                                      [--predictor_of_mean CALIBRATE_MEAN_FLAG]
+                                     [--minimisation_method METHOD]
+                                     [--previous_coefficients COEFFICIENTS_FILE]
+                                     [--save_coefficients COEFFICIENTS_FILE]
+                                     [--subsample_fraction FRACTION]
+                                     [--subsample_seed SEED]
                                      [--save_mean_variance MEAN_VARIANCE_FILE]
                                      [--num_realizations NUMBER_OF_REALIZATIONS]
                                      [--random_ordering]
@@ -36,6 +36,15 @@
 usage: improver-ensemble-calibration [-h] [--profile]
                                      [--profile_file PROFILE_FILE]
                                      [--predictor_of_mean CALIBRATE_MEAN_FLAG]
+                                     [--minimisation_method METHOD]
+                                     [--previous_coefficients COEFFICIENTS_FILE]
+                                     [--save_coefficients COEFFICIENTS_FILE]
+                                     [--subsample_fraction FRACTION]
+                                     [--subsample_seed SEED]
+                                     [--compare_with_full_sample]
+                                     [--save_training_diagnostics DIAGNOSTICS_FILE]
+                                     [--training_store TRAINING_STORE]
+                                     [--training_length DAYS]
                                      [--save_mean_variance MEAN_VARIANCE_FILE]
                                      [--num_realizations NUMBER_OF_REALIZATIONS]
                                      [--random_ordering]
@@ -80,6 +89,59 @@ optional arguments:
                         calibrated mean. Currently the ensemble mean ("mean")
                         and the ensemble realizations ("realizations") are
                         supported as the predictors. Default: "mean".
+  --minimisation_method METHOD
+                        The method used to minimise the CRPS when estimating
+                        the coefficients. The gradient-based methods
+                        "L-BFGS-B" and "BFGS" use the analytic gradient of the
+                        CRPS, and usually converge in far fewer iterations
+                        than "Nelder-Mead". Default: "Nelder-Mead".
+  --previous_coefficients COEFFICIENTS_FILE
+                        A path to an input NetCDF file containing the
+                        coefficients saved by a previous calibration, such as
+                        that of the previous cycle, to use as the starting
+                        point when estimating the coefficients.
+  --save_coefficients COEFFICIENTS_FILE
+                        Option to save the coefficients estimated for the last
+                        time of the current forecast, so that they can be
+                        supplied as the previous coefficients of a later
+                        calibration. If used, a path to save the coefficients
+                        to must be provided.
+  --subsample_fraction FRACTION
+                        Option to estimate the coefficients from this fraction
+                        of the grid points, sampled at random from strata of
+                        the ensemble mean. If not set, all grid points are
+                        used.
+  --subsample_seed SEED
+                        Option to specify a value for the random seed used to
+                        sample the grid points, so that the subsample can be
+                        reproduced.
+  --compare_with_full_sample
+                        Option to also estimate the coefficients from all grid
+                        points when training on a subsample, so that the
+                        change in the CRPS of the coefficients estimated from
+                        the subsample can be reported. Requires
+                        --subsample_fraction.
+  --save_training_diagnostics DIAGNOSTICS_FILE
+                        Option to save the diagnostics of training on a
+                        subsample for each time, including the CRPS over the
+                        subsample and over all grid points, and, if
+                        --compare_with_full_sample is set, the percentage
+                        change in the CRPS compared with training on all grid
+                        points. If used, a path to save the diagnostics to as
+                        JSON must be provided.
+  --training_store TRAINING_STORE
+                        Option to use a directory as a rolling store of the
+                        historic forecast mean and variance and the truth for
+                        each day of the training period. The historic
+                        forecasts and truth supplied are added to the store,
+                        so only the newest day needs to be supplied, and the
+                        training data is read from the store. Days outside the
+                        training period are removed. Requires
+                        --training_length, and the ensemble mean as the
+                        predictor.
+  --training_length DAYS
+                        The number of days in the training period held by the
+                        training store.
   --save_mean_variance MEAN_VARIANCE_FILE
                         Option to save output mean and variance from
                         EnsembleCalibration plugin. If used, a path to save
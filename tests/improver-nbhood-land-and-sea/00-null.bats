@@ -39,6 +39,7 @@ usage: improver-nbhood-land-and-sea [-h] [--profile]
                                     [--radius RADIUS | --radii-by-lead-time RADII_BY_LEAD_TIME LEAD_TIME_IN_HOURS]
                                     [--sum_or_fraction {sum,fraction}]
                                     [--intermediate_filepath INTERMEDIATE_FILEPATH]
+                                    [--mask_areas_dirpath MASK_AREAS]
                                     INPUT_FILE INPUT_MASK OUTPUT_FILE
 __TEXT__
   [[ "$output" =~ "$expected" ]]
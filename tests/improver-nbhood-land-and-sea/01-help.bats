@@ -39,6 +39,7 @@ usage: improver-nbhood-land-and-sea [-h] [--profile]
                                     [--radius RADIUS | --radii-by-lead-time RADII_BY_LEAD_TIME LEAD_TIME_IN_HOURS]
                                     [--sum_or_fraction {sum,fraction}]
                                     [--intermediate_filepath INTERMEDIATE_FILEPATH]
+                                    [--mask_areas_dirpath MASK_AREAS]
                                     INPUT_FILE INPUT_MASK OUTPUT_FILE
 
 Neighbourhood the input dataset over two distinct regions of land and sea. If
@@ -73,6 +74,12 @@ optional arguments:
                         points and prior to collapsing the topographic_zone
                         coordinate. Intermediate files will not be produced if
                         no topographic masked neighbourhood processing occurs.
+  --mask_areas_dirpath MASK_AREAS
+                        A path to a directory containing the neighbourhood
+                        areas of the land-sea mask, created with the improver
+                        generate-nbhood-mask-areas CLI. If provided, the
+                        neighbourhood areas of the land and sea masks are read
+                        from this directory rather than being calculated.
 
 Collapse weights - required if using a topographic zones mask:
   --weights_for_collapsing_dim WEIGHTS
@@ -39,7 +39,8 @@ usage: improver-nbhood [-h] [--profile] [--profile_file PROFILE_FILE]
                        [--sum_or_fraction {sum,fraction}] [--re_mask]
                        [--percentiles PERCENTILES [PERCENTILES ...]]
                        [--input_mask_filepath INPUT_MASK_FILE]
-                       [--halo_radius HALO_RADIUS] [--apply-recursive-filter]
+                       [--halo_radius HALO_RADIUS] [--workers WORKERS]
+                       [--tile_size TILE_SIZE] [--apply-recursive-filter]
                        [--input_filepath_alphas_x_cube ALPHAS_X_FILE]
                        [--input_filepath_alphas_y_cube ALPHAS_Y_FILE]
                        [--alpha_x ALPHA_X] [--alpha_y ALPHA_Y]
@@ -119,6 +120,16 @@ optional arguments:
                         larger grid was defined than the standard grid and we
                         want to clip the grid back to the standard grid e.g.
                         for global data regridded to UK area. Default=None
+  --workers WORKERS     Number of threads used to neighbourhood process the
+                        realizations and times of the input concurrently,
+                        default=1
+  --tile_size TILE_SIZE
+                        Number of grid cells along each side of the tiles used
+                        to neighbourhood process the probabilities. If set,
+                        the neighbourhood is only calculated for tiles in
+                        which the data within the tile and the neighbourhood
+                        radius around it are not constant. Default=None, which
+                        processes the whole grid at once.
   --apply-recursive-filter
                         Option to apply the recursive filter to a square
                         neighbourhooded output dataset, converting it into a
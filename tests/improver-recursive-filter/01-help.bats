@@ -40,7 +40,8 @@ usage: improver-recursive-filter [-h] [--profile]
                                  [--alpha_x ALPHA_X] [--alpha_y ALPHA_Y]
                                  [--iterations ITERATIONS]
                                  [--input_mask_filepath INPUT_MASK_FILE]
-                                 [--re_mask]
+                                 [--re_mask] [--engine ENGINE]
+                                 [--workers WORKERS]
                                  INPUT_FILE OUTPUT_FILE
 
 Run a recursive filter to convert a square neighbourhood into a Gaussian-like
@@ -79,6 +80,13 @@ optional arguments:
                         A path to an input mask NetCDF file to be used to mask
                         the input file.
   --re_mask             Re-apply mask to recursively filtered output.
+  --engine ENGINE       The engine used to run the recursive filter. 'batched'
+                        filters all the 2D slices of the input at once, whilst
+                        'slices' filters each 2D slice in turn. Options:
+                        'batched', 'slices'. Default: 'batched'.
+  --workers WORKERS     Number of threads used by the 'batched' engine to
+                        filter independent rows or columns in parallel,
+                        default=1
 __HELP__
   [[ "$output" == "$expected" ]]
 }
@@ -40,7 +40,7 @@ usage: improver-weighted-blending [-h] [--profile]
                                   [--calendar CALENDAR]
                                   [--cycletime CYCLETIME]
                                   [--model_id_attr MODEL_ID_ATTR]
-                                  [--spatial_weights_from_mask]
+                                  [--spatial_weights_from_mask] [--streaming]
                                   [--fuzzy_length FUZZY_LENGTH]
                                   [--y0val LINEAR_STARTING_POINT]
                                   [--ynval LINEAR_END_POINT]
@@ -107,6 +107,13 @@ optional arguments:
                         data we are blending. The spatial weights are
                         calculated using the SpatiallyVaryingWeightsFromMask
                         plugin.
+  --streaming           If set, the input files are blended one at a time,
+                        accumulating the weighted values into arrays the size
+                        of a single input field, so that all of the input data
+                        is never held in memory at once. This applies to the
+                        weighted_mean and weighted_maximum of non-percentile
+                        data. Note that calculating spatial weights from the
+                        mask reads all of the input data.
 
 Spatial weights from mask options:
   Options for calculating the spatial weights using the